@@ -0,0 +1,137 @@
+"""
+Fixtures for the benchmark suite.
+
+Benchmarks live in *_bench.py files so the regular test run doesn't collect
+them. Run them with scripts/test/benchmarks.sh.
+
+Each benchmark runs its scenario a number of times and records the median
+latency and the maximum query count, and compares them to the committed
+baseline (benchmarks/baseline.json). A scenario fails if it makes more queries
+than the baseline, or if its median latency is more than
+BENCHMARK_LATENCY_TOLERANCE (a multiplier, default 1.0 - i.e. twice the
+baseline) over. Scenarios without a baseline pass with a warning.
+
+Set BENCHMARK_UPDATE_BASELINE=True to write the results to the baseline file
+instead of checking them.
+"""
+
+import json
+import statistics
+import time
+import warnings
+from pathlib import Path
+
+import pytest
+
+from unified_ecommerce.envs import get_bool, get_int, get_string
+from unified_ecommerce.query_metrics import count_queries
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+DEFAULT_ROUNDS = get_int("BENCHMARK_ROUNDS", 5)
+LATENCY_TOLERANCE = float(get_string("BENCHMARK_LATENCY_TOLERANCE", "1.0"))
+UPDATE_BASELINE = get_bool("BENCHMARK_UPDATE_BASELINE", False)  # noqa: FBT003
+
+_results = {}
+
+
+def _load_baseline() -> dict:
+    """Load the committed baseline."""
+
+    if not BASELINE_PATH.exists():
+        return {}
+
+    return json.loads(BASELINE_PATH.read_text())
+
+
+def _check_against_baseline(name: str, result: dict, baseline: dict):
+    """Fail if the result is a regression from the baseline."""
+
+    if name not in baseline:
+        warnings.warn(f"No baseline for benchmark {name}", stacklevel=2)
+        return
+
+    expected = baseline[name]
+
+    if result["queries"] > expected["queries"]:
+        pytest.fail(
+            f"{name} made {result['queries']} queries; the baseline is "
+            f"{expected['queries']}."
+        )
+
+    max_latency = expected["median_seconds"] * (1 + LATENCY_TOLERANCE)
+    if result["median_seconds"] > max_latency:
+        pytest.fail(
+            f"{name} took {result['median_seconds']:.4f}s (median); the baseline "
+            f"is {expected['median_seconds']:.4f}s."
+        )
+
+
+@pytest.fixture(scope="session")
+def benchmark_baseline():
+    """Return the committed baseline results."""
+
+    return _load_baseline()
+
+
+@pytest.fixture()
+def benchmark(request, benchmark_baseline):
+    """
+    Return a function that benchmarks a scenario.
+
+    The function takes the callable to benchmark, and optionally a setup
+    callable (run before each round, untimed) that returns the arguments for
+    it, and the number of rounds. It returns the result of the last round.
+    """
+
+    name = request.node.name
+
+    def run(func, *, setup=None, rounds=DEFAULT_ROUNDS):
+        timings = []
+        query_counts = []
+        result = None
+
+        for _ in range(rounds):
+            args = setup() if setup else ()
+
+            with count_queries(lambda: f"Benchmark {name}") as counter:
+                start = time.perf_counter()
+                result = func(*args)
+                timings.append(time.perf_counter() - start)
+
+            query_counts.append(counter.count)
+
+        _results[name] = {
+            "queries": max(query_counts),
+            "median_seconds": round(statistics.median(timings), 6),
+        }
+
+        if not UPDATE_BASELINE:
+            _check_against_baseline(name, _results[name], benchmark_baseline)
+
+        return result
+
+    return run
+
+
+def pytest_sessionfinish(session, exitstatus):  # noqa: ARG001
+    """Write the results to the baseline file, if we're updating it."""
+
+    if not UPDATE_BASELINE or not _results:
+        return
+
+    baseline = {**_load_baseline(), **_results}
+    BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Print the results."""
+
+    if not _results:
+        return
+
+    terminalreporter.section("benchmarks")
+    for name, result in sorted(_results.items()):
+        terminalreporter.write_line(
+            f"{name}: {result['median_seconds'] * 1000:.2f}ms median, "
+            f"{result['queries']} queries"
+        )
@@ -0,0 +1,280 @@
+"""Benchmarks for the purchase funnel, from adding to the basket to refunds."""
+
+import uuid
+from decimal import Decimal
+
+import pytest
+import reversion
+from django.urls import reverse
+from mitol.payment_gateway.api import ProcessorResponse
+from rest_framework.test import APIClient
+
+from payments.api import (
+    generate_checkout_payload,
+    generate_discount_code,
+    process_cybersource_payment_response,
+)
+from payments.constants import PAYMENT_HOOK_ACTION_POST_SALE
+from payments.factories import (
+    BasketFactory,
+    BasketItemFactory,
+    OrderFactory,
+    PaymentTransactionFactory,
+)
+from payments.models import Line, Order
+from payments.serializers.v0 import (
+    WebhookBase,
+    WebhookBaseSerializer,
+    WebhookOrder,
+)
+from refunds.api import create_request_from_order, process_approved_refund
+from system_meta.factories import ActiveIntegratedSystemFactory, ProductFactory
+from unified_ecommerce.constants import (
+    DISCOUNT_TYPE_DOLLARS_OFF,
+    PAYMENT_TYPE_MARKETING,
+)
+from unified_ecommerce.factories import UserFactory
+from unified_ecommerce.test_utils import generate_mocked_request
+
+pytestmark = [pytest.mark.django_db, pytest.mark.parametrize("size", [1, 10, 50])]
+
+
+@pytest.fixture(autouse=True)
+def _external_services(settings, mocker):
+    """Keep the benchmarks from calling out to external services."""
+
+    settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_SECURITY_KEY = "Test Security Key"
+    settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_ACCESS_KEY = "Test Access Key"
+    settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_PROFILE_ID = uuid.uuid4()
+
+    mocker.patch("payments.api.send_pre_sale_webhook")
+    mocker.patch("payments.tasks.dispatch_webhook.delay")
+    mocker.patch("requests.post")
+    mocker.patch(
+        "mitol.payment_gateway.api.PaymentGateway.validate_processor_response",
+        return_value=True,
+    )
+    mocker.patch("refunds.api.create_request_access_codes")
+    mocker.patch("refunds.mail_api.send_refund_issued_email")
+    mocker.patch("refunds.mail_api.send_refund_denied_email")
+    mocker.patch("refunds.sheets.update_google_sheets")
+    mocker.patch("refunds.tasks.queue_process_approved_refund.delay")
+
+
+@pytest.fixture()
+def system():
+    """Create an integrated system."""
+
+    return ActiveIntegratedSystemFactory.create()
+
+
+@pytest.fixture()
+def products(system, size):
+    """Create versioned products in the system."""
+
+    with reversion.create_revision():
+        return ProductFactory.create_batch(size, system=system, price=Decimal(10))
+
+
+@pytest.fixture()
+def user():
+    """Create a user."""
+
+    return UserFactory.create()
+
+
+@pytest.fixture()
+def user_client(user):
+    """Return an API client authenticated as the user."""
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def _fill_basket(user, system, products):
+    """Create a basket for the user with the products in it."""
+
+    basket = BasketFactory.create(user=user, integrated_system=system)
+    for product in products:
+        BasketItemFactory.create(basket=basket, product=product, quantity=1)
+
+    return basket
+
+
+def _create_order(user, system, products, *, state=Order.STATE.FULFILLED):
+    """Create an order with a line for each product."""
+
+    order = OrderFactory.create(
+        purchaser=user,
+        integrated_system=system,
+        state=state,
+        total_price_paid=sum(product.price for product in products),
+    )
+
+    for product in products:
+        Line.from_product(
+            product=product,
+            order=order,
+            quantity=1,
+            discounted_price=product.price,
+        ).save()
+
+    PaymentTransactionFactory.create(
+        order=order,
+        transaction_id=str(uuid.uuid4()),
+        amount=order.total_price_paid,
+    )
+    return order
+
+
+def test_basket_add(benchmark, user, user_client, system, products, size):
+    """Add a product to a basket that already has the other products in it."""
+
+    _fill_basket(user, system, products[:-1])
+    url = reverse(
+        "v0:create_from_product",
+        kwargs={"system_slug": system.slug, "sku": products[-1].sku},
+    )
+
+    response = benchmark(lambda: user_client.post(url))
+
+    assert response.status_code in (200, 201)
+
+
+def test_multi_sku_basket_add(benchmark, user_client, system, products, size):
+    """Add all the products to the basket at once."""
+
+    payload = {
+        "system_slug": system.slug,
+        "skus": [{"sku": product.sku, "quantity": 1} for product in products],
+    }
+
+    response = benchmark(
+        lambda: user_client.post(reverse("v0:create_with_products"), data=payload)
+    )
+
+    assert response.status_code == 200
+
+
+def test_generate_checkout_payload(benchmark, user, system, products, size):
+    """Generate the checkout payload for a full basket."""
+
+    _fill_basket(user, system, products)
+
+    payload = benchmark(
+        lambda request: generate_checkout_payload(request, system),
+        setup=lambda: (generate_mocked_request(user),),
+    )
+
+    assert "payload" in payload
+
+
+def test_cybersource_callback(benchmark, rf, user, system, products, size):
+    """Process an accepted payment response for a pending order."""
+
+    def setup():
+        _fill_basket(user, system, products)
+        checkout = generate_checkout_payload(generate_mocked_request(user), system)
+        payload = {
+            **{f"req_{key}": value for key, value in checkout["payload"].items()},
+            "decision": "ACCEPT",
+            "message": "payment processor message",
+            "transaction_id": str(uuid.uuid4()),
+        }
+        order = Order.objects.get(
+            reference_number=payload["req_reference_number"],
+        )
+
+        return (rf.post(reverse("v0:checkout-result-callback"), payload), order)
+
+    result = benchmark(process_cybersource_payment_response, setup=setup)
+
+    assert result == Order.STATE.FULFILLED
+
+
+def test_order_history(benchmark, user, user_client, system, products, size):
+    """List the order history, with an order per product."""
+
+    for product in products:
+        _create_order(user, system, [product])
+
+    response = benchmark(
+        lambda: user_client.get(reverse("v0:orderhistory_api-list"), {"limit": size})
+    )
+
+    assert response.status_code == 200
+    assert len(response.data["results"]) == size
+
+
+def test_post_sale_webhook_serialization(benchmark, user, system, products, size):
+    """Serialize the post-sale webhook data for an order."""
+
+    order = _create_order(user, system, products)
+
+    def serialize():
+        webhook_data = WebhookBase(
+            type=PAYMENT_HOOK_ACTION_POST_SALE,
+            system_slug=system.slug,
+            system_key=system.api_key,
+            user=order.purchaser,
+            data=WebhookOrder(order=order, lines=list(order.lines.all())),
+        )
+        return WebhookBaseSerializer(webhook_data).data
+
+    data = benchmark(serialize)
+
+    assert len(data["data"]["lines"]) == size
+
+
+def test_bulk_discount_generation(benchmark, system, size):
+    """Generate a batch of discount codes."""
+
+    def generate():
+        return generate_discount_code(
+            discount_type=DISCOUNT_TYPE_DOLLARS_OFF,
+            payment_type=PAYMENT_TYPE_MARKETING,
+            amount=10,
+            count=size,
+            prefix=f"bench-{uuid.uuid4().hex[:8]}-",
+            codes=f"bench-{uuid.uuid4()}",
+            integrated_system=system.id,
+        )
+
+    codes = benchmark(generate)
+
+    assert len(codes) == size
+
+
+def test_refund_approval(benchmark, mocker, user, system, products, size):
+    """Approve and process a refund for a whole order."""
+
+    start_refund = mocker.patch("mitol.payment_gateway.api.PaymentGateway.start_refund")
+    mocker.patch("payments.api.process_post_sale_webhooks")
+
+    def setup():
+        order = _create_order(user, system, products)
+        refund_request = create_request_from_order(user, order)
+        start_refund.return_value = ProcessorResponse(
+            state=ProcessorResponse.STATE_PENDING,
+            response_data={
+                "id": str(uuid.uuid4()),
+                "refundAmountDetails": {
+                    "refundAmount": float(refund_request.total_requested)
+                },
+            },
+            transaction_id=str(uuid.uuid4()),
+            message="",
+            response_code="",
+        )
+
+        return (refund_request,)
+
+    def approve(refund_request):
+        refund_request.approve("Benchmark")
+        process_approved_refund(refund_request)
+        return refund_request
+
+    refund_request = benchmark(approve, setup=setup)
+
+    assert refund_request.order.state == Order.STATE.REFUNDED
@@ -12,7 +12,8 @@ from django.views.generic import TemplateView
 
 from payments import api
 from payments.models import Basket
-from system_meta.models import IntegratedSystem, Product
+from system_meta.models import Product
+from system_meta.resolvers import resolve_system
 
 log = logging.getLogger(__name__)
 
@@ -25,7 +26,7 @@ class CartView(LoginRequiredMixin, TemplateView):
 
     def get(self, request: HttpRequest, system_slug: str) -> HttpResponse:
         """Render the cart page."""
-        system = IntegratedSystem.objects.get(slug=system_slug)
+        system = resolve_system(system_slug)
         basket = Basket.establish_basket(request, system)
         products = Product.objects.all()
 
@@ -61,7 +62,7 @@ class CheckoutInterstitialView(LoginRequiredMixin, TemplateView):
     def get(self, request, system_slug):
         """Render the checkout interstitial page."""
         try:
-            system = IntegratedSystem.objects.get(slug=system_slug)
+            system = resolve_system(system_slug)
             checkout_payload = api.generate_checkout_payload(request, system)
         except ObjectDoesNotExist:
             return HttpResponse("No basket")
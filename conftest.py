@@ -5,6 +5,9 @@ import pytest
 from django.conf import settings
 
 from fixtures.common import *  # noqa: F403
+
+# The star import skips these, since they start with an underscore.
+from fixtures.common import _clear_resolver_cache, _clear_throttles  # noqa: F401
 from fixtures.users import *  # noqa: F403
 from unified_ecommerce.exceptions import DoNotUseRequestException
 
@@ -9,6 +9,7 @@ import factory
 import pytest
 import responses
 from pytest_mock import PytestMockWarning
+from redis.exceptions import ConnectionError as RedisConnectionError
 from rest_framework.test import APIClient
 from urllib3.exceptions import InsecureRequestWarning
 
@@ -104,3 +105,99 @@ def mock_learn_api_metadata_updater(mocker):
         ),
         "update_products_task": mocker.patch("system_meta.tasks.update_products.delay"),
     }
+
+
+@pytest.fixture(autouse=True)
+def _clear_resolver_cache():
+    """Clear the process-local system/product resolver cache between tests"""
+
+    from system_meta.resolvers import clear_resolver_cache
+
+    clear_resolver_cache()
+    yield
+    clear_resolver_cache()
+
+
+@pytest.fixture(autouse=True)
+def _clear_throttles():
+    """
+    Clear the default cache between tests, since the throttles fall back to
+    keeping their history there and every test client has the same IP.
+    """
+
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class FakeRedis:
+    """Just enough of a Redis client for the metrics store."""
+
+    def __init__(self):
+        """Start with an empty store."""
+
+        self.hashes = {}
+        self.fail = False
+
+    def pipeline(self, transaction):  # noqa: ARG002
+        """Return a pipeline that runs the commands when executed."""
+
+        return FakeRedisPipeline(self)
+
+    def hgetall(self, key):
+        """Return the hash, as Redis would (as bytes)."""
+
+        return {
+            field.encode(): str(value).encode()
+            for field, value in self.hashes.get(key, {}).items()
+        }
+
+
+class FakeRedisPipeline:
+    """Queues the commands, and runs them against the fake client."""
+
+    def __init__(self, client):
+        """Set up the pipeline."""
+
+        self.client = client
+        self.commands = []
+
+    def hset(self, key, field, value):
+        """Queue an HSET."""
+
+        self.commands.append((key, field, lambda stored: value))  # noqa: ARG005
+
+    def hincrbyfloat(self, key, field, amount):
+        """Queue an HINCRBYFLOAT."""
+
+        self.commands.append((key, field, lambda stored: float(stored or 0) + amount))
+
+    def eval(self, script, numkeys, key, field, value):  # noqa: ARG002, PLR0913
+        """Queue the metrics store's max script."""
+
+        self.commands.append(
+            (key, field, lambda stored: max(float(stored or value), value))
+        )
+
+    def execute(self):
+        """Run the queued commands."""
+
+        if self.client.fail:
+            raise RedisConnectionError
+
+        for key, field, command in self.commands:
+            stored = self.client.hashes.setdefault(key, {})
+            stored[field] = command(stored.get(field))
+
+
+@pytest.fixture()  # noqa: PT001, RUF100
+def metrics_store(mocker, settings):
+    """Publish the metrics to a fake Redis store, and return it."""
+
+    settings.MITOL_UE_METRICS_CACHE_NAME = "redis"
+    settings.MITOL_UE_METRICS_PUBLISH_INTERVAL = 60
+    client = FakeRedis()
+    mocker.patch("django_redis.get_redis_connection", return_value=client)
+    return client
@@ -0,0 +1,12 @@
+"""Dataclasses for the OpenAPI app."""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class PrecomputedSchema:
+    """A rendered API schema, ready to serve."""
+
+    content: bytes
+    compressed: bytes
+    content_hash: str
@@ -8,6 +8,8 @@ from django.conf import settings
 from django.core import management
 from django.core.management import BaseCommand
 
+from openapi.schema import get_code_hash, precompute_schemas
+
 
 class Command(BaseCommand):
     """Generate OpenAPI specs for our APIs."""
@@ -30,12 +32,30 @@ class Command(BaseCommand):
             default=False,
             help="Fail the command if there are any warnings",
         )
+        parser.add_argument(
+            "--precompute",
+            dest="precompute",
+            action="store_true",
+            default=False,
+            help=(
+                "Build the schemas that the API serves and store them in the "
+                "cache, instead of writing the specs (run this when deploying)"
+            ),
+        )
 
         super().add_arguments(parser)
 
     def handle(self, **options):
         """Run the command"""
 
+        if options["precompute"]:
+            versions = precompute_schemas()
+            self.stdout.write(
+                f"Precomputed the {', '.join(versions)} schemas for code "
+                f"{get_code_hash()}"
+            )
+            return
+
         directory = options["directory"]
         for version in settings.REST_FRAMEWORK["ALLOWED_VERSIONS"]:
             filename = version + ".yaml"
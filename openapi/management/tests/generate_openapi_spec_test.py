@@ -0,0 +1,50 @@
+"""Tests for the generate_openapi_spec command"""
+
+from io import StringIO
+
+from django.core.management import call_command
+
+
+def test_generate_openapi_spec(mocker, tmp_path):
+    """The spec for each version should be written to the directory."""
+
+    spectacular = mocker.patch(
+        "openapi.management.commands.generate_openapi_spec.management.call_command"
+    )
+
+    call_command("generate_openapi_spec", directory=str(tmp_path))
+
+    spectacular.assert_called_once_with(
+        "spectacular",
+        urlconf="unified_ecommerce.urls",
+        file=tmp_path / "v0.yaml",
+        validate=True,
+        api_version="v0",
+        fail_on_warn=False,
+    )
+
+
+def test_generate_openapi_spec_precompute(mocker, tmp_path):
+    """With --precompute, the schemas should be cached instead of written."""
+
+    spectacular = mocker.patch(
+        "openapi.management.commands.generate_openapi_spec.management.call_command"
+    )
+    precompute = mocker.patch(
+        "openapi.management.commands.generate_openapi_spec.precompute_schemas",
+        return_value=["v0"],
+    )
+    mocker.patch(
+        "openapi.management.commands.generate_openapi_spec.get_code_hash",
+        return_value="abc123",
+    )
+    stdout = StringIO()
+
+    call_command(
+        "generate_openapi_spec", "--precompute", directory=str(tmp_path), stdout=stdout
+    )
+
+    precompute.assert_called_once_with()
+    spectacular.assert_not_called()
+    assert "v0" in stdout.getvalue()
+    assert "abc123" in stdout.getvalue()
@@ -0,0 +1,218 @@
+"""
+Precomputed API schemas.
+
+Generating the schema walks every view and serializer, which takes seconds, so
+the schema views serve a copy that's built once instead. Each version's schema
+is rendered as YAML and JSON, gzipped, and stored in the cache named by
+MITOL_UE_OPENAPI_SCHEMA_CACHE_NAME under a hash of the code that produces it:
+the project's source, the installed packages and the drf-spectacular settings.
+A deploy (or anything else that changes the code) gets a new hash, and so a new
+schema, while processes running the same code share one.
+
+`./manage.py generate_openapi_spec --precompute` builds and stores the schemas,
+so it should be run when deploying. If a process can't find its schema in the
+cache, it builds and stores it itself. Either way, each process keeps the
+schemas it has served in memory, so after the first request it doesn't even
+need the cache.
+"""
+
+import gzip
+import hashlib
+import importlib.metadata
+import json
+import logging
+import threading
+from functools import cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+from openapi.dataclasses import PrecomputedSchema
+
+log = logging.getLogger(__name__)
+
+SCHEMA_CACHE_KEY_PREFIX = "openapi:schema"
+SCHEMA_RENDERERS = {
+    OpenApiYamlRenderer.format: OpenApiYamlRenderer,
+    OpenApiJsonRenderer.format: OpenApiJsonRenderer,
+}
+
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+def _get_schema_cache():
+    """Return the cache backend used for the schemas."""
+
+    return caches[settings.MITOL_UE_OPENAPI_SCHEMA_CACHE_NAME]
+
+
+def _iter_source_files():
+    """Yield the project's Python source files, skipping tests and migrations."""
+
+    for package in sorted(Path(settings.BASE_DIR).iterdir()):
+        if not (package / "__init__.py").exists():
+            continue
+
+        for path in sorted(package.rglob("*.py")):
+            if (
+                path.name == "conftest.py"
+                or path.name.endswith("_test.py")
+                or "migrations" in path.parts
+                or "tests" in path.parts
+            ):
+                continue
+
+            yield path
+
+
+@cache
+def get_code_hash() -> str:
+    """
+    Return a hash of the code that the schemas are generated from.
+
+    This is worked out once per process - the code doesn't change under it.
+    """
+
+    digest = hashlib.sha256()
+    digest.update(
+        json.dumps(settings.SPECTACULAR_SETTINGS, sort_keys=True, default=str).encode(
+            "utf-8"
+        )
+    )
+
+    for distribution in sorted(
+        f"{dist.metadata['Name']}=={dist.version}"
+        for dist in importlib.metadata.distributions()
+    ):
+        digest.update(distribution.encode("utf-8"))
+
+    base_dir = Path(settings.BASE_DIR)
+    for path in _iter_source_files():
+        digest.update(str(path.relative_to(base_dir)).encode("utf-8"))
+        digest.update(path.read_bytes())
+
+    return digest.hexdigest()
+
+
+def _get_schema_cache_key(version: str) -> str:
+    """Return the cache key for the version's schemas, for the current code."""
+
+    return f"{SCHEMA_CACHE_KEY_PREFIX}:{version}:{get_code_hash()}"
+
+
+def build_schemas(version: str) -> dict[str, PrecomputedSchema]:
+    """
+    Generate the schema for the API version, and render it in each format.
+
+    Args:
+    - version (str): the API version
+    Returns:
+    - dict: the schema, keyed by the renderer format ("yaml" or "json")
+    """
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(
+        urlconf=spectacular_settings.SERVE_URLCONF, api_version=version
+    )
+    schema = generator.get_schema(request=None, public=True)
+    schemas = {}
+
+    for renderer_format, renderer_class in SCHEMA_RENDERERS.items():
+        content = renderer_class().render(schema, renderer_context={})
+        schemas[renderer_format] = PrecomputedSchema(
+            content=content,
+            compressed=gzip.compress(content, mtime=0),
+            content_hash=hashlib.sha256(content).hexdigest(),
+        )
+
+    return schemas
+
+
+def _store_schemas(version: str, schemas: dict[str, PrecomputedSchema]) -> None:
+    """Store the version's schemas in the cache, compressed."""
+
+    _get_schema_cache().set(
+        _get_schema_cache_key(version),
+        {
+            renderer_format: {
+                "compressed": schema.compressed,
+                "content_hash": schema.content_hash,
+            }
+            for renderer_format, schema in schemas.items()
+        },
+        timeout=settings.MITOL_UE_OPENAPI_SCHEMA_CACHE_TIMEOUT,
+    )
+
+
+def precompute_schemas() -> list[str]:
+    """
+    Build the schema for each API version, and store them in the cache.
+
+    Returns:
+    - list of str: the versions that were built
+    """
+
+    versions = settings.REST_FRAMEWORK["ALLOWED_VERSIONS"]
+
+    for version in versions:
+        _store_schemas(version, build_schemas(version))
+
+    return versions
+
+
+def _load_schemas(version: str) -> dict[str, PrecomputedSchema]:
+    """Return the version's schemas from the cache, building them if needed."""
+
+    cached = _get_schema_cache().get(_get_schema_cache_key(version))
+
+    if cached is None:
+        log.warning(
+            "The %s API schema hasn't been precomputed for this code, building it",
+            version,
+        )
+        schemas = build_schemas(version)
+        _store_schemas(version, schemas)
+        return schemas
+
+    return {
+        renderer_format: PrecomputedSchema(
+            content=gzip.decompress(schema["compressed"]),
+            compressed=schema["compressed"],
+            content_hash=schema["content_hash"],
+        )
+        for renderer_format, schema in cached.items()
+    }
+
+
+def get_schema(version: str, renderer_format: str) -> PrecomputedSchema:
+    """
+    Return the precomputed schema for the API version, in the given format.
+
+    Args:
+    - version (str): the API version
+    - renderer_format (str): the renderer format ("yaml" or "json")
+    Returns:
+    - PrecomputedSchema
+    """
+
+    schema = _schemas.get((version, renderer_format))
+
+    if schema is None:
+        # Only one thread in the process needs to load or build the schemas.
+        with _schemas_lock:
+            if (version, renderer_format) not in _schemas:
+                for loaded_format, loaded in _load_schemas(version).items():
+                    _schemas[(version, loaded_format)] = loaded
+
+        schema = _schemas[(version, renderer_format)]
+
+    return schema
+
+
+def clear_schemas() -> None:
+    """Forget the schemas this process has loaded."""
+
+    _schemas.clear()
@@ -0,0 +1,130 @@
+"""Tests for the precomputed API schemas."""
+
+import gzip
+import hashlib
+import json
+
+import pytest
+import yaml
+
+from openapi import schema
+from openapi.dataclasses import PrecomputedSchema
+from openapi.schema import (
+    build_schemas,
+    clear_schemas,
+    get_code_hash,
+    get_schema,
+    precompute_schemas,
+)
+
+
+def _fake_schemas(version):
+    """Return small schemas for the version, instead of generating them."""
+
+    schemas = {}
+    for renderer_format in ("yaml", "json"):
+        content = f"{version} {renderer_format}".encode()
+        schemas[renderer_format] = PrecomputedSchema(
+            content=content,
+            compressed=gzip.compress(content, mtime=0),
+            content_hash=hashlib.sha256(content).hexdigest(),
+        )
+    return schemas
+
+
+@pytest.fixture(autouse=True)
+def _clear_schemas():
+    """Forget the loaded schemas and the code hash."""
+
+    clear_schemas()
+    get_code_hash.cache_clear()
+    yield
+    clear_schemas()
+    get_code_hash.cache_clear()
+
+
+@pytest.fixture()
+def build(mocker):
+    """Build fake schemas."""
+
+    return mocker.patch("openapi.schema.build_schemas", side_effect=_fake_schemas)
+
+
+def test_build_schemas():
+    """The schema should be rendered as YAML and JSON, gzipped and hashed."""
+
+    schemas = build_schemas("v0")
+
+    assert set(schemas) == {"yaml", "json"}
+    spec = yaml.safe_load(schemas["yaml"].content)
+    assert spec["info"]["version"] == "0.0.1 (v0)"
+    assert spec["paths"]
+    assert json.loads(schemas["json"].content) == spec
+    for built in schemas.values():
+        assert gzip.decompress(built.compressed) == built.content
+        assert built.content_hash == hashlib.sha256(built.content).hexdigest()
+
+
+def test_get_schema(build):
+    """The schema should be built once, then served from memory or the cache."""
+
+    assert get_schema("v0", "yaml") == _fake_schemas("v0")["yaml"]
+    assert get_schema("v0", "json") == _fake_schemas("v0")["json"]
+    build.assert_called_once_with("v0")
+
+    # Another process, running the same code, gets it from the cache.
+    clear_schemas()
+    assert get_schema("v0", "json") == _fake_schemas("v0")["json"]
+    build.assert_called_once_with("v0")
+
+
+def test_get_schema_code_changed(build, mocker):
+    """If the code changes, the schema should be built again."""
+
+    get_schema("v0", "yaml")
+    clear_schemas()
+    mocker.patch("openapi.schema.get_code_hash", return_value="changed")
+    get_schema("v0", "yaml")
+
+    assert build.call_count == 2
+
+
+def test_precompute_schemas(build, settings):
+    """Each version's schema should be built and stored in the cache."""
+
+    settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, "ALLOWED_VERSIONS": ["v0"]}
+
+    assert precompute_schemas() == ["v0"]
+    build.assert_called_once_with("v0")
+
+    assert get_schema("v0", "yaml") == _fake_schemas("v0")["yaml"]
+    build.assert_called_once_with("v0")
+
+
+def test_get_code_hash(settings, tmp_path):
+    """The hash should change with the source, but not the tests or migrations."""
+
+    settings.BASE_DIR = str(tmp_path)
+    package = tmp_path / "app"
+    (package / "migrations").mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "views.py").write_text("VIEW = 1\n")
+
+    def _hash():
+        get_code_hash.cache_clear()
+        return get_code_hash()
+
+    original = _hash()
+
+    (package / "views_test.py").write_text("TEST = 1\n")
+    (package / "migrations" / "0001_initial.py").write_text("MIGRATION = 1\n")
+    (tmp_path / "notes.py").write_text("NOTE = 1\n")
+    assert _hash() == original
+
+    (package / "views.py").write_text("VIEW = 2\n")
+    assert _hash() != original
+
+    assert [path.name for path in schema._iter_source_files()] == [  # noqa: SLF001
+        "__init__.py",
+        "views.py",
+    ]
@@ -4,14 +4,17 @@ URL Configuration for schema & documentation views
 
 from django.urls import path
 from drf_spectacular.views import (
-    SpectacularAPIView,
     SpectacularRedocView,
     SpectacularSwaggerView,
 )
 
+from openapi.views import PrecomputedSpectacularAPIView
+
 urlpatterns = [
     path(
-        "api/v0/schema/", SpectacularAPIView.as_view(api_version="v0"), name="v0_schema"
+        "api/v0/schema/",
+        PrecomputedSpectacularAPIView.as_view(api_version="v0"),
+        name="v0_schema",
     ),
     path(
         "api/v0/schema/swagger-ui/",
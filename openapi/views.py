@@ -0,0 +1,58 @@
+"""Views for the OpenAPI app."""
+
+import re
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from drf_spectacular.views import SpectacularAPIView
+
+from openapi.schema import get_schema
+
+ACCEPTS_GZIP_RE = re.compile(r"\bgzip\b")
+
+
+class PrecomputedSpectacularAPIView(SpectacularAPIView):
+    """
+    Serve the precomputed schema for the API version (see openapi.schema).
+
+    The schema's ETag is the hash of its content, so clients that send
+    If-None-Match get a 304 back, and it's sent gzipped to clients that accept
+    that. Requests for a translated schema (with a lang parameter) are
+    generated as usual.
+    """
+
+    def get(self, request, *args, **kwargs):
+        """Return the schema, in the format the client asked for."""
+
+        if request.GET.get("lang") or self.custom_settings:
+            return super().get(request, *args, **kwargs)
+
+        version = (
+            self.api_version
+            or request.version
+            or self._get_version_parameter(request)
+            or ""
+        )
+        schema = get_schema(version, request.accepted_renderer.format)
+        compress = ACCEPTS_GZIP_RE.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        etag = f'"{schema.content_hash}{"-gzip" if compress else ""}"'
+        etags = {f'"{schema.content_hash}"', f'"{schema.content_hash}-gzip"', "*"}
+
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match and etags & set(parse_etags(if_none_match)):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                schema.compressed if compress else schema.content,
+                content_type=request.accepted_media_type,
+            )
+            response["Content-Disposition"] = (
+                f'inline; filename="{self._get_filename(request, version)}"'
+            )
+            if compress:
+                response["Content-Encoding"] = "gzip"
+
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Accept", "Accept-Encoding"])
+        return response
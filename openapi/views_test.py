@@ -0,0 +1,86 @@
+"""Tests for the OpenAPI views."""
+
+import gzip
+import json
+
+import pytest
+from django.urls import reverse
+
+from openapi.dataclasses import PrecomputedSchema
+from openapi.schema import clear_schemas
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def build(mocker):
+    """Build fake schemas, and forget them afterwards."""
+
+    clear_schemas()
+    build = mocker.patch(
+        "openapi.schema.build_schemas",
+        side_effect=lambda version: {
+            renderer_format: PrecomputedSchema(
+                content=content,
+                compressed=gzip.compress(content, mtime=0),
+                content_hash=f"{version}-{renderer_format}",
+            )
+            for renderer_format, content in [
+                ("yaml", b"openapi: 3.0.3\n"),
+                ("json", json.dumps({"openapi": "3.0.3"}).encode()),
+            ]
+        },
+    )
+    yield build
+    clear_schemas()
+
+
+def test_schema(client, build):
+    """The precomputed schema should be served, in the format asked for."""
+
+    url = reverse("v0_schema")
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == b"openapi: 3.0.3\n"
+    assert response["Content-Type"] == "application/vnd.oai.openapi"
+    assert response["ETag"] == '"v0-yaml"'
+    assert "Content-Encoding" not in response
+    assert response["Content-Disposition"] == (
+        'inline; filename="MIT OL Unified Ecommerce API (v0).yaml"'
+    )
+
+    response = client.get(url, HTTP_ACCEPT="application/json")
+    assert response.status_code == 200
+    assert response.json() == {"openapi": "3.0.3"}
+    assert response["Content-Type"] == "application/json"
+    assert response["ETag"] == '"v0-json"'
+
+    build.assert_called_once_with("v0")
+
+
+def test_schema_gzip(client):
+    """The schema should be sent gzipped to clients that accept it."""
+
+    response = client.get(reverse("v0_schema"), HTTP_ACCEPT_ENCODING="gzip, br")
+
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+    assert response["ETag"] == '"v0-yaml-gzip"'
+    assert gzip.decompress(response.content) == b"openapi: 3.0.3\n"
+    assert {"Accept", "Accept-Encoding"} <= {
+        header.strip() for header in response["Vary"].split(",")
+    }
+
+
+@pytest.mark.parametrize(
+    ("if_none_match", "status"),
+    [('"v0-yaml"', 304), ('"v0-yaml-gzip"', 304), ("*", 304), ('"v0-json"', 200)],
+)
+def test_schema_not_modified(client, if_none_match, status):
+    """Clients that have the schema already should get a 304."""
+
+    response = client.get(reverse("v0_schema"), HTTP_IF_NONE_MATCH=if_none_match)
+
+    assert response.status_code == status
+    assert response["ETag"] == '"v0-yaml"'
@@ -2,11 +2,20 @@
 
 from django.contrib import admin
 from django.contrib.admin.decorators import display
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 from mitol.common.admin import TimestampedModelAdmin
+from mitol.payment_gateway.payment_utils import quantize_decimal
 from reversion.admin import VersionAdmin
 from safedelete.admin import SafeDeleteAdmin, SafeDeleteAdminFilter
 
 from payments import models
+from unified_ecommerce.paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+# Order IDs are bigints.
+MAX_ORDER_ID = 2**63 - 1
 
 
 class BasketItemInline(admin.TabularInline):
@@ -89,14 +98,19 @@ class BaseOrderAdmin(TimestampedModelAdmin):
     """Base admin for Order"""
 
     search_fields = [
-        "id",
+        "reference_number",
         "purchaser__email",
         "purchaser__username",
-        "reference_number",
     ]
-    list_display = ["id", "state", "get_purchaser", "total_price_paid", "tax"]
+    search_help_text = (
+        "Search by order ID, reference number, or the purchaser's email or username."
+    )
+    list_display = ["id", "state", "get_purchaser", "total_price_paid", "get_tax"]
     list_fields = ["state"]
     list_filter = ["state"]
+    list_select_related = ["purchaser"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     inlines = [OrderLineInline, OrderTransactionInline]
     readonly_fields = ["reference_number"]
     fieldsets = [
@@ -147,18 +161,37 @@ class BaseOrderAdmin(TimestampedModelAdmin):
         """Return the purchaser information for the order"""
         return f"{obj.purchaser.email}"
 
-    @display(description="Tax")
+    @display(description="Tax", ordering="annotated_tax")
     def get_tax(self, obj: models.Order):
         """Return the tax for the order"""
-        return obj.tax
+        return quantize_decimal(obj.annotated_tax)
 
     def get_queryset(self, request):
-        """Filter only to pending orders"""
-        return (
-            super()
-            .get_queryset(request)
-            .prefetch_related("purchaser", "lines__product_version")
+        """Annotate the tax, so the changelist doesn't load each order's lines"""
+        return super().get_queryset(request).with_tax()
+
+    def get_search_results(self, request, queryset, search_term):  # noqa: ARG002
+        """
+        Search by order ID, reference number, or purchaser email/username.
+
+        The default search joins the purchaser and ORs the columns of both tables
+        together, which can't use the trigram indexes. This matches the users
+        in a subquery instead. IDs have to match exactly.
+        """
+
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        purchasers = User.objects.filter(
+            Q(email__icontains=search_term) | Q(username__icontains=search_term)
         )
+        query = Q(reference_number__icontains=search_term) | Q(purchaser__in=purchasers)
+
+        if search_term.isdigit() and int(search_term) <= MAX_ORDER_ID:
+            query |= Q(pk=int(search_term))
+
+        return queryset.filter(query), False
 
 
 @admin.register(models.Order)
@@ -199,12 +232,7 @@ class FulfilledOrderAdmin(BaseOrderAdmin):
 
     def get_queryset(self, request):
         """Filter only to fulfilled orders"""
-        return (
-            super()
-            .get_queryset(request)
-            .prefetch_related("purchaser", "lines__product_version")
-            .filter(state=models.Order.STATE.FULFILLED)
-        )
+        return super().get_queryset(request).filter(state=models.Order.STATE.FULFILLED)
 
 
 @admin.register(models.RefundedOrder)
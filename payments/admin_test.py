@@ -0,0 +1,100 @@
+"""Tests for the payments admin."""
+
+import pytest
+from django.contrib.admin.sites import site
+from django.test import RequestFactory
+from mitol.payment_gateway.payment_utils import quantize_decimal
+
+from payments import models
+from payments.factories import LineFactory, OrderFactory, TaxRateFactory
+from system_meta.factories import ProductVersionFactory
+from unified_ecommerce.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _create_order(tax_rate=None, **kwargs):
+    """Create an order with a couple of lines."""
+
+    order = OrderFactory.create(tax_rate=tax_rate, **kwargs)
+
+    for quantity in (1, 3):
+        product_version = ProductVersionFactory.create()
+        LineFactory.create(
+            order=order,
+            product_version=product_version,
+            quantity=quantity,
+            discounted_price=product_version.field_dict["price"],
+        )
+
+    return order
+
+
+@pytest.mark.parametrize("with_tax_rate", [True, False])
+def test_line_prices(with_tax_rate):
+    """The line prices calculated in SQL should match the properties."""
+
+    order = _create_order(TaxRateFactory.create() if with_tax_rate else None)
+
+    for line in models.Line.objects.filter(order=order).with_prices():
+        assert line.annotated_base_price == pytest.approx(line.base_price)
+        assert line.annotated_tax == pytest.approx(line.tax)
+        assert line.annotated_total_price == pytest.approx(line.total_price)
+
+
+def test_order_tax():
+    """The order tax calculated in SQL should match the tax property."""
+
+    taxed_order = _create_order(TaxRateFactory.create())
+    untaxed_order = OrderFactory.create()
+
+    orders = models.Order.objects.with_tax().in_bulk([taxed_order.id, untaxed_order.id])
+
+    assert orders[taxed_order.id].annotated_tax > 0
+    assert quantize_decimal(orders[taxed_order.id].annotated_tax) == taxed_order.tax
+    assert orders[untaxed_order.id].annotated_tax == 0
+
+
+def test_order_search():
+    """Orders should be searchable by ID, reference number and purchaser."""
+
+    order = OrderFactory.create(
+        purchaser=UserFactory.create(email="findme@example.com", username="someone"),
+        reference_number="abc-defghi",
+    )
+    other_order = OrderFactory.create(
+        purchaser=UserFactory.create(email="other@example.com", username="other"),
+        reference_number="jkl-mnopqr",
+    )
+    model_admin = site._registry[models.Order]  # noqa: SLF001
+    request = RequestFactory().get("/")
+
+    def search(term):
+        queryset, may_have_duplicates = model_admin.get_search_results(
+            request, model_admin.get_queryset(request), term
+        )
+        assert not may_have_duplicates
+        return set(queryset)
+
+    assert search("") == {order, other_order}
+    assert search("FINDME@") == {order}
+    assert search("someon") == {order}
+    assert search("C-DEF") == {order}
+    assert search(str(other_order.id)) == {other_order}
+    assert search("9" * 30) == set()
+
+
+@pytest.mark.parametrize("model", [models.Order, models.PendingOrder])
+def test_order_changelist(model):
+    """The order changelists should show the annotated tax."""
+
+    order = _create_order(TaxRateFactory.create())
+    model_admin = site._registry[model]  # noqa: SLF001
+    request = RequestFactory().get("/", {"q": "example"})
+    request.user = UserFactory.create(is_staff=True, is_superuser=True)
+
+    changelist = model_admin.get_changelist_instance(request)
+
+    assert [(row.id, model_admin.get_tax(row)) for row in changelist.result_list] == [
+        (order.id, order.tax)
+    ]
@@ -1,17 +1,21 @@
 """Ecommerce APIs"""
 
 import logging
+import time
 import uuid
+from datetime import timedelta
 from decimal import Decimal
 
 import reversion
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.db import transaction
 from django.db.models import Q, QuerySet
 from django.urls import reverse
 from ipware import get_client_ip
+from mitol.common.utils.datetime import now_in_utc
 from mitol.payment_gateway.api import CartItem as GatewayCartItem
 from mitol.payment_gateway.api import Order as GatewayOrder
 from mitol.payment_gateway.api import PaymentGateway, ProcessorResponse
@@ -35,15 +39,20 @@ from payments.models import (
     FulfilledOrder,
     Order,
     PendingOrder,
+    PendingPreSaleWebhook,
+    RedeemedDiscount,
     TaxRate,
+    Transaction,
+    TransactionDataArchive,
 )
 from payments.serializers.v0 import (
     WebhookBase,
     WebhookBaseSerializer,
     WebhookBasket,
+    WebhookBasketAction,
     WebhookOrder,
 )
-from payments.tasks import dispatch_webhook
+from payments.tasks import dispatch_webhook, flush_pre_sale_webhooks
 from payments.utils import parse_supplied_date
 from system_meta.models import IntegratedSystem, Product
 from unified_ecommerce.constants import (
@@ -64,11 +73,14 @@ from unified_ecommerce.constants import (
     REFUND_SUCCESS_STATES,
     ZERO_PAYMENT_DATA,
 )
+from unified_ecommerce.utils import prefetched_iterator
 from users.api import determine_user_location, get_flagged_countries
 
 log = logging.getLogger(__name__)
 User = get_user_model()
 
+PRE_SALE_WEBHOOK_SCHEDULED_KEY = "pre_sale_webhook_scheduled:{system_id}:{user_id}"
+
 
 def generate_checkout_payload(request, system):
     """Generate the payload to send to the payment gateway."""
@@ -140,15 +152,28 @@ def fulfill_completed_order(
     basket=None,
     source=POST_SALE_SOURCE_BACKOFFICE,  # noqa: ARG001
 ):
-    """Fulfill the order."""
-    order.fulfill(payment_data)
+    """
+    Fulfill the order, and clear the basket it came from.
+
+    Returns True if this call fulfilled the order; if the order had already
+    moved on (e.g. the other payment callback got to it first), nothing is done.
+    """
+    if not order.fulfill(payment_data):
+        return False
 
     if basket and basket.compare_to_order(order):
         basket.delete()
 
+    return True
+
 
 def get_order_from_cybersource_payment_response(request):
-    """Figure out the order from the payment response from Cybersource."""
+    """
+    Figure out the order from the payment response from Cybersource.
+
+    The order isn't locked: the state transitions are conditional updates, so
+    callbacks for the same order don't need to wait for each other.
+    """
     payment_data = request.POST
     converted_order = PaymentGateway.get_gateway_class(
         settings.ECOMMERCE_DEFAULT_PAYMENT_GATEWAY
@@ -156,7 +181,7 @@ def get_order_from_cybersource_payment_response(request):
     order_id = Order.decode_reference_number(converted_order.reference)
 
     try:
-        order = Order.objects.select_for_update().get(pk=order_id)
+        order = Order.objects.get(pk=order_id)
     except ObjectDoesNotExist:
         order = None
     return order
@@ -168,7 +193,8 @@ def process_cybersource_payment_response(
     """
     Update the order and basket based on the payment request from Cybersource.
     Returns the order state after applying update operations corresponding to
-    the request.
+    the request. If another callback changed the order's state first, that
+    state is returned and nothing else is done.
 
     Args:
         - request (HttpRequest): The payment request received from Cybersource.
@@ -296,13 +322,15 @@ def refund_order(
         return False, f"Order with order_id {order.id} is not in fulfilled state."
 
     # Fetch the most recent transaction
-    order_recent_transaction = order.transactions.first()
+    order_recent_transaction = order.transactions.only(
+        *Transaction.REFUND_FIELDS
+    ).first()
     if not order_recent_transaction:
         log.error("There is no associated transaction against order_id %s", order.id)
         return False, f"There is no associated transaction against order_id {order.id}"
 
     # Check for PayPal payment
-    if "paypal_token" in order_recent_transaction.data:
+    if order_recent_transaction.is_paypal:
         msg = (
             f"PayPal: Order {order.reference_number} contains a PayPal"
             "transaction. Please contact Finance to refund this order."
@@ -310,9 +338,9 @@ def refund_order(
         raise PaypalRefundError(msg)
 
     # Prepare refund request
-    transaction_dict = order_recent_transaction.data
-    if "refund_amount" in kwargs:
-        transaction_dict["req_amount"] = kwargs["refund_amount"]
+    transaction_dict = order_recent_transaction.get_refund_payload(
+        kwargs.get("refund_amount")
+    )
 
     # Process refund
     refund_gateway_request = PaymentGateway.create_refund_request(
@@ -463,6 +491,129 @@ def send_pre_sale_webhook(basket, product, action):
     dispatch_webhook.delay(system_webhook_url, WebhookBaseSerializer(webhook_data).data)
 
 
+def _schedule_pre_sale_webhook_flush(system_id, user_id):
+    """Send the queued pre-sale webhooks at the end of the window, once."""
+
+    window = settings.MITOL_UE_PRE_SALE_WEBHOOK_WINDOW
+
+    if caches[settings.MITOL_UE_PRE_SALE_WEBHOOK_CACHE_NAME].add(
+        PRE_SALE_WEBHOOK_SCHEDULED_KEY.format(system_id=system_id, user_id=user_id),
+        True,  # noqa: FBT003
+        timeout=window,
+    ):
+        flush_pre_sale_webhooks.apply_async((system_id, user_id), countdown=window)
+
+
+def queue_pre_sale_webhook(basket, product, action):
+    """
+    Send the pre-sale webhook for a basket change, coalescing it if configured.
+
+    If MITOL_UE_PRE_SALE_WEBHOOK_WINDOW is set, the change is stored, and the
+    changes the user makes in the system within the window are sent in one
+    webhook at the end of it (see send_coalesced_pre_sale_webhook). Otherwise,
+    or if the system is in MITOL_UE_PRE_SALE_WEBHOOK_IMMEDIATE_SYSTEMS, it's
+    sent straight away.
+
+    Args:
+    - basket (Basket): the basket to work with
+    - product (Product): the product being added/removed
+    - action (WebhookBasketAction): The action being taken
+    """
+
+    system = basket.integrated_system
+
+    if (
+        not settings.MITOL_UE_PRE_SALE_WEBHOOK_WINDOW
+        or system.slug in settings.MITOL_UE_PRE_SALE_WEBHOOK_IMMEDIATE_SYSTEMS
+        or not system.webhook_url
+    ):
+        send_pre_sale_webhook(basket, product, action)
+        return
+
+    PendingPreSaleWebhook.objects.create(
+        integrated_system=system,
+        user=basket.user,
+        product=product,
+        action=action.value,
+    )
+    transaction.on_commit(
+        lambda: _schedule_pre_sale_webhook_flush(system.id, basket.user_id)
+    )
+
+
+def send_coalesced_pre_sale_webhook(system_id, user_id):
+    """
+    Send one pre-sale webhook for the user's queued basket changes in the system.
+
+    The webhook has the net set of products added, in the order they were first
+    added; products that were removed again are left out.
+
+    Args:
+    - system_id (int): the integrated system's ID
+    - user_id (int): the user's ID
+    """
+
+    with transaction.atomic():
+        pending = list(
+            PendingPreSaleWebhook.objects.select_for_update(of=("self",))
+            .filter(integrated_system_id=system_id, user_id=user_id)
+            .select_related("integrated_system", "user", "product")
+            .order_by("id")
+        )
+
+        if not pending:
+            return
+
+        PendingPreSaleWebhook.objects.filter(
+            pk__in=[event.pk for event in pending]
+        ).delete()
+
+        products = {}
+        for event in pending:
+            if event.action == WebhookBasketAction.REMOVE.value:
+                products.pop(event.product_id, None)
+            else:
+                products.setdefault(event.product_id, event.product)
+
+        if not products:
+            log.info(
+                "send_coalesced_pre_sale_webhook: No net changes for user %s in "
+                "system %s, skipping",
+                user_id,
+                system_id,
+            )
+            return
+
+        system = pending[0].integrated_system
+        basket_info = WebhookBasket(
+            product=next(iter(products.values())),
+            action=WebhookBasketAction.ADD,
+            products=list(products.values()),
+        )
+
+        log.info(
+            "send_coalesced_pre_sale_webhook: Calling webhook endpoint %s for %s",
+            system.webhook_url,
+            basket_info,
+        )
+
+        webhook_data = WebhookBase(
+            type=PAYMENT_HOOK_ACTION_PRE_SALE,
+            system_slug=system.slug,
+            system_key=system.api_key,
+            user=pending[0].user,
+            data=basket_info,
+        )
+
+        payload = WebhookBaseSerializer(webhook_data).data
+
+        # Only send it if the pending rows are gone for good, or a rollback
+        # would bring them back and the next flush would send it again.
+        transaction.on_commit(
+            lambda: dispatch_webhook.delay(system.webhook_url, payload)
+        )
+
+
 def get_auto_apply_discounts_for_basket(basket_id: int) -> QuerySet[Discount]:
     """
     Get the auto-apply discounts that can be applied to a basket.
@@ -987,3 +1138,200 @@ def check_taxable(basket):
         basket.tax_rate = taxrate
         basket.save()
         log.debug("check_taxable: charging the tax for %s", taxrate)
+
+
+def _id_chunks(queryset: QuerySet, chunk_size: int, limit: int | None = None):
+    """
+    Yield lists of the IDs in the queryset, in primary key order.
+
+    Args:
+    - queryset (QuerySet): the rows to walk
+    - chunk_size (int): the number of IDs in each list
+    - limit (int or None): stop after this many IDs
+    """
+
+    chunk = []
+
+    for count, obj in enumerate(
+        prefetched_iterator(queryset.only("id"), chunk_size=chunk_size), start=1
+    ):
+        chunk.append(obj.id)
+
+        if limit and count >= limit:
+            break
+
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def cancel_stale_pending_orders(
+    *,
+    older_than: timedelta,
+    chunk_size: int = 500,
+    pause: float = 0,
+    limit: int | None = None,
+    dry_run: bool = False,
+) -> int:
+    """
+    Cancel pending orders that haven't been touched for a while.
+
+    A checkout that's never completed leaves its order pending; checking out
+    the same basket again reuses (and saves) it, so orders that haven't been
+    updated since the cutoff are abandoned. Canceling an order releases its
+    discount redemptions, as for any other canceled order.
+
+    Orders are canceled in chunks, each in its own short transaction. Orders
+    that are locked (i.e. being checked out right now) are skipped rather than
+    waited for, so this doesn't hold up checkout.
+
+    Args:
+    - older_than (timedelta): cancel orders last updated before this long ago
+    - chunk_size (int): the number of orders to cancel per transaction
+    - pause (float): seconds to wait between chunks
+    - limit (int or None): the most orders to look at
+    - dry_run (bool): just count the orders
+    Returns:
+    - int: the number of orders canceled (or that would be)
+    """
+
+    stale_orders = Order.objects.filter(
+        state=Order.STATE.PENDING,
+        updated_on__lt=now_in_utc() - older_than,
+    )
+    canceled = 0
+
+    for chunk in _id_chunks(stale_orders, chunk_size, limit):
+        if dry_run:
+            canceled += len(chunk)
+            continue
+
+        with transaction.atomic():
+            # Check the orders again now they're locked - they may have been
+            # reused or paid for since the chunk was read.
+            order_ids = list(
+                stale_orders.filter(pk__in=chunk)
+                .select_for_update(skip_locked=True)
+                .values_list("id", flat=True)
+            )
+            RedeemedDiscount.objects.filter(order_id__in=order_ids).delete()
+            # As in Order.transition_state: only move pending orders, and set
+            # updated_on since update() doesn't.
+            canceled += Order.objects.filter(
+                pk__in=order_ids, state=Order.STATE.PENDING
+            ).update(state=Order.STATE.CANCELED, updated_on=now_in_utc())
+
+        log.debug("Canceled %s stale pending orders so far", canceled)
+        time.sleep(pause)
+
+    return canceled
+
+
+def delete_stale_baskets(
+    *,
+    older_than: timedelta,
+    chunk_size: int = 500,
+    pause: float = 0,
+    limit: int | None = None,
+    dry_run: bool = False,
+) -> int:
+    """
+    Delete baskets that haven't been touched for a while.
+
+    Any change to a basket, its items or its discounts bumps its version and
+    updated_on (see payments.signals), so baskets that haven't been updated
+    since the cutoff have been abandoned.
+    Baskets are deleted in chunks, with their items.
+
+    Args:
+    - older_than (timedelta): delete baskets last updated before this long ago
+    - chunk_size (int): the number of baskets to delete per query
+    - pause (float): seconds to wait between chunks
+    - limit (int or None): the most baskets to look at
+    - dry_run (bool): just count the baskets
+    Returns:
+    - int: the number of baskets deleted (or that would be)
+    """
+
+    stale_baskets = Basket.objects.filter(updated_on__lt=now_in_utc() - older_than)
+    deleted = 0
+
+    for chunk in _id_chunks(stale_baskets, chunk_size, limit):
+        if dry_run:
+            deleted += len(chunk)
+            continue
+
+        # Check the baskets again, in case they've been used since the chunk
+        # was read.
+        _, deleted_by_model = stale_baskets.filter(pk__in=chunk).delete()
+        deleted += deleted_by_model.get(Basket._meta.label, 0)  # noqa: SLF001
+
+        log.debug("Deleted %s stale baskets so far", deleted)
+        time.sleep(pause)
+
+    return deleted
+
+
+def archive_transaction_data(
+    *,
+    older_than: timedelta,
+    chunk_size: int = 500,
+    pause: float = 0,
+    limit: int | None = None,
+    dry_run: bool = False,
+) -> int:
+    """
+    Move the payloads of old transactions to the archive.
+
+    The fields that get used later are copied to the transaction when it's
+    saved, so the payload is only needed for auditing once the transaction is
+    old. It's compressed into a TransactionDataArchive row and removed from the
+    transaction, in chunks.
+
+    Args:
+    - older_than (timedelta): archive transactions created before this long ago
+    - chunk_size (int): the number of transactions to archive per query
+    - pause (float): seconds to wait between chunks
+    - limit (int or None): the most transactions to look at
+    - dry_run (bool): just count the transactions
+    Returns:
+    - int: the number of transactions archived (or that would be)
+    """
+
+    old_transactions = Transaction.objects.filter(
+        created_on__lt=now_in_utc() - older_than, data__isnull=False
+    )
+    archived = 0
+
+    for chunk in _id_chunks(old_transactions, chunk_size, limit):
+        if dry_run:
+            archived += len(chunk)
+            continue
+
+        with transaction.atomic():
+            payloads = dict(
+                old_transactions.filter(pk__in=chunk)
+                .select_for_update(skip_locked=True)
+                .values_list("id", "data")
+            )
+            TransactionDataArchive.objects.bulk_create(
+                [
+                    TransactionDataArchive(
+                        transaction_id=transaction_id,
+                        payload=TransactionDataArchive.compress(data),
+                    )
+                    for transaction_id, data in payloads.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["transaction"],
+                update_fields=["payload", "updated_on"],
+            )
+            archived += Transaction.objects.filter(pk__in=payloads).update(data=None)
+
+        log.debug("Archived %s transaction payloads so far", archived)
+        time.sleep(pause)
+
+    return archived
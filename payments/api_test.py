@@ -2,7 +2,7 @@
 
 import random
 import uuid
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from decimal import Decimal
 
 import pytest
@@ -10,6 +10,7 @@ import reversion
 from CyberSource.rest import ApiException
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from django.http import HttpRequest
 from django.urls import reverse
 from factory import Faker, fuzzy
@@ -17,6 +18,7 @@ from mitol.payment_gateway.api import PaymentGateway, ProcessorResponse
 from reversion.models import Version
 
 from payments.api import (
+    archive_transaction_data,
     check_blocked_countries,
     check_taxable,
     generate_checkout_payload,
@@ -27,7 +29,9 @@ from payments.api import (
     locate_customer_for_basket,
     process_cybersource_payment_response,
     process_post_sale_webhooks,
+    queue_pre_sale_webhook,
     refund_order,
+    send_coalesced_pre_sale_webhook,
     send_post_sale_webhook,
     send_pre_sale_webhook,
     update_discount_codes,
@@ -61,9 +65,12 @@ from payments.models import (
     Discount,
     FulfilledOrder,
     Order,
+    PendingPreSaleWebhook,
     Transaction,
+    TransactionDataArchive,
 )
 from payments.serializers.v0 import (
+    TransactionDataPurchaserSerializer,
     WebhookBase,
     WebhookBaseSerializer,
     WebhookBasket,
@@ -87,6 +94,7 @@ from unified_ecommerce.constants import (
 )
 from unified_ecommerce.factories import UserFactory
 from unified_ecommerce.test_utils import generate_mocked_request
+from unified_ecommerce.utils import now_in_utc
 
 pytestmark = [pytest.mark.django_db]
 
@@ -528,6 +536,45 @@ def test_process_cybersource_payment_decline_response(
     order.refresh_from_db()
 
 
+def test_process_cybersource_payment_error_after_fulfillment(
+    rf, mocker, user, products
+):
+    """
+    An ERROR callback that arrives after the order's been fulfilled shouldn't
+    change the order.
+    """
+
+    mocker.patch("requests.post")
+    mocker.patch(
+        "mitol.payment_gateway.api.PaymentGateway.validate_processor_response",
+        return_value=True,
+    )
+    create_basket(user, products)
+    resp = generate_checkout_payload(generate_mocked_request(user), products[0].system)
+
+    payload = {
+        **{f"req_{key}": value for key, value in resp["payload"].items()},
+        "decision": "ACCEPT",
+        "message": "payment processor message",
+        "transaction_id": "12345",
+    }
+    order = Order.objects.get(state=Order.STATE.PENDING, purchaser=user)
+
+    request = rf.post(reverse("v0:checkout-result-callback"), payload)
+    assert process_cybersource_payment_response(request, order) == (
+        Order.STATE.FULFILLED
+    )
+
+    request = rf.post(
+        reverse("v0:checkout-result-callback"), {**payload, "decision": "ERROR"}
+    )
+    assert process_cybersource_payment_response(request, order) == (
+        Order.STATE.FULFILLED
+    )
+    order.refresh_from_db()
+    assert order.state == Order.STATE.FULFILLED
+
+
 @pytest.mark.parametrize(
     "source", [POST_SALE_SOURCE_BACKOFFICE, POST_SALE_SOURCE_REDIRECT]
 )
@@ -588,6 +635,131 @@ def test_pre_sale_webhook(mocker, user, products):
     mocked_task.assert_called_with(system.webhook_url, serialized_webhook_data.data)
 
 
+@pytest.fixture()
+def pre_sale_window(settings):
+    """Coalesce pre-sale webhooks over a 5 second window."""
+
+    settings.MITOL_UE_PRE_SALE_WEBHOOK_WINDOW = 5
+    settings.MITOL_UE_PRE_SALE_WEBHOOK_IMMEDIATE_SYSTEMS = []
+    return settings
+
+
+def test_queue_pre_sale_webhook(
+    mocker, pre_sale_window, django_capture_on_commit_callbacks, user, products
+):
+    """Basket changes should be stored, and sent once at the end of the window."""
+
+    mocked_send = mocker.patch("payments.api.send_pre_sale_webhook")
+    mocked_flush = mocker.patch("payments.api.flush_pre_sale_webhooks.apply_async")
+    basket = BasketFactory.create(user=user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        for product in [products[0], products[1], products[0]]:
+            queue_pre_sale_webhook(basket, product, WebhookBasketAction.ADD)
+
+    mocked_send.assert_not_called()
+    mocked_flush.assert_called_once_with(
+        (basket.integrated_system.id, user.id),
+        countdown=pre_sale_window.MITOL_UE_PRE_SALE_WEBHOOK_WINDOW,
+    )
+    assert list(
+        PendingPreSaleWebhook.objects.order_by("id").values_list(
+            "product_id", flat=True
+        )
+    ) == [products[0].id, products[1].id, products[0].id]
+
+
+@pytest.mark.parametrize("immediate", ["window", "system"])
+def test_queue_pre_sale_webhook_immediate(
+    mocker, pre_sale_window, user, products, immediate
+):
+    """The webhook should be sent straight away if coalescing is off for it."""
+
+    mocked_send = mocker.patch("payments.api.send_pre_sale_webhook")
+    basket = BasketFactory.create(user=user)
+
+    if immediate == "window":
+        pre_sale_window.MITOL_UE_PRE_SALE_WEBHOOK_WINDOW = 0
+    else:
+        pre_sale_window.MITOL_UE_PRE_SALE_WEBHOOK_IMMEDIATE_SYSTEMS = [
+            basket.integrated_system.slug
+        ]
+
+    queue_pre_sale_webhook(basket, products[0], WebhookBasketAction.ADD)
+
+    mocked_send.assert_called_once_with(basket, products[0], WebhookBasketAction.ADD)
+    assert not PendingPreSaleWebhook.objects.exists()
+
+
+def test_send_coalesced_pre_sale_webhook(
+    mocker, user, products, django_capture_on_commit_callbacks
+):
+    """One webhook should be sent with the net products added, in order."""
+
+    mocked_task = mocker.patch("payments.tasks.dispatch_webhook.delay")
+    system = IntegratedSystemFactory.create()
+    events = [
+        (products[1], WebhookBasketAction.ADD),
+        (products[0], WebhookBasketAction.ADD),
+        (products[1], WebhookBasketAction.ADD),
+        (products[2], WebhookBasketAction.ADD),
+        (products[2], WebhookBasketAction.REMOVE),
+    ]
+    for product, action in events:
+        PendingPreSaleWebhook.objects.create(
+            integrated_system=system, user=user, product=product, action=action.value
+        )
+    other_user_event = PendingPreSaleWebhook.objects.create(
+        integrated_system=system,
+        user=UserFactory.create(),
+        product=products[3],
+        action=WebhookBasketAction.ADD.value,
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        send_coalesced_pre_sale_webhook(system.id, user.id)
+        send_coalesced_pre_sale_webhook(system.id, user.id)
+
+    webhook_data = WebhookBase(
+        type=PAYMENT_HOOK_ACTION_PRE_SALE,
+        system_slug=system.slug,
+        system_key=system.api_key,
+        user=user,
+        data=WebhookBasket(
+            product=products[1],
+            action=WebhookBasketAction.ADD,
+            products=[products[1], products[0]],
+        ),
+    )
+    mocked_task.assert_called_once_with(
+        system.webhook_url, WebhookBaseSerializer(webhook_data).data
+    )
+    assert [
+        product["id"] for product in mocked_task.call_args.args[1]["data"]["products"]
+    ] == [products[1].id, products[0].id]
+    assert list(PendingPreSaleWebhook.objects.all()) == [other_user_event]
+
+
+def test_send_coalesced_pre_sale_webhook_rollback(mocker, user, products):
+    """If the flush is rolled back, the webhook shouldn't be sent."""
+
+    mocked_task = mocker.patch("payments.tasks.dispatch_webhook.delay")
+    system = IntegratedSystemFactory.create()
+    PendingPreSaleWebhook.objects.create(
+        integrated_system=system,
+        user=user,
+        product=products[0],
+        action=WebhookBasketAction.ADD.value,
+    )
+
+    with pytest.raises(RuntimeError), transaction.atomic():
+        send_coalesced_pre_sale_webhook(system.id, user.id)
+        raise RuntimeError
+
+    mocked_task.assert_not_called()
+    assert PendingPreSaleWebhook.objects.count() == 1
+
+
 @pytest.mark.parametrize(
     "source", [POST_SALE_SOURCE_BACKOFFICE, POST_SALE_SOURCE_REDIRECT]
 )
@@ -1551,3 +1723,101 @@ def test_check_taxable_with_empty_country_code():
 
     # Assert that no tax rate was applied to the basket
     assert basket.tax_rate is None
+
+
+def test_transaction_purchaser_serializer():
+    """The purchaser data should have the keys it had when read from the payload."""
+
+    transaction = TransactionFactory.create(
+        transaction_id="purchaser",
+        data={
+            "req_bill_to_forename": "Jane",
+            "req_bill_to_surname": "Doe",
+            "req_bill_to_email": "jane@example.com",
+            "req_bill_to_address_line1": "1 Main St",
+            "req_bill_to_address_line3": "Suite 5",
+            "req_bill_to_address_city": "Cambridge",
+            "req_bill_to_address_state": "MA",
+            "req_bill_to_address_postal_code": "02139",
+            "req_bill_to_address_country": "US",
+        },
+    )
+
+    assert TransactionDataPurchaserSerializer(transaction).data == {
+        "first_name": "Jane",
+        "last_name": "Doe",
+        "country": "US",
+        "email": "jane@example.com",
+        "street_address": ["1 Main St", "Suite 5"],
+        "street_address_1": "1 Main St",
+        "street_address_2": None,
+        "street_address_3": "Suite 5",
+        "street_address_4": None,
+        "street_address_5": None,
+        "city": "Cambridge",
+        "state_or_territory": "MA",
+        "postal_code": "02139",
+        "company": None,
+    }
+
+
+@pytest.mark.parametrize("dry_run", [True, False])
+def test_archive_transaction_data(dry_run):
+    """Old transaction payloads should be moved to the archive."""
+
+    old_transactions = [
+        TransactionFactory.create(
+            transaction_id=f"old-{idx}",
+            data={
+                "transaction_id": f"old-{idx}",
+                "req_currency": "USD",
+                "req_bill_to_forename": "Jane",
+                "req_bill_to_address_line1": "1 Main St",
+            },
+        )
+        for idx in range(3)
+    ]
+    new_transaction = TransactionFactory.create(transaction_id="new", data={})
+    Transaction.objects.filter(
+        pk__in=[transaction.pk for transaction in old_transactions]
+    ).update(created_on=now_in_utc() - timedelta(days=400))
+
+    archived = archive_transaction_data(
+        older_than=timedelta(days=180), chunk_size=2, dry_run=dry_run
+    )
+
+    assert archived == 3
+    assert Transaction.objects.get(pk=new_transaction.pk).data == {}
+
+    if dry_run:
+        assert not TransactionDataArchive.objects.exists()
+        assert not Transaction.objects.filter(data__isnull=True).exists()
+        return
+
+    assert TransactionDataArchive.objects.count() == 3
+
+    for old_transaction in old_transactions:
+        transaction = Transaction.objects.only(*Transaction.ADDRESS_FIELDS).get(
+            pk=old_transaction.pk
+        )
+
+        assert transaction.get_data() == old_transaction.data
+        assert TransactionDataPurchaserSerializer(transaction).data == {
+            "first_name": "Jane",
+            "last_name": None,
+            "country": None,
+            "email": None,
+            "street_address": ["1 Main St"],
+            "street_address_1": "1 Main St",
+            "street_address_2": None,
+            "street_address_3": None,
+            "street_address_4": None,
+            "street_address_5": None,
+            "city": None,
+            "state_or_territory": None,
+            "postal_code": None,
+            "company": None,
+        }
+
+    # Nothing is left to archive.
+    assert archive_transaction_data(older_than=timedelta(days=180)) == 0
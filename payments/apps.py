@@ -1,6 +1,7 @@
 """App initialization for payments"""
 
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PaymentsConfig(AppConfig):
@@ -8,3 +9,13 @@ class PaymentsConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "payments"
+
+    def ready(self):
+        """Connect the signal handlers, and install the CyberSource simulator."""
+
+        from payments import signals  # noqa: F401
+
+        if settings.MITOL_UE_CYBERSOURCE_SIMULATOR:
+            from payments.simulator import install_refund_simulator
+
+            install_refund_simulator()
@@ -0,0 +1,106 @@
+"""
+Caching for serialized baskets.
+
+Integrated system frontends poll the basket on every page view. Each basket
+has a version that's bumped whenever the basket or its contents change (see
+payments.signals), so the serialized basket is cached by the basket ID, its
+version, and the catalog generation (which covers the products and systems in
+it). A changed basket gets a new key, so nothing needs to be invalidated.
+An unchanged basket then only costs reading the basket row.
+
+Cached baskets carry a strong ETag, so clients that send If-None-Match get a
+304 back.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from payments.serializers.v0 import BasketWithProductSerializer
+from system_meta.caching import compute_etag, get_catalog_generation
+
+BASKET_CACHE_KEY_PREFIX = "payments:basket"
+
+
+def _get_basket_cache():
+    """Return the cache backend used for serialized baskets."""
+
+    return caches[settings.MITOL_UE_BASKET_CACHE_NAME]
+
+
+def get_basket_cache_key(basket, generation: int) -> str:
+    """Return the cache key for the basket at its current version."""
+
+    return f"{BASKET_CACHE_KEY_PREFIX}:{basket.pk}:{basket.version}:{generation}"
+
+
+def get_serialized_baskets(baskets) -> list[dict]:
+    """
+    Return the serialized baskets, from the cache if possible.
+
+    Args:
+    - baskets (list of Basket): the baskets to serialize
+    Returns:
+    - list of dict: the serialized data ("data") and ETag ("etag") for each
+      basket, in the same order
+    """
+
+    cache = _get_basket_cache()
+    generation = get_catalog_generation()
+    keys = [get_basket_cache_key(basket, generation) for basket in baskets]
+    cached = cache.get_many(keys)
+    missing = {}
+
+    for basket, key in zip(baskets, keys):
+        if key in cached:
+            continue
+
+        data = BasketWithProductSerializer(basket).data
+        missing[key] = cached[key] = {
+            "data": data,
+            "etag": compute_etag(data, BasketWithProductSerializer.__name__),
+        }
+
+    if missing:
+        cache.set_many(missing, timeout=settings.MITOL_UE_BASKET_CACHE_TIMEOUT)
+
+    return [cached[key] for key in keys]
+
+
+def get_serialized_basket(basket) -> dict:
+    """Return the serialized basket and its ETag, from the cache if possible."""
+
+    return get_serialized_baskets([basket])[0]
+
+
+def invalidate_basket(basket) -> None:
+    """Drop the cached serialized basket, e.g. when the basket is deleted."""
+
+    _get_basket_cache().delete(get_basket_cache_key(basket, get_catalog_generation()))
+
+
+def etag_response(request, data, etag: str):
+    """
+    Return the data with its ETag, or a 304 if the client already has it.
+
+    Args:
+    - request (Request): the current request
+    - data: the serialized response data
+    - etag (str): the quoted ETag for the data
+    Returns:
+    - Response
+    """
+
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+
+    if if_none_match and {etag, "*"} & set(parse_etags(if_none_match)):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data, status=status.HTTP_200_OK)
+
+    response["ETag"] = etag
+    patch_vary_headers(response, ["Cookie", "Authorization"])
+    return response
@@ -0,0 +1,196 @@
+"""Tests for the serialized basket cache."""
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from payments.caching import get_basket_cache_key, get_serialized_basket
+from payments.factories import (
+    BasketFactory,
+    BasketItemFactory,
+    DiscountFactory,
+    TaxRateFactory,
+)
+from system_meta.caching import get_catalog_generation
+from system_meta.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache(settings):
+    """Use the default cache, and clear it."""
+
+    settings.MITOL_UE_BASKET_CACHE_NAME = "default"
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture()
+def basket(user):
+    """Return a basket with an item in it, for the user."""
+
+    basket = BasketFactory.create(user=user)
+    BasketItemFactory.create(
+        basket=basket, product=ProductFactory.create(system=basket.integrated_system)
+    )
+    basket.refresh_from_db()
+    return basket
+
+
+def _basket_url(basket):
+    """Return the URL for the basket, for its system."""
+
+    return reverse(
+        "v0:get_user_basket_for_system",
+        kwargs={"system_slug": basket.integrated_system.slug},
+    )
+
+
+def _assert_bumps_version(basket, change):
+    """Assert that the change bumps the basket's version."""
+
+    version = basket.version
+    change()
+    basket.refresh_from_db()
+
+    assert basket.version > version
+
+
+def test_item_changes_bump_version(basket):
+    """Adding, changing and removing items should bump the version."""
+
+    product = ProductFactory.create(system=basket.integrated_system)
+    _assert_bumps_version(
+        basket, lambda: BasketItemFactory.create(basket=basket, product=product)
+    )
+    item = basket.basket_items.get(product=product)
+    _assert_bumps_version(basket, lambda: item.save())
+    _assert_bumps_version(basket, lambda: item.delete())
+
+
+def test_discount_changes_bump_version(basket):
+    """Adding, changing and removing discounts should bump the version."""
+
+    discount = DiscountFactory.create()
+    _assert_bumps_version(basket, lambda: basket.discounts.add(discount))
+    _assert_bumps_version(basket, lambda: discount.save())
+    _assert_bumps_version(basket, lambda: discount.basket.remove(basket))
+    basket.discounts.add(discount)
+    _assert_bumps_version(basket, lambda: discount.basket.clear())
+    basket.discounts.add(discount)
+    _assert_bumps_version(basket, lambda: discount.delete())
+
+
+def test_tax_changes_bump_version(basket):
+    """Setting the basket's tax rate, or changing it, should bump the version."""
+
+    tax_rate = TaxRateFactory.create()
+
+    def set_tax_rate():
+        basket.tax_rate = tax_rate
+        basket.save()
+
+    _assert_bumps_version(basket, set_tax_rate)
+    _assert_bumps_version(basket, lambda: tax_rate.save())
+
+
+def test_serialized_basket_is_cached(basket):
+    """The serialized basket should be cached under its version."""
+
+    serialized = get_serialized_basket(basket)
+
+    assert cache.get(get_basket_cache_key(basket, get_catalog_generation())) == (
+        serialized
+    )
+    assert serialized["data"]["id"] == basket.id
+    assert serialized["etag"].startswith('"')
+
+
+def test_basket_for_system_is_cached(user_client, basket):
+    """An unchanged basket should be served without serializing it again."""
+
+    first_response = user_client.get(_basket_url(basket))
+    assert first_response.status_code == 200
+    assert "ETag" in first_response
+
+    with CaptureQueriesContext(connection) as queries:
+        second_response = user_client.get(_basket_url(basket))
+
+    assert second_response.status_code == 200
+    assert second_response.data == first_response.data
+    assert second_response["ETag"] == first_response["ETag"]
+    assert not [query for query in queries if "payments_basketitem" in query["sql"]]
+
+
+def test_basket_for_system_conditional_get(user_client, basket):
+    """Clients with the current ETag should get a 304."""
+
+    etag = user_client.get(_basket_url(basket))["ETag"]
+    response = user_client.get(_basket_url(basket), headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+
+def test_basket_change_invalidates_cache(user_client, basket):
+    """Changing the basket should change the response and its ETag."""
+
+    first_response = user_client.get(_basket_url(basket))
+    BasketItemFactory.create(
+        basket=basket, product=ProductFactory.create(system=basket.integrated_system)
+    )
+
+    response = user_client.get(
+        _basket_url(basket), headers={"If-None-Match": first_response["ETag"]}
+    )
+
+    assert response.status_code == 200
+    assert len(response.data["basket_items"]) == 2
+    assert response["ETag"] != first_response["ETag"]
+
+
+def test_deleted_basket_is_dropped(basket):
+    """Deleting the basket (clearing it, or on fulfilment) drops its cached copy."""
+
+    get_serialized_basket(basket)
+    cache_key = get_basket_cache_key(basket, get_catalog_generation())
+
+    basket.delete()
+
+    assert cache.get(cache_key) is None
+
+
+def test_basket_viewset(user_client, basket):
+    """The basket list and detail views should be cached and have ETags."""
+
+    other_basket = BasketFactory.create(user=basket.user)
+    list_url = reverse("v0:basket-list")
+    detail_url = reverse("v0:basket-detail", kwargs={"pk": basket.id})
+
+    list_response = user_client.get(list_url)
+    detail_response = user_client.get(detail_url)
+
+    assert list_response.status_code == detail_response.status_code == 200
+    assert [result["id"] for result in list_response.data["results"]] == [
+        basket.id,
+        other_basket.id,
+    ]
+    assert list_response.data["results"][0] == detail_response.data
+    assert detail_response["ETag"] == get_serialized_basket(basket)["etag"]
+
+    for url, response in [(list_url, list_response), (detail_url, detail_response)]:
+        assert (
+            user_client.get(url, headers={"If-None-Match": response["ETag"]})
+        ).status_code == 304
+
+    BasketItemFactory.create(
+        basket=other_basket,
+        product=ProductFactory.create(system=other_basket.integrated_system),
+    )
+    assert (
+        user_client.get(list_url, headers={"If-None-Match": list_response["ETag"]})
+    ).status_code == 200
@@ -23,3 +23,19 @@ GEOLOCATION_TYPES = [
     GEOLOCATION_TYPE_NONE,
 ]
 GEOLOCATION_CHOICES = zip(GEOLOCATION_TYPES, GEOLOCATION_TYPES)
+
+# Settlement reconciliation (see payments.reconciliation)
+SETTLEMENT_TYPE_CREDIT = "ics_credit"
+
+DISCREPANCY_NOT_RECORDED = "not_recorded"
+DISCREPANCY_NOT_SETTLED = "not_settled"
+DISCREPANCY_DUPLICATE = "duplicate"
+DISCREPANCY_AMOUNT_MISMATCH = "amount_mismatch"
+DISCREPANCY_PENDING_ORDER = "pending_order"
+DISCREPANCY_KINDS = [
+    DISCREPANCY_NOT_RECORDED,
+    DISCREPANCY_NOT_SETTLED,
+    DISCREPANCY_DUPLICATE,
+    DISCREPANCY_AMOUNT_MISMATCH,
+    DISCREPANCY_PENDING_ORDER,
+]
@@ -1,6 +1,7 @@
 """Dataclasses for the payments app."""
 
 from dataclasses import dataclass
+from decimal import Decimal
 
 from users.dataclasses import CustomerCalculatedLocation
 
@@ -11,3 +12,25 @@ class CustomerLocationMetadata:
 
     location_block: CustomerCalculatedLocation
     location_tax: CustomerCalculatedLocation
+
+
+@dataclass
+class SettlementRecord:
+    """A transaction from a payment gateway settlement report."""
+
+    transaction_id: str
+    reference_number: str
+    amount: Decimal
+    currency: str
+    transaction_type: str
+
+
+@dataclass
+class SettlementDiscrepancy:
+    """A difference between a settlement report and our transactions."""
+
+    kind: str
+    transaction_id: str
+    reference_number: str = ""
+    settled_amount: Decimal | None = None
+    recorded_amount: Decimal | None = None
@@ -85,7 +85,9 @@ class CustomerVerificationHooks:
         Some integrated systems take action when the user adds items to the
         basket (to add things like audit enrollments, etc.). This hook will send
         the same data that would get sent from the post_sale hook so the
-        integrated system can do what it needs to.
+        integrated system can do what it needs to. Changes made in quick
+        succession may be coalesced into one webhook - see
+        queue_pre_sale_webhook.
 
         Args:
         - request (HttpRequest): the current request
@@ -93,7 +95,7 @@ class CustomerVerificationHooks:
         - basket_item (Product): the item to add to the basket; ignored
         """
 
-        from payments.api import send_pre_sale_webhook
+        from payments.api import queue_pre_sale_webhook
         from payments.serializers.v0 import WebhookBasketAction
 
-        send_pre_sale_webhook(basket, basket_item, WebhookBasketAction.ADD)
+        queue_pre_sale_webhook(basket, basket_item, WebhookBasketAction.ADD)
@@ -30,8 +30,10 @@ def pending_complete_order():
     return order
 
 
-def test_post_sale_webhook_called(mocker, pending_complete_order):
-    """Test that the post-sale webhooks get called."""
+def test_post_sale_webhook_called(
+    mocker, django_capture_on_commit_callbacks, pending_complete_order
+):
+    """Test that the post-sale webhooks get called, once the order is committed."""
 
     mocked_webhook = mocker.patch("payments.api.process_post_sale_webhooks")
 
@@ -40,14 +42,18 @@ def test_post_sale_webhook_called(mocker, pending_complete_order):
         "amount": 0,
     }
 
-    pending_complete_order.fulfill(mocked_transaction_data)
-    pending_complete_order.save()
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        pending_complete_order.fulfill(mocked_transaction_data)
+        mocked_webhook.assert_not_called()
 
+    assert len(callbacks) == 1
     assert pending_complete_order.state == Order.STATE.FULFILLED
     mocked_webhook.assert_called()
 
 
-def test_post_sale_webhook_not_called_when_no_url(mocker, pending_complete_order):
+def test_post_sale_webhook_not_called_when_no_url(
+    mocker, django_capture_on_commit_callbacks, pending_complete_order
+):
     """
     Test that the post-sale webhooks aren't called if there's not a URL to call.
 
@@ -69,8 +75,8 @@ def test_post_sale_webhook_not_called_when_no_url(mocker, pending_complete_order
 
     pending_complete_order.refresh_from_db()
 
-    pending_complete_order.fulfill(mocked_transaction_data)
-    pending_complete_order.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        pending_complete_order.fulfill(mocked_transaction_data)
 
     assert pending_complete_order.state == Order.STATE.FULFILLED
     mocked_webhook.assert_called()
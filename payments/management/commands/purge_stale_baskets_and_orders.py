@@ -0,0 +1,93 @@
+"""
+Cancel abandoned pending orders and delete abandoned baskets.
+
+This does the same as the scheduled purge_stale_baskets_and_orders task, but
+the thresholds, chunk size, pause and limit can be set for a one-off run (e.g.
+to work through a backlog). Rows are handled in chunks in primary key order,
+pausing between chunks, so it can run during business hours.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from payments.api import cancel_stale_pending_orders, delete_stale_baskets
+
+
+class Command(BaseCommand):
+    """Cancel abandoned pending orders and delete abandoned baskets."""
+
+    help = "Cancel abandoned pending orders and delete abandoned baskets."
+
+    def add_arguments(self, parser):
+        """Add arguments to the command."""
+
+        parser.add_argument(
+            "--order-days",
+            type=int,
+            default=settings.MITOL_UE_STALE_PENDING_ORDER_DAYS,
+            help="Cancel pending orders that haven't been updated for this many days.",
+        )
+        parser.add_argument(
+            "--basket-days",
+            type=int,
+            default=settings.MITOL_UE_STALE_BASKET_DAYS,
+            help="Delete baskets that haven't been updated for this many days.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.MITOL_UE_CLEANUP_CHUNK_SIZE,
+            help="The number of rows to change per query.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=int,
+            default=settings.MITOL_UE_CLEANUP_PAUSE_MS,
+            help="Milliseconds to wait between chunks.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=0,
+            help="The most orders and baskets to look at (0 for no limit).",
+        )
+        parser.add_argument(
+            "--skip-orders",
+            action="store_true",
+            help="Don't cancel pending orders.",
+        )
+        parser.add_argument(
+            "--skip-baskets",
+            action="store_true",
+            help="Don't delete baskets.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Just count the orders and baskets.",
+        )
+
+    def handle(self, *args, **kwargs):  # noqa: ARG002
+        """Cancel the orders and delete the baskets."""
+
+        options = {
+            "chunk_size": kwargs["chunk_size"],
+            "pause": kwargs["pause"] / 1000,
+            "limit": kwargs["limit"] or None,
+            "dry_run": kwargs["dry_run"],
+        }
+        verb = "Would have" if kwargs["dry_run"] else "Have"
+
+        if not kwargs["skip_orders"]:
+            canceled = cancel_stale_pending_orders(
+                older_than=timedelta(days=kwargs["order_days"]), **options
+            )
+            self.stdout.write(f"{verb} canceled {canceled} stale pending orders.")
+
+        if not kwargs["skip_baskets"]:
+            deleted = delete_stale_baskets(
+                older_than=timedelta(days=kwargs["basket_days"]), **options
+            )
+            self.stdout.write(f"{verb} deleted {deleted} stale baskets.")
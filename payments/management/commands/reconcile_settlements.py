@@ -0,0 +1,127 @@
+"""
+Check a settlement report from CyberSource against our transactions.
+
+The report can be a local file (CSV or XML), or downloaded from CyberSource
+for a date. The discrepancies are written as CSV, to standard output or a
+file, with a count of each kind at the end. See payments.reconciliation for
+what's checked.
+"""
+
+import csv
+from collections import Counter
+from contextlib import ExitStack
+from dataclasses import astuple, fields
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.management import BaseCommand, CommandError
+
+from payments.constants import DISCREPANCY_KINDS
+from payments.dataclasses import SettlementDiscrepancy
+from payments.reconciliation import (
+    download_settlement_report,
+    read_settlement_report,
+    reconcile_settlements,
+)
+from payments.utils import parse_supplied_date
+from unified_ecommerce.db_routing import use_replica
+
+
+class Command(BaseCommand):
+    """Check a settlement report from CyberSource against our transactions."""
+
+    help = "Check a settlement report from CyberSource against our transactions."
+
+    def add_arguments(self, parser):
+        """Add arguments to the command."""
+
+        report = parser.add_mutually_exclusive_group(required=True)
+        report.add_argument(
+            "--file",
+            type=str,
+            help="The settlement report file (CSV or XML).",
+        )
+        report.add_argument(
+            "--date",
+            type=str,
+            help="Download the settlement report with this date from CyberSource.",
+        )
+        parser.add_argument(
+            "--start",
+            type=str,
+            help=(
+                "Also report payments recorded from this date that weren't "
+                "settled. Requires --end."
+            ),
+        )
+        parser.add_argument(
+            "--end",
+            type=str,
+            help="The end of the period for --start (not included).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="The number of settled transactions to check at a time.",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="The file to write the discrepancies to, instead of standard output.",
+        )
+
+    def handle(self, *args, **kwargs):  # noqa: ARG002
+        """Reconcile the report."""
+
+        if bool(kwargs["start"]) != bool(kwargs["end"]):
+            msg = "--start and --end must be used together."
+            raise CommandError(msg)
+
+        try:
+            recorded_between = (
+                (
+                    parse_supplied_date(kwargs["start"]),
+                    parse_supplied_date(kwargs["end"]),
+                )
+                if kwargs["start"]
+                else None
+            )
+            report_date = (
+                parse_supplied_date(kwargs["date"]).date() if kwargs["date"] else None
+            )
+        except ValueError as exc:
+            msg = f"Couldn't parse the date: {exc}"
+            raise CommandError(msg) from exc
+
+        counts = Counter()
+
+        with ExitStack() as stack:
+            report_path = kwargs["file"]
+
+            if report_date:
+                report_path = (
+                    Path(stack.enter_context(TemporaryDirectory())) / "settlements"
+                )
+                download_settlement_report(report_date, report_path)
+
+            outfile = (
+                stack.enter_context(
+                    Path(kwargs["output"]).open("w", newline="", encoding="utf-8")
+                )
+                if kwargs["output"]
+                else self.stdout
+            )
+            writer = csv.writer(outfile, lineterminator="\n")
+            writer.writerow(field.name for field in fields(SettlementDiscrepancy))
+
+            with use_replica():
+                for discrepancy in reconcile_settlements(
+                    read_settlement_report(report_path),
+                    batch_size=kwargs["batch_size"],
+                    recorded_between=recorded_between,
+                ):
+                    counts[discrepancy.kind] += 1
+                    writer.writerow(astuple(discrepancy))
+
+        for kind in DISCREPANCY_KINDS:
+            self.stderr.write(f"{kind}: {counts[kind]}")
@@ -0,0 +1,82 @@
+"""
+Export the sales and tax report for a period, as CSV or JSON lines.
+
+The report has a row for each line of the orders paid for in the period - see
+payments.reports. It's read from the replica, if there is one, and written as
+it's read, so any period can be exported without running out of memory.
+"""
+
+from pathlib import Path
+
+from django.core.management import BaseCommand, CommandError
+
+from payments.reports import (
+    REPORT_FORMAT_CSV,
+    REPORT_FORMATS,
+    get_sales_report_rows,
+    render_sales_report,
+)
+from payments.utils import parse_supplied_date
+from unified_ecommerce.db_routing import use_replica
+
+
+class Command(BaseCommand):
+    """Export the sales and tax report for a period."""
+
+    help = "Export the sales and tax report for a period, as CSV or JSON lines."
+
+    def add_arguments(self, parser):
+        """Add arguments to the command."""
+
+        parser.add_argument(
+            "--start",
+            type=str,
+            required=True,
+            help="The start of the period (a date, or date and time).",
+        )
+        parser.add_argument(
+            "--end",
+            type=str,
+            required=True,
+            help="The end of the period (a date, or date and time); not included.",
+        )
+        parser.add_argument(
+            "--format",
+            type=str,
+            choices=list(REPORT_FORMATS),
+            default=REPORT_FORMAT_CSV,
+            help="The format to write the report in.",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="The file to write the report to, instead of standard output.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="The number of rows to read at a time.",
+        )
+
+    def handle(self, *args, **kwargs):  # noqa: ARG002
+        """Write the report."""
+
+        try:
+            start = parse_supplied_date(kwargs["start"])
+            end = parse_supplied_date(kwargs["end"])
+        except ValueError as exc:
+            msg = f"Couldn't parse the period: {exc}"
+            raise CommandError(msg) from exc
+
+        with use_replica():
+            rows = get_sales_report_rows(start, end, chunk_size=kwargs["chunk_size"])
+
+        output = render_sales_report(rows, kwargs["format"])
+
+        if not kwargs["output"]:
+            for chunk in output:
+                self.stdout.write(chunk, ending="")
+            return
+
+        with Path(kwargs["output"]).open("w", newline="", encoding="utf-8") as outfile:
+            outfile.writelines(output)
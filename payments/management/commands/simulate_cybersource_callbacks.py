@@ -0,0 +1,152 @@
+"""Send simulated CyberSource callbacks for pending orders."""
+
+import random
+import statistics
+from collections import Counter
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from mitol.payment_gateway.api import ProcessorResponse
+
+from payments.models import Order
+from payments.simulator import (
+    CALLBACK_TARGETS,
+    DECISION_REASON_CODES,
+    CallbackSimulator,
+    build_callback_payload,
+)
+
+
+class Command(BaseCommand):
+    """
+    Sends simulated CyberSource Secure Acceptance callbacks for pending orders.
+
+    The callbacks are signed with the configured CyberSource security key, so
+    the instance receiving them needs to have the same key. For example, to
+    send a storm of duplicated, out-of-order callbacks for 500 orders:
+    python manage.py simulate_cybersource_callbacks --limit 500 \
+        --duplicate-rate 0.3 --reorder --concurrency 20
+    """
+
+    help = "Send simulated CyberSource callbacks for pending orders."
+
+    def add_arguments(self, parser) -> None:
+        """Add arguments to the command parser."""
+
+        parser.add_argument(
+            "--base-url",
+            type=str,
+            default=settings.SITE_BASE_URL,
+            help="The base URL of the instance to send callbacks to.",
+        )
+        parser.add_argument(
+            "--order",
+            type=str,
+            nargs="+",
+            dest="reference_numbers",
+            help="Reference numbers of the orders to send callbacks for.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=100,
+            help="Send callbacks for at most this many pending orders.",
+        )
+        parser.add_argument(
+            "--decision",
+            type=str,
+            default=ProcessorResponse.STATE_ACCEPTED,
+            choices=sorted(DECISION_REASON_CODES),
+            help="The decision to send.",
+        )
+        parser.add_argument(
+            "--target",
+            type=str,
+            nargs="+",
+            dest="targets",
+            default=sorted(CALLBACK_TARGETS),
+            choices=sorted(CALLBACK_TARGETS),
+            help="The callbacks to send for each order.",
+        )
+        parser.add_argument(
+            "--delay",
+            type=float,
+            default=0,
+            help="Seconds to wait before sending each callback.",
+        )
+        parser.add_argument(
+            "--jitter",
+            type=float,
+            default=0,
+            help="Up to this many extra seconds are added to the delay.",
+        )
+        parser.add_argument(
+            "--duplicate-rate",
+            type=float,
+            default=0,
+            help="The chance (0-1) of each callback being sent twice.",
+        )
+        parser.add_argument(
+            "--reorder",
+            action="store_true",
+            help="Send the callbacks in a random order.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="The number of callbacks to send at once.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Seed the random number generator, for repeatable runs.",
+        )
+
+    def handle(self, **options) -> None:
+        """Build the callback payloads and send them."""
+
+        orders = Order.objects.filter(state=Order.STATE.PENDING).order_by("id")
+
+        if options["reference_numbers"]:
+            orders = orders.filter(reference_number__in=options["reference_numbers"])
+        else:
+            orders = orders[: options["limit"]]
+
+        orders = orders.select_related("purchaser").prefetch_related("lines")
+
+        payloads = [
+            build_callback_payload(order, options["decision"]) for order in orders
+        ]
+
+        if not payloads:
+            msg = "No pending orders found."
+            raise CommandError(msg)
+
+        simulator = CallbackSimulator(
+            options["base_url"],
+            targets=options["targets"],
+            delay=options["delay"],
+            jitter=options["jitter"],
+            duplicate_rate=options["duplicate_rate"],
+            reorder=options["reorder"],
+            concurrency=options["concurrency"],
+            rng=random.Random(options["seed"]),  # noqa: S311
+        )
+        deliveries = simulator.run(payloads)
+
+        statuses = Counter(
+            delivery.status_code or delivery.error for delivery in deliveries
+        )
+        timings = sorted(delivery.elapsed for delivery in deliveries)
+
+        self.stdout.write(
+            f"Sent {len(deliveries)} callbacks for {len(payloads)} orders "
+            f"({sum(delivery.duplicate for delivery in deliveries)} duplicates)."
+        )
+        for status, count in sorted(statuses.items(), key=str):
+            self.stdout.write(f"  {status}: {count}")
+        self.stdout.write(
+            f"Latency: median {statistics.median(timings) * 1000:.1f}ms, "
+            f"max {timings[-1] * 1000:.1f}ms"
+        )
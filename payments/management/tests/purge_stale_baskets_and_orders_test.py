@@ -0,0 +1,166 @@
+"""Tests for the purge_stale_baskets_and_orders command"""
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from mitol.common.utils.datetime import now_in_utc
+
+from payments.factories import (
+    BasketFactory,
+    BasketItemFactory,
+    DiscountFactory,
+    OrderFactory,
+    RedeemedDiscountFactory,
+)
+from payments.models import Basket, BasketItem, Order, RedeemedDiscount
+
+pytestmark = pytest.mark.django_db
+
+
+def _age(obj, days):
+    """Make the object look like it was last updated the given days ago."""
+
+    type(obj).objects.filter(pk=obj.pk).update(
+        updated_on=now_in_utc() - timedelta(days=days)
+    )
+
+
+@pytest.fixture()
+def stale_orders():
+    """Return stale and fresh pending orders, and a stale fulfilled one."""
+
+    orders = {
+        "stale": OrderFactory.create_batch(3, state=Order.STATE.PENDING),
+        "fresh": OrderFactory.create(state=Order.STATE.PENDING),
+        "fulfilled": OrderFactory.create(state=Order.STATE.FULFILLED),
+    }
+
+    for order in [*orders["stale"], orders["fulfilled"]]:
+        _age(order, 30)
+
+    return orders
+
+
+@pytest.fixture()
+def stale_baskets():
+    """Return stale baskets (with items) and a fresh one."""
+
+    baskets = {
+        "stale": [
+            BasketItemFactory.create().basket,
+            BasketItemFactory.create().basket,
+        ],
+        "fresh": BasketFactory.create(),
+    }
+
+    for basket in baskets["stale"]:
+        _age(basket, 100)
+
+    return baskets
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 100])
+def test_purge(stale_orders, stale_baskets, chunk_size):
+    """Stale pending orders should be canceled, and stale baskets deleted."""
+
+    redeemed = RedeemedDiscountFactory.create(
+        order=stale_orders["stale"][0],
+        discount=DiscountFactory.create(),
+        user=stale_orders["stale"][0].purchaser,
+    )
+    kept_redeemed = RedeemedDiscountFactory.create(
+        order=stale_orders["fresh"],
+        discount=redeemed.discount,
+        user=stale_orders["fresh"].purchaser,
+    )
+    out = StringIO()
+
+    call_command(
+        "purge_stale_baskets_and_orders",
+        chunk_size=chunk_size,
+        pause=0,
+        stdout=out,
+    )
+
+    assert "Have canceled 3 stale pending orders." in out.getvalue()
+    assert "Have deleted 2 stale baskets." in out.getvalue()
+    assert set(
+        Order.objects.filter(state=Order.STATE.CANCELED).values_list("id", flat=True)
+    ) == {order.id for order in stale_orders["stale"]}
+    # Canceling an order updates its updated_on.
+    assert not Order.objects.filter(
+        state=Order.STATE.CANCELED, updated_on__lt=now_in_utc() - timedelta(days=1)
+    ).exists()
+    assert Order.objects.get(pk=stale_orders["fresh"].pk).state == Order.STATE.PENDING
+    assert Order.objects.get(pk=stale_orders["fulfilled"].pk).state == (
+        Order.STATE.FULFILLED
+    )
+    # Canceled orders release their discount redemptions.
+    assert list(RedeemedDiscount.objects.all()) == [kept_redeemed]
+    assert list(Basket.objects.all()) == [stale_baskets["fresh"]]
+    assert not BasketItem.objects.exists()
+
+
+def test_purge_keeps_changed_baskets(stale_baskets):
+    """Baskets that have changed since they went stale should be kept."""
+
+    added_to, removed_from = stale_baskets["stale"]
+    BasketItemFactory.create(basket=added_to)
+    removed_from.basket_items.first().delete()
+    out = StringIO()
+
+    call_command(
+        "purge_stale_baskets_and_orders", skip_orders=True, pause=0, stdout=out
+    )
+
+    assert "Have deleted 0 stale baskets." in out.getvalue()
+    assert Basket.objects.count() == 3
+
+
+def test_purge_dry_run(stale_orders, stale_baskets):
+    """A dry run should just count the orders and baskets."""
+
+    out = StringIO()
+
+    call_command("purge_stale_baskets_and_orders", dry_run=True, stdout=out)
+
+    assert "Would have canceled 3 stale pending orders." in out.getvalue()
+    assert "Would have deleted 2 stale baskets." in out.getvalue()
+    assert Order.objects.filter(state=Order.STATE.PENDING).count() == 4
+    assert Basket.objects.count() == 3
+
+
+def test_purge_limit_and_thresholds(stale_orders, stale_baskets):
+    """The limit and thresholds should be respected."""
+
+    out = StringIO()
+
+    call_command(
+        "purge_stale_baskets_and_orders",
+        limit=2,
+        pause=0,
+        basket_days=200,
+        stdout=out,
+    )
+
+    assert "Have canceled 2 stale pending orders." in out.getvalue()
+    assert "Have deleted 0 stale baskets." in out.getvalue()
+
+
+def test_purge_skips(stale_orders, stale_baskets):
+    """Orders or baskets can be skipped."""
+
+    out = StringIO()
+
+    call_command(
+        "purge_stale_baskets_and_orders",
+        skip_orders=True,
+        skip_baskets=True,
+        stdout=out,
+    )
+
+    assert not out.getvalue()
+    assert Order.objects.filter(state=Order.STATE.PENDING).count() == 4
+    assert Basket.objects.count() == 3
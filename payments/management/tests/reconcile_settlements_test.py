@@ -0,0 +1,121 @@
+"""Tests for the reconcile_settlements command"""
+
+import csv
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from mitol.common.utils.datetime import now_in_utc
+
+from payments.constants import DISCREPANCY_KINDS, DISCREPANCY_NOT_RECORDED
+from payments.factories import OrderFactory, TransactionFactory
+from payments.models import Order
+from unified_ecommerce.constants import TRANSACTION_TYPE_PAYMENT
+
+pytestmark = pytest.mark.django_db
+
+REPORT = """request_id,merchant_ref_number,transaction_type,amount,currency
+1001,mitxonline-1,ics_bill,10.00,USD
+1002,mitxonline-1,ics_bill,20.00,USD
+"""
+
+
+@pytest.fixture()
+def report_path(tmp_path):
+    """Return the path to a settlement report, and record its first transaction."""
+
+    TransactionFactory.create(
+        order=OrderFactory.create(
+            state=Order.STATE.FULFILLED, reference_number="mitxonline-1"
+        ),
+        transaction_id="1001",
+        transaction_type=TRANSACTION_TYPE_PAYMENT,
+        amount=Decimal(10),
+    )
+
+    path = tmp_path / "report.csv"
+    path.write_text(REPORT, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("to_file", [True, False])
+def test_reconcile_settlements(tmp_path, report_path, to_file):
+    """The discrepancies should be written as CSV, with the counts after."""
+
+    stdout, stderr = StringIO(), StringIO()
+    output = tmp_path / "discrepancies.csv"
+    kwargs = {"output": str(output)} if to_file else {}
+
+    call_command(
+        "reconcile_settlements",
+        file=str(report_path),
+        batch_size=1,
+        stdout=stdout,
+        stderr=stderr,
+        **kwargs,
+    )
+
+    rows = list(
+        csv.DictReader(
+            StringIO(
+                output.read_text(encoding="utf-8") if to_file else stdout.getvalue()
+            )
+        )
+    )
+    assert rows == [
+        {
+            "kind": DISCREPANCY_NOT_RECORDED,
+            "transaction_id": "1002",
+            "reference_number": "mitxonline-1",
+            "settled_amount": "20.00",
+            "recorded_amount": "",
+        }
+    ]
+    assert stderr.getvalue().splitlines() == [
+        f"{kind}: {1 if kind == DISCREPANCY_NOT_RECORDED else 0}"
+        for kind in DISCREPANCY_KINDS
+    ]
+
+
+def test_reconcile_settlements_download(mocker, report_path):
+    """With --date, the report for that date should be downloaded and checked."""
+
+    def download(report_date, path):
+        path.write_text(report_path.read_text(encoding="utf-8"), encoding="utf-8")
+
+    mock_download = mocker.patch(
+        "payments.management.commands.reconcile_settlements.download_settlement_report",
+        side_effect=download,
+    )
+    stdout = StringIO()
+    today = now_in_utc().date()
+
+    call_command(
+        "reconcile_settlements",
+        date=str(today),
+        start=str(today - timedelta(days=1)),
+        end=str(today + timedelta(days=1)),
+        stdout=stdout,
+        stderr=StringIO(),
+    )
+
+    assert mock_download.call_args.args[0] == today
+    assert [
+        row["transaction_id"] for row in csv.DictReader(StringIO(stdout.getvalue()))
+    ] == ["1002"]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"start": "2026-01-01"},
+        {"start": "2026-01-01", "end": "soon"},
+    ],
+)
+def test_reconcile_settlements_bad_period(report_path, kwargs):
+    """The period should be checked."""
+
+    with pytest.raises(CommandError):
+        call_command("reconcile_settlements", file=str(report_path), **kwargs)
@@ -0,0 +1,73 @@
+"""Tests for the sales_report command"""
+
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from mitol.common.utils.datetime import now_in_utc
+
+from payments.factories import LineFactory, OrderFactory
+from payments.models import Order
+from system_meta.factories import ProductVersionFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def order():
+    """Return a fulfilled order with a line."""
+
+    order = OrderFactory.create(state=Order.STATE.FULFILLED)
+    product_version = ProductVersionFactory.create()
+    LineFactory.create(
+        order=order,
+        product_version=product_version,
+        discounted_price=product_version.field_dict["price"],
+    )
+
+    return order
+
+
+def _period():
+    """Return start and end arguments for a period that includes today."""
+
+    today = now_in_utc().date()
+    return {"start": str(today), "end": str(today + timedelta(days=1))}
+
+
+def test_sales_report_csv(mocker, order):
+    """The report should be written as CSV, reading from the replica."""
+
+    mock_use_replica = mocker.patch(
+        "payments.management.commands.sales_report.use_replica"
+    )
+    out = StringIO()
+
+    call_command("sales_report", **_period(), stdout=out)
+
+    rows = list(csv.DictReader(StringIO(out.getvalue())))
+    assert [row["reference_number"] for row in rows] == [order.reference_number]
+    mock_use_replica.assert_called_once()
+
+
+def test_sales_report_jsonl_file(tmp_path, order):
+    """The report can be written to a file as JSON lines."""
+
+    output = tmp_path / "report.jsonl"
+
+    call_command(
+        "sales_report", **_period(), format="jsonl", output=str(output), chunk_size=1
+    )
+
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row["order_id"] for row in rows] == [order.id]
+
+
+def test_sales_report_bad_date():
+    """Dates that can't be parsed should be an error."""
+
+    with pytest.raises(CommandError):
+        call_command("sales_report", start="not a date", end="2026-01-01")
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.27 on 2026-10-19 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payments", "0015_order_integrated_system"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="basket",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Incremented whenever the basket or its contents change.",
+            ),
+        ),
+    ]
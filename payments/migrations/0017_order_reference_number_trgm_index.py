@@ -0,0 +1,29 @@
+# Generated by Django 4.2.27 on 2026-10-19 10:15
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # The index is built concurrently, so orders can still be written.
+    atomic = False
+
+    dependencies = [
+        ("payments", "0016_basket_version"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name="order",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("reference_number"),
+                    name="gin_trgm_ops",
+                ),
+                name="payments_order_ref_trgm_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 4.2.27 on 2026-10-19 10:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payments", "0017_order_reference_number_trgm_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransactionDataArchive",
+            fields=[
+                ("created_on", models.DateTimeField(auto_now_add=True)),
+                ("updated_on", models.DateTimeField(auto_now=True)),
+                (
+                    "transaction",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="data_archive",
+                        serialize=False,
+                        to="payments.transaction",
+                    ),
+                ),
+                (
+                    "payload",
+                    models.BinaryField(help_text="The zlib-compressed JSON payload."),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="bill_to_city",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="bill_to_country",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="bill_to_email",
+            field=models.CharField(
+                blank=True, db_index=True, default="", max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="bill_to_first_name",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="bill_to_last_name",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="bill_to_postal_code",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="bill_to_state",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="bill_to_street_address",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="currency",
+            field=models.CharField(blank=True, default="", max_length=3),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="is_paypal",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="requested_amount",
+            field=models.DecimalField(
+                blank=True, decimal_places=5, max_digits=20, null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="data",
+            field=models.JSONField(
+                blank=True,
+                help_text="The payment processor payload. Moved to the archive when old.",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+# The Transaction columns copied from the payload, as of this migration. This
+# is a copy of payments.utils.transaction_fields_from_data, so later changes to
+# that don't change what this does.
+DATA_FIELDS = {
+    "currency": "req_currency",
+    "bill_to_first_name": "req_bill_to_forename",
+    "bill_to_last_name": "req_bill_to_surname",
+    "bill_to_email": "req_bill_to_email",
+    "bill_to_country": "req_bill_to_address_country",
+    "bill_to_city": "req_bill_to_address_city",
+    "bill_to_state": "req_bill_to_address_state",
+    "bill_to_postal_code": "req_bill_to_address_postal_code",
+}
+
+
+def _fields_from_data(data):
+    """Return the column values for the payload."""
+
+    fields = {field: str(data.get(key) or "") for field, key in DATA_FIELDS.items()}
+
+    try:
+        fields["requested_amount"] = Decimal(str(data["req_amount"]))
+    except (KeyError, ArithmeticError, ValueError):
+        fields["requested_amount"] = None
+
+    street_address = [
+        str(data.get(f"req_bill_to_address_line{idx}") or "") for idx in range(1, 6)
+    ]
+    while street_address and not street_address[-1]:
+        street_address.pop()
+    fields["bill_to_street_address"] = street_address
+    fields["is_paypal"] = "paypal_token" in data
+
+    return fields
+
+
+def backfill_transaction_data_fields(apps, schema_editor):
+    """Copy the fields from the existing transactions' payloads."""
+
+    model = apps.get_model("payments", "transaction")
+    fields = [*DATA_FIELDS, "requested_amount", "bill_to_street_address", "is_paypal"]
+    batch = []
+
+    for txn in (
+        model.objects.filter(data__isnull=False)
+        .order_by("id")
+        .iterator(chunk_size=BATCH_SIZE)
+    ):
+        for field, value in _fields_from_data(txn.data).items():
+            setattr(txn, field, value)
+
+        batch.append(txn)
+
+        if len(batch) == BATCH_SIZE:
+            model.objects.bulk_update(batch, fields)
+            batch = []
+
+    if batch:
+        model.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payments", "0018_transaction_data_fields_and_archive"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_transaction_data_fields, migrations.RunPython.noop
+        ),
+    ]
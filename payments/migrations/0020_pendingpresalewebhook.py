@@ -0,0 +1,68 @@
+# Generated by Django 4.2.27 on 2026-10-19 10:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("system_meta", "0009_product_details_url"),
+        ("payments", "0019_backfill_transaction_data_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingPreSaleWebhook",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_on", models.DateTimeField(auto_now_add=True)),
+                ("updated_on", models.DateTimeField(auto_now=True)),
+                (
+                    "action",
+                    models.CharField(help_text="The basket action.", max_length=10),
+                ),
+                (
+                    "integrated_system",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending_pre_sale_webhooks",
+                        to="system_meta.integratedsystem",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending_pre_sale_webhooks",
+                        to="system_meta.product",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending_pre_sale_webhooks",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["integrated_system", "user", "id"],
+                        name="pending_presale_webhook_idx",
+                    )
+                ],
+            },
+        ),
+    ]
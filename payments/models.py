@@ -1,9 +1,11 @@
 """Models for payment processing."""
 # ruff: noqa: TD002,TD003,FIX002
 
+import json
 import logging
 import re
 import uuid
+import zlib
 from datetime import datetime
 from decimal import Decimal
 
@@ -11,18 +13,26 @@ import pytz
 import reversion
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models, transaction
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast, Coalesce, Upper
 from django.utils.functional import cached_property
 from django_countries.fields import CountryField
-from mitol.common.models import TimestampedModel
+from mitol.common.models import TimestampedModel, TimestampedModelQuerySet
+from mitol.common.utils.datetime import now_in_utc
 from mitol.payment_gateway.payment_utils import quantize_decimal
 from reversion.models import Version
 from safedelete.managers import SafeDeleteManager
 from safedelete.models import SafeDeleteModel
 
 from payments.constants import GEOLOCATION_CHOICES, GEOLOCATION_TYPE_NONE
-from payments.utils import product_price_with_discount
+from payments.utils import (
+    product_price_with_discount,
+    transaction_fields_from_data,
+)
 from system_meta.models import IntegratedSystem, Product
 from unified_ecommerce.constants import (
     DISCOUNT_TYPE_DOLLARS_OFF,
@@ -41,7 +51,9 @@ from unified_ecommerce.utils import SoftDeleteActiveModel
 
 User = get_user_model()
 log = logging.getLogger(__name__)
-pm = get_plugin_manager()
+
+# For prices calculated in the database.
+PRICE_FIELD = models.DecimalField(max_digits=20, decimal_places=5)
 
 
 class Company(TimestampedModel):
@@ -406,6 +418,25 @@ class Basket(TimestampedModel):
         null=True,
         blank=True,
     )
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Incremented whenever the basket or its contents change.",
+    )
+
+    def bump_version(self):
+        """
+        Increment the version, so the cached serialized basket isn't used.
+
+        This is an UPDATE rather than a save, so concurrent changes can't both
+        end up with the same version. UPDATEs skip auto_now, so it sets
+        updated_on too, which is what stale baskets are found by.
+        """
+
+        Basket.objects.filter(pk=self.pk).update(
+            version=models.F("version") + 1, updated_on=now_in_utc()
+        )
+        self.refresh_from_db(fields=["version", "updated_on"])
 
     def compare_to_order(self, order):
         """
@@ -629,6 +660,32 @@ class BasketItem(TimestampedModel):
         return quantize_decimal(self.total_price)
 
 
+class OrderQuerySet(TimestampedModelQuerySet):
+    """QuerySet for Order."""
+
+    def with_tax(self):
+        """
+        Annotate the orders with their tax (as annotated_tax), in SQL.
+
+        This matches the tax property, without loading the lines.
+        """
+
+        line_tax = (
+            Line.objects.filter(order=models.OuterRef("pk"))
+            .with_prices()
+            .order_by()
+            .values("order")
+            .annotate(total=models.Sum("annotated_tax"))
+            .values("total")
+        )
+
+        return self.annotate(
+            annotated_tax=Coalesce(
+                models.Subquery(line_tax), Decimal(0), output_field=PRICE_FIELD
+            )
+        )
+
+
 class Order(TimestampedModel):
     """An order containing information for a purchase."""
 
@@ -709,6 +766,19 @@ class Order(TimestampedModel):
     )
     reference_number = models.CharField(max_length=255, default="", blank=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        """Model meta options."""
+
+        indexes = [
+            # For the admin's case-insensitive substring search.
+            GinIndex(
+                OpClass(Upper("reference_number"), name="gin_trgm_ops"),
+                name="payments_order_ref_trgm_idx",
+            ),
+        ]
+
     # override save method to auto-fill generated_rerefence_number
     def save(self, *args, **kwargs):
         """Save the order."""
@@ -781,40 +851,95 @@ class Order(TimestampedModel):
             )
         )
 
-    def fulfill(self, payment_data, source=POST_SALE_SOURCE_REDIRECT):
-        """Fufill the order."""
-        # record the transaction
-        try:
-            self.create_transaction(payment_data)
+    def transition_state(self, new_state, from_states=(STATE.PENDING,)) -> bool:
+        """
+        Move the order to the new state, if it's in one of the given states.
 
-            self.state = Order.STATE.FULFILLED
-            self.save()
+        This is a conditional update (UPDATE ... WHERE state IN from_states), so
+        when two callers race to change the order (e.g. the redirect and the
+        backoffice callback for the same payment), exactly one of them wins,
+        and the row is only locked for the update itself.
+
+        Args:
+        - new_state (str): the state to move to
+        - from_states (tuple): the states the order can be moved from
 
-            # trigger post-sale events
-            self.handle_post_sale(source=source)
+        Returns:
+        - bool: True if this call changed the state. If it didn't, the order's
+          state is refreshed, so it reflects whatever the winner did.
+        """
+
+        # update() doesn't touch the auto_now fields, so set updated_on here.
+        updated_on = now_in_utc()
+        updated = Order.objects.filter(pk=self.pk, state__in=from_states).update(
+            state=new_state, updated_on=updated_on
+        )
+
+        if updated:
+            self.state = new_state
+            self.updated_on = updated_on
+        else:
+            self.refresh_from_db(fields=["state", "updated_on"])
+            log.info(
+                "Order %s is %s, not moving it to %s",
+                self.reference_number,
+                self.state,
+                new_state,
+            )
+
+        return bool(updated)
+
+    def fulfill(self, payment_data, source=POST_SALE_SOURCE_REDIRECT) -> bool:
+        """
+        Fulfill the order, if it's still pending.
+
+        The post-sale events are triggered once the fulfillment is committed.
+        Returns True if this call fulfilled the order.
+        """
+        try:
+            with transaction.atomic():
+                if not self.transition_state(Order.STATE.FULFILLED):
+                    return False
+
+                # record the transaction
+                self.create_transaction(payment_data)
         except Exception as e:  # pylint: disable=broad-except
             log.exception(
                 "Error occurred fulfilling order %s", self.reference_number, exc_info=e
             )
 
             self.errored()
+            return False
 
-    def cancel(self):
-        """Cancel this order"""
-        self.state = Order.STATE.CANCELED
-        self.save()
+        if self.state != Order.STATE.FULFILLED:
+            # The transaction couldn't be recorded, so the order errored.
+            return False
+
+        # trigger post-sale events
+        transaction.on_commit(
+            lambda: self.handle_post_sale(source=source),
+            robust=True,
+        )
 
-    def decline(self):
-        """Decline this order"""
-        self.state = Order.STATE.DECLINED
-        self.save()
+        return True
 
-        return self
+    def cancel(self) -> bool:
+        """Cancel this order, if it's still pending"""
+        return self.transition_state(Order.STATE.CANCELED)
 
-    def errored(self):
-        """Error this order"""
-        self.state = Order.STATE.ERRORED
-        self.save()
+    def decline(self) -> bool:
+        """Decline this order, if it's still pending"""
+        return self.transition_state(Order.STATE.DECLINED)
+
+    def errored(self, from_states=(STATE.PENDING,)) -> bool:
+        """
+        Error this order, if it's still pending.
+
+        This is what an ERROR from the payment processor does, so a late or
+        duplicated callback can't error an order that's already been paid.
+        Recording a refund can error a fulfilled order, by passing from_states.
+        """
+        return self.transition_state(Order.STATE.ERRORED, from_states)
 
     def refund(self, *, api_response_data, **kwargs):
         """Issue a refund"""
@@ -868,7 +993,8 @@ class Order(TimestampedModel):
                 amount=self.total_price_paid,
             )
         except Exception:  # pylint: disable=broad-except  # noqa: BLE001
-            self.errored()
+            # fulfill() has already moved the order on by the time this runs.
+            self.errored((Order.STATE.PENDING, Order.STATE.FULFILLED))
 
     def handle_post_sale(self, source=POST_SALE_SOURCE_REDIRECT):
         """
@@ -878,7 +1004,7 @@ class Order(TimestampedModel):
 
         log.debug("Running post-sale events for %s", self)
 
-        pm.hook.post_sale(order_id=self.id, source=source)
+        get_plugin_manager().hook.post_sale(order_id=self.id, source=source)
 
     def delete_redeemed_discounts(self):
         """Delete redeemed discounts"""
@@ -1101,15 +1227,14 @@ class FulfilledOrder(Order):
                 transaction_type=TRANSACTION_TYPE_REFUND,
                 reason=reason,
             )
-            self.state = Order.STATE.REFUNDED
-            self.save()
+            self.transition_state(Order.STATE.REFUNDED, (Order.STATE.FULFILLED,))
 
             # TODO: send_order_refund_email.delay(self.id)
             # (and any other post-refund events)
 
             return refund_transaction  # noqa: TRY300
         except Exception:  # pylint: disable=broad-except  # noqa: BLE001
-            self.errored()
+            self.errored((Order.STATE.FULFILLED,))
 
     class Meta:
         """Model meta options."""
@@ -1206,6 +1331,49 @@ class PartiallyRefundedOrder(Order):
         proxy = True
 
 
+class LineQuerySet(TimestampedModelQuerySet):
+    """QuerySet for Line."""
+
+    def with_prices(self):
+        """
+        Annotate the lines with their prices, in SQL.
+
+        The base_price, tax and total_price properties read the unit price from
+        the product version; this reads it from the version's serialized data
+        in the database instead, so the prices can be aggregated. The prices
+        are annotated as annotated_base_price, annotated_tax and
+        annotated_total_price.
+        """
+
+        unit_price = Cast(KT("_product_version_data__0__fields__price"), PRICE_FIELD)
+        base_price = models.ExpressionWrapper(
+            unit_price * models.F("quantity"), output_field=PRICE_FIELD
+        )
+        tax = Coalesce(
+            models.ExpressionWrapper(
+                base_price * models.F("order__tax_rate__tax_rate") / 100,
+                output_field=PRICE_FIELD,
+            ),
+            Decimal(0),
+            output_field=PRICE_FIELD,
+        )
+
+        return (
+            self.alias(
+                _product_version_data=Cast(
+                    "product_version__serialized_data", models.JSONField()
+                )
+            )
+            .annotate(annotated_base_price=base_price, annotated_tax=tax)
+            .annotate(
+                annotated_total_price=models.ExpressionWrapper(
+                    models.F("annotated_base_price") + models.F("annotated_tax"),
+                    output_field=PRICE_FIELD,
+                )
+            )
+        )
+
+
 class Line(TimestampedModel):
     """A line in an Order."""
 
@@ -1229,6 +1397,8 @@ class Line(TimestampedModel):
         max_digits=20,
     )
 
+    objects = LineQuerySet.as_manager()
+
     class Meta:
         """Model meta options."""
 
@@ -1322,7 +1492,11 @@ class Transaction(TimestampedModel):
         decimal_places=5,
         max_digits=20,
     )
-    data = models.JSONField()
+    data = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="The payment processor payload. Moved to the archive when old.",
+    )
     transaction_type = models.TextField(
         choices=TRANSACTION_TYPES,
         default=TRANSACTION_TYPE_PAYMENT,
@@ -1331,6 +1505,121 @@ class Transaction(TimestampedModel):
     )
     reason = models.CharField(max_length=255, blank=True)
 
+    # These are copied from the payload when the transaction is saved, so they
+    # can be used without loading (or unarchiving) the payload.
+    requested_amount = models.DecimalField(
+        decimal_places=5, max_digits=20, null=True, blank=True
+    )
+    currency = models.CharField(max_length=3, blank=True, default="")
+    is_paypal = models.BooleanField(default=False)
+    bill_to_first_name = models.CharField(max_length=255, blank=True, default="")
+    bill_to_last_name = models.CharField(max_length=255, blank=True, default="")
+    bill_to_email = models.CharField(
+        max_length=255, blank=True, default="", db_index=True
+    )
+    bill_to_country = models.CharField(max_length=255, blank=True, default="")
+    bill_to_street_address = models.JSONField(default=list, blank=True)
+    bill_to_city = models.CharField(max_length=255, blank=True, default="")
+    bill_to_state = models.CharField(max_length=255, blank=True, default="")
+    bill_to_postal_code = models.CharField(max_length=255, blank=True, default="")
+
+    REFUND_FIELDS = (
+        "id",
+        "transaction_id",
+        "requested_amount",
+        "currency",
+        "is_paypal",
+    )
+    ADDRESS_FIELDS = (
+        "id",
+        "bill_to_first_name",
+        "bill_to_last_name",
+        "bill_to_email",
+        "bill_to_country",
+        "bill_to_street_address",
+        "bill_to_city",
+        "bill_to_state",
+        "bill_to_postal_code",
+    )
+
+    def copy_data_fields(self):
+        """Copy the fields we use from the payload to their columns."""
+
+        for field, value in transaction_fields_from_data(self.data).items():
+            setattr(self, field, value)
+
+    def save(self, *args, **kwargs):
+        """Save the transaction, copying the fields from the payload if it's there."""
+
+        if self.data is not None and "update_fields" not in kwargs:
+            self.copy_data_fields()
+
+        super().save(*args, **kwargs)
+
+    def get_data(self) -> dict | None:
+        """Return the payload, unarchiving it if it's been archived."""
+
+        if self.data is not None:
+            return self.data
+
+        try:
+            return self.data_archive.get_data()
+        except TransactionDataArchive.DoesNotExist:
+            return None
+
+    def get_refund_payload(self, amount=None) -> dict:
+        """
+        Return the data the payment gateway needs to refund this transaction.
+
+        Values that aren't known are left out, so the gateway can complain
+        about them.
+
+        Args:
+        - amount (Decimal|str|None): the amount to refund; the full requested
+            amount if not specified
+        Returns:
+        - dict: the transaction ID, amount and currency
+        """
+
+        payload = {"transaction_id": self.transaction_id}
+        amount = amount if amount is not None else self.requested_amount
+
+        if amount is not None:
+            payload["req_amount"] = str(amount)
+
+        if self.currency:
+            payload["req_currency"] = self.currency
+
+        return payload
+
+
+class TransactionDataArchive(TimestampedModel):
+    """The compressed payload of an old transaction."""
+
+    transaction = models.OneToOneField(
+        Transaction,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="data_archive",
+    )
+    payload = models.BinaryField(help_text="The zlib-compressed JSON payload.")
+
+    @staticmethod
+    def compress(data: dict) -> bytes:
+        """Compress a transaction payload."""
+
+        return zlib.compress(json.dumps(data, cls=DjangoJSONEncoder).encode())
+
+    def get_data(self) -> dict:
+        """Return the uncompressed payload."""
+
+        return json.loads(zlib.decompress(self.payload))
+
+    def __str__(self):
+        """Return the archive as a string."""
+
+        return f"Archived data for transaction {self.transaction_id}"
+
 
 class RedeemedDiscount(TimestampedModel):
     """Redeemed Discount model"""
@@ -1351,3 +1640,43 @@ class RedeemedDiscount(TimestampedModel):
         """Return the redeemed discount as a string."""
 
         return f"{self.discount} {self.user}"
+
+
+class PendingPreSaleWebhook(TimestampedModel):
+    """
+    A basket change waiting to be sent to the integrated system.
+
+    When pre-sale webhooks are coalesced, the changes a user makes to a basket
+    are kept here until the window is up, then sent in one webhook. See
+    payments.api.queue_pre_sale_webhook.
+    """
+
+    integrated_system = models.ForeignKey(
+        IntegratedSystem,
+        on_delete=models.CASCADE,
+        related_name="pending_pre_sale_webhooks",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="pending_pre_sale_webhooks",
+    )
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="pending_pre_sale_webhooks"
+    )
+    action = models.CharField(max_length=10, help_text="The basket action.")
+
+    class Meta:
+        """Meta options for PendingPreSaleWebhook"""
+
+        indexes = [
+            models.Index(
+                fields=["integrated_system", "user", "id"],
+                name="pending_presale_webhook_idx",
+            )
+        ]
+
+    def __str__(self):
+        """Return the pending webhook as a string."""
+
+        return f"Pending {self.action} of {self.product} for {self.user}"
@@ -685,3 +685,164 @@ def test_establish_basket_unique_constraint():
         ).count()
         == 1
     )
+
+
+@pytest.mark.parametrize(
+    ("from_state", "transition", "to_state", "expected"),
+    [
+        (models.Order.STATE.PENDING, "cancel", models.Order.STATE.CANCELED, True),
+        (models.Order.STATE.PENDING, "decline", models.Order.STATE.DECLINED, True),
+        (models.Order.STATE.PENDING, "errored", models.Order.STATE.ERRORED, True),
+        (models.Order.STATE.FULFILLED, "errored", models.Order.STATE.FULFILLED, False),
+        (models.Order.STATE.FULFILLED, "cancel", models.Order.STATE.FULFILLED, False),
+        (models.Order.STATE.CANCELED, "decline", models.Order.STATE.CANCELED, False),
+    ],
+)
+def test_order_transitions(from_state, transition, to_state, expected):
+    """State transitions should only apply to orders in the right state."""
+
+    order = OrderFactory.create(state=from_state)
+
+    assert getattr(order, transition)() is expected
+    assert order.state == to_state
+    order.refresh_from_db()
+    assert order.state == to_state
+
+
+def test_fulfilled_order_refund():
+    """Refunding should move a fulfilled order to refunded."""
+
+    order = OrderFactory.create(state=models.Order.STATE.FULFILLED)
+    fulfilled_order = models.FulfilledOrder.objects.get(pk=order.pk)
+
+    refund = fulfilled_order.refund(
+        api_response_data={"id": "refund-1"}, amount=10, reason="test"
+    )
+
+    assert refund.transaction_id == "refund-1"
+    order.refresh_from_db()
+    assert order.state == models.Order.STATE.REFUNDED
+
+
+def test_fulfilled_order_refund_error():
+    """If the refund can't be recorded, the fulfilled order should be errored."""
+
+    order = OrderFactory.create(state=models.Order.STATE.FULFILLED)
+    fulfilled_order = models.FulfilledOrder.objects.get(pk=order.pk)
+
+    assert fulfilled_order.refund(api_response_data={}) is None
+
+    order.refresh_from_db()
+    assert order.state == models.Order.STATE.ERRORED
+
+
+def test_order_transition_updated_on():
+    """Moving the order to a new state should update its updated_on."""
+
+    order = OrderFactory.create(state=models.Order.STATE.PENDING)
+    models.Order.objects.filter(pk=order.pk).update(
+        updated_on=order.updated_on - timedelta(days=1)
+    )
+    order.refresh_from_db()
+    previous = order.updated_on
+
+    assert order.cancel()
+    assert order.updated_on > previous
+    order.refresh_from_db()
+    assert order.updated_on > previous
+
+    # A transition that doesn't apply shouldn't change it.
+    canceled_on = order.updated_on
+    assert not order.decline()
+    order.refresh_from_db()
+    assert order.updated_on == canceled_on
+
+
+def test_order_transition_race(mocker, django_capture_on_commit_callbacks):
+    """
+    If two callers change the same order, only the first should win, and the
+    second shouldn't trigger any side effects.
+    """
+
+    mock_post_sale = mocker.patch("payments.models.Order.handle_post_sale")
+    order = OrderFactory.create(state=models.Order.STATE.PENDING)
+    first = models.Order.objects.get(pk=order.pk)
+    second = models.Order.objects.get(pk=order.pk)
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        assert first.fulfill({"transaction_id": "1234", "amount": 10})
+        assert not second.fulfill({"transaction_id": "5678", "amount": 10})
+        assert not second.cancel()
+
+    assert len(callbacks) == 1
+    mock_post_sale.assert_called_once()
+    assert second.state == models.Order.STATE.FULFILLED
+    assert list(order.transactions.values_list("transaction_id", flat=True)) == ["1234"]
+
+
+def test_order_fulfill_transaction_error(mocker, django_capture_on_commit_callbacks):
+    """If the transaction can't be recorded, the order should be errored."""
+
+    mock_post_sale = mocker.patch("payments.models.Order.handle_post_sale")
+    order = OrderFactory.create(state=models.Order.STATE.PENDING)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert not order.fulfill({"amount": 10})
+
+    mock_post_sale.assert_not_called()
+    order.refresh_from_db()
+    assert order.state == models.Order.STATE.ERRORED
+    assert not order.transactions.exists()
+
+
+def test_transaction_copies_data_fields():
+    """Saving a transaction should copy the fields we use from its payload."""
+
+    order = OrderFactory.create(state=models.Order.STATE.PENDING)
+    order.create_transaction(
+        {
+            "transaction_id": "1234",
+            "req_amount": "10.00",
+            "req_currency": "USD",
+            "req_bill_to_email": "buyer@example.com",
+        }
+    )
+
+    transaction = models.Transaction.objects.get(transaction_id="1234")
+
+    assert transaction.requested_amount == Decimal("10.00")
+    assert transaction.currency == "USD"
+    assert transaction.bill_to_email == "buyer@example.com"
+    assert not transaction.is_paypal
+    assert transaction.get_refund_payload() == {
+        "transaction_id": "1234",
+        "req_amount": "10.00000",
+        "req_currency": "USD",
+    }
+    assert transaction.get_refund_payload(Decimal(5)) == {
+        "transaction_id": "1234",
+        "req_amount": "5",
+        "req_currency": "USD",
+    }
+
+
+def test_transaction_get_archived_data():
+    """get_data should return the payload, even once it's been archived."""
+
+    order = OrderFactory.create(state=models.Order.STATE.PENDING)
+    order.create_transaction({"transaction_id": "1234", "req_currency": "USD"})
+    transaction = models.Transaction.objects.get(transaction_id="1234")
+    data = transaction.data
+
+    assert transaction.get_data() == data
+
+    models.TransactionDataArchive.objects.create(
+        transaction=transaction, payload=models.TransactionDataArchive.compress(data)
+    )
+    transaction.data = None
+    transaction.save()
+    transaction = models.Transaction.objects.get(pk=transaction.pk)
+
+    assert transaction.data is None
+    assert transaction.currency == "USD"
+    assert transaction.get_data() == data
@@ -1,11 +1,34 @@
+"""Permission classes for the payments app."""
+
 from rest_framework_api_key.permissions import BaseHasAPIKey
 
+from system_meta.caching import verify_integrated_system_api_key
 from system_meta.models import IntegratedSystemAPIKey
 
 
 class HasIntegratedSystemAPIKey(BaseHasAPIKey):
     """
     Permission class to check for Integrated System API Key.
+
+    Verified keys are cached (see verify_integrated_system_api_key). On success,
+    the key and its system are attached to the request as
+    integrated_system_api_key and integrated_system, so views don't need to look
+    them up again.
     """
 
     model = IntegratedSystemAPIKey
+
+    def has_permission(self, request, view):  # noqa: ARG002
+        """Check the API key, and attach it and its system to the request."""
+
+        key = self.get_key(request)
+        if not key:
+            return False
+
+        api_key = verify_integrated_system_api_key(key)
+        if api_key is None:
+            return False
+
+        request.integrated_system_api_key = api_key
+        request.integrated_system = api_key.integrated_system
+        return True
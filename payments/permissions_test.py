@@ -0,0 +1,99 @@
+"""Tests for payments permissions."""
+
+import uuid
+
+import pytest
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from payments.models import Discount
+from system_meta.caching import API_KEY_CACHE_KEY_PREFIX
+from system_meta.factories import ActiveIntegratedSystemFactory
+from system_meta.models import IntegratedSystemAPIKey
+from unified_ecommerce.constants import (
+    DISCOUNT_TYPE_DOLLARS_OFF,
+    PAYMENT_TYPE_MARKETING,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def system_api_key():
+    """Create an integrated system API key."""
+
+    system = ActiveIntegratedSystemFactory.create()
+    api_key, key = IntegratedSystemAPIKey.objects.create_key(
+        name="test key", integrated_system=system
+    )
+
+    return (system, api_key, key)
+
+
+def _create_discount(key):
+    """Call the discount API with the given key, to create a single code."""
+
+    client = APIClient()
+    return client.post(
+        reverse("v0:discount-api"),
+        {
+            "discount_type": DISCOUNT_TYPE_DOLLARS_OFF,
+            "payment_type": PAYMENT_TYPE_MARKETING,
+            "amount": 10,
+            "codes": str(uuid.uuid4()),
+        },
+        format="json",
+        HTTP_AUTHORIZATION=f"Api-Key {key}",
+    )
+
+
+def test_api_key_verification_is_cached(mocker, system_api_key):
+    """Only the first request should do the full key verification."""
+
+    system, _, key = system_api_key
+    verify = mocker.spy(IntegratedSystemAPIKey.objects, "get_from_key")
+
+    for _ in range(3):
+        assert _create_discount(key).status_code == 201
+
+    verify.assert_called_once_with(key)
+    assert Discount.objects.filter(integrated_system=system).count() == 3
+
+
+def test_revoked_api_key_is_rejected(system_api_key):
+    """Revoking a key should take effect immediately."""
+
+    _, api_key, key = system_api_key
+
+    assert _create_discount(key).status_code == 201
+
+    api_key.revoked = True
+    api_key.save()
+
+    assert _create_discount(key).status_code == 403
+
+
+def test_cached_revoked_api_key_is_rejected(settings, system_api_key):
+    """A revoked key should be rejected even if it's in the cache."""
+
+    _, api_key, key = system_api_key
+
+    assert _create_discount(key).status_code == 201
+
+    cache = caches[settings.MITOL_UE_API_KEY_CACHE_NAME]
+    cache_key = f"{API_KEY_CACHE_KEY_PREFIX}:{api_key.prefix}"
+    cached = cache.get(cache_key)
+    cached["api_key"].revoked = True
+    cache.set(cache_key, cached)
+
+    assert _create_discount(key).status_code == 403
+
+
+def test_bad_api_key_is_rejected(system_api_key):
+    """A key with a valid prefix but the wrong secret should be rejected."""
+
+    _, api_key, key = system_api_key
+
+    assert _create_discount(key).status_code == 201
+    assert _create_discount(f"{api_key.prefix}.wrong").status_code == 403
@@ -0,0 +1,13 @@
+"""Private URLs for the payments app."""
+
+from django.urls import re_path
+
+from payments.views.v0 import sales_report
+
+urlpatterns = [
+    re_path(
+        r"^sales_report/$",
+        sales_report,
+        name="sales_report",
+    ),
+]
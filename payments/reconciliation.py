@@ -0,0 +1,302 @@
+"""
+Settlement reconciliation.
+
+Checks a settlement report from the payment gateway (CyberSource's Payment
+Batch Detail report, as CSV or XML) against our transactions, and finds:
+- transactions the gateway settled that we have no record of (not_recorded)
+- transactions that appear in the report more than once (duplicate)
+- transactions settled for a different amount than we recorded
+  (amount_mismatch)
+- charges settled for orders that are still pending (pending_order)
+- payments we recorded in a period that weren't settled (not_settled), if a
+  period is given
+
+The report is read a row at a time and checked in batches, with a query for
+the batch's transactions and one for its pending orders, rather than a query
+per row. Only the settled transaction IDs are kept between batches (to find
+duplicates and unsettled payments), so a month-long report can be checked in
+one pass.
+"""
+
+import csv
+import logging
+import xml.etree.ElementTree as ET
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from CyberSource import ReportDownloadsApi
+from django.conf import settings
+from mitol.payment_gateway.api import CyberSourcePaymentGateway
+
+from payments.constants import (
+    DISCREPANCY_AMOUNT_MISMATCH,
+    DISCREPANCY_DUPLICATE,
+    DISCREPANCY_NOT_RECORDED,
+    DISCREPANCY_NOT_SETTLED,
+    DISCREPANCY_PENDING_ORDER,
+    SETTLEMENT_TYPE_CREDIT,
+)
+from payments.dataclasses import SettlementDiscrepancy, SettlementRecord
+from payments.exceptions import PaymentGatewayError
+from payments.models import Order, Transaction
+from unified_ecommerce.constants import TRANSACTION_TYPE_PAYMENT
+from unified_ecommerce.utils import chunked_iterator
+
+log = logging.getLogger(__name__)
+
+# The CSV report's columns, and the XML report's attributes and elements, for
+# each SettlementRecord field.
+CSV_COLUMNS = {
+    "transaction_id": "request_id",
+    "reference_number": "merchant_ref_number",
+    "amount": "amount",
+    "currency": "currency",
+    "transaction_type": "transaction_type",
+}
+XML_FIELDS = {
+    "transaction_id": "RequestID",
+    "reference_number": "MerchantReferenceNumber",
+    "amount": "Amount",
+    "currency": "CurrencyCode",
+    "transaction_type": "TransactionType",
+}
+
+
+def _make_record(values: dict) -> SettlementRecord:
+    """Make a SettlementRecord from the report's values for its fields."""
+
+    try:
+        amount = Decimal(values["amount"] or 0)
+    except InvalidOperation as exc:
+        msg = f"Bad amount for transaction {values['transaction_id']}"
+        raise ValueError(msg) from exc
+
+    return SettlementRecord(
+        transaction_id=values["transaction_id"],
+        reference_number=values["reference_number"] or "",
+        amount=amount,
+        currency=values["currency"] or "",
+        transaction_type=values["transaction_type"] or "",
+    )
+
+
+def _read_csv(report) -> Iterator[SettlementRecord]:
+    """Read the records from a CSV report, skipping the lines before the header."""
+
+    reader = csv.reader(report)
+
+    for header in reader:
+        if CSV_COLUMNS["transaction_id"] in header:
+            break
+    else:
+        return
+
+    indexes = {field: header.index(column) for field, column in CSV_COLUMNS.items()}
+
+    for row in reader:
+        if not row:
+            continue
+
+        yield _make_record(
+            {field: row[index].strip() for field, index in indexes.items()}
+        )
+
+
+def _read_xml(report) -> Iterator[SettlementRecord]:
+    """Read the records from an XML report, discarding each one once read."""
+
+    parents = []
+
+    # The reports come from CyberSource (or the operator), not the public.
+    for event, element in ET.iterparse(report, events=("start", "end")):  # noqa: S314
+        if event == "start":
+            parents.append(element)
+            continue
+
+        parents.pop()
+
+        if element.tag.rsplit("}", 1)[-1] != "Request":
+            continue
+
+        children = {
+            child.tag.rsplit("}", 1)[-1]: (child.text or "").strip()
+            for child in element
+        }
+        yield _make_record(
+            {
+                field: element.get(name) or children.get(name, "")
+                for field, name in XML_FIELDS.items()
+            }
+        )
+
+        # Drop the requests that have been read, so memory use stays flat.
+        if parents:
+            parents[-1].remove(element)
+
+
+def read_settlement_report(path: str | Path) -> Iterator[SettlementRecord]:
+    """
+    Read the records from a settlement report file, a row at a time.
+
+    Args:
+    - path (str|Path): the report; XML if it starts with "<", otherwise CSV
+    Returns:
+    - Iterator[SettlementRecord]: the records in the report
+    """
+
+    with Path(path).open("rb") as report:
+        is_xml = report.read(64).lstrip().startswith(b"<")
+
+    if is_xml:
+        with Path(path).open("rb") as report:
+            yield from _read_xml(report)
+    else:
+        with Path(path).open(newline="", encoding="utf-8-sig") as report:
+            yield from _read_csv(report)
+
+
+def download_settlement_report(report_date: date, path: str | Path) -> None:
+    """
+    Download the settlement report for a day from CyberSource to a file.
+
+    The report is streamed to the file rather than loaded into memory.
+
+    Args:
+    - report_date (date): the day the report was run
+    - path (str|Path): the file to write the report to
+    """
+
+    api = ReportDownloadsApi(CyberSourcePaymentGateway.get_client_configuration())
+    api.api_client.download_file_path = str(path)
+
+    status, _ = api.download_report(
+        report_date.isoformat(),
+        settings.MITOL_UE_SETTLEMENT_REPORT_NAME,
+        organization_id=settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_MERCHANT_ID,
+    )
+
+    if not 200 <= status < 300:  # noqa: PLR2004
+        msg = f"Couldn't download the settlement report for {report_date}: {status}"
+        raise PaymentGatewayError(msg)
+
+
+def _batches(records: Iterable, batch_size: int) -> Iterator[list]:
+    """Yield lists of up to batch_size records."""
+
+    records = iter(records)
+
+    while batch := list(islice(records, batch_size)):
+        yield batch
+
+
+def _check_batch(batch: list[SettlementRecord], settled_ids: set) -> Iterator:
+    """Yield the discrepancies in a batch of records."""
+
+    recorded = {
+        row["transaction_id"]: row
+        for row in Transaction.objects.filter(
+            transaction_id__in={record.transaction_id for record in batch}
+        ).values("transaction_id", "amount")
+    }
+    pending_references = set(
+        Order.objects.filter(
+            reference_number__in={
+                record.reference_number
+                for record in batch
+                if record.transaction_type != SETTLEMENT_TYPE_CREDIT
+                and record.reference_number
+            },
+            state=Order.STATE.PENDING,
+        ).values_list("reference_number", flat=True)
+    )
+
+    for record in batch:
+        if record.transaction_id in settled_ids:
+            yield SettlementDiscrepancy(
+                DISCREPANCY_DUPLICATE,
+                record.transaction_id,
+                record.reference_number,
+                settled_amount=record.amount,
+            )
+            continue
+
+        settled_ids.add(record.transaction_id)
+        transaction = recorded.get(record.transaction_id)
+
+        if (
+            record.transaction_type != SETTLEMENT_TYPE_CREDIT
+            and record.reference_number in pending_references
+        ):
+            yield SettlementDiscrepancy(
+                DISCREPANCY_PENDING_ORDER,
+                record.transaction_id,
+                record.reference_number,
+                settled_amount=record.amount,
+            )
+
+        if transaction is None:
+            yield SettlementDiscrepancy(
+                DISCREPANCY_NOT_RECORDED,
+                record.transaction_id,
+                record.reference_number,
+                settled_amount=record.amount,
+            )
+        elif abs(record.amount) != abs(transaction["amount"]):
+            yield SettlementDiscrepancy(
+                DISCREPANCY_AMOUNT_MISMATCH,
+                record.transaction_id,
+                record.reference_number,
+                settled_amount=record.amount,
+                recorded_amount=transaction["amount"],
+            )
+
+
+def reconcile_settlements(
+    records: Iterable[SettlementRecord],
+    *,
+    batch_size: int | None = None,
+    recorded_between: tuple[datetime, datetime] | None = None,
+) -> Iterator[SettlementDiscrepancy]:
+    """
+    Check settlement records against our transactions.
+
+    Args:
+    - records (Iterable[SettlementRecord]): the settled transactions
+    - batch_size (int|None): the records to check at a time; defaults to
+        MITOL_UE_RECONCILIATION_BATCH_SIZE
+    - recorded_between (tuple|None): if set, also report the payments recorded
+        in this period (start included, end not) that weren't settled
+    Returns:
+    - Iterator[SettlementDiscrepancy]: the discrepancies, as they're found
+    """
+
+    batch_size = batch_size or settings.MITOL_UE_RECONCILIATION_BATCH_SIZE
+    settled_ids = set()
+
+    for batch in _batches(records, batch_size):
+        yield from _check_batch(batch, settled_ids)
+
+    log.debug("Checked %s settled transactions", len(settled_ids))
+
+    if not recorded_between:
+        return
+
+    payments = Transaction.objects.filter(
+        transaction_type=TRANSACTION_TYPE_PAYMENT,
+        created_on__gte=recorded_between[0],
+        created_on__lt=recorded_between[1],
+        amount__gt=0,
+    ).values("id", "transaction_id", "amount", "order__reference_number")
+
+    for chunk in chunked_iterator(payments, chunk_size=batch_size):
+        for payment in chunk:
+            if payment["transaction_id"] not in settled_ids:
+                yield SettlementDiscrepancy(
+                    DISCREPANCY_NOT_SETTLED,
+                    payment["transaction_id"],
+                    payment["order__reference_number"],
+                    recorded_amount=payment["amount"],
+                )
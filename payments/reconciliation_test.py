@@ -0,0 +1,210 @@
+"""Tests for settlement reconciliation."""
+
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from mitol.common.utils.datetime import now_in_utc
+
+from payments.constants import (
+    DISCREPANCY_AMOUNT_MISMATCH,
+    DISCREPANCY_DUPLICATE,
+    DISCREPANCY_NOT_RECORDED,
+    DISCREPANCY_NOT_SETTLED,
+    DISCREPANCY_PENDING_ORDER,
+    SETTLEMENT_TYPE_CREDIT,
+)
+from payments.dataclasses import SettlementDiscrepancy, SettlementRecord
+from payments.exceptions import PaymentGatewayError
+from payments.factories import OrderFactory, TransactionFactory
+from payments.models import Order
+from payments.reconciliation import (
+    download_settlement_report,
+    read_settlement_report,
+    reconcile_settlements,
+)
+from unified_ecommerce.constants import TRANSACTION_TYPE_PAYMENT
+
+pytestmark = pytest.mark.django_db
+
+CSV_REPORT = """Payment Batch Detail Report,1.0,2026-01-02,acme,
+request_id,batch_id,merchant_ref_number,transaction_type,amount,currency
+1001,9,mitxonline-1,ics_bill,10.00,USD
+
+1002,9,mitxonline-2,ics_credit,-5.50,USD
+"""
+
+XML_REPORT = """<?xml version="1.0" encoding="utf-8"?>
+<Report xmlns="https://ebc.cybersource.com/ebc/reports/dtd/pbdr.dtd">
+  <Batches>
+    <Batch BatchID="9">
+      <Requests>
+        <Request RequestID="1001" MerchantReferenceNumber="mitxonline-1">
+          <TransactionType>ics_bill</TransactionType>
+          <Amount>10.00</Amount>
+          <CurrencyCode>USD</CurrencyCode>
+        </Request>
+        <Request RequestID="1002" MerchantReferenceNumber="mitxonline-2">
+          <TransactionType>ics_credit</TransactionType>
+          <Amount>-5.50</Amount>
+          <CurrencyCode>USD</CurrencyCode>
+        </Request>
+      </Requests>
+    </Batch>
+  </Batches>
+</Report>
+"""
+
+EXPECTED_RECORDS = [
+    SettlementRecord("1001", "mitxonline-1", Decimal("10.00"), "USD", "ics_bill"),
+    SettlementRecord(
+        "1002", "mitxonline-2", Decimal("-5.50"), "USD", SETTLEMENT_TYPE_CREDIT
+    ),
+]
+
+
+@pytest.mark.parametrize("report", [CSV_REPORT, XML_REPORT])
+def test_read_settlement_report(tmp_path, report):
+    """The records should be read from CSV and XML reports."""
+
+    report_path = tmp_path / "report"
+    report_path.write_text(report, encoding="utf-8")
+
+    assert list(read_settlement_report(report_path)) == EXPECTED_RECORDS
+
+
+def test_read_settlement_report_bad_amount(tmp_path):
+    """A row with an amount that isn't a number should raise a ValueError."""
+
+    report_path = tmp_path / "report.csv"
+    report_path.write_text(
+        "request_id,merchant_ref_number,transaction_type,amount,currency\n"
+        "1001,mitxonline-1,ics_bill,ten,USD\n",
+        encoding="utf-8",
+    )
+
+    with pytest.raises(ValueError, match="1001"):
+        list(read_settlement_report(report_path))
+
+
+def _record(transaction_id, amount, reference_number="", transaction_type="ics_bill"):
+    """Make a settlement record."""
+
+    return SettlementRecord(
+        transaction_id, reference_number, Decimal(amount), "USD", transaction_type
+    )
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 100])
+def test_reconcile_settlements(batch_size):
+    """Each kind of discrepancy should be found, in any batch size."""
+
+    paid_order = OrderFactory.create(
+        state=Order.STATE.FULFILLED, reference_number="paid"
+    )
+    pending_order = OrderFactory.create(
+        state=Order.STATE.PENDING, reference_number="pending"
+    )
+    TransactionFactory.create(
+        order=paid_order, transaction_id="matched", amount=Decimal(10)
+    )
+    TransactionFactory.create(
+        order=paid_order, transaction_id="refund", amount=Decimal(-5)
+    )
+    TransactionFactory.create(
+        order=paid_order, transaction_id="mismatched", amount=Decimal(10)
+    )
+    TransactionFactory.create(
+        order=pending_order, transaction_id="pending", amount=Decimal(10)
+    )
+
+    records = [
+        _record("matched", 10, "paid"),
+        _record("refund", "-5", "pending", SETTLEMENT_TYPE_CREDIT),
+        _record("mismatched", "9.99", "paid"),
+        _record("pending", 10, "pending"),
+        _record("unknown", 20, "paid"),
+        _record("matched", 10, "paid"),
+    ]
+
+    assert list(reconcile_settlements(records, batch_size=batch_size)) == [
+        SettlementDiscrepancy(
+            DISCREPANCY_AMOUNT_MISMATCH,
+            "mismatched",
+            "paid",
+            settled_amount=Decimal("9.99"),
+            recorded_amount=Decimal(10),
+        ),
+        SettlementDiscrepancy(
+            DISCREPANCY_PENDING_ORDER,
+            "pending",
+            "pending",
+            settled_amount=Decimal(10),
+        ),
+        SettlementDiscrepancy(
+            DISCREPANCY_NOT_RECORDED,
+            "unknown",
+            "paid",
+            settled_amount=Decimal(20),
+        ),
+        SettlementDiscrepancy(
+            DISCREPANCY_DUPLICATE,
+            "matched",
+            "paid",
+            settled_amount=Decimal(10),
+        ),
+    ]
+
+
+def test_reconcile_settlements_not_settled():
+    """With a period, the payments recorded in it that weren't settled are found."""
+
+    order = OrderFactory.create(state=Order.STATE.FULFILLED, reference_number="paid")
+    for transaction_id, amount in [("settled", 10), ("unsettled", 10), ("free", 0)]:
+        TransactionFactory.create(
+            order=order,
+            transaction_id=transaction_id,
+            transaction_type=TRANSACTION_TYPE_PAYMENT,
+            amount=Decimal(amount),
+        )
+    period = (now_in_utc() - timedelta(days=1), now_in_utc() + timedelta(days=1))
+
+    assert list(
+        reconcile_settlements(
+            [_record("settled", 10, "paid")], recorded_between=period, batch_size=1
+        )
+    ) == [
+        SettlementDiscrepancy(
+            DISCREPANCY_NOT_SETTLED,
+            "unsettled",
+            "paid",
+            recorded_amount=Decimal(10),
+        )
+    ]
+    assert list(reconcile_settlements([_record("settled", 10, "paid")])) == []
+
+
+@pytest.mark.parametrize("status", [200, 404])
+def test_download_settlement_report(mocker, settings, tmp_path, status):
+    """The report should be downloaded to the path, or an error raised."""
+
+    settings.MITOL_UE_SETTLEMENT_REPORT_NAME = "Payment Batch Detail"
+    settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_MERCHANT_ID = "acme"
+    mocker.patch(
+        "payments.reconciliation.CyberSourcePaymentGateway.get_client_configuration",
+        return_value={},
+    )
+    api = mocker.patch("payments.reconciliation.ReportDownloadsApi").return_value
+    api.download_report.return_value = (status, {})
+    report_date = now_in_utc().date()
+
+    if status == 200:
+        download_settlement_report(report_date, tmp_path / "report")
+    else:
+        with pytest.raises(PaymentGatewayError):
+            download_settlement_report(report_date, tmp_path / "report")
+
+    assert api.api_client.download_file_path == str(tmp_path / "report")
+    api.download_report.assert_called_once_with(
+        report_date.isoformat(), "Payment Batch Detail", organization_id="acme"
+    )
@@ -0,0 +1,175 @@
+"""
+Sales and tax reports.
+
+The report has a row for each line of the orders that were paid for in the
+period (including those since refunded), with the order's tax details, the
+discount codes redeemed on it and the amount refunded for the line.
+
+The rows are streamed: they're read in chunks (see chunked_iterator) and
+rendered as they're read, so the report takes the same memory for any period.
+"""
+
+import csv
+import json
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import DecimalField, OuterRef, Subquery, Sum
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce
+
+from payments.models import PRICE_FIELD, Line, Order, RedeemedDiscount
+from refunds.models import RequestLine
+from unified_ecommerce.constants import REFUND_STATUS_APPROVED_COMPLETE
+from unified_ecommerce.utils import chunked_iterator
+
+REPORT_FORMAT_CSV = "csv"
+REPORT_FORMAT_JSONL = "jsonl"
+REPORT_FORMATS = {
+    REPORT_FORMAT_CSV: "text/csv",
+    REPORT_FORMAT_JSONL: "application/jsonl",
+}
+
+REPORTED_ORDER_STATES = [
+    Order.STATE.FULFILLED,
+    Order.STATE.PARTIALLY_REFUNDED,
+    Order.STATE.REFUNDED,
+]
+
+# Report column: the values() field it comes from.
+SALES_REPORT_COLUMNS = {
+    "order_id": "order_id",
+    "reference_number": "order__reference_number",
+    "order_created_on": "order__created_on",
+    "order_state": "order__state",
+    "integrated_system": "order__integrated_system__slug",
+    "purchaser_email": "order__purchaser__email",
+    "tax_country": "order__purchaser_taxable_country_code",
+    "tax_rate": "order__tax_rate__tax_rate",
+    "line_id": "id",
+    "sku": "product_sku",
+    "product_name": "product_name",
+    "quantity": "quantity",
+    "base_price": "annotated_base_price",
+    "discounted_price": "discounted_price",
+    "tax": "annotated_tax",
+    "total_price": "annotated_total_price",
+    "discount_codes": None,
+    "refunded_amount": "refunded_amount",
+}
+
+
+def _get_report_lines(start: datetime, end: datetime):
+    """Return the values() queryset of the lines in the report."""
+
+    refunded = (
+        RequestLine.objects.filter(
+            line=OuterRef("pk"), status=REFUND_STATUS_APPROVED_COMPLETE
+        )
+        .values("line")
+        .annotate(total=Sum("refunded_amount"))
+        .values("total")
+    )
+
+    return (
+        Line.objects.filter(
+            order__created_on__gte=start,
+            order__created_on__lt=end,
+            order__state__in=REPORTED_ORDER_STATES,
+        )
+        .with_prices()
+        .annotate(
+            product_sku=KT("_product_version_data__0__fields__sku"),
+            product_name=KT("_product_version_data__0__fields__name"),
+            refunded_amount=Coalesce(
+                Subquery(refunded, output_field=DecimalField()),
+                0,
+                output_field=PRICE_FIELD,
+            ),
+        )
+        .values(*[field for field in SALES_REPORT_COLUMNS.values() if field])
+    )
+
+
+def _generate_rows(lines, chunk_size: int) -> Iterator[dict]:
+    """Yield the report rows for the lines, a chunk at a time."""
+
+    for chunk in chunked_iterator(lines, chunk_size=chunk_size):
+        discount_codes = defaultdict(list)
+        for order_id, code in (
+            RedeemedDiscount.objects.using(lines.db)
+            .filter(order_id__in={line["order_id"] for line in chunk})
+            .order_by("id")
+            .values_list("order_id", "discount__discount_code")
+        ):
+            discount_codes[order_id].append(code)
+
+        for line in chunk:
+            yield {
+                column: (
+                    line[field]
+                    if field
+                    else ";".join(discount_codes.get(line["order_id"], []))
+                )
+                for column, field in SALES_REPORT_COLUMNS.items()
+            }
+
+
+def get_sales_report_rows(
+    start: datetime, end: datetime, *, chunk_size: int | None = None
+) -> Iterator[dict]:
+    """
+    Return an iterator of the sales report rows for orders placed in a period.
+
+    The database is picked when this is called (not when the rows are read),
+    so call it inside use_replica() to read the report from the replica.
+
+    Args:
+    - start (datetime): the start of the period
+    - end (datetime): the end of the period (not included)
+    - chunk_size (int|None): the rows to read at a time; defaults to
+        MITOL_UE_REPORT_CHUNK_SIZE
+    Returns:
+    - Iterator[dict]: the rows, keyed by column (see SALES_REPORT_COLUMNS)
+    """
+
+    lines = _get_report_lines(start, end)
+
+    return _generate_rows(
+        lines.using(lines.db), chunk_size or settings.MITOL_UE_REPORT_CHUNK_SIZE
+    )
+
+
+class _Echo:
+    """A file-like object that returns what's written to it, for csv.writer."""
+
+    def write(self, value):
+        """Return the value."""
+
+        return value
+
+
+def render_sales_report(rows: Iterable[dict], report_format: str) -> Iterator[str]:
+    """
+    Render report rows as CSV (with a header) or JSON lines, a row at a time.
+
+    Args:
+    - rows (Iterable[dict]): the report rows
+    - report_format (str): one of REPORT_FORMATS
+    Returns:
+    - Iterator[str]: the rendered rows
+    """
+
+    if report_format == REPORT_FORMAT_JSONL:
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(SALES_REPORT_COLUMNS.keys())
+
+    for row in rows:
+        yield writer.writerow(row.values())
@@ -0,0 +1,132 @@
+"""Tests for the sales report."""
+
+import csv
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from mitol.common.utils.datetime import now_in_utc
+
+from payments.factories import (
+    DiscountFactory,
+    LineFactory,
+    OrderFactory,
+    RedeemedDiscountFactory,
+    TaxRateFactory,
+)
+from payments.models import Order
+from payments.reports import (
+    REPORT_FORMAT_CSV,
+    REPORT_FORMAT_JSONL,
+    SALES_REPORT_COLUMNS,
+    get_sales_report_rows,
+    render_sales_report,
+)
+from refunds.factories import RequestFactory, RequestLineFactory
+from system_meta.factories import ProductVersionFactory
+from unified_ecommerce.constants import REFUND_STATUS_APPROVED_COMPLETE
+
+pytestmark = pytest.mark.django_db
+
+
+def _create_order(state=Order.STATE.FULFILLED, lines=2, **kwargs):
+    """Create an order with some lines."""
+
+    order = OrderFactory.create(state=state, **kwargs)
+
+    for _ in range(lines):
+        product_version = ProductVersionFactory.create()
+        LineFactory.create(
+            order=order,
+            product_version=product_version,
+            quantity=2,
+            discounted_price=product_version.field_dict["price"],
+        )
+
+    return order
+
+
+@pytest.fixture()
+def period():
+    """Return the start and end of a period that includes now."""
+
+    return now_in_utc() - timedelta(days=1), now_in_utc() + timedelta(days=1)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 100])
+def test_sales_report_rows(period, chunk_size):
+    """The report should have a row for each line of the paid orders."""
+
+    order = _create_order(
+        tax_rate=TaxRateFactory.create(), purchaser_taxable_country_code="GB"
+    )
+    refunded_order = _create_order(Order.STATE.REFUNDED, lines=1)
+    _create_order(Order.STATE.PENDING)
+    _create_order(Order.STATE.CANCELED)
+    old_order = _create_order()
+    Order.objects.filter(pk=old_order.pk).update(
+        created_on=now_in_utc() - timedelta(days=30)
+    )
+
+    discount = DiscountFactory.create()
+    RedeemedDiscountFactory.create(order=order, discount=discount, user=order.purchaser)
+    refund_line = refunded_order.lines.get()
+    RequestLineFactory.create(
+        refund_request=RequestFactory.create(order=refunded_order),
+        line=refund_line,
+        refunded_amount=Decimal(5),
+        status=REFUND_STATUS_APPROVED_COMPLETE,
+    )
+
+    rows = list(get_sales_report_rows(*period, chunk_size=chunk_size))
+
+    assert [(row["order_id"], row["line_id"]) for row in rows] == sorted(
+        (line.order_id, line.id)
+        for line in [*order.lines.all(), *refunded_order.lines.all()]
+    )
+
+    for row in rows:
+        assert list(row) == list(SALES_REPORT_COLUMNS)
+
+        if row["order_id"] == order.id:
+            line = order.lines.get(pk=row["line_id"])
+            assert row["tax_country"] == "GB"
+            assert row["tax_rate"] == order.tax_rate.tax_rate
+            assert row["discount_codes"] == discount.discount_code
+            assert row["refunded_amount"] == 0
+        else:
+            line = refund_line
+            assert row["tax_rate"] is None
+            assert row["discount_codes"] == ""
+            assert row["refunded_amount"] == Decimal(5)
+
+        assert row["sku"] == line.product_version.field_dict["sku"]
+        assert row["quantity"] == line.quantity
+        assert row["base_price"] == pytest.approx(line.base_price)
+        assert row["tax"] == pytest.approx(line.tax)
+        assert row["total_price"] == pytest.approx(line.total_price)
+        assert row["purchaser_email"] == line.order.purchaser.email
+
+
+def test_render_sales_report(period):
+    """The report should render as CSV with a header, or JSON lines."""
+
+    order = _create_order(lines=1)
+    rows = list(get_sales_report_rows(*period))
+
+    csv_rows = list(
+        csv.DictReader(StringIO("".join(render_sales_report(rows, REPORT_FORMAT_CSV))))
+    )
+    assert len(csv_rows) == 1
+    assert list(csv_rows[0]) == list(SALES_REPORT_COLUMNS)
+    assert csv_rows[0]["reference_number"] == order.reference_number
+
+    jsonl_rows = [
+        json.loads(line)
+        for line in render_sales_report(iter(rows), REPORT_FORMAT_JSONL)
+    ]
+    assert len(jsonl_rows) == 1
+    assert jsonl_rows[0]["order_id"] == order.id
+    assert Decimal(jsonl_rows[0]["base_price"]) == rows[0]["base_price"]
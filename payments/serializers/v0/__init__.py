@@ -1,6 +1,6 @@
 """Serializers for payments."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal
 from enum import Enum
 
@@ -67,13 +67,20 @@ class WebhookBasket:
     their cart - MITx Online specifically enrolls as soon as you add to cart,
     regardless of whether or not you pay, and then upgrades when you do, for
     instance.)
+
+    When the webhooks are coalesced, products has every product added in the
+    window, in order, and product is the first of them.
     """
 
     product: Product
     action: WebhookBasketAction
+    products: list[Product] = field(default_factory=list)
 
     def __str__(self):
         """Return a resonable string representation of the object."""
+        if len(self.products) > 1:
+            return f"cart {self.action.value} event for {len(self.products)} products"
+
         return f"cart {self.action.value} event for {self.product}"
 
 
@@ -302,7 +309,8 @@ class TransactionSerializer(serializers.Serializer):
     created_on = serializers.DateTimeField()
     updated_on = serializers.DateTimeField()
     reason = serializers.CharField()
-    data = serializers.JSONField()
+    # The payload is unarchived for old transactions.
+    data = serializers.JSONField(source="get_data")
     order = TransactionOrderSerializer()
 
     class Meta:
@@ -330,6 +338,11 @@ class TransactionDataPurchaserSerializer(serializers.Serializer):
     country = serializers.CharField()
     email = serializers.EmailField()
     street_address = serializers.ListField(child=serializers.CharField())
+    street_address_1 = serializers.CharField()
+    street_address_2 = serializers.CharField()
+    street_address_3 = serializers.CharField()
+    street_address_4 = serializers.CharField()
+    street_address_5 = serializers.CharField()
     city = serializers.CharField()
     state_or_territory = serializers.CharField()
     postal_code = serializers.CharField()
@@ -343,46 +356,32 @@ class TransactionDataPurchaserSerializer(serializers.Serializer):
         https://github.com/mitodl/mitxonline/issues/532
 
         UE doesn't store (very much) user data so this gets all of it from the
-        CyberSource payload in question.
+        CyberSource payload in question, which is copied to the transaction's
+        bill_to fields when it's saved.
         """
-        transaction = instance.data
-
-        fields = {
-            "first_name": transaction.get("req_bill_to_forename", None),
-            "last_name": transaction.get("req_bill_to_surname", None),
-            "country": transaction.get("req_bill_to_address_country", None),
-            "email": transaction.get("req_bill_to_email", None),
-            "street_address": [],
-            "street_address_1": transaction.get("req_bill_to_address_line1", None),
-            "street_address_2": transaction.get("req_bill_to_address_line2", None),
-            "street_address_3": transaction.get("req_bill_to_address_line3", None),
-            "street_address_4": transaction.get("req_bill_to_address_line4", None),
-            "street_address_5": transaction.get("req_bill_to_address_line5", None),
-            "city": transaction.get("req_bill_to_address_city", None),
-            "state_or_territory": transaction.get("req_bill_to_address_state", None),
-            "postal_code": transaction.get("req_bill_to_address_postal_code", None),
+
+        # The lines keep their positions, but trailing blank ones are dropped.
+        lines = [*instance.bill_to_street_address, "", "", "", "", ""]
+
+        return {
+            "first_name": instance.bill_to_first_name or None,
+            "last_name": instance.bill_to_last_name or None,
+            "country": instance.bill_to_country or None,
+            "email": instance.bill_to_email or None,
+            "street_address": [
+                line for line in instance.bill_to_street_address if line
+            ],
+            "street_address_1": lines[0] or None,
+            "street_address_2": lines[1] or None,
+            "street_address_3": lines[2] or None,
+            "street_address_4": lines[3] or None,
+            "street_address_5": lines[4] or None,
+            "city": instance.bill_to_city or None,
+            "state_or_territory": instance.bill_to_state or None,
+            "postal_code": instance.bill_to_postal_code or None,
             "company": None,
         }
 
-        fields["street_address"] = self.get_street_address(fields)
-
-        return fields
-
-    def get_street_address(self, instance):
-        """Return the street address as a list."""
-
-        return [
-            line
-            for line in [
-                instance["street_address_1"],
-                instance["street_address_2"],
-                instance["street_address_3"],
-                instance["street_address_4"],
-                instance["street_address_5"],
-            ]
-            if line
-        ]
-
     class Meta:
         """Meta opts for the serializer."""
 
@@ -392,6 +391,11 @@ class TransactionDataPurchaserSerializer(serializers.Serializer):
             "country",
             "email",
             "street_address",
+            "street_address_1",
+            "street_address_2",
+            "street_address_3",
+            "street_address_4",
+            "street_address_5",
             "city",
             "state_or_territory",
             "postal_code",
@@ -435,6 +439,7 @@ class OrderSerializer(serializers.ModelSerializer):
         # Other types probably won't have address info.
         transaction = (
             instance.transactions.filter(transaction_type=TRANSACTION_TYPE_PAYMENT)
+            .only(*Transaction.ADDRESS_FIELDS)
             .order_by("-created_on")
             .first()
         )
@@ -492,11 +497,18 @@ class WebhookBasketDataSerializer(DataclassSerializer):
 
     product = ProductSerializer()
     action = serializers.SerializerMethodField()
+    products = serializers.SerializerMethodField()
 
     def get_action(self, instance):
         """Return the action as a string."""
         return instance.action.value
 
+    def get_products(self, instance):
+        """Return the products, or just the product if this wasn't coalesced."""
+        return ProductSerializer(
+            instance.products or [instance.product], many=True
+        ).data
+
     class Meta:
         """Meta options for WebhookBasketDataSerializer"""
 
@@ -551,7 +563,14 @@ class OrderHistorySerializer(serializers.ModelSerializer):
 
     @extend_schema_field(TransactionSerializer)
     def get_transactions(self, instance) -> list[TransactionSerializer]:
-        """Return a list of transactions for the order."""
+        """
+        Return a list of transactions for the order.
+
+        These include the full payment processor payload, which is part of the
+        API, rather than just the columns copied from it. There are only a
+        couple of transactions per order, and OrderHistoryViewSet prefetches
+        them with their archives.
+        """
         return (
             TransactionSerializer(instance.transactions, many=True).data
             if instance.transactions
@@ -0,0 +1,95 @@
+"""Signal handlers for the payments app."""
+
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from mitol.common.utils.datetime import now_in_utc
+
+from payments.caching import invalidate_basket
+from payments.models import Basket, BasketItem, Discount, TaxRate
+
+
+def _bump_basket_versions(**filters):
+    """Bump the version (and updated_on) of the matching baskets."""
+
+    Basket.objects.filter(**filters).update(
+        version=F("version") + 1, updated_on=now_in_utc()
+    )
+
+
+@receiver(post_save, sender=Basket)
+def bump_basket_version(sender, instance, **kwargs):  # noqa: ARG001
+    """
+    Bump the version when the basket is saved.
+
+    This covers the discount and tax paths, which save the basket after changing
+    it.
+    """
+
+    if not kwargs.get("raw"):
+        instance.bump_version()
+
+
+@receiver(post_delete, sender=Basket)
+def invalidate_deleted_basket(sender, instance, **kwargs):  # noqa: ARG001
+    """Drop the cached copy of a deleted (cleared or fulfilled) basket."""
+
+    invalidate_basket(instance)
+
+
+@receiver(post_save, sender=BasketItem)
+@receiver(post_delete, sender=BasketItem)
+def bump_basket_version_for_item(sender, instance, **kwargs):  # noqa: ARG001
+    """Bump the basket's version when an item is added, changed or removed."""
+
+    origin = kwargs.get("origin")
+    if isinstance(origin, Basket) or getattr(origin, "model", None) is Basket:
+        # The item is going with its basket.
+        return
+
+    if not kwargs.get("raw"):
+        _bump_basket_versions(pk=instance.basket_id)
+
+
+@receiver(m2m_changed, sender=Basket.discounts.through)
+def bump_basket_version_for_discounts(
+    sender,  # noqa: ARG001
+    instance,
+    action,
+    reverse,
+    pk_set,
+    **kwargs,  # noqa: ARG001
+):
+    """Bump the basket's version when discounts are added or removed."""
+
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            _bump_basket_versions(pk=instance.pk)
+    elif action in ("post_add", "post_remove"):
+        _bump_basket_versions(pk__in=pk_set)
+    elif action == "pre_clear":
+        # The discount is being removed from all its baskets, and pk_set isn't
+        # provided for clears, so find them while they're still linked.
+        _bump_basket_versions(discounts=instance)
+
+
+@receiver(post_save, sender=Discount)
+@receiver(pre_delete, sender=Discount)
+def bump_basket_versions_for_discount(sender, instance, **kwargs):  # noqa: ARG001
+    """Bump the versions of the baskets that have the discount applied."""
+
+    if not kwargs.get("raw"):
+        _bump_basket_versions(discounts=instance)
+
+
+@receiver(post_save, sender=TaxRate)
+def bump_basket_versions_for_tax_rate(sender, instance, **kwargs):  # noqa: ARG001
+    """Bump the versions of the baskets that the tax rate is assessed on."""
+
+    if not kwargs.get("raw"):
+        _bump_basket_versions(tax_rate=instance)
@@ -0,0 +1,407 @@
+"""
+Local CyberSource simulator, for offline end-to-end and load testing.
+
+There are two halves to this:
+- Secure Acceptance callbacks. build_callback_payload generates the payload
+  CyberSource would send back for an order, signed with the configured
+  security key, and CallbackSimulator posts batches of them to the checkout
+  result (CheckoutCallbackView) and backoffice (BackofficeCallbackView)
+  callbacks, with optional delays, duplicates and reordering.
+- Refunds. SimulatedRefundApi stands in for the CyberSource REST refund API,
+  with injectable latency and failure rate. With MITOL_UE_CYBERSOURCE_SIMULATOR
+  set, it's installed when the app starts.
+
+None of this talks to CyberSource, so callback storms and refund batches can
+be reproduced locally.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urljoin
+
+import requests
+from CyberSource.rest import ApiException
+from django.conf import settings
+from django.urls import reverse
+from mitol.common.utils.datetime import now_in_utc
+from mitol.payment_gateway import api as gateway_api
+from mitol.payment_gateway.api import PaymentGateway, ProcessorResponse
+
+from payments.models import Order
+from system_meta.models import IntegratedSystem
+from unified_ecommerce.constants import (
+    CYBERSOURCE_REASON_CODE_DECLINE_DECLINED,
+    CYBERSOURCE_REASON_CODE_SUCCESS,
+    CYBERSOURCE_REASON_CODE_SYSTEM_FAILURE,
+)
+
+log = logging.getLogger(__name__)
+
+CALLBACK_TARGET_REDIRECT = "redirect"
+CALLBACK_TARGET_BACKOFFICE = "backoffice"
+CALLBACK_TARGETS = {
+    CALLBACK_TARGET_REDIRECT: "v0:checkout-result-callback",
+    CALLBACK_TARGET_BACKOFFICE: "v0:checkout-callback",
+}
+
+DECISION_REASON_CODES = {
+    ProcessorResponse.STATE_ACCEPTED: CYBERSOURCE_REASON_CODE_SUCCESS,
+    ProcessorResponse.STATE_DECLINED: CYBERSOURCE_REASON_CODE_DECLINE_DECLINED,
+    ProcessorResponse.STATE_CANCELLED: "",
+    ProcessorResponse.STATE_ERROR: CYBERSOURCE_REASON_CODE_SYSTEM_FAILURE,
+}
+
+SIMULATED_REFUND_FAILURE_REASON = "SIMULATED_FAILURE"
+
+_original_refund_api = None
+
+
+def sign_payload(payload: dict) -> dict:
+    """Sign the payload with the configured CyberSource security key."""
+
+    gateway = PaymentGateway.get_gateway_class(
+        settings.ECOMMERCE_DEFAULT_PAYMENT_GATEWAY
+    )
+
+    return gateway._sign_cybersource_payload(payload)  # noqa: SLF001
+
+
+def _decision_fields(decision: str, amount, transaction_id: str | None) -> dict:
+    """Return the fields CyberSource adds to the callback for the decision."""
+
+    fields = {
+        "decision": decision,
+        "reason_code": str(DECISION_REASON_CODES.get(decision, "")),
+        "message": f"Simulated {decision.lower()} response",
+        "transaction_id": transaction_id or str(random.randrange(10**21, 10**22)),  # noqa: S311
+        "signed_date_time": now_in_utc().strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+    if decision == ProcessorResponse.STATE_ACCEPTED:
+        fields["auth_amount"] = str(amount)
+
+    return fields
+
+
+def build_callback_payload(
+    order: Order,
+    decision: str = ProcessorResponse.STATE_ACCEPTED,
+    *,
+    transaction_id: str | None = None,
+) -> dict:
+    """
+    Build the signed callback payload CyberSource would send for the order.
+
+    Like the real thing, this echoes the checkout request back with "req_"
+    prefixes and adds the decision and transaction fields.
+
+    Args:
+    - order (Order): the (pending) order
+    - decision (str): the decision; one of the ProcessorResponse states
+    - transaction_id (str): the transaction ID; random if not specified
+    Returns:
+    - dict, the signed payload
+    """
+
+    lines = list(order.lines.all())
+    systems = {
+        system.id: system
+        for system in IntegratedSystem.all_objects.filter(
+            pk__in={line.product_version.field_dict["system_id"] for line in lines}
+        )
+    }
+    amount = order.total_price_paid
+
+    payload = {
+        "req_reference_number": order.reference_number,
+        "req_transaction_uuid": uuid.uuid4().hex,
+        "req_transaction_type": "sale",
+        "req_access_key": settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_ACCESS_KEY,
+        "req_profile_id": str(settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_PROFILE_ID),
+        "req_consumer_id": hashlib.sha256(
+            order.purchaser.username.encode("utf-8")
+        ).hexdigest(),
+        "req_customer_ip_address": "127.0.0.1",
+        "req_amount": str(amount),
+        "req_currency": "USD",
+        "req_locale": "en-us",
+        "req_line_item_count": str(len(lines)),
+        **_decision_fields(decision, amount, transaction_id),
+    }
+
+    for idx, line in enumerate(lines):
+        field_dict = line.product_version.field_dict
+        sku = f"{systems[field_dict['system_id']].slug}!{field_dict['sku']}"
+        payload.update(
+            {
+                f"req_item_{idx}_code": sku,
+                f"req_item_{idx}_name": str(field_dict["description"])[:254],
+                f"req_item_{idx}_quantity": str(line.quantity),
+                f"req_item_{idx}_sku": sku,
+                f"req_item_{idx}_tax_amount": str(line.tax_money),
+                f"req_item_{idx}_unit_price": str(line.unit_price_money),
+            }
+        )
+
+    return sign_payload(payload)
+
+
+def build_callback_payload_from_checkout(
+    checkout_payload: dict,
+    decision: str = ProcessorResponse.STATE_ACCEPTED,
+    *,
+    transaction_id: str | None = None,
+) -> dict:
+    """
+    Build the signed callback payload for a checkout form payload.
+
+    This is for when the checkout payload is at hand (i.e. from the checkout
+    API) but the order isn't, such as when load testing a remote instance.
+
+    Args:
+    - checkout_payload (dict): the payload returned by the checkout API
+    - decision (str): the decision; one of the ProcessorResponse states
+    - transaction_id (str): the transaction ID; random if not specified
+    Returns:
+    - dict, the signed payload
+    """
+
+    payload = {
+        f"req_{key}": "" if value is None else str(value)
+        for key, value in checkout_payload.items()
+        if key not in ("signature", "signed_field_names", "unsigned_field_names")
+    }
+    payload.update(
+        _decision_fields(decision, checkout_payload["amount"], transaction_id)
+    )
+
+    return sign_payload(payload)
+
+
+@dataclass
+class CallbackDelivery:
+    """The result of posting a simulated callback."""
+
+    target: str
+    reference_number: str
+    duplicate: bool
+    status_code: int | None
+    elapsed: float
+    error: str = ""
+
+
+class CallbackSimulator:
+    """Posts batches of simulated callbacks to a running instance."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        base_url: str,
+        *,
+        targets=(CALLBACK_TARGET_REDIRECT, CALLBACK_TARGET_BACKOFFICE),
+        delay: float = 0,
+        jitter: float = 0,
+        duplicate_rate: float = 0,
+        reorder: bool = False,
+        concurrency: int = 1,
+        timeout: float = 30,
+        rng: random.Random | None = None,
+    ):
+        """
+        Set up the simulator.
+
+        Args:
+        - base_url (str): the base URL of the instance to send callbacks to
+        - targets (iterable): the callbacks to send for each payload
+        - delay (float): seconds to wait before sending each callback
+        - jitter (float): up to this many extra seconds are added to the delay
+        - duplicate_rate (float): the chance (0-1) of each callback being sent
+          a second time
+        - reorder (bool): shuffle the callbacks, rather than sending them in
+          order
+        - concurrency (int): the number of callbacks to send at once
+        - timeout (float): the request timeout, in seconds
+        - rng (Random): the random number generator, for repeatable runs
+        """
+
+        unknown = set(targets) - set(CALLBACK_TARGETS)
+        if unknown:
+            msg = f"Unknown callback targets: {', '.join(sorted(unknown))}"
+            raise ValueError(msg)
+
+        self.base_url = base_url
+        self.targets = tuple(targets)
+        self.delay = delay
+        self.jitter = jitter
+        self.duplicate_rate = duplicate_rate
+        self.reorder = reorder
+        self.concurrency = max(concurrency, 1)
+        self.timeout = timeout
+        self.rng = rng or random.Random()  # noqa: S311
+        self.session = requests.Session()
+
+    def schedule(self, payloads: list[dict]) -> list[tuple[str, dict, bool]]:
+        """
+        Return the callbacks to send, as (target, payload, is duplicate) tuples.
+        """
+
+        deliveries = []
+
+        for payload in payloads:
+            for target in self.targets:
+                deliveries.append((target, payload, False))
+
+                if self.rng.random() < self.duplicate_rate:
+                    deliveries.append((target, payload, True))
+
+        if self.reorder:
+            self.rng.shuffle(deliveries)
+
+        return deliveries
+
+    def send(self, target: str, payload: dict, *, duplicate: bool = False):
+        """Send a single callback, after the configured delay."""
+
+        wait = self.delay + self.rng.uniform(0, self.jitter)
+        if wait > 0:
+            time.sleep(wait)
+
+        url = urljoin(self.base_url, reverse(CALLBACK_TARGETS[target]))
+        start = time.perf_counter()
+
+        try:
+            response = self.session.post(
+                url, data=payload, allow_redirects=False, timeout=self.timeout
+            )
+        except requests.RequestException as exc:
+            return CallbackDelivery(
+                target=target,
+                reference_number=payload["req_reference_number"],
+                duplicate=duplicate,
+                status_code=None,
+                elapsed=time.perf_counter() - start,
+                error=str(exc),
+            )
+
+        return CallbackDelivery(
+            target=target,
+            reference_number=payload["req_reference_number"],
+            duplicate=duplicate,
+            status_code=response.status_code,
+            elapsed=time.perf_counter() - start,
+        )
+
+    def run(self, payloads: list[dict]) -> list[CallbackDelivery]:
+        """Send the callbacks for the payloads, and return the results."""
+
+        deliveries = self.schedule(payloads)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(
+                executor.map(
+                    lambda delivery: self.send(
+                        delivery[0], delivery[1], duplicate=delivery[2]
+                    ),
+                    deliveries,
+                )
+            )
+
+
+def _get_field(data: dict, name: str):
+    """
+    Get a field from a serialized CyberSource request.
+
+    The client library's models serialize with their attribute names
+    ("_total_amount") while the API itself uses camel case ("totalAmount"), so
+    this accepts either.
+    """
+
+    first, *rest = name.split("_")
+    camel_name = first + "".join(part.title() for part in rest)
+
+    for key in (f"_{name}", name, camel_name):
+        if key in data:
+            return data[key]
+
+    return None
+
+
+class SimulatedRefundApi:
+    """
+    Stand-in for CyberSource.RefundApi.
+
+    Refunds wait for the configured latency, then either fail with the
+    configured probability (raising ApiException, like the real client) or
+    return a pending refund.
+    """
+
+    def __init__(self, configuration=None):
+        """Take the client configuration, for compatibility; it's not used."""
+
+        self.configuration = configuration
+
+    def refund_payment(self, refund_payment_request, id):  # noqa: A002
+        """Simulate refunding the payment with the given transaction ID."""
+
+        request = json.loads(refund_payment_request)
+        time.sleep(settings.MITOL_UE_CYBERSOURCE_SIMULATOR_REFUND_LATENCY_MS / 1000)
+
+        if (
+            random.randrange(100)  # noqa: S311
+            < settings.MITOL_UE_CYBERSOURCE_SIMULATOR_REFUND_FAILURE_PERCENT
+        ):
+            exc = ApiException(status=502, reason="Bad Gateway")
+            exc.body = json.dumps(
+                {
+                    "status": "SERVER_ERROR",
+                    "reason": SIMULATED_REFUND_FAILURE_REASON,
+                    "message": f"Simulated refund failure for transaction {id}",
+                }
+            )
+            raise exc
+
+        amount_details = _get_field(
+            _get_field(request, "order_information"), "amount_details"
+        )
+        body = {
+            "id": str(random.randrange(10**21, 10**22)),  # noqa: S311
+            "status": "PENDING",
+            "clientReferenceInformation": {"transactionId": id},
+            "refundAmountDetails": {
+                "refundAmount": _get_field(amount_details, "total_amount"),
+                "currency": _get_field(amount_details, "currency"),
+            },
+            "processorInformation": {"responseCode": "100"},
+        }
+
+        return None, 201, json.dumps(body)
+
+
+def install_refund_simulator():
+    """Route refunds through SimulatedRefundApi rather than CyberSource."""
+
+    global _original_refund_api  # noqa: PLW0603
+
+    if _original_refund_api is not None:
+        return
+
+    log.warning("CyberSource simulator enabled: refunds will not be processed")
+    _original_refund_api = gateway_api.RefundApi
+    gateway_api.RefundApi = SimulatedRefundApi
+
+
+def uninstall_refund_simulator():
+    """Send refunds to CyberSource again."""
+
+    global _original_refund_api  # noqa: PLW0603
+
+    if _original_refund_api is None:
+        return
+
+    gateway_api.RefundApi = _original_refund_api
+    _original_refund_api = None
@@ -0,0 +1,199 @@
+"""Tests for the CyberSource simulator."""
+
+import random
+import uuid
+
+import pytest
+import reversion
+from CyberSource.rest import ApiException
+from django.urls import reverse
+from mitol.payment_gateway.api import PaymentGateway, ProcessorResponse, Refund
+
+from payments.api import generate_checkout_payload
+from payments.models import Basket, BasketItem, Order
+from payments.simulator import (
+    CALLBACK_TARGET_BACKOFFICE,
+    CALLBACK_TARGET_REDIRECT,
+    CallbackSimulator,
+    build_callback_payload,
+    install_refund_simulator,
+    uninstall_refund_simulator,
+)
+from system_meta.factories import ProductFactory
+from unified_ecommerce.test_utils import generate_mocked_request
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def _payment_gateway_settings(settings):
+    """Set the payment gateway settings"""
+
+    settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_SECURITY_KEY = "Test Security Key"
+    settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_ACCESS_KEY = "Test Access Key"
+    settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_PROFILE_ID = uuid.uuid4()
+
+
+@pytest.fixture()
+def _refund_simulator(settings):
+    """Install the refund simulator, without latency."""
+
+    settings.MITOL_UE_CYBERSOURCE_SIMULATOR_REFUND_LATENCY_MS = 0
+    install_refund_simulator()
+    yield
+    uninstall_refund_simulator()
+
+
+@pytest.fixture()
+def pending_order(mocker, user):
+    """Create a pending order by checking out a basket."""
+
+    mocker.patch("payments.api.send_pre_sale_webhook")
+
+    with reversion.create_revision():
+        products = ProductFactory.create_batch(2)
+
+    system = products[0].system
+    basket = Basket.objects.create(user=user, integrated_system=system)
+    for product in products:
+        product.system = system
+        product.save()
+        BasketItem.objects.create(basket=basket, product=product, quantity=1)
+
+    generate_checkout_payload(generate_mocked_request(user), system)
+
+    return Order.objects.get(purchaser=user, state=Order.STATE.PENDING)
+
+
+@pytest.mark.parametrize(
+    ("decision", "expected_state"),
+    [
+        (ProcessorResponse.STATE_ACCEPTED, Order.STATE.FULFILLED),
+        (ProcessorResponse.STATE_DECLINED, Order.STATE.DECLINED),
+        (ProcessorResponse.STATE_CANCELLED, Order.STATE.CANCELED),
+    ],
+)
+def test_callback_payload(
+    settings, mocker, client, pending_order, decision, expected_state
+):
+    """The callback views should accept and process the simulated payload."""
+
+    mocker.patch("payments.tasks.dispatch_webhook.delay")
+    payload = build_callback_payload(pending_order, decision)
+
+    assert PaymentGateway.validate_processor_response(
+        settings.ECOMMERCE_DEFAULT_PAYMENT_GATEWAY,
+        mocker.Mock(method="POST", data=payload),
+    )
+
+    response = client.post(
+        reverse("v0:checkout-result-callback"), payload, format="multipart"
+    )
+    assert response.status_code == 302
+
+    pending_order.refresh_from_db()
+    assert pending_order.state == expected_state
+
+    # The backoffice callback for the same order shouldn't change anything.
+    response = client.post(reverse("v0:checkout-callback"), payload, format="multipart")
+    assert response.status_code == 200
+
+    pending_order.refresh_from_db()
+    assert pending_order.state == expected_state
+    if expected_state == Order.STATE.FULFILLED:
+        assert pending_order.transactions.count() == 1
+
+
+def test_tampered_callback_payload(client, pending_order):
+    """A payload that's been changed after signing should be rejected."""
+
+    payload = build_callback_payload(pending_order)
+    payload["req_amount"] = "0.01"
+
+    response = client.post(reverse("v0:checkout-callback"), payload, format="multipart")
+
+    assert response.status_code == 403
+    pending_order.refresh_from_db()
+    assert pending_order.state == Order.STATE.PENDING
+
+
+def test_schedule_duplicates_and_reordering():
+    """Scheduling should add duplicates and shuffle when asked to."""
+
+    payloads = [{"req_reference_number": str(idx)} for idx in range(20)]
+    simulator = CallbackSimulator(
+        "http://localhost",
+        duplicate_rate=1,
+        reorder=True,
+        rng=random.Random(1),  # noqa: S311
+    )
+
+    deliveries = simulator.schedule(payloads)
+
+    assert len(deliveries) == 80
+    assert sum(duplicate for _, _, duplicate in deliveries) == 40
+    assert [payload for _, payload, _ in deliveries[::4]] != payloads[:20]
+
+    in_order = CallbackSimulator(
+        "http://localhost", targets=[CALLBACK_TARGET_BACKOFFICE]
+    ).schedule(payloads)
+    assert [payload for _, payload, _ in in_order] == payloads
+
+
+def test_run(mocker):
+    """Running should post each callback and report the results."""
+
+    simulator = CallbackSimulator("http://localhost:9080", concurrency=2)
+    mock_post = mocker.patch.object(
+        simulator.session, "post", return_value=mocker.Mock(status_code=200)
+    )
+    payloads = [{"req_reference_number": "a"}, {"req_reference_number": "b"}]
+
+    deliveries = simulator.run(payloads)
+
+    assert len(deliveries) == 4
+    assert {delivery.status_code for delivery in deliveries} == {200}
+    assert {call.args[0] for call in mock_post.call_args_list} == {
+        f"http://localhost:9080{reverse('v0:checkout-result-callback')}",
+        f"http://localhost:9080{reverse('v0:checkout-callback')}",
+    }
+    assert {delivery.target for delivery in deliveries} == {
+        CALLBACK_TARGET_REDIRECT,
+        CALLBACK_TARGET_BACKOFFICE,
+    }
+
+
+def test_unknown_target():
+    """Unknown targets should be rejected."""
+
+    with pytest.raises(ValueError, match="Unknown callback targets"):
+        CallbackSimulator("http://localhost", targets=["nowhere"])
+
+
+@pytest.mark.usefixtures("_refund_simulator")
+def test_simulated_refund(settings):
+    """Refunds should go to the simulator and come back pending."""
+
+    response = PaymentGateway.start_refund(
+        settings.ECOMMERCE_DEFAULT_PAYMENT_GATEWAY,
+        Refund(transaction_id="12345", refund_amount="10.00", refund_currency="USD"),
+    )
+
+    assert response.state == ProcessorResponse.STATE_PENDING
+    assert response.transaction_id == "12345"
+    assert response.response_data["refundAmountDetails"]["refundAmount"] == "10.00"
+
+
+@pytest.mark.usefixtures("_refund_simulator")
+def test_simulated_refund_failure(settings):
+    """Simulated refund failures should raise like the real API client."""
+
+    settings.MITOL_UE_CYBERSOURCE_SIMULATOR_REFUND_FAILURE_PERCENT = 100
+
+    with pytest.raises(ApiException):
+        PaymentGateway.start_refund(
+            settings.ECOMMERCE_DEFAULT_PAYMENT_GATEWAY,
+            Refund(
+                transaction_id="12345", refund_amount="10.00", refund_currency="USD"
+            ),
+        )
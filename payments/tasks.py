@@ -1,13 +1,20 @@
 """Tasks for the payments app."""
 
 import logging
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
 
 import requests
+from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
+from mitol.common.utils.datetime import now_in_utc
 
 from payments.mail_api import send_successful_order_payment_email
 from payments.serializers.v0 import WebhookBase
 from unified_ecommerce.celery import app
+from unified_ecommerce.db_routing import use_replica
 
 log = logging.getLogger(__name__)
 
@@ -94,3 +101,116 @@ def dispatch_webhook(system_webhook_url, webhook_data, attempt_count=0):
             webhook_dataclass,
             exc_info=e,
         )
+
+
+@app.task
+def flush_pre_sale_webhooks(system_id, user_id):
+    """
+    Send the pre-sale webhook for the basket changes the user made in the
+    system during the coalescing window.
+    """
+
+    from payments.api import send_coalesced_pre_sale_webhook
+
+    send_coalesced_pre_sale_webhook(system_id, user_id)
+
+
+@app.task
+def purge_stale_baskets_and_orders():
+    """
+    Cancel abandoned pending orders and delete abandoned baskets.
+
+    This runs in small, paused chunks (see MITOL_UE_CLEANUP_CHUNK_SIZE and
+    MITOL_UE_CLEANUP_PAUSE_MS) so it can run alongside checkout, and looks at no
+    more than MITOL_UE_CLEANUP_MAX_ROWS of each per run - anything left over is
+    picked up by the next run.
+    """
+
+    from payments.api import cancel_stale_pending_orders, delete_stale_baskets
+
+    options = {
+        "chunk_size": settings.MITOL_UE_CLEANUP_CHUNK_SIZE,
+        "pause": settings.MITOL_UE_CLEANUP_PAUSE_MS / 1000,
+        "limit": settings.MITOL_UE_CLEANUP_MAX_ROWS or None,
+    }
+
+    canceled = cancel_stale_pending_orders(
+        older_than=timedelta(days=settings.MITOL_UE_STALE_PENDING_ORDER_DAYS),
+        **options,
+    )
+    deleted = delete_stale_baskets(
+        older_than=timedelta(days=settings.MITOL_UE_STALE_BASKET_DAYS), **options
+    )
+
+    log.info(
+        "Canceled %s stale pending orders and deleted %s stale baskets",
+        canceled,
+        deleted,
+    )
+
+
+@app.task
+def archive_transaction_data():
+    """
+    Move the payloads of old transactions to the archive table.
+
+    Transactions older than MITOL_UE_TRANSACTION_ARCHIVE_DAYS are archived, in
+    the same chunks as the stale basket and order cleanup.
+    """
+
+    from payments.api import archive_transaction_data as archive
+
+    archived = archive(
+        older_than=timedelta(days=settings.MITOL_UE_TRANSACTION_ARCHIVE_DAYS),
+        chunk_size=settings.MITOL_UE_CLEANUP_CHUNK_SIZE,
+        pause=settings.MITOL_UE_CLEANUP_PAUSE_MS / 1000,
+        limit=settings.MITOL_UE_CLEANUP_MAX_ROWS or None,
+    )
+
+    log.info("Archived %s transaction payloads", archived)
+
+
+@app.task(
+    soft_time_limit=settings.MITOL_UE_RECONCILIATION_TIME_LIMIT,
+    time_limit=settings.MITOL_UE_RECONCILIATION_TIME_LIMIT + 60,
+)
+def reconcile_settlement_report():
+    """
+    Check the previous day's CyberSource settlement report against our
+    transactions, and log the discrepancies.
+
+    The report is set by MITOL_UE_SETTLEMENT_REPORT_NAME; if that's blank, this
+    does nothing. See payments.reconciliation.
+    """
+
+    from payments.reconciliation import (
+        download_settlement_report,
+        read_settlement_report,
+        reconcile_settlements,
+    )
+
+    if not settings.MITOL_UE_SETTLEMENT_REPORT_NAME:
+        log.debug("No settlement report is configured, skipping reconciliation")
+        return None
+
+    # The report for a day is dated the day after it ends.
+    report_date = now_in_utc().date()
+    counts = Counter()
+
+    try:
+        with TemporaryDirectory() as report_dir:
+            report_path = Path(report_dir) / "settlements"
+            download_settlement_report(report_date, report_path)
+
+            with use_replica():
+                for discrepancy in reconcile_settlements(
+                    read_settlement_report(report_path)
+                ):
+                    counts[discrepancy.kind] += 1
+                    log.warning("Settlement discrepancy: %s", discrepancy)
+    except SoftTimeLimitExceeded:
+        log.exception("Settlement reconciliation for %s timed out", report_date)
+
+    log.info("Reconciled settlements for %s: %s", report_date, dict(counts))
+
+    return dict(counts)
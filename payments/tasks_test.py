@@ -1,10 +1,14 @@
 """Tests for Celery tasks in payments."""
 
+from decimal import Decimal
+
 import pytest
+from celery.exceptions import SoftTimeLimitExceeded
 
-from payments.constants import PAYMENT_HOOK_ACTION_TEST
+from payments.constants import DISCREPANCY_NOT_RECORDED, PAYMENT_HOOK_ACTION_TEST
+from payments.dataclasses import SettlementRecord
 from payments.serializers.v0 import WebhookBase, WebhookBaseSerializer, WebhookTest
-from payments.tasks import dispatch_webhook
+from payments.tasks import dispatch_webhook, reconcile_settlement_report
 from system_meta.factories import IntegratedSystemFactory
 
 pytestmark = [pytest.mark.django_db]
@@ -44,3 +48,45 @@ def test_dispatch_webhook(mocker, user):
         json=webhook_data,
         timeout=30,
     )
+
+
+def test_reconcile_settlement_report(mocker, settings):
+    """The day's report should be downloaded and checked, and the counts returned."""
+
+    settings.MITOL_UE_SETTLEMENT_REPORT_NAME = "Payment Batch Detail"
+    mock_download = mocker.patch(
+        "payments.reconciliation.download_settlement_report", autospec=True
+    )
+    mocker.patch(
+        "payments.reconciliation.read_settlement_report",
+        return_value=[
+            SettlementRecord("1001", "ref", Decimal(10), "USD", "ics_bill"),
+            SettlementRecord("1002", "ref", Decimal(10), "USD", "ics_bill"),
+        ],
+    )
+
+    assert reconcile_settlement_report() == {DISCREPANCY_NOT_RECORDED: 2}
+    mock_download.assert_called_once()
+
+
+def test_reconcile_settlement_report_not_configured(mocker, settings):
+    """Nothing should be done if there's no report configured."""
+
+    settings.MITOL_UE_SETTLEMENT_REPORT_NAME = ""
+    mock_download = mocker.patch("payments.reconciliation.download_settlement_report")
+
+    assert reconcile_settlement_report() is None
+    mock_download.assert_not_called()
+
+
+def test_reconcile_settlement_report_time_limit(mocker, settings):
+    """The counts so far should be returned if the task runs out of time."""
+
+    settings.MITOL_UE_SETTLEMENT_REPORT_NAME = "Payment Batch Detail"
+    mocker.patch("payments.reconciliation.download_settlement_report")
+    mocker.patch(
+        "payments.reconciliation.read_settlement_report",
+        side_effect=SoftTimeLimitExceeded,
+    )
+
+    assert reconcile_settlement_report() == {}
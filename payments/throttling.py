@@ -0,0 +1,97 @@
+"""
+Throttles for the payments endpoints.
+
+Each scope has a per-user and a per-IP throttle (the per-IP one catches many
+accounts used from one place), plus a per-system throttle for the API key
+endpoints. The discount throttles only count requests with a discount code, so
+they can go on the basket endpoints that take an optional one. The rates are in
+DEFAULT_THROTTLE_RATES - see unified_ecommerce.throttling.
+"""
+
+from unified_ecommerce.throttling import (
+    IntegratedSystemTokenBucketThrottle,
+    IPTokenBucketThrottle,
+    UserTokenBucketThrottle,
+)
+
+
+class BasketUserThrottle(UserTokenBucketThrottle):
+    """Throttle changes to the user's baskets."""
+
+    scope = "basket_user"
+
+
+class BasketIPThrottle(IPTokenBucketThrottle):
+    """Throttle changes to baskets from the IP address."""
+
+    scope = "basket_ip"
+
+
+def _get_discount_code(request, view):
+    """Return the discount code in the URL, query string or body, if any."""
+
+    data = request.data if hasattr(request.data, "get") else {}
+
+    return (
+        view.kwargs.get("discount_code")
+        or request.query_params.get("discount_code")
+        or data.get("discount_code")
+    )
+
+
+class DiscountCodeThrottleMixin:
+    """Only throttle requests that have a discount code."""
+
+    def get_cache_key(self, request, view):
+        """Return the bucket if the request has a discount code."""
+
+        if not _get_discount_code(request, view):
+            return None
+
+        return super().get_cache_key(request, view)
+
+
+class DiscountUserThrottle(DiscountCodeThrottleMixin, UserTokenBucketThrottle):
+    """Throttle the user's attempts to apply discount codes."""
+
+    scope = "discount_user"
+
+
+class DiscountIPThrottle(DiscountCodeThrottleMixin, IPTokenBucketThrottle):
+    """Throttle attempts to apply discount codes from the IP address."""
+
+    scope = "discount_ip"
+
+
+class CheckoutUserThrottle(UserTokenBucketThrottle):
+    """Throttle the user's checkouts."""
+
+    scope = "checkout_user"
+
+
+class CheckoutIPThrottle(IPTokenBucketThrottle):
+    """Throttle checkouts from the IP address."""
+
+    scope = "checkout_ip"
+
+
+class CheckoutCallbackIPThrottle(IPTokenBucketThrottle):
+    """
+    Throttle returns from the payment gateway from the IP address.
+
+    These record the user's payment, so they have their own bucket: retrying
+    checkout shouldn't get the return for the payment throttled.
+    """
+
+    scope = "checkout_callback_ip"
+
+
+class IntegratedSystemThrottle(IntegratedSystemTokenBucketThrottle):
+    """Throttle the integrated system's API key requests."""
+
+    scope = "integrated_system"
+
+
+BASKET_THROTTLES = (BasketUserThrottle, BasketIPThrottle)
+DISCOUNT_THROTTLES = (DiscountUserThrottle, DiscountIPThrottle)
+CHECKOUT_THROTTLES = (CheckoutUserThrottle, CheckoutIPThrottle)
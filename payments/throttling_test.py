@@ -0,0 +1,79 @@
+"""Tests for the payments throttles."""
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from payments.throttling import (
+    CHECKOUT_THROTTLES,
+    DiscountIPThrottle,
+    DiscountUserThrottle,
+)
+from payments.views.v0 import CheckoutCallbackView
+from system_meta.factories import ActiveIntegratedSystemFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def _discount_rates(mocker):
+    """Allow two discount code attempts per minute."""
+
+    rates = {"discount_user": "2/min", "discount_ip": "10/min"}
+    for throttle in (DiscountUserThrottle, DiscountIPThrottle):
+        mocker.patch.object(throttle, "THROTTLE_RATES", rates)
+
+
+@pytest.mark.usefixtures("_discount_rates")
+def test_add_discount_throttled(user_client):
+    """Guessing discount codes should be throttled."""
+
+    system = ActiveIntegratedSystemFactory.create()
+    url = reverse("v0:add_discount", kwargs={"system_slug": system.slug})
+
+    responses = [
+        user_client.post(f"{url}?discount_code=GUESS{attempt}") for attempt in range(3)
+    ]
+
+    assert [response.status_code for response in responses] == [404, 404, 429]
+    assert int(responses[-1]["Retry-After"]) > 0
+
+
+@pytest.mark.parametrize(
+    ("kwargs", "query", "data", "throttled"),
+    [
+        ({"discount_code": "CODE"}, "", {}, True),
+        ({}, "?discount_code=CODE", {}, True),
+        ({}, "", {"discount_code": "CODE"}, True),
+        ({}, "", {"skus": ["SKU"]}, False),
+        ({}, "", ["SKU"], False),
+    ],
+)
+@pytest.mark.usefixtures("_discount_rates")
+def test_discount_throttles_need_code(user, kwargs, query, data, throttled):
+    """Only requests with a discount code should use the discount throttles."""
+
+    view = APIView()
+    view.kwargs = kwargs
+    request = view.initialize_request(
+        APIRequestFactory().post(f"/{query}", data, format="json")
+    )
+    request.user = user
+
+    assert (DiscountUserThrottle().get_cache_key(request, view) is not None) is (
+        throttled
+    )
+    assert (DiscountIPThrottle().get_cache_key(request, view) is not None) is (
+        throttled
+    )
+
+
+def test_checkout_callback_has_its_own_bucket():
+    """Returns from the gateway shouldn't share a bucket with checkouts."""
+
+    checkout_scopes = {throttle.scope for throttle in CHECKOUT_THROTTLES}
+
+    assert not checkout_scopes & {
+        throttle.scope for throttle in CheckoutCallbackView.throttle_classes
+    }
@@ -50,3 +50,53 @@ def parse_supplied_date(datearg):
 
     retDate = retDate.replace(tzinfo=pytz.timezone(TIME_ZONE))
     return retDate  # noqa: RET504
+
+
+# Transaction columns copied from the CyberSource payload when it's saved.
+TRANSACTION_DATA_FIELDS = {
+    "currency": "req_currency",
+    "bill_to_first_name": "req_bill_to_forename",
+    "bill_to_last_name": "req_bill_to_surname",
+    "bill_to_email": "req_bill_to_email",
+    "bill_to_country": "req_bill_to_address_country",
+    "bill_to_city": "req_bill_to_address_city",
+    "bill_to_state": "req_bill_to_address_state",
+    "bill_to_postal_code": "req_bill_to_address_postal_code",
+}
+
+
+def transaction_fields_from_data(data: dict) -> dict:
+    """
+    Get the values of the Transaction columns that are copied from its payload.
+
+    These are the parts of the payload that get used after the fact (for
+    refunds and the purchaser's address), so they can be read without loading
+    the whole payload.
+
+    Args:
+    - data (dict): the payment processor payload
+    Returns:
+    - dict: the field values, keyed by field name
+    """
+
+    fields = {
+        field: str(data.get(key) or "")
+        for field, key in TRANSACTION_DATA_FIELDS.items()
+    }
+
+    try:
+        fields["requested_amount"] = Decimal(str(data["req_amount"]))
+    except (KeyError, ArithmeticError, ValueError):
+        fields["requested_amount"] = None
+
+    # The lines keep their positions (blank if they're missing), without any
+    # trailing blank ones.
+    street_address = [
+        str(data.get(f"req_bill_to_address_line{idx}") or "") for idx in range(1, 6)
+    ]
+    while street_address and not street_address[-1]:
+        street_address.pop()
+    fields["bill_to_street_address"] = street_address
+    fields["is_paypal"] = "paypal_token" in data
+
+    return fields
@@ -1,5 +1,7 @@
 """Tests for utility functions in payments."""
 
+from decimal import Decimal
+
 import pytest
 import pytz
 from dateutil import parser
@@ -111,3 +113,49 @@ def test_parse_supplied_date_with_different_timezone():
     # Expected result: timezone should be converted to TIME_ZONE
     expected = parser.parse("2023-10-15T19:30:00").replace(tzinfo=pytz.timezone("UTC"))
     assert result == expected
+
+
+def test_transaction_fields_from_data():
+    """The Transaction columns should be copied from the CyberSource payload."""
+
+    data = {
+        "req_amount": "199.50",
+        "req_currency": "USD",
+        "req_bill_to_forename": "Jane",
+        "req_bill_to_surname": "Doe",
+        "req_bill_to_email": "jane@example.com",
+        "req_bill_to_address_line1": "1 Main St",
+        "req_bill_to_address_line3": "Suite 5",
+        "req_bill_to_address_city": "Cambridge",
+        "req_bill_to_address_state": "MA",
+        "req_bill_to_address_postal_code": "02139",
+        "req_bill_to_address_country": "US",
+    }
+
+    assert utils.transaction_fields_from_data(data) == {
+        "requested_amount": Decimal("199.50"),
+        "currency": "USD",
+        "is_paypal": False,
+        "bill_to_first_name": "Jane",
+        "bill_to_last_name": "Doe",
+        "bill_to_email": "jane@example.com",
+        "bill_to_country": "US",
+        "bill_to_street_address": ["1 Main St", "", "Suite 5"],
+        "bill_to_city": "Cambridge",
+        "bill_to_state": "MA",
+        "bill_to_postal_code": "02139",
+    }
+
+
+@pytest.mark.parametrize("req_amount", [None, "", "not a number"])
+def test_transaction_fields_from_incomplete_data(req_amount):
+    """Missing or bad values should be left blank."""
+
+    fields = utils.transaction_fields_from_data(
+        {"paypal_token": "abc", "req_amount": req_amount}
+    )
+
+    assert fields["requested_amount"] is None
+    assert fields["is_paypal"] is True
+    assert fields["currency"] == ""
+    assert fields["bill_to_street_address"] == []
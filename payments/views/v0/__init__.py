@@ -4,8 +4,8 @@ import logging
 from typing import Optional
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import transaction
-from django.http import Http404, HttpResponse
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import redirect
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -19,16 +19,27 @@ from drf_spectacular.utils import (
 )
 from mitol.payment_gateway.api import PaymentGateway
 from rest_framework import status, viewsets
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
 from payments import api
+from payments.caching import (
+    etag_response,
+    get_serialized_basket,
+    get_serialized_baskets,
+)
 from payments.exceptions import ProductBlockedError
-from payments.models import Basket, BasketItem, Discount, Order
+from payments.models import Basket, BasketItem, Discount, Order, Transaction
 from payments.permissions import HasIntegratedSystemAPIKey
+from payments.reports import (
+    REPORT_FORMAT_CSV,
+    REPORT_FORMATS,
+    get_sales_report_rows,
+    render_sales_report,
+)
 from payments.serializers.v0 import (
     BasketItemSerializer,
     BasketWithProductSerializer,
@@ -37,7 +48,17 @@ from payments.serializers.v0 import (
     DiscountSerializer,
     OrderHistorySerializer,
 )
-from system_meta.models import IntegratedSystem, IntegratedSystemAPIKey, Product
+from payments.throttling import (
+    BASKET_THROTTLES,
+    CHECKOUT_THROTTLES,
+    DISCOUNT_THROTTLES,
+    CheckoutCallbackIPThrottle,
+    IntegratedSystemThrottle,
+)
+from payments.utils import parse_supplied_date
+from system_meta.caching import compute_etag
+from system_meta.models import Product
+from system_meta.resolvers import resolve_product, resolve_system
 from unified_ecommerce import settings
 from unified_ecommerce.constants import (
     POST_SALE_SOURCE_BACKOFFICE,
@@ -48,11 +69,12 @@ from unified_ecommerce.constants import (
     USER_MSG_TYPE_PAYMENT_ERROR,
     USER_MSG_TYPE_PAYMENT_ERROR_UNKNOWN,
 )
+from unified_ecommerce.db_routing import ReplicaReadMixin, use_replica
+from unified_ecommerce.idempotency import IDEMPOTENCY_KEY_PARAMETER, idempotent
 from unified_ecommerce.plugin_manager import get_plugin_manager
 from unified_ecommerce.utils import redirect_with_user_message
 
 log = logging.getLogger(__name__)
-pm = get_plugin_manager()
 
 # Baskets
 
@@ -99,6 +121,27 @@ class BasketViewSet(ReadOnlyModelViewSet):
 
         return Basket.objects.filter(user=self.request.user).all()
 
+    def list(self, request, *args, **kwargs):  # noqa: ARG002
+        """List the user's baskets, using the cached serialized baskets."""
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        baskets = list(queryset) if page is None else page
+        data = [serialized["data"] for serialized in get_serialized_baskets(baskets)]
+        response_data = data if page is None else self.get_paginated_response(data).data
+
+        return etag_response(
+            request,
+            response_data,
+            compute_etag(response_data, request.get_full_path()),
+        )
+
+    def retrieve(self, request, *args, **kwargs):  # noqa: ARG002
+        """Retrieve the basket, using the cached serialized basket."""
+
+        serialized = get_serialized_basket(self.get_object())
+        return etag_response(request, serialized["data"], serialized["etag"])
+
 
 @extend_schema(
     description="Returns or creates a basket for the current user and system.",
@@ -119,11 +162,9 @@ def get_user_basket_for_system(request, system_slug: str):
     Returns:
         Basket: The basket object.
     """
-    system = IntegratedSystem.objects.get(slug=system_slug)
-    return Response(
-        BasketWithProductSerializer(Basket.establish_basket(request, system)).data,
-        status=status.HTTP_200_OK,
-    )
+    system = resolve_system(system_slug)
+    serialized = get_serialized_basket(Basket.establish_basket(request, system))
+    return etag_response(request, serialized["data"], serialized["etag"])
 
 
 def _create_basket_from_product(
@@ -152,20 +193,22 @@ def _create_basket_from_product(
     Returns:
         Response: HTTP response
     """
-    system = IntegratedSystem.objects.get(slug=system_slug)
+    system = resolve_system(system_slug)
     basket = Basket.establish_basket(request, system)
     quantity = request.data.get("quantity", 1)
     checkout = request.data.get("checkout", False)
 
     try:
-        product = Product.objects.get(system=system, sku=sku)
+        product = resolve_product(system, sku)
     except Product.DoesNotExist:
         return Response(
             {"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND
         )
 
     try:
-        pm.hook.basket_add(request=request, basket=basket, basket_item=product)
+        get_plugin_manager().hook.basket_add(
+            request=request, basket=basket, basket_item=product
+        )
     except ProductBlockedError:
         return Response(
             {"error": "Product blocked from purchasing."},
@@ -209,10 +252,13 @@ def _create_basket_from_product(
             "system_slug", OpenApiTypes.STR, OpenApiParameter.PATH, required=True
         ),
         OpenApiParameter("sku", OpenApiTypes.STR, OpenApiParameter.PATH, required=True),
+        IDEMPOTENCY_KEY_PARAMETER,
     ],
 )
 @api_view(["POST"])
 @permission_classes((IsAuthenticated,))
+@throttle_classes(BASKET_THROTTLES)
+@idempotent
 def create_basket_from_product(request, system_slug: str, sku: str):
     """Run _create_basket_from_product."""
 
@@ -236,10 +282,13 @@ def create_basket_from_product(request, system_slug: str, sku: str):
         OpenApiParameter(
             "discount_code", OpenApiTypes.STR, OpenApiParameter.PATH, required=True
         ),
+        IDEMPOTENCY_KEY_PARAMETER,
     ],
 )
 @api_view(["POST"])
 @permission_classes((IsAuthenticated,))
+@throttle_classes(BASKET_THROTTLES + DISCOUNT_THROTTLES)
+@idempotent
 def create_basket_from_product_with_discount(
     request, system_slug: str, sku: str, discount_code: Optional[str] = None
 ):
@@ -255,9 +304,12 @@ def create_basket_from_product_with_discount(
     methods=["POST"],
     responses=BasketWithProductSerializer,
     request=CreateBasketWithProductsSerializer,
+    parameters=[IDEMPOTENCY_KEY_PARAMETER],
 )
 @api_view(["POST"])
 @permission_classes((IsAuthenticated,))
+@throttle_classes(BASKET_THROTTLES + DISCOUNT_THROTTLES)
+@idempotent
 def create_basket_with_products(request):
     """
     Create new basket items for the currently logged in user. Reuse the existing
@@ -286,14 +338,14 @@ def create_basket_with_products(request):
     discount_code = request.data.get("discount_code", None)
     skus = request.data.get("skus", [])
 
-    system = IntegratedSystem.objects.get(slug=system_slug)
+    system = resolve_system(system_slug)
     basket = Basket.establish_basket(request, system)
     products = []
 
     try:
         products = [
             (
-                Product.objects.get(system=system, sku=sku["sku"]),
+                resolve_product(system, sku["sku"]),
                 sku["quantity"],
             )
             for sku in skus
@@ -305,7 +357,9 @@ def create_basket_with_products(request):
 
     try:
         for product, quantity in products:
-            pm.hook.basket_add(request=request, basket=basket, basket_item=product)
+            get_plugin_manager().hook.basket_add(
+                request=request, basket=basket, basket_item=product
+            )
             BasketItem.objects.update_or_create(
                 basket=basket, product=product, defaults={"quantity": quantity}
             )
@@ -345,6 +399,7 @@ def create_basket_with_products(request):
 )
 @api_view(["DELETE"])
 @permission_classes([IsAuthenticated])
+@throttle_classes(BASKET_THROTTLES)
 def clear_basket(request, system_slug: str):
     """
     Clear the basket for the current user.
@@ -355,7 +410,7 @@ def clear_basket(request, system_slug: str):
     Returns:
         Response: HTTP response
     """
-    system = IntegratedSystem.objects.get(slug=system_slug)
+    system = resolve_system(system_slug)
     basket = Basket.establish_basket(request, system)
 
     basket.delete()
@@ -376,11 +431,14 @@ def clear_basket(request, system_slug: str):
     request=None,
     parameters=[
         OpenApiParameter("system_slug", OpenApiTypes.STR, OpenApiParameter.PATH),
+        IDEMPOTENCY_KEY_PARAMETER,
     ],
     responses=CyberSourceCheckoutSerializer,
 )
 @api_view(["POST"])
 @permission_classes((IsAuthenticated,))
+@throttle_classes(CHECKOUT_THROTTLES)
+@idempotent
 def start_checkout(request, system_slug: str):
     """
     Handle checkout.
@@ -398,7 +456,7 @@ def start_checkout(request, system_slug: str):
     CyberSource documentation.
     """
     try:
-        system = IntegratedSystem.objects.get(slug=system_slug)
+        system = resolve_system(system_slug)
         payload = api.generate_checkout_payload(request, system)
     except ObjectDoesNotExist:
         return Response("No basket", status=status.HTTP_406_NOT_ACCEPTABLE)
@@ -429,6 +487,7 @@ class CheckoutCallbackView(APIView):
 
     authentication_classes = []  # disables authentication
     permission_classes = [AllowAny]  # disables permission
+    throttle_classes = [CheckoutCallbackIPThrottle]
 
     def _get_payment_process_redirect_url_from_line_items(self, request):
         """
@@ -520,26 +579,27 @@ class CheckoutCallbackView(APIView):
         CyberSource should be generating the payload for this request.
         """
 
-        with transaction.atomic():
-            order = api.get_order_from_cybersource_payment_response(request)
-            if order is None:
-                return HttpResponse("Order not found")
-
-            # Only process the response if the database record in pending status
-            # If it is, then we can process the response as per usual.
-            # If it isn't, then we just need to redirect the user with the
-            # proper message.
-
-            if order.state == Order.STATE.PENDING:
-                processed_order_state = api.process_cybersource_payment_response(
-                    request,
-                    order,
-                    POST_SALE_SOURCE_REDIRECT,
-                )
+        order = api.get_order_from_cybersource_payment_response(request)
+        if order is None:
+            return HttpResponse("Order not found")
+
+        # Only process the response if the database record in pending status
+        # If it is, then we can process the response as per usual.
+        # If it isn't, then we just need to redirect the user with the
+        # proper message. The state transitions only apply to pending orders,
+        # so if the backoffice callback gets there in between, it wins and we
+        # redirect based on what it did.
+
+        if order.state == Order.STATE.PENDING:
+            processed_order_state = api.process_cybersource_payment_response(
+                request,
+                order,
+                POST_SALE_SOURCE_REDIRECT,
+            )
 
-                return self.post_checkout_redirect(processed_order_state, request)
-            else:
-                return self.post_checkout_redirect(order.state, request)
+            return self.post_checkout_redirect(processed_order_state, request)
+        else:
+            return self.post_checkout_redirect(order.state, request)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -564,20 +624,19 @@ class BackofficeCallbackView(APIView):
         Raises:
             - Http404 if the Order is not found.
         """
-        with transaction.atomic():
-            order = api.get_order_from_cybersource_payment_response(request)
-
-            # We only want to process responses related to orders which are PENDING
-            # otherwise we can conclude that we already received a response through
-            # the user's browser.
-            if order is None:
-                raise Http404
-            elif order.state == Order.STATE.PENDING:
-                api.process_cybersource_payment_response(
-                    request, order, POST_SALE_SOURCE_BACKOFFICE
-                )
+        order = api.get_order_from_cybersource_payment_response(request)
 
-            return Response(status=status.HTTP_200_OK)
+        # We only want to process responses related to orders which are PENDING
+        # otherwise we can conclude that we already received a response through
+        # the user's browser.
+        if order is None:
+            raise Http404
+        elif order.state == Order.STATE.PENDING:
+            api.process_cybersource_payment_response(
+                request, order, POST_SALE_SOURCE_BACKOFFICE
+            )
+
+        return Response(status=status.HTTP_200_OK)
 
 
 @extend_schema_view(
@@ -589,7 +648,7 @@ class BackofficeCallbackView(APIView):
         ],
     ),
 )
-class OrderHistoryViewSet(ReadOnlyModelViewSet):
+class OrderHistoryViewSet(ReplicaReadMixin, ReadOnlyModelViewSet):
     """Provides APIs for displaying the users's order history."""
 
     serializer_class = OrderHistorySerializer
@@ -601,6 +660,14 @@ class OrderHistoryViewSet(ReadOnlyModelViewSet):
         return (
             Order.objects.filter(purchaser=self.request.user)
             .filter(state__in=[Order.STATE.FULFILLED, Order.STATE.REFUNDED])
+            .prefetch_related(
+                Prefetch(
+                    "transactions",
+                    queryset=Transaction.objects.select_related(
+                        "order", "data_archive"
+                    ),
+                )
+            )
             .order_by("-created_on")
             .all()
         )
@@ -619,10 +686,13 @@ class OrderHistoryViewSet(ReadOnlyModelViewSet):
         OpenApiParameter(
             "discount_code", OpenApiTypes.STR, OpenApiParameter.QUERY, required=True
         ),
+        IDEMPOTENCY_KEY_PARAMETER,
     ],
 )
 @api_view(["POST"])
 @permission_classes((IsAuthenticated,))
+@throttle_classes(DISCOUNT_THROTTLES)
+@idempotent
 def add_discount_to_basket(request, system_slug: str):
     """
     Add a discount to the basket for the currently logged in user.
@@ -636,7 +706,7 @@ def add_discount_to_basket(request, system_slug: str):
     Returns:
         Response: HTTP response
     """
-    system = IntegratedSystem.objects.get(slug=system_slug)
+    system = resolve_system(system_slug)
     basket = Basket.establish_basket(request, system)
     discount_code = request.query_params.get("discount_code")
 
@@ -673,6 +743,7 @@ class DiscountAPIViewSet(APIView):
 
     permission_classes = [HasIntegratedSystemAPIKey]
     authentication_classes = []  # disables authentication
+    throttle_classes = [IntegratedSystemThrottle]
 
     @extend_schema(
         description="Create a discount.",
@@ -690,10 +761,10 @@ class DiscountAPIViewSet(APIView):
         Returns:
             Response: The response object.
         """
-        key = request.META["HTTP_AUTHORIZATION"].split()[1]
-        api_key = IntegratedSystemAPIKey.objects.get_from_key(key)
         discount_dictionary = request.data
-        discount_dictionary["integrated_system"] = str(api_key.integrated_system.id)
+        # HasIntegratedSystemAPIKey has already verified the key and attached
+        # its system to the request.
+        discount_dictionary["integrated_system"] = str(request.integrated_system.id)
         discount_codes = api.generate_discount_code(
             **discount_dictionary,
         )
@@ -714,6 +785,7 @@ class BasketItemViewSet(viewsets.ModelViewSet):
     """ViewSet for handling BasketItem operations."""
 
     permission_classes = (IsAuthenticated,)
+    throttle_classes = BASKET_THROTTLES
     serializer_class = BasketItemSerializer
 
     def get_queryset(self):
@@ -722,3 +794,48 @@ class BasketItemViewSet(viewsets.ModelViewSet):
             return BasketItem.objects.none()
 
         return BasketItem.objects.filter(basket__user=self.request.user)
+
+
+@extend_schema(exclude=True)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def sales_report(request):
+    """
+    Stream the sales report for orders placed between start and end.
+
+    Query parameters:
+    - start, end: the dates (or datetimes) of the period; end isn't included
+    - output: csv (the default) or jsonl
+
+    The report is read from the replica, if there is one.
+    """
+
+    report_format = request.query_params.get("output", REPORT_FORMAT_CSV)
+
+    try:
+        start = parse_supplied_date(request.query_params["start"])
+        end = parse_supplied_date(request.query_params["end"])
+    except (KeyError, ValueError):
+        return Response(
+            {"error": "start and end dates are required."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if report_format not in REPORT_FORMATS:
+        return Response(
+            {"error": f"output must be one of {', '.join(REPORT_FORMATS)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    with use_replica():
+        rows = get_sales_report_rows(start, end)
+
+    response = StreamingHttpResponse(
+        render_sales_report(rows, report_format),
+        content_type=REPORT_FORMATS[report_format],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="sales-{start:%Y-%m-%d}-{end:%Y-%m-%d}.{report_format}"'
+    )
+
+    return response
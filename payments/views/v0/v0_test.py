@@ -1,10 +1,20 @@
 """View tests for the v0 API."""
 
+from datetime import timedelta
+
 import pytest
 from django.urls import reverse
-
-from payments.factories import BasketFactory, DiscountFactory, ProductFactory
-from payments.models import Basket
+from mitol.common.utils.datetime import now_in_utc
+
+from payments.api import archive_transaction_data
+from payments.factories import (
+    BasketFactory,
+    DiscountFactory,
+    OrderFactory,
+    ProductFactory,
+    TransactionFactory,
+)
+from payments.models import Basket, Order, Transaction
 from system_meta.factories import ActiveIntegratedSystemFactory
 
 pytestmark = pytest.mark.django_db
@@ -132,3 +142,95 @@ def test_create_basket_with_product(
             assert discount not in Basket.objects.get(id=basket_id).discounts.all()
         else:
             assert discount in Basket.objects.get(id=basket_id).discounts.all()
+
+
+def test_create_basket_with_product_idempotency_key(mocker, user_client):
+    """Retries with the same Idempotency-Key should replay the first response."""
+
+    mock_webhook = mocker.patch("payments.api.send_pre_sale_webhook")
+    product = ProductFactory.create(system=ActiveIntegratedSystemFactory())
+    url = reverse(
+        "v0:create_from_product",
+        kwargs={"system_slug": product.system.slug, "sku": product.sku},
+    )
+
+    first = user_client.post(url, headers={"Idempotency-Key": "retry-me"})
+    second = user_client.post(url, headers={"Idempotency-Key": "retry-me"})
+
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json()
+    assert second["Idempotent-Replayed"] == "true"
+    mock_webhook.assert_called_once()
+
+
+@pytest.mark.parametrize("output", ["csv", "jsonl"])
+def test_sales_report(mocker, staff_client, output):
+    """Staff should be able to stream the sales report."""
+
+    mock_rows = mocker.patch(
+        "payments.views.v0.get_sales_report_rows",
+        return_value=iter([{"order_id": 1, "reference_number": "abc"}]),
+    )
+
+    response = staff_client.get(
+        reverse("sales_report"),
+        {"start": "2026-01-01", "end": "2026-02-01", "output": output},
+    )
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Disposition"] == (
+        f'attachment; filename="sales-2026-01-01-2026-02-01.{output}"'
+    )
+    content = b"".join(response.streaming_content).decode()
+    assert "abc" in content
+    start, end = mock_rows.call_args.args
+    assert (start.year, start.month, end.month) == (2026, 1, 2)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"end": "2026-02-01"},
+        {"start": "bad", "end": "2026-02-01"},
+        {"start": "2026-01-01", "end": "2026-02-01", "output": "xlsx"},
+    ],
+)
+def test_sales_report_bad_params(staff_client, params):
+    """The report needs a valid period and output format."""
+
+    response = staff_client.get(reverse("sales_report"), params)
+
+    assert response.status_code == 400
+
+
+def test_sales_report_staff_only(user_client):
+    """Only staff should be able to get the sales report."""
+
+    response = user_client.get(
+        reverse("sales_report"), {"start": "2026-01-01", "end": "2026-02-01"}
+    )
+
+    assert response.status_code == 403
+
+
+def test_order_history_archived_transactions(user, user_client):
+    """The order history should include the payloads of archived transactions."""
+
+    order = OrderFactory.create(purchaser=user, state=Order.STATE.FULFILLED)
+    payload = {"transaction_id": "old", "req_currency": "USD"}
+    TransactionFactory.create(order=order, transaction_id="old", data=payload)
+    TransactionFactory.create(order=order, transaction_id="new", data={"new": 1})
+    Transaction.objects.filter(transaction_id="old").update(
+        created_on=now_in_utc() - timedelta(days=400)
+    )
+    archive_transaction_data(older_than=timedelta(days=180))
+
+    response = user_client.get(reverse("v0:orderhistory_api-list"))
+
+    assert response.status_code == 200
+    (result,) = response.json()["results"]
+    assert {
+        transaction["transaction_id"]: transaction["data"]
+        for transaction in result["transactions"]
+    } == {"old": payload, "new": {"new": 1}}
@@ -1,8 +1,14 @@
 """Admin for the refunds app."""
 
+from decimal import Decimal
+
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 
+from payments.models import PRICE_FIELD, Line
 from refunds.models import Request, RequestLine, RequestProcessingCode, RequestRecipient
+from unified_ecommerce.paginators import EstimatedCountPaginator
 
 
 class ProcessingCodeInline(admin.TabularInline):
@@ -87,12 +93,15 @@ class RequestAdmin(admin.ModelAdmin):
         "system",
         "order",
         "line_count",
-        "total_requested",
-        "total_approved",
+        "get_total_requested",
+        "get_total_approved",
         "processed_date",
         "processed_by_email",
     )
-    list_filte = ("status",)
+    list_filter = ("status",)
+    list_select_related = ("requester", "processed_by", "order__integrated_system")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     inlines = [
         RequestLineInline,
         ProcessingCodeInline,
@@ -114,18 +123,59 @@ class RequestAdmin(admin.ModelAdmin):
         "total_approved",
     ]
 
-    @admin.display(description="System")
+    def get_queryset(self, request):
+        """Annotate the line count and totals, so the lines aren't loaded."""
+
+        requested = (
+            Line.objects.filter(
+                pk__in=RequestLine.objects.filter(
+                    refund_request=OuterRef(OuterRef("pk"))
+                ).values("line")
+            )
+            .with_prices()
+            .order_by()
+            .annotate(group=Value(1))
+            .values("group")
+            .annotate(total=Sum("annotated_total_price"))
+            .values("total")
+        )
+
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                annotated_line_count=Count("lines"),
+                annotated_total_approved=Coalesce(
+                    Sum("lines__refunded_amount"), Decimal(0)
+                ),
+                annotated_total_requested=Coalesce(
+                    Subquery(requested), Decimal(0), output_field=PRICE_FIELD
+                ),
+            )
+        )
+
+    @admin.display(description="System", ordering="order__integrated_system")
     def system(self, obj):
         """Return the system for this request."""
 
         return obj.order.integrated_system
 
-    @admin.display(description="Line Count")
+    @admin.display(description="Line Count", ordering="annotated_line_count")
     def line_count(self, obj):
         """Return the number of lines on the request."""
-        return obj.lines.count()
+        return obj.annotated_line_count
+
+    @admin.display(description="Total requested", ordering="annotated_total_requested")
+    def get_total_requested(self, obj):
+        """Return the total requested refund amount."""
+        return obj.annotated_total_requested
+
+    @admin.display(description="Total approved", ordering="annotated_total_approved")
+    def get_total_approved(self, obj):
+        """Return the total approved refund amount."""
+        return obj.annotated_total_approved
 
-    @admin.display(description="Requester")
+    @admin.display(description="Requester", ordering="requester__email")
     def requester_email(self, obj):
         """Return the requester's email."""
         return obj.requester.email
@@ -0,0 +1,54 @@
+"""Tests for the refunds admin."""
+
+from decimal import Decimal
+
+import pytest
+from django.contrib.admin.sites import site
+from django.test import RequestFactory as HttpRequestFactory
+
+from payments.factories import LineFactory, OrderFactory, TaxRateFactory
+from refunds.factories import RequestFactory, RequestLineFactory
+from refunds.models import Request
+from system_meta.factories import ProductVersionFactory
+from unified_ecommerce.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_request_changelist():
+    """The request changelist should show the annotated line count and totals."""
+
+    order = OrderFactory.create(tax_rate=TaxRateFactory.create())
+    refund_request = RequestFactory.create(order=order)
+    empty_request = RequestFactory.create()
+
+    for refunded_amount in (Decimal(5), Decimal(10)):
+        product_version = ProductVersionFactory.create()
+        RequestLineFactory.create(
+            refund_request=refund_request,
+            line=LineFactory.create(
+                order=order,
+                product_version=product_version,
+                discounted_price=product_version.field_dict["price"],
+            ),
+            refunded_amount=refunded_amount,
+        )
+
+    model_admin = site._registry[Request]  # noqa: SLF001
+    request = HttpRequestFactory().get("/")
+    request.user = UserFactory.create(is_staff=True, is_superuser=True)
+    rows = {
+        row.id: row for row in model_admin.get_changelist_instance(request).result_list
+    }
+
+    row = rows[refund_request.id]
+    assert model_admin.line_count(row) == 2
+    assert model_admin.get_total_requested(row) == pytest.approx(
+        refund_request.total_requested
+    )
+    assert model_admin.get_total_approved(row) == refund_request.total_approved == 15
+
+    row = rows[empty_request.id]
+    assert model_admin.line_count(row) == 0
+    assert model_admin.get_total_requested(row) == 0
+    assert model_admin.get_total_approved(row) == 0
@@ -12,7 +12,7 @@ from mitol.google_sheets.utils import ResultType
 from mitol.google_sheets_refunds.utils import RefundRequestRow
 from mitol.payment_gateway.api import PaymentGateway
 
-from payments.models import Line, Order
+from payments.models import Line, Order, Transaction
 from refunds.exceptions import (
     RefundOrderImproperStateError,
     RefundOrderPaymentTypeUnsupportedError,
@@ -34,7 +34,6 @@ from unified_ecommerce.constants import (
 from unified_ecommerce.plugin_manager import get_plugin_manager
 from unified_ecommerce.utils import now_in_utc
 
-pm = get_plugin_manager()
 log = logging.getLogger(__name__)
 User = get_user_model()
 
@@ -102,7 +101,7 @@ def create_request_from_order(
     if not skip_event:
         # If we're processing a refund from Google Sheets, we don't want to fire
         # these.
-        pm.hook.refund_created(refund_id=request.pk)
+        get_plugin_manager().hook.refund_created(refund_id=request.pk)
     request.refresh_from_db()
 
     return request
@@ -121,6 +120,7 @@ def process_approved_refund(request: Request) -> None:
     order = request.order
     order_recent_transaction = (
         order.transactions.filter(transaction_type=TRANSACTION_TYPE_PAYMENT)
+        .only(*Transaction.REFUND_FIELDS)
         .order_by("-created_on")
         .first()
     )
@@ -130,10 +130,8 @@ def process_approved_refund(request: Request) -> None:
         log.error(message)
         return False, message
 
-    transaction_dict = order_recent_transaction.data
-
     # Check for a PayPal payment - if there's one, we can't process it
-    if "paypal_token" in transaction_dict:
+    if order_recent_transaction.is_paypal:
         msg = (
             f"PayPal: Order {order.reference_number} contains a PayPal "
             "transaction. Please contact Finance to refund this order."
@@ -160,15 +158,11 @@ def process_approved_refund(request: Request) -> None:
         order.state = Order.STATE.REFUNDED
         order.save()
 
-        pm.hook.refund_issued(refund_id=request.id)
+        get_plugin_manager().hook.refund_issued(refund_id=request.id)
 
         return True
 
-    refund_dict = {
-        "transaction_id": transaction_dict["transaction_id"],
-        "req_amount": str(refund_amount),
-        "req_currency": transaction_dict["req_currency"],
-    }
+    refund_dict = order_recent_transaction.get_refund_payload(refund_amount)
 
     log.debug("Refund request %s payload for CyberSource: %s", request, refund_dict)
 
@@ -207,7 +201,7 @@ def process_approved_refund(request: Request) -> None:
         order.state = Order.STATE.REFUNDED
         order.save()
 
-        pm.hook.refund_issued(refund_id=request.id)
+        get_plugin_manager().hook.refund_issued(refund_id=request.id)
 
         return True
 
@@ -24,7 +24,6 @@ from unified_ecommerce.constants import (
 from unified_ecommerce.plugin_manager import get_plugin_manager
 
 log = logging.getLogger(__name__)
-pm = get_plugin_manager()
 
 
 class RequestRecipient(TimestampedModel):
@@ -187,7 +186,7 @@ class Request(TimestampedModel):
         self.save()
         self.lines.update(status=REFUND_STATUS_DENIED)
 
-        pm.hook.refund_denied(refund_id=self.pk)
+        get_plugin_manager().hook.refund_denied(refund_id=self.pk)
 
     def __str__(self):
         """Return a reasonable string representation of the request."""
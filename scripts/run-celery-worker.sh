@@ -0,0 +1,42 @@
+#!/usr/bin/env bash
+#
+# This script runs a Celery worker for one group of queues.
+#
+# The queues are split into groups so the payment-side effects get their own
+# workers and are never stuck behind the batch jobs (see
+# unified_ecommerce/celery_queues.py):
+#
+#   payments - webhooks, refunds, email and default
+#   bulk     - bulk_sync (the product metadata sweep, Google Sheets refunds)
+#
+# Each group's concurrency can be set with CELERY_PAYMENTS_CONCURRENCY and
+# CELERY_BULK_CONCURRENCY. Any other arguments are passed to the worker (e.g.
+# -B to run beat in the same process).
+
+set -e
+
+GROUP="${1:?usage: run-celery-worker.sh payments|bulk [worker options]}"
+shift
+
+case "$GROUP" in
+payments)
+	QUEUES="webhooks,refunds,email,default"
+	CONCURRENCY="${CELERY_PAYMENTS_CONCURRENCY:-4}"
+	;;
+bulk)
+	QUEUES="bulk_sync"
+	CONCURRENCY="${CELERY_BULK_CONCURRENCY:-1}"
+	;;
+*)
+	echo "Unknown queue group: $GROUP" >&2
+	exit 1
+	;;
+esac
+
+exec celery -A unified_ecommerce.celery:app worker \
+	-Q "$QUEUES" \
+	-n "$GROUP@%h" \
+	-c "$CONCURRENCY" \
+	-O fair \
+	-l "${MITOL_UE_LOG_LEVEL:-INFO}" \
+	"$@"
@@ -0,0 +1,18 @@
+#!/usr/bin/env bash
+#
+# This script runs the django app under ASGI, for the async routes.
+#
+# It runs alongside uwsgi: nginx sends the routes that wait on upstream
+# services (see the nginx config) here, and everything else to uwsgi. In
+# development it listens on ASGI_PORT; otherwise it listens on a socket, the
+# way uwsgi does.
+
+if [[ -n "$DEV_ENV" ]]; then
+	exec uvicorn unified_ecommerce.asgi:application \
+		--host 0.0.0.0 --port "${ASGI_PORT:-8072}" --reload
+fi
+
+exec uvicorn unified_ecommerce.asgi:application \
+	--uds /tmp/asgi.socket \
+	--workers "${ASGI_WORKERS:-2}" \
+	--proxy-headers --forwarded-allow-ips "*"
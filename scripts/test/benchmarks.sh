@@ -0,0 +1,10 @@
+#!/bin/bash
+#
+# Run the purchase funnel benchmarks against the committed baseline.
+#
+# Set BENCHMARK_UPDATE_BASELINE=True to rewrite benchmarks/baseline.json with
+# the results instead. Extra arguments are passed to pytest.
+
+export DJANGO_SETTINGS_MODULE=unified_ecommerce.settings
+
+pytest benchmarks -o python_files='*_bench.py' --no-cov "$@"
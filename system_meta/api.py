@@ -2,6 +2,7 @@
 
 import logging
 
+import httpx
 import requests
 from django.conf import settings
 from reversion import create_revision
@@ -11,6 +12,81 @@ from unified_ecommerce.utils import parse_readable_id
 
 log = logging.getLogger(__name__)
 
+LEARN_API_TIMEOUT = 10
+
+
+def _format_learn_output(data: dict, readable_id: str, *, all_data: bool) -> dict:
+    """Format the Learn API data accordingly."""
+
+    if all_data:
+        return data.get("results", [])[0]
+
+    course_data = data.get("results")[0]
+    image_data = course_data.get("image", {})
+    url = course_data.get("url", "")
+    prices = course_data.get("prices", [])
+    prices.sort()
+    price = prices[-1] if len(prices) else 0
+
+    runs = course_data.get("runs", [])
+    run = next((r for r in runs if r.get("run_id") == readable_id), None)
+    if run:
+        run_prices = run.get("prices", [])
+        run_prices.sort()
+        run_price = run_prices[-1] if len(run_prices) else 0
+
+    return {
+        "sku": run.get("run_id") if run else course_data.get("readable_id"),
+        "title": course_data.get("title"),
+        "description": course_data.get("description"),
+        "image": {
+            "image_url": image_data.get("url"),
+            "alt_text": image_data.get("alt"),
+            "description": image_data.get("description"),
+        }
+        if image_data
+        else None,
+        "price": run_price if run and run_price > price else price,
+        "url": url if url else "",
+    }
+
+
+def _learn_request(platform: str, readable_id: str) -> tuple[str, dict]:
+    """Return the URL and query parameters for the Learn API lookup."""
+
+    split_readable_id, _ = parse_readable_id(readable_id)
+
+    return (
+        f"{settings.MITOL_LEARN_API_URL}learning_resources/",
+        {"platform": platform, "readable_id": split_readable_id},
+    )
+
+
+def _parse_learn_response(
+    raw_response: dict, readable_id: str, *, all_data: bool
+) -> dict | None:
+    """Return the product metadata from the Learn API response, if it matches."""
+
+    _, split_run = parse_readable_id(readable_id)
+
+    if raw_response.get("count", 0) > 0:
+        course_data = raw_response.get("results")[0]
+        if split_run and course_data.get("runs"):
+            test_run = next(
+                (r for r in course_data.get("runs") if r.get("run_id") == readable_id),
+                None,
+            )
+            if test_run:
+                return _format_learn_output(
+                    raw_response, readable_id, all_data=all_data
+                )
+
+            return None
+
+        return _format_learn_output(raw_response, readable_id, all_data=all_data)
+    else:
+        return None
+
 
 def get_product_metadata(
     platform: str, readable_id: str, *, all_data: bool = False
@@ -28,75 +104,39 @@ def get_product_metadata(
         The product metadata from the Learn API.
     """
 
-    def _format_output(data: dict, *, all_data: bool) -> dict:
-        """Format the Learn API data accordingly."""
-
-        if all_data:
-            return data.get("results", [])[0]
-
-        course_data = data.get("results")[0]
-        image_data = course_data.get("image", {})
-        url = course_data.get("url", "")
-        prices = course_data.get("prices", [])
-        prices.sort()
-        price = prices[-1] if len(prices) else 0
-
-        runs = course_data.get("runs", [])
-        run = next((r for r in runs if r.get("run_id") == readable_id), None)
-        if run:
-            run_prices = run.get("prices", [])
-            run_prices.sort()
-            run_price = run_prices[-1] if len(run_prices) else 0
-
-        return {
-            "sku": run.get("run_id") if run else course_data.get("readable_id"),
-            "title": course_data.get("title"),
-            "description": course_data.get("description"),
-            "image": {
-                "image_url": image_data.get("url"),
-                "alt_text": image_data.get("alt"),
-                "description": image_data.get("description"),
-            }
-            if image_data
-            else None,
-            "price": run_price if run and run_price > price else price,
-            "url": url if url else "",
-        }
-
     try:
-        split_readable_id, split_run = parse_readable_id(readable_id)
-        response = requests.get(
-            f"{settings.MITOL_LEARN_API_URL}learning_resources/",
-            params={"platform": platform, "readable_id": split_readable_id},
-            timeout=10,
-        )
+        url, params = _learn_request(platform, readable_id)
+        response = requests.get(url, params=params, timeout=LEARN_API_TIMEOUT)
         response.raise_for_status()
-        raw_response = response.json()
-
-        if raw_response.get("count", 0) > 0:
-            course_data = raw_response.get("results")[0]
-            if split_run and course_data.get("runs"):
-                test_run = next(
-                    (
-                        r
-                        for r in course_data.get("runs")
-                        if r.get("run_id") == readable_id
-                    ),
-                    None,
-                )
-                if test_run:
-                    return _format_output(raw_response, all_data=all_data)
-
-                return None
 
-            return _format_output(raw_response, all_data=all_data)
-        else:
-            return None
+        return _parse_learn_response(response.json(), readable_id, all_data=all_data)
     except requests.RequestException:
         log.exception("Failed to get product metadata for %s", readable_id)
         return None
 
 
+async def aget_product_metadata(
+    platform: str, readable_id: str, *, all_data: bool = False
+) -> dict | None:
+    """
+    Get product metadata from the Learn API, asynchronously.
+
+    This is get_product_metadata for async views: the request is made with
+    httpx, so waiting on Learn doesn't tie up a thread.
+    """
+
+    try:
+        url, params = _learn_request(platform, readable_id)
+        async with httpx.AsyncClient(timeout=LEARN_API_TIMEOUT) as client:
+            response = await client.get(url, params=params)
+        response.raise_for_status()
+
+        return _parse_learn_response(response.json(), readable_id, all_data=all_data)
+    except httpx.HTTPError:
+        log.exception("Failed to get product metadata for %s", readable_id)
+        return None
+
+
 def update_product_metadata(product_id: int) -> None:
     """Get product metadata from the Learn API."""
 
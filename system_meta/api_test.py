@@ -1,8 +1,10 @@
 """Tests for the system_meta APIs."""
 
+import httpx
 import pytest
+from asgiref.sync import async_to_sync
 
-from system_meta.api import update_product_metadata
+from system_meta.api import aget_product_metadata, update_product_metadata
 from system_meta.factories import ProductFactory
 
 pytestmark = pytest.mark.django_db
@@ -68,3 +70,66 @@ def test_retrieve_product_metadata_no_match(mocker):
     product.refresh_from_db()
     assert product.description == "This is the wrong description."
     assert product.price == 50
+
+
+@pytest.mark.parametrize("found", [True, False])
+def test_aget_product_metadata(mocker, found):
+    """The async lookup should parse the Learn API response like the sync one."""
+
+    mocked_get = mocker.patch(
+        "system_meta.api.httpx.AsyncClient.get",
+        return_value=httpx.Response(
+            200,
+            json={
+                "count": 1 if found else 0,
+                "results": [
+                    {
+                        "title": "Example title",
+                        "description": "Example description",
+                        "prices": [100, 200],
+                        "readable_id": "course-v1:MITx+12.345x",
+                        "url": "https://example.com/course",
+                        "runs": [
+                            {
+                                "run_id": "course-v1:MITx+12.345x+2T2099",
+                                "prices": [150, 250],
+                            }
+                        ],
+                    }
+                ]
+                if found
+                else [],
+            },
+            request=httpx.Request("GET", "https://learn.example.com/"),
+        ),
+    )
+
+    metadata = async_to_sync(aget_product_metadata)(
+        "mitx", "course-v1:MITx+12.345x+2T2099"
+    )
+
+    assert mocked_get.call_args.kwargs["params"] == {
+        "platform": "mitx",
+        "readable_id": "course-v1:MITx+12.345x",
+    }
+    if found:
+        assert metadata["sku"] == "course-v1:MITx+12.345x+2T2099"
+        assert metadata["title"] == "Example title"
+        assert metadata["price"] == 250
+    else:
+        assert metadata is None
+
+
+def test_aget_product_metadata_error(mocker):
+    """Errors talking to Learn should be logged, and return nothing."""
+
+    mocker.patch(
+        "system_meta.api.httpx.AsyncClient.get",
+        side_effect=httpx.ConnectTimeout("timed out"),
+    )
+    mocked_log = mocker.patch("system_meta.api.log.exception")
+
+    assert (
+        async_to_sync(aget_product_metadata)("mitx", "course-v1:MITx+12.345x") is None
+    )
+    mocked_log.assert_called_once()
@@ -8,3 +8,8 @@ class SystemMetaConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "system_meta"
+
+    def ready(self):
+        """Connect the signal handlers."""
+
+        from system_meta import signals  # noqa: F401
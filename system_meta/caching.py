@@ -0,0 +1,277 @@
+"""
+Response caching for the product catalog APIs.
+
+Catalog responses (integrated systems and products) are cached per request
+variant and versioned by a catalog generation counter. Any change to a Product
+or IntegratedSystem bumps the generation, which orphans every cached response
+at once - we never have to enumerate the keys to invalidate them.
+
+Cached responses carry a strong ETag, so clients that send If-None-Match get a
+304 back without us touching the database or the serializers.
+
+Right after the generation is bumped, the read replica (if reads are going to
+one) may not have the change yet, so responses are generated from the primary
+for the replica sticky window - otherwise stale data could be cached under the
+new generation.
+
+This also caches verified integrated system API keys, so bursts of requests
+from an integrated system don't each pay for the key hashing.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from unified_ecommerce.db_routing import use_primary
+
+log = logging.getLogger(__name__)
+
+CATALOG_GENERATION_KEY = "system_meta:catalog_generation"
+CATALOG_BUMPED_AT_KEY = "system_meta:catalog_bumped_at"
+CATALOG_RESPONSE_KEY_PREFIX = "system_meta:catalog_response"
+API_KEY_CACHE_KEY_PREFIX = "system_meta:verified_api_key"
+
+
+def _get_catalog_cache():
+    """Return the cache backend used for catalog data."""
+
+    return caches[settings.MITOL_UE_CATALOG_CACHE_NAME]
+
+
+def _initial_generation() -> int:
+    """
+    Return a seed value for the generation counter.
+
+    This is time-based rather than starting at 1 so that, if the counter is
+    evicted while cached responses survive, the new counter can't collide with
+    a generation those responses were stored under.
+    """
+
+    return time.time_ns() // 1_000_000
+
+
+def get_catalog_generation() -> int:
+    """Return the current catalog generation, initializing it if needed."""
+
+    cache = _get_catalog_cache()
+    generation = cache.get(CATALOG_GENERATION_KEY)
+
+    if generation is None:
+        cache.add(CATALOG_GENERATION_KEY, _initial_generation(), timeout=None)
+        generation = cache.get(CATALOG_GENERATION_KEY)
+
+    return generation
+
+
+def bump_catalog_generation() -> None:
+    """Increment the catalog generation, invalidating all cached responses."""
+
+    cache = _get_catalog_cache()
+
+    try:
+        cache.incr(CATALOG_GENERATION_KEY)
+    except ValueError:
+        # The key doesn't exist (never set, or evicted) - just start over.
+        cache.set(CATALOG_GENERATION_KEY, _initial_generation(), timeout=None)
+
+    cache.set(
+        CATALOG_BUMPED_AT_KEY,
+        time.time(),
+        timeout=settings.MITOL_UE_DB_REPLICA_STICKY_SECONDS,
+    )
+    log.debug("Bumped catalog generation")
+
+
+def compute_etag(data, variant: str) -> str:
+    """
+    Compute a strong ETag for the serialized data.
+
+    Args:
+    - data: the serialized response data
+    - variant (str): anything else that changes the representation (renderer,
+      serializer class, etc.)
+    Returns:
+    - str: the quoted ETag value
+    """
+
+    digest = hashlib.sha256(variant.encode("utf-8"))
+    digest.update(
+        json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode("utf-8")
+    )
+
+    return f'"{digest.hexdigest()}"'
+
+
+def _get_api_key_cache_key(prefix: str) -> str:
+    """Return the cache key for the API key with the given prefix."""
+
+    return f"{API_KEY_CACHE_KEY_PREFIX}:{prefix}"
+
+
+def _digest_api_key(key: str) -> str:
+    """Return a fast digest of the presented key, for comparing to the cache."""
+
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def verify_integrated_system_api_key(key: str):
+    """
+    Verify an integrated system API key, using the cache if possible.
+
+    The full verification (hashing the key with the configured password hasher)
+    is deliberately slow. Once a key has been verified, we cache a SHA-256
+    digest of it under the key's prefix, along with the key's system, so later
+    requests with the same key only need the digest. The cache is keyed by the
+    prefix rather than the digest so that the entry can be dropped when the key
+    is revoked or deleted.
+
+    Args:
+    - key (str): the API key presented by the client
+    Returns:
+    - IntegratedSystemAPIKey or None: the API key, with its integrated system,
+      or None if the key isn't valid
+    """
+
+    from system_meta.models import IntegratedSystemAPIKey
+
+    prefix, _, _ = key.partition(".")
+    cache = caches[settings.MITOL_UE_API_KEY_CACHE_NAME]
+    cache_key = _get_api_key_cache_key(prefix)
+    digest = _digest_api_key(key)
+    cached = cache.get(cache_key)
+
+    if cached is not None and hmac.compare_digest(cached["digest"], digest):
+        api_key = cached["api_key"]
+    else:
+        try:
+            api_key = IntegratedSystemAPIKey.objects.get_from_key(key)
+        except IntegratedSystemAPIKey.DoesNotExist:
+            return None
+
+        # Load the system now so it's cached along with the key.
+        api_key.integrated_system  # noqa: B018
+
+        cache.set(
+            cache_key,
+            {"digest": digest, "api_key": api_key},
+            timeout=settings.MITOL_UE_API_KEY_CACHE_TIMEOUT,
+        )
+
+    # Checked for cached keys too, in case one was cached as it was revoked.
+    if api_key.revoked or api_key.has_expired:
+        return None
+
+    return api_key
+
+
+def invalidate_integrated_system_api_key(prefix: str) -> None:
+    """Drop the cached verification for the API key with the given prefix."""
+
+    caches[settings.MITOL_UE_API_KEY_CACHE_NAME].delete(_get_api_key_cache_key(prefix))
+
+
+class CatalogCacheMixin:
+    """
+    Cache list and retrieve responses for catalog viewsets.
+
+    Responses are keyed by the catalog generation, the action, the serializer
+    in use (staff users get a different one), the accepted renderer, and the
+    full path and query string - which covers the system filter, the other
+    filters, and the pagination parameters.
+
+    Only successful responses are cached. Permission checks and throttling
+    still run for every request, since those happen before the action is
+    dispatched.
+    """
+
+    def _get_catalog_variant(self, request) -> str:
+        """Return a string identifying this representation of the resource."""
+
+        query = sorted(request.query_params.lists())
+        return "|".join(
+            [
+                self.__class__.__name__,
+                self.action or "",
+                self.get_serializer_class().__name__,
+                request.accepted_renderer.format or "",
+                request.path,
+                json.dumps(query),
+            ]
+        )
+
+    def _finalize_cached_response(self, response, etag):
+        """Add the caching headers to the response."""
+
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Cookie", "Authorization"])
+        return response
+
+    def _cached_response(self, request, action, *args, **kwargs):
+        """
+        Serve the response from the cache, or generate and cache it.
+
+        Args:
+        - request (Request): the current request
+        - action (callable): the uncached action to call on a cache miss
+        Returns:
+        - Response
+        """
+
+        cache = _get_catalog_cache()
+        variant = self._get_catalog_variant(request)
+        cache_key = (
+            f"{CATALOG_RESPONSE_KEY_PREFIX}:{get_catalog_generation()}:"
+            f"{hashlib.sha256(variant.encode('utf-8')).hexdigest()}"
+        )
+        cached = cache.get(cache_key)
+
+        if cached is None:
+            recently_bumped = cache.get(CATALOG_BUMPED_AT_KEY) is not None
+
+            with use_primary() if recently_bumped else nullcontext():
+                response = action(request, *args, **kwargs)
+
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+            cached = {
+                "etag": compute_etag(response.data, variant),
+                "data": response.data,
+            }
+            cache.set(
+                cache_key, cached, timeout=settings.MITOL_UE_CATALOG_CACHE_TIMEOUT
+            )
+        else:
+            response = None
+
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match and {cached["etag"], "*"} & set(parse_etags(if_none_match)):
+            return self._finalize_cached_response(
+                Response(status=status.HTTP_304_NOT_MODIFIED), cached["etag"]
+            )
+
+        if response is None:
+            response = Response(cached["data"], status=status.HTTP_200_OK)
+
+        return self._finalize_cached_response(response, cached["etag"])
+
+    def list(self, request, *args, **kwargs):
+        """List the objects, from the cache if possible."""
+
+        return self._cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve the object, from the cache if possible."""
+
+        return self._cached_response(request, super().retrieve, *args, **kwargs)
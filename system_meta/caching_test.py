@@ -0,0 +1,137 @@
+"""Tests for catalog response caching."""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from system_meta.caching import bump_catalog_generation, get_catalog_generation
+from system_meta.factories import ActiveIntegratedSystemFactory, ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+PRODUCT_LIST_URL = "/api/v0/meta/product/"
+
+
+def test_bump_catalog_generation():
+    """Bumping the generation should change it."""
+
+    generation = get_catalog_generation()
+    bump_catalog_generation()
+
+    assert get_catalog_generation() > generation
+
+
+@pytest.mark.parametrize("soft_delete", [True, False])
+def test_product_changes_bump_generation(soft_delete):
+    """Saving or soft-deleting a product should bump the generation."""
+
+    product = ProductFactory.create()
+    generation = get_catalog_generation()
+
+    if soft_delete:
+        product.delete()
+    else:
+        product.name = "A new name"
+        product.save()
+
+    assert get_catalog_generation() > generation
+
+
+def test_system_changes_bump_generation():
+    """Saving an integrated system should bump the generation."""
+
+    system = ActiveIntegratedSystemFactory.create()
+    generation = get_catalog_generation()
+
+    system.description = "A new description"
+    system.save()
+
+    assert get_catalog_generation() > generation
+
+
+def test_catalog_list_is_cached(user_client):
+    """The second identical request should not hit the database."""
+
+    ProductFactory.create_batch(3)
+
+    first_response = user_client.get(PRODUCT_LIST_URL)
+    assert first_response.status_code == 200
+    assert "ETag" in first_response
+
+    with CaptureQueriesContext(connection) as queries:
+        second_response = user_client.get(PRODUCT_LIST_URL)
+
+    assert second_response.status_code == 200
+    assert second_response.data == first_response.data
+    assert second_response["ETag"] == first_response["ETag"]
+    assert not [query for query in queries if "system_meta_product" in query["sql"]]
+
+
+def test_catalog_cache_varies_by_query(user_client):
+    """Filters and pagination should be part of the cache key."""
+
+    products = ProductFactory.create_batch(3)
+
+    full_response = user_client.get(PRODUCT_LIST_URL)
+    filtered_response = user_client.get(PRODUCT_LIST_URL, {"sku": products[0].sku})
+    paged_response = user_client.get(PRODUCT_LIST_URL, {"limit": 1})
+
+    assert full_response.data["count"] == 3
+    assert filtered_response.data["count"] == 1
+    assert len(paged_response.data["results"]) == 1
+    assert len({full_response["ETag"], filtered_response["ETag"]}) == 2
+
+
+def test_catalog_conditional_get(user_client):
+    """A request with a matching If-None-Match header should get a 304."""
+
+    ProductFactory.create_batch(2)
+
+    response = user_client.get(PRODUCT_LIST_URL)
+    etag = response["ETag"]
+
+    not_modified = user_client.get(PRODUCT_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+    assert not_modified.status_code == 304
+    assert not_modified["ETag"] == etag
+
+    stale = user_client.get(PRODUCT_LIST_URL, HTTP_IF_NONE_MATCH='"stale"')
+    assert stale.status_code == 200
+
+
+def test_catalog_change_invalidates_cache(user_client):
+    """Changing a product should change the response and its ETag."""
+
+    product = ProductFactory.create()
+    url = f"{PRODUCT_LIST_URL}{product.id}/"
+
+    response = user_client.get(url)
+    etag = response["ETag"]
+
+    product.name = "Renamed product"
+    product.save()
+
+    updated_response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert updated_response.status_code == 200
+    assert updated_response.data["name"] == "Renamed product"
+    assert updated_response["ETag"] != etag
+
+
+def test_catalog_unchanged_etag_survives_generation_bump(user_client):
+    """Unrelated catalog changes shouldn't change the ETag for the same data."""
+
+    product = ProductFactory.create()
+    url = f"{PRODUCT_LIST_URL}{product.id}/"
+
+    etag = user_client.get(url)["ETag"]
+    ProductFactory.create()
+
+    assert user_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def test_catalog_missing_object_not_cached(user_client):
+    """Error responses should not be cached."""
+
+    response = user_client.get(f"{PRODUCT_LIST_URL}999999/")
+
+    assert response.status_code == 404
+    assert "ETag" not in response
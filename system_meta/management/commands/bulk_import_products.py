@@ -0,0 +1,235 @@
+"""
+Bulk import products from a JSONL or CSV file.
+
+Each record needs a sku, name, and price, and a system slug (either in the
+record or via --system). description, system_data, and details_url are
+optional. In CSV files, system_data should be a JSON string.
+
+Products are upserted on the (sku, system) unique constraint in chunks. Each
+chunk is written with a single INSERT ... ON CONFLICT statement and recorded
+as a single revision. Importing a product reactivates it if it was
+soft-deleted. Once everything is loaded, the catalog and resolver caches are
+invalidated, and a single update_products task is queued to refresh the
+metadata for all the imported products.
+"""
+
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+import reversion
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from mitol.common.utils.datetime import now_in_utc
+
+from system_meta.caching import bump_catalog_generation
+from system_meta.models import IntegratedSystem, Product
+from system_meta.resolvers import clear_resolver_cache, publish_invalidation
+from system_meta.tasks import update_products
+
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+REQUIRED_FIELDS = ("sku", "name", "price")
+UPDATE_FIELDS = [
+    "name",
+    "price",
+    "description",
+    "system_data",
+    "details_url",
+    "deleted_on",
+    "updated_on",
+]
+
+
+class Command(BaseCommand):
+    """Bulk import products from a JSONL or CSV file."""
+
+    help = "Bulk import (upsert) products from a JSONL or CSV file."
+
+    def add_arguments(self, parser):
+        """Add arguments to the command."""
+
+        parser.add_argument(
+            "filename",
+            type=str,
+            help="The file to import.",
+        )
+        parser.add_argument(
+            "--format",
+            type=str,
+            choices=[FORMAT_JSONL, FORMAT_CSV],
+            help="The file format. Detected from the file extension if not set.",
+        )
+        parser.add_argument(
+            "--system",
+            "-s",
+            type=str,
+            help="The system slug to use for records that don't specify one.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="The number of products to write per batch.",
+        )
+        parser.add_argument(
+            "--no-refresh",
+            action="store_true",
+            help="Don't queue a metadata refresh for the imported products.",
+        )
+
+    def _read_records(self, filename, file_format):
+        """Yield (line number, record) tuples from the file."""
+
+        with Path(filename).open(newline="", encoding="utf-8") as infile:
+            if file_format == FORMAT_CSV:
+                # Line 1 is the header row.
+                for line, record in enumerate(csv.DictReader(infile), start=2):
+                    if record.get("system_data"):
+                        try:
+                            record["system_data"] = json.loads(record["system_data"])
+                        except json.JSONDecodeError as err:
+                            msg = f"Line {line}: system_data is not valid JSON."
+                            raise CommandError(msg) from err
+
+                    yield line, record
+                return
+
+            for line, raw_record in enumerate(infile, start=1):
+                if not raw_record.strip():
+                    continue
+
+                try:
+                    yield line, json.loads(raw_record)
+                except json.JSONDecodeError as err:
+                    msg = f"Line {line}: not valid JSON."
+                    raise CommandError(msg) from err
+
+    def _get_system(self, slug, line):
+        """Return the system with the given slug, caching lookups."""
+
+        if slug not in self._systems:
+            try:
+                self._systems[slug] = IntegratedSystem.objects.get(slug=slug)
+            except IntegratedSystem.DoesNotExist as err:
+                msg = f"Line {line}: system {slug} does not exist."
+                raise CommandError(msg) from err
+
+        return self._systems[slug]
+
+    def _build_product(self, line, record, default_system, now):
+        """Build an unsaved Product from the record."""
+
+        missing = [
+            field for field in REQUIRED_FIELDS if record.get(field) in (None, "")
+        ]
+        if missing:
+            msg = f"Line {line}: missing {', '.join(missing)}."
+            raise CommandError(msg)
+
+        system_slug = record.get("system") or default_system
+        if not system_slug:
+            msg = f"Line {line}: no system specified."
+            raise CommandError(msg)
+
+        try:
+            price = Decimal(str(record["price"]))
+        except InvalidOperation as err:
+            msg = f"Line {line}: invalid price {record['price']}."
+            raise CommandError(msg) from err
+
+        return Product(
+            sku=record["sku"],
+            name=record["name"],
+            price=price,
+            description=record.get("description") or "",
+            system=self._get_system(system_slug, line),
+            system_data=record.get("system_data") or None,
+            details_url=record.get("details_url") or "",
+            deleted_on=None,
+            created_on=now,
+            updated_on=now,
+        )
+
+    def _import_chunk(self, products):
+        """
+        Upsert a chunk of products in one statement and one revision.
+
+        Returns the IDs of the products that were written.
+        """
+
+        # Postgres won't upsert the same row twice in one statement, so the
+        # last record for a given SKU wins.
+        products = list({(p.sku, p.system_id): p for p in products}.values())
+
+        with transaction.atomic(), reversion.create_revision():
+            Product.all_objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=["sku", "system"],
+                update_fields=UPDATE_FIELDS,
+            )
+
+            # bulk_create doesn't return IDs for upserted rows, so fetch them.
+            saved = list(
+                Product.all_objects.filter(
+                    sku__in={product.sku for product in products},
+                    system_id__in={product.system_id for product in products},
+                )
+            )
+            keys = {(product.sku, product.system_id) for product in products}
+            saved = [
+                product for product in saved if (product.sku, product.system_id) in keys
+            ]
+
+            for product in saved:
+                reversion.add_to_revision(product)
+            reversion.set_comment(f"Bulk import of {len(saved)} products")
+
+        return [product.id for product in saved]
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        """Handle the command."""
+
+        filename = options["filename"]
+        file_format = options["format"] or (
+            FORMAT_CSV if filename.lower().endswith(".csv") else FORMAT_JSONL
+        )
+        chunk_size = options["chunk_size"]
+
+        if chunk_size < 1:
+            msg = "The chunk size must be at least 1."
+            raise CommandError(msg)
+
+        self._systems = {}
+        records = self._read_records(filename, file_format)
+        product_ids = []
+
+        while chunk := list(islice(records, chunk_size)):
+            now = now_in_utc()
+            products = [
+                self._build_product(line, record, options["system"], now)
+                for line, record in chunk
+            ]
+            product_ids.extend(self._import_chunk(products))
+
+            self.stdout.write(f"Imported {len(product_ids)} products...")
+
+        if not product_ids:
+            self.stdout.write(self.style.WARNING("No products found to import."))
+            return
+
+        # bulk_create skips the post_save signal, so invalidate the catalog and
+        # the resolver caches (in every process) here.
+        bump_catalog_generation()
+        clear_resolver_cache()
+        publish_invalidation()
+
+        if not options["no_refresh"]:
+            update_products.delay(product_ids=product_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Successfully imported {len(product_ids)} products.")
+        )
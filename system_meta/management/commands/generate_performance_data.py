@@ -0,0 +1,729 @@
+"""
+Fills the database with production-shaped volumes of synthetic data, for
+performance testing.
+
+Unlike generate_test_data, this is non-interactive and built for volume:
+systems and products (with several reversion versions each), users, bulk
+discount collections, and orders with their lines, transactions, redeemed
+discounts and refund requests. Rows are written with bulk_create, in chunks,
+by a pool of worker processes.
+
+The data is deterministic from the seed: each chunk gets its own random
+number generator, seeded from the seed and the chunk, so the output doesn't
+depend on how the chunks are scheduled. Users, orders and discounts get
+explicit IDs (after whatever is already in the database), which lets chunks
+refer to each other's rows without looking them up; the ID sequences are reset
+at the end.
+
+Everything is named with the prefix, and a prefix can only be used once.
+
+Ignoring S311 because this is synthetic data, not anything secret.
+"""
+# ruff: noqa: S311
+
+import os
+import random
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+import reversion
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from reversion.models import Version
+
+from payments.models import (
+    BulkDiscountCollection,
+    Discount,
+    Line,
+    Order,
+    RedeemedDiscount,
+    Transaction,
+)
+from refunds.models import Request, RequestLine
+from system_meta.caching import bump_catalog_generation
+from system_meta.models import IntegratedSystem, Product
+from unified_ecommerce.constants import (
+    DISCOUNT_TYPE_PERCENT_OFF,
+    PAYMENT_TYPE_MARKETING,
+    PAYMENT_TYPE_SALES,
+    REDEMPTION_TYPE_ONE_TIME,
+    REFUND_STATUS_APPROVED_COMPLETE,
+    REFUND_STATUS_CREATED,
+    TRANSACTION_TYPE_PAYMENT,
+    TRANSACTION_TYPE_REFUND,
+)
+from unified_ecommerce.utils import now_in_utc
+
+User = get_user_model()
+
+# Roughly the mix of order states in production.
+ORDER_STATE_WEIGHTS = {
+    Order.STATE.FULFILLED: 80,
+    Order.STATE.PENDING: 6,
+    Order.STATE.CANCELED: 4,
+    Order.STATE.REFUNDED: 4,
+    Order.STATE.DECLINED: 3,
+    Order.STATE.ERRORED: 2,
+    Order.STATE.REVIEW: 1,
+}
+PAID_ORDER_STATES = (Order.STATE.FULFILLED, Order.STATE.REFUNDED)
+HISTORY_DAYS = 3 * 365
+USER_NAMESPACE = uuid.UUID("0c5b2f8e-5d1a-4d7e-9a63-2f4e8b1c7d90")
+FIRST_NAMES = ["Alex", "Jordan", "Sam", "Taylor", "Morgan", "Casey", "Riley", "Avery"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Okafor", "Novak", "Silva", "Kumar", "Haddad"]
+CARD_TYPES = {"001": "Visa", "002": "Mastercard", "003": "American Express"}
+
+
+def _rng(seed, *parts) -> random.Random:
+    """Return a random number generator for a part of the data."""
+
+    return random.Random(":".join(str(part) for part in (seed, *parts)))
+
+
+def _uuid(rng: random.Random) -> str:
+    """Return a UUID generated by the random number generator."""
+
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _created_on(rng: random.Random, now):
+    """Return a creation date spread over the history."""
+
+    return now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 24 * 60 * 60))
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """
+    Let bulk_create keep the created_on/updated_on values that were set.
+
+    Otherwise, auto_now and auto_now_add overwrite them with the current time,
+    and every row would look like it was created today.
+    """
+
+    fields = [
+        model._meta.get_field(name)  # noqa: SLF001
+        for model in models
+        for name in ("created_on", "updated_on")
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+def _init_worker():
+    """Set up Django in a worker process, if it isn't already."""
+
+    if not apps.ready:
+        django.setup()
+
+
+def create_users(*, seed, prefix, start, end, base_id, now):  # noqa: PLR0913
+    """Create the users with the given indexes."""
+
+    rng = _rng(seed, "users", start)
+    users = []
+
+    for idx in range(start, end):
+        username = f"{prefix}-user-{idx}"
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        created_on = _created_on(rng, now)
+        users.append(
+            User(
+                id=base_id + idx,
+                global_id=str(uuid.uuid5(USER_NAMESPACE, username)),
+                username=username,
+                email=f"{username}@example.com",
+                first_name=first_name,
+                last_name=last_name,
+                name=f"{first_name} {last_name}",
+                password=f"{UNUSABLE_PASSWORD_PREFIX}{_uuid(rng)}",
+                created_on=created_on,
+                updated_on=created_on,
+            )
+        )
+
+    with _explicit_timestamps(User), transaction.atomic():
+        User.objects.bulk_create(users)
+
+    return len(users)
+
+
+def create_discounts(  # noqa: PLR0913
+    *, seed, prefix, collection, collection_id, start, end, base_id, system_ids, now
+):
+    """Create the discount codes with the given indexes in a bulk collection."""
+
+    rng = _rng(seed, "discounts", collection, start)
+    discounts = []
+
+    for idx in range(start, end):
+        created_on = _created_on(rng, now)
+        discounts.append(
+            Discount(
+                id=base_id + idx,
+                discount_code=(
+                    f"{prefix}-{collection}-{idx:07d}-{rng.getrandbits(32):08x}"
+                ),
+                amount=Decimal(rng.choice([10, 20, 25, 50])),
+                discount_type=DISCOUNT_TYPE_PERCENT_OFF,
+                redemption_type=REDEMPTION_TYPE_ONE_TIME,
+                payment_type=rng.choice([PAYMENT_TYPE_MARKETING, PAYMENT_TYPE_SALES]),
+                is_bulk=True,
+                bulk_discount_collection_id=collection_id,
+                integrated_system_id=rng.choice([None, *system_ids]),
+                created_on=created_on,
+                updated_on=created_on,
+            )
+        )
+
+    with _explicit_timestamps(Discount), transaction.atomic():
+        Discount.objects.bulk_create(discounts)
+
+    return len(discounts)
+
+
+def _payment_data(rng, order, transaction_id):
+    """Return CyberSource-shaped payment data for the order."""
+
+    card_type = rng.choice(list(CARD_TYPES))
+    amount = order.total_price_paid
+
+    return {
+        "utf8": "✓",
+        "decision": "ACCEPT",
+        "reason_code": "100",
+        "message": "Request was processed successfully.",
+        "transaction_id": transaction_id,
+        "auth_amount": str(amount),
+        "auth_code": f"{rng.randrange(10**6):06d}",
+        "auth_response": "100",
+        "auth_time": order.created_on.strftime("%Y-%m-%dT%H%M%SZ"),
+        "auth_trans_ref_no": f"{rng.randrange(10**12):012d}",
+        "decision_publicSignature": _uuid(rng),
+        "req_amount": str(amount),
+        "req_currency": "USD",
+        "req_locale": "en-us",
+        "req_reference_number": order.reference_number,
+        "req_transaction_type": "sale",
+        "req_transaction_uuid": _uuid(rng).replace("-", ""),
+        "req_card_number": f"xxxxxxxxxxxx{rng.randrange(10**4):04d}",
+        "req_card_type": card_type,
+        "card_type_name": CARD_TYPES[card_type],
+        "req_card_expiry_date": (
+            f"{rng.randrange(1, 13):02d}-{rng.randrange(2027, 2032)}"
+        ),
+        "req_bill_to_forename": rng.choice(FIRST_NAMES),
+        "req_bill_to_surname": rng.choice(LAST_NAMES),
+        "req_bill_to_email": f"user-{order.purchaser_id}@example.com",
+        "req_bill_to_address_country": "US",
+        "req_bill_to_address_city": "Cambridge",
+        "req_bill_to_address_line1": f"{rng.randrange(1, 999)} Main St",
+        "req_bill_to_address_postal_code": f"{rng.randrange(10**5):05d}",
+        "req_bill_to_address_state": "MA",
+        "req_customer_ip_address": order.purchaser_ip,
+        "signed_date_time": order.created_on.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "signed_field_names": "transaction_id,decision,req_reference_number",
+        "signature": _uuid(rng),
+    }
+
+
+def create_orders(  # noqa: PLR0913, PLR0915
+    *,
+    seed,
+    start,
+    end,
+    base_id,
+    user_base_id,
+    user_count,
+    discount_base_id,
+    discount_count,
+    products_by_system,
+    max_lines,
+    discount_percent,
+    refund_request_percent,
+    now,
+):
+    """
+    Create the orders with the given indexes, and everything hanging off them.
+
+    Fulfilled and refunded orders get a payment transaction, and a share of
+    them redeem a bulk discount code. Refunded orders get an approved refund
+    request and refund transaction, and a share of the fulfilled orders get a
+    pending refund request.
+    """
+
+    rng = _rng(seed, "orders", start)
+    states = list(ORDER_STATE_WEIGHTS)
+    state_weights = list(ORDER_STATE_WEIGHTS.values())
+    system_ids = sorted(products_by_system)
+
+    orders = []
+    lines = []
+    transactions = []
+    redemptions = []
+    refunds = []
+
+    for idx in range(start, end):
+        order_id = base_id + idx
+        created_on = _created_on(rng, now)
+        state = rng.choices(states, state_weights)[0]
+        system_id = rng.choice(system_ids)
+        products = rng.sample(
+            products_by_system[system_id],
+            min(rng.randint(1, max_lines), len(products_by_system[system_id])),
+        )
+        discount_id = (
+            discount_base_id + idx % discount_count
+            if discount_count
+            and state in PAID_ORDER_STATES
+            and rng.random() * 100 < discount_percent
+            else None
+        )
+        discount_multiplier = (
+            Decimal(100 - rng.choice([10, 20, 25, 50])) / 100
+            if discount_id
+            else Decimal(1)
+        )
+
+        order = Order(
+            id=order_id,
+            state=state,
+            integrated_system_id=system_id,
+            purchaser_id=user_base_id + rng.randrange(user_count),
+            purchaser_ip=f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+            total_price_paid=Decimal(0),
+            created_on=created_on,
+            updated_on=created_on,
+        )
+        order.reference_number = order._generate_reference_number()  # noqa: SLF001
+
+        order_lines = []
+        for versions in products:
+            # Most orders are for the current version of the product.
+            version_id, price = (
+                versions[-1] if rng.random() < 0.8 else rng.choice(versions)  # noqa: PLR2004
+            )
+            order_lines.append(
+                Line(
+                    order_id=order_id,
+                    product_version_id=version_id,
+                    quantity=1,
+                    discounted_price=(price * discount_multiplier).quantize(
+                        Decimal("0.01")
+                    ),
+                    created_on=created_on,
+                    updated_on=created_on,
+                )
+            )
+
+        order.total_price_paid = sum(line.discounted_price for line in order_lines)
+        orders.append(order)
+        lines.extend(order_lines)
+
+        if discount_id:
+            redemptions.append(
+                RedeemedDiscount(
+                    discount_id=discount_id,
+                    order_id=order_id,
+                    user_id=order.purchaser_id,
+                    created_on=created_on,
+                    updated_on=created_on,
+                )
+            )
+
+        if state not in PAID_ORDER_STATES:
+            continue
+
+        transaction_id = f"{order_id:012d}{rng.randrange(10**10):010d}"
+        payment_transaction = Transaction(
+            transaction_id=transaction_id,
+            order_id=order_id,
+            amount=order.total_price_paid,
+            data=_payment_data(rng, order, transaction_id),
+            transaction_type=TRANSACTION_TYPE_PAYMENT,
+            created_on=created_on,
+            updated_on=created_on,
+        )
+        # bulk_create doesn't call save(), which copies these from the payload.
+        payment_transaction.copy_data_fields()
+        transactions.append(payment_transaction)
+
+        if state == Order.STATE.REFUNDED:
+            refunded_on = created_on + timedelta(days=rng.randint(1, 30))
+            refund_transaction = Transaction(
+                transaction_id=f"R{transaction_id}",
+                order_id=order_id,
+                amount=order.total_price_paid,
+                data={
+                    "id": f"R{transaction_id}",
+                    "status": "PENDING",
+                    "refundAmountDetails": {
+                        "refundAmount": str(order.total_price_paid),
+                        "currency": "USD",
+                    },
+                },
+                transaction_type=TRANSACTION_TYPE_REFUND,
+                reason="Synthetic refund",
+                created_on=refunded_on,
+                updated_on=refunded_on,
+            )
+            transactions.append(refund_transaction)
+            refunds.append(
+                (
+                    order,
+                    order_lines,
+                    REFUND_STATUS_APPROVED_COMPLETE,
+                    refunded_on,
+                    refund_transaction,
+                )
+            )
+        elif rng.random() * 100 < refund_request_percent:
+            requested_on = created_on + timedelta(days=rng.randint(1, 30))
+            refunds.append(
+                (order, order_lines, REFUND_STATUS_CREATED, requested_on, None)
+            )
+
+    requests = [
+        Request(
+            requester_id=order.purchaser_id,
+            order_id=order.id,
+            status=status,
+            total_refunded=(
+                order.total_price_paid
+                if status == REFUND_STATUS_APPROVED_COMPLETE
+                else Decimal(0)
+            ),
+            processed_date=(
+                requested_on if status == REFUND_STATUS_APPROVED_COMPLETE else None
+            ),
+            created_on=requested_on,
+            updated_on=requested_on,
+        )
+        for order, _, status, requested_on, _ in refunds
+    ]
+
+    models = (Order, Line, Transaction, RedeemedDiscount, Request, RequestLine)
+    with _explicit_timestamps(*models), transaction.atomic():
+        Order.objects.bulk_create(orders)
+        Line.objects.bulk_create(lines)
+        Transaction.objects.bulk_create(transactions)
+        RedeemedDiscount.objects.bulk_create(redemptions)
+        Request.objects.bulk_create(requests)
+
+        request_lines = []
+        request_line_transactions = []
+        for request, (_, order_lines, status, requested_on, refund_transaction) in zip(
+            requests, refunds
+        ):
+            for line in order_lines:
+                request_line = RequestLine(
+                    refund_request_id=request.id,
+                    line_id=line.id,
+                    status=status,
+                    refunded_amount=(
+                        line.discounted_price
+                        if status == REFUND_STATUS_APPROVED_COMPLETE
+                        else Decimal(0)
+                    ),
+                    created_on=requested_on,
+                    updated_on=requested_on,
+                )
+                request_lines.append(request_line)
+                if refund_transaction:
+                    request_line_transactions.append((request_line, refund_transaction))
+
+        RequestLine.objects.bulk_create(request_lines)
+        RequestLine.transactions.through.objects.bulk_create(
+            [
+                RequestLine.transactions.through(
+                    requestline_id=request_line.id,
+                    transaction_id=refund_transaction.id,
+                )
+                for request_line, refund_transaction in request_line_transactions
+            ]
+        )
+
+    return len(orders)
+
+
+class Command(BaseCommand):
+    """Fills the database with large volumes of synthetic data."""
+
+    help = "Fill the database with large volumes of synthetic data."
+
+    def add_arguments(self, parser) -> None:
+        """Add arguments to the command parser."""
+
+        parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+        parser.add_argument(
+            "--prefix",
+            type=str,
+            default="perf",
+            help="Prefix for the generated names. Each prefix can be used once.",
+        )
+        parser.add_argument("--systems", type=int, default=5)
+        parser.add_argument("--products-per-system", type=int, default=200)
+        parser.add_argument(
+            "--versions-per-product",
+            type=int,
+            default=3,
+            help="Reversion versions for each product (i.e. price changes).",
+        )
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--orders", type=int, default=2_000_000)
+        parser.add_argument("--max-lines", type=int, default=3)
+        parser.add_argument("--discount-collections", type=int, default=3)
+        parser.add_argument("--codes-per-collection", type=int, default=100_000)
+        parser.add_argument(
+            "--discount-percent",
+            type=float,
+            default=10,
+            help="Percentage of paid orders that redeem a discount code.",
+        )
+        parser.add_argument(
+            "--refund-request-percent",
+            type=float,
+            default=2,
+            help="Percentage of fulfilled orders with a pending refund request.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Worker processes. Use 1 to do everything in this process.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--allow-non-debug",
+            action="store_true",
+            help="Run even though DEBUG is off. Don't do this in production.",
+        )
+
+    def run_chunks(self, label, func, chunks, workers):
+        """Run the function for each chunk, in worker processes."""
+
+        total = 0
+
+        if workers == 1:
+            for kwargs in chunks:
+                total += func(**kwargs)
+        else:
+            # The workers need their own connections, so don't let them
+            # inherit ours.
+            connections.close_all()
+
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker
+            ) as executor:
+                futures = [executor.submit(func, **kwargs) for kwargs in chunks]
+
+                for future in as_completed(futures):
+                    total += future.result()
+
+        self.stdout.write(f"Created {total} {label}.")
+
+    def chunks(self, count, chunk_size, **kwargs):
+        """Return the keyword arguments for each chunk of the indexes."""
+
+        return [
+            {**kwargs, "start": start, "end": min(start + chunk_size, count)}
+            for start in range(0, count, chunk_size)
+        ]
+
+    def create_catalog(self, options, now) -> dict:
+        """
+        Create the systems and the versioned products.
+
+        Returns a dict of system ID to a list of the versions of each product,
+        as (version ID, price) tuples, oldest first.
+        """
+
+        seed = options["seed"]
+        prefix = options["prefix"]
+        rng = _rng(seed, "catalog")
+        systems = []
+
+        for idx in range(options["systems"]):
+            system = IntegratedSystem(
+                name=f"{prefix} system {idx}",
+                slug=f"{prefix}-system-{idx}",
+                description=f"Synthetic system {idx}",
+                api_key=_uuid(rng),
+            )
+            system.save()
+            systems.append(system)
+
+        products = [
+            Product(
+                sku=f"course-v1:{prefix.upper()}+{system_idx}.{idx:04d}x+1T2026",
+                name=f"Synthetic course {system_idx}.{idx}",
+                description=f"Synthetic course {idx} in {system.slug}.",
+                price=Decimal(rng.randrange(50, 2000)),
+                system=system,
+                system_data={"courserun": f"{system_idx}.{idx:04d}x+1T2026"},
+                created_on=now,
+                updated_on=now,
+            )
+            for system_idx, system in enumerate(systems)
+            for idx in range(options["products_per_system"])
+        ]
+
+        with _explicit_timestamps(Product):
+            Product.objects.bulk_create(products)
+
+        # bulk_create doesn't return IDs on every database, so fetch them.
+        products = list(
+            Product.objects.filter(system__in=systems).order_by("system_id", "sku")
+        )
+
+        for version in range(options["versions_per_product"]):
+            if version:
+                for product in products:
+                    product.price = (
+                        product.price * Decimal(rng.choice(["0.9", "1.1", "1.25"]))
+                    ).quantize(Decimal("0.01"))
+                Product.objects.bulk_update(products, ["price"])
+
+            for start in range(0, len(products), options["chunk_size"]):
+                with transaction.atomic(), reversion.create_revision():
+                    for product in products[start : start + options["chunk_size"]]:
+                        reversion.add_to_revision(product)
+                    reversion.set_comment("Synthetic performance data")
+
+        bump_catalog_generation()
+        self.stdout.write(
+            f"Created {len(systems)} systems and {len(products)} products."
+        )
+
+        product_systems = {product.id: product.system_id for product in products}
+        versions = defaultdict(list)
+
+        for version in (
+            Version.objects.get_for_model(Product)
+            .filter(object_id__in=[str(product_id) for product_id in product_systems])
+            .order_by("id")
+        ):
+            versions[int(version.object_id)].append(
+                (version.id, Decimal(version.field_dict["price"]))
+            )
+
+        products_by_system = defaultdict(list)
+        for product_id, product_versions in versions.items():
+            products_by_system[product_systems[product_id]].append(product_versions)
+
+        return dict(products_by_system)
+
+    def handle(self, **options) -> None:
+        """Generate the data."""
+
+        if not settings.DEBUG and not options["allow_non_debug"]:
+            msg = "DEBUG is off; pass --allow-non-debug if you're sure."
+            raise CommandError(msg)
+
+        prefix = options["prefix"]
+        if IntegratedSystem.all_objects.filter(slug__startswith=f"{prefix}-").exists():
+            msg = f"Data with the prefix {prefix} already exists."
+            raise CommandError(msg)
+
+        seed = options["seed"]
+        workers = max(options["workers"] or 1, 1)
+        chunk_size = options["chunk_size"]
+        now = now_in_utc()
+
+        products_by_system = self.create_catalog(options, now)
+        system_ids = sorted(products_by_system)
+
+        collections = [
+            BulkDiscountCollection.objects.create(prefix=f"{prefix}-{idx}-")
+            for idx in range(options["discount_collections"])
+        ]
+
+        user_base_id = (User.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+        discount_base_id = (Discount.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+        order_base_id = (Order.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+        codes_per_collection = options["codes_per_collection"]
+        discount_count = codes_per_collection * len(collections)
+
+        self.run_chunks(
+            "users",
+            create_users,
+            self.chunks(
+                options["users"],
+                chunk_size,
+                seed=seed,
+                prefix=prefix,
+                base_id=user_base_id,
+                now=now,
+            ),
+            workers,
+        )
+        self.run_chunks(
+            "discount codes",
+            create_discounts,
+            [
+                chunk
+                for idx, collection in enumerate(collections)
+                for chunk in self.chunks(
+                    codes_per_collection,
+                    chunk_size,
+                    seed=seed,
+                    prefix=prefix,
+                    collection=idx,
+                    collection_id=collection.id,
+                    base_id=discount_base_id + idx * codes_per_collection,
+                    system_ids=system_ids,
+                    now=now,
+                )
+            ],
+            workers,
+        )
+        self.run_chunks(
+            "orders",
+            create_orders,
+            self.chunks(
+                options["orders"],
+                chunk_size,
+                seed=seed,
+                base_id=order_base_id,
+                user_base_id=user_base_id,
+                user_count=options["users"],
+                discount_base_id=discount_base_id,
+                discount_count=discount_count,
+                products_by_system=products_by_system,
+                max_lines=options["max_lines"],
+                discount_percent=options["discount_percent"],
+                refund_request_percent=options["refund_request_percent"],
+                now=now,
+            ),
+            workers,
+        )
+
+        # The explicit IDs didn't advance the sequences.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Discount, Order]
+            ):
+                cursor.execute(sql)
+
+        self.stdout.write(self.style.SUCCESS("Done."))
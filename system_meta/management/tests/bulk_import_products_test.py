@@ -0,0 +1,166 @@
+"""Tests for the bulk_import_products command"""
+
+import json
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+import reversion
+from django.core.management import CommandError, call_command
+from reversion.models import Revision
+
+from system_meta.factories import IntegratedSystemFactory, ProductFactory
+from system_meta.models import Product
+from system_meta.resolvers import resolve_product
+
+pytestmark = pytest.mark.django_db
+
+
+def _write_jsonl(path, records):
+    """Write the records to a JSONL file."""
+
+    path.write_text("\n".join(json.dumps(record) for record in records))
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1000])
+def test_bulk_import_jsonl(tmp_path, mock_learn_api_metadata_updater, chunk_size):
+    """Test that products are created in chunks, with one revision per chunk."""
+
+    system = IntegratedSystemFactory.create()
+    records = [
+        {"sku": f"sku-{idx}", "name": f"Product {idx}", "price": "10.50"}
+        for idx in range(5)
+    ]
+    filename = _write_jsonl(tmp_path / "products.jsonl", records)
+
+    out = StringIO()
+    call_command(
+        "bulk_import_products",
+        filename,
+        system=system.slug,
+        chunk_size=chunk_size,
+        stdout=out,
+    )
+
+    assert "Successfully imported 5 products" in out.getvalue()
+    products = Product.objects.filter(system=system)
+    assert products.count() == 5
+    assert {product.price for product in products} == {Decimal("10.50")}
+    assert Revision.objects.count() == -(-5 // chunk_size)
+
+    for product in products:
+        assert reversion.models.Version.objects.get_for_object(product).count() == 1
+
+    delay = mock_learn_api_metadata_updater["update_products_task"]
+    delay.assert_called_once()
+    assert sorted(delay.call_args.kwargs["product_ids"]) == sorted(
+        products.values_list("id", flat=True)
+    )
+
+
+def test_bulk_import_upserts(tmp_path):
+    """Test that existing products are updated and reactivated in place."""
+
+    system = IntegratedSystemFactory.create()
+    existing = ProductFactory.create(system=system, sku="existing", price=5)
+    existing.delete()
+
+    filename = _write_jsonl(
+        tmp_path / "products.jsonl",
+        [
+            {
+                "sku": "existing",
+                "name": "Updated",
+                "price": 20,
+                "system": system.slug,
+            },
+            {"sku": "new", "name": "New", "price": 30, "system": system.slug},
+        ],
+    )
+
+    call_command("bulk_import_products", filename, stdout=StringIO())
+
+    existing = Product.all_objects.get(pk=existing.pk)
+    assert existing.is_active
+    assert existing.name == "Updated"
+    assert existing.price == Decimal(20)
+    assert Product.objects.filter(system=system).count() == 2
+
+
+def test_bulk_import_refreshes_resolver_cache(mocker, tmp_path):
+    """Products resolved before the import should be resolved again after it."""
+
+    publish = mocker.patch(
+        "system_meta.management.commands.bulk_import_products.publish_invalidation"
+    )
+    system = IntegratedSystemFactory.create()
+    existing = ProductFactory.create(system=system, sku="existing", price=5)
+
+    assert resolve_product(system, "existing").price == Decimal(5)
+
+    filename = _write_jsonl(
+        tmp_path / "products.jsonl",
+        [{"sku": "existing", "name": "Updated", "price": 20, "system": system.slug}],
+    )
+    call_command("bulk_import_products", filename, stdout=StringIO())
+
+    resolved = resolve_product(system, "existing")
+    assert resolved.id == existing.id
+    assert resolved.price == Decimal(20)
+    publish.assert_called_once_with()
+
+
+def test_bulk_import_csv(tmp_path):
+    """Test that CSV files are imported, with system_data decoded."""
+
+    system = IntegratedSystemFactory.create()
+    path = tmp_path / "products.csv"
+    path.write_text(
+        "sku,name,price,system,system_data\n"
+        f'csv-sku,CSV Product,12.00,{system.slug},"{{""run"": ""1T2025""}}"\n'
+    )
+
+    call_command("bulk_import_products", str(path), stdout=StringIO())
+
+    product = Product.objects.get(sku="csv-sku", system=system)
+    assert product.system_data == {"run": "1T2025"}
+
+
+@pytest.mark.parametrize("price", [0, "0", "0.00"])
+def test_bulk_import_free_products(tmp_path, price):
+    """Test that products with a price of 0 are imported."""
+
+    system = IntegratedSystemFactory.create()
+    filename = _write_jsonl(
+        tmp_path / "products.jsonl",
+        [{"sku": "free", "name": "Free", "price": price, "system": system.slug}],
+    )
+
+    call_command("bulk_import_products", filename, stdout=StringIO())
+
+    assert Product.objects.get(sku="free", system=system).price == Decimal(0)
+
+
+@pytest.mark.parametrize(
+    ("record", "message"),
+    [
+        ({"sku": "a", "name": "A", "price": 1, "system": "missing"}, "does not exist"),
+        ({"sku": "a", "name": "A", "price": 1}, "no system specified"),
+        ({"sku": "a", "name": "A"}, "missing price"),
+        ({"sku": "a", "name": "A", "price": ""}, "missing price"),
+        ({"sku": "", "name": "A", "price": 1}, "missing sku"),
+    ],
+)
+def test_bulk_import_bad_records(
+    tmp_path, mock_learn_api_metadata_updater, record, message
+):
+    """Test that bad records stop the import with a useful error."""
+
+    filename = _write_jsonl(tmp_path / "products.jsonl", [record])
+
+    with pytest.raises(CommandError, match=message):
+        call_command("bulk_import_products", filename, stdout=StringIO())
+
+    assert not Product.all_objects.exists()
+    mock_learn_api_metadata_updater["update_products_task"].assert_not_called()
@@ -0,0 +1,135 @@
+"""Tests for the generate_performance_data command"""
+
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from reversion.models import Version
+
+from payments.models import (
+    BulkDiscountCollection,
+    Discount,
+    Line,
+    Order,
+    RedeemedDiscount,
+    Transaction,
+)
+from refunds.models import Request
+from system_meta.models import IntegratedSystem, Product
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+def generate(prefix, **kwargs):
+    """Run the command with small counts, in this process."""
+
+    options = {
+        "prefix": prefix,
+        "seed": 42,
+        "systems": 2,
+        "products_per_system": 4,
+        "versions_per_product": 2,
+        "users": 20,
+        "orders": 60,
+        "discount_collections": 2,
+        "codes_per_collection": 5,
+        "discount_percent": 50,
+        "workers": 1,
+        "chunk_size": 7,
+        **kwargs,
+    }
+
+    call_command("generate_performance_data", stdout=StringIO(), **options)
+
+
+@pytest.fixture(autouse=True)
+def _debug(settings):
+    """Turn DEBUG on, which the command requires."""
+
+    settings.DEBUG = True
+
+
+def test_generate_performance_data():
+    """The command should create the requested volumes of data."""
+
+    generate("perf")
+
+    assert IntegratedSystem.objects.filter(slug__startswith="perf-").count() == 2
+    products = Product.objects.filter(system__slug__startswith="perf-")
+    assert products.count() == 8
+    assert (
+        Version.objects.get_for_model(Product)
+        .filter(object_id__in=[str(product.id) for product in products])
+        .count()
+        == 16
+    )
+    assert User.objects.filter(username__startswith="perf-user-").count() == 20
+    assert (
+        BulkDiscountCollection.objects.filter(prefix__startswith="perf-").count() == 2
+    )
+    assert Discount.objects.filter(discount_code__startswith="perf-").count() == 10
+
+    orders = Order.objects.filter(purchaser__username__startswith="perf-user-")
+    assert orders.count() == 60
+    assert not orders.filter(lines__isnull=True).exists()
+    assert {order.reference_number for order in orders} == {
+        order._generate_reference_number()  # noqa: SLF001
+        for order in orders
+    }
+
+    paid = orders.filter(state__in=[Order.STATE.FULFILLED, Order.STATE.REFUNDED])
+    assert Transaction.objects.filter(order__in=paid).count() >= paid.count()
+    assert not Transaction.objects.exclude(order__in=paid).exists()
+    assert RedeemedDiscount.objects.filter(order__in=paid).exists()
+
+    for refund in Request.objects.filter(order__state=Order.STATE.REFUNDED):
+        assert refund.total_refunded == refund.order.total_price_paid
+        assert refund.lines.filter(transactions__isnull=False).exists()
+
+    for order in orders[:10]:
+        assert order.total_price_paid == sum(
+            line.discounted_price for line in Line.objects.filter(order=order)
+        )
+
+    # The orders should be spread over the history, not all created today.
+    assert len({order.created_on.date() for order in orders}) > 1
+
+
+def test_generate_performance_data_is_deterministic():
+    """The same seed should generate the same data, whatever the prefix."""
+
+    def summary(prefix):
+        return [
+            (order.state, order.total_price_paid, order.lines.count())
+            for order in Order.objects.filter(
+                purchaser__username__startswith=f"{prefix}-user-"
+            ).order_by("id")
+        ]
+
+    generate("first")
+    generate("second")
+
+    assert summary("first") == summary("second")
+
+
+def test_generate_performance_data_prefix_in_use():
+    """Each prefix should only be usable once."""
+
+    generate("perf", users=1, orders=1)
+
+    with pytest.raises(CommandError, match="already exists"):
+        generate("perf", users=1, orders=1)
+
+
+def test_generate_performance_data_requires_debug(settings):
+    """The command shouldn't run with DEBUG off unless it's forced to."""
+
+    settings.DEBUG = False
+
+    with pytest.raises(CommandError, match="DEBUG is off"):
+        generate("perf")
+
+    generate("perf", allow_non_debug=True, users=1, orders=1)
@@ -0,0 +1,177 @@
+"""
+Process-local lookup cache for integrated systems and products.
+
+Most requests start by resolving a system slug (and often a SKU) to a model
+instance. Those rows almost never change, so they're cached in process memory
+here rather than queried on every request.
+
+Only active objects are cached, since lookups go through the safedelete
+managers; a missing or soft-deleted object raises DoesNotExist as the ORM
+would, and that result isn't cached.
+
+Invalidation:
+- Saving or deleting a system or product (soft deletes go through save())
+  clears the cache in the current process via the signal handlers.
+- If MITOL_UE_RESOLVER_PUBSUB_CACHE_NAME names a django-redis cache (it's
+  "redis" by default), the handlers also publish a message on commit. Each
+  process runs a listener thread that clears its cache when a message
+  arrives, so all the web workers see the change.
+- Entries expire after MITOL_UE_RESOLVER_CACHE_TTL seconds regardless, which
+  bounds staleness if a message is missed.
+"""
+
+import copy
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from system_meta.models import IntegratedSystem, Product
+
+log = logging.getLogger(__name__)
+
+RESOLVER_INVALIDATION_CHANNEL = "system_meta:resolver_invalidate"
+LISTENER_RETRY_SECONDS = 5
+
+_lock = threading.Lock()
+_entries = {}
+_generation = 0
+_listener_pid = None
+
+
+def _get_redis_connection():
+    """Return a Redis connection for pub/sub, or None if it's not configured."""
+
+    cache_name = settings.MITOL_UE_RESOLVER_PUBSUB_CACHE_NAME
+
+    if not cache_name:
+        return None
+
+    from django_redis import get_redis_connection
+
+    return get_redis_connection(cache_name)
+
+
+def clear_resolver_cache() -> None:
+    """Clear the cache for this process."""
+
+    global _generation  # noqa: PLW0603
+
+    with _lock:
+        _entries.clear()
+        _generation += 1
+
+
+def _listen_for_invalidations():
+    """Clear the cache whenever an invalidation message is published."""
+
+    while True:
+        try:
+            pubsub = _get_redis_connection().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(RESOLVER_INVALIDATION_CHANNEL)
+            # Anything could have changed while we weren't subscribed.
+            clear_resolver_cache()
+
+            for _ in pubsub.listen():
+                clear_resolver_cache()
+        except Exception:
+            log.exception("Resolver cache invalidation listener failed, retrying")
+
+        clear_resolver_cache()
+        time.sleep(LISTENER_RETRY_SECONDS)
+
+
+def _ensure_listener():
+    """
+    Start the invalidation listener for this process if it isn't running.
+
+    This is checked against the PID so that forked workers start their own
+    listener rather than relying on a thread that didn't survive the fork.
+    """
+
+    global _listener_pid  # noqa: PLW0603
+
+    if _listener_pid == os.getpid() or not settings.MITOL_UE_RESOLVER_PUBSUB_CACHE_NAME:
+        return
+
+    with _lock:
+        if _listener_pid == os.getpid():
+            return
+
+        _entries.clear()
+        _listener_pid = os.getpid()
+
+    threading.Thread(
+        target=_listen_for_invalidations,
+        name="resolver-cache-invalidation",
+        daemon=True,
+    ).start()
+
+
+def publish_invalidation() -> None:
+    """Tell the other processes to clear their caches."""
+
+    try:
+        connection = _get_redis_connection()
+
+        if connection is not None:
+            connection.publish(RESOLVER_INVALIDATION_CHANNEL, "1")
+    except Exception:
+        log.exception("Couldn't publish resolver cache invalidation")
+
+
+def _resolve(key, loader):
+    """
+    Return a copy of the cached object for the key, loading it if needed.
+
+    Deep copies are returned so callers can't change the cached instance, or
+    the related objects cached with it (e.g. a product's system).
+    """
+
+    _ensure_listener()
+    now = time.monotonic()
+
+    with _lock:
+        entry = _entries.get(key)
+        generation = _generation
+
+    if entry is not None and entry[0] > now:
+        return copy.deepcopy(entry[1])
+
+    instance = loader()
+
+    with _lock:
+        # Don't cache if the cache was cleared while we were loading - the
+        # instance may predate the change that cleared it.
+        if generation == _generation:
+            _entries[key] = (now + settings.MITOL_UE_RESOLVER_CACHE_TTL, instance)
+
+    return copy.deepcopy(instance)
+
+
+def resolve_system(slug: str) -> IntegratedSystem:
+    """
+    Return the active integrated system with the given slug.
+
+    Raises IntegratedSystem.DoesNotExist if there isn't one.
+    """
+
+    return _resolve(
+        ("system", slug),
+        lambda: IntegratedSystem.objects.get(slug=slug),
+    )
+
+
+def resolve_product(system: IntegratedSystem, sku: str) -> Product:
+    """
+    Return the active product with the given SKU in the given system.
+
+    Raises Product.DoesNotExist if there isn't one.
+    """
+
+    return _resolve(
+        ("product", system.id, sku),
+        lambda: Product.objects.select_related("system").get(system=system, sku=sku),
+    )
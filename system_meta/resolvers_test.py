@@ -0,0 +1,116 @@
+"""Tests for the system and product resolvers."""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from system_meta.factories import ActiveIntegratedSystemFactory, ProductFactory
+from system_meta.models import IntegratedSystem, Product
+from system_meta.resolvers import (
+    RESOLVER_INVALIDATION_CHANNEL,
+    publish_invalidation,
+    resolve_product,
+    resolve_system,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def test_resolve_system_is_cached():
+    """Resolving a system a second time shouldn't hit the database."""
+
+    system = ActiveIntegratedSystemFactory.create()
+
+    assert resolve_system(system.slug) == system
+
+    with CaptureQueriesContext(connection) as queries:
+        resolved = resolve_system(system.slug)
+
+    assert resolved == system
+    assert len(queries) == 0
+
+
+def test_resolve_product_is_cached():
+    """Resolving a product a second time shouldn't hit the database."""
+
+    product = ProductFactory.create()
+
+    assert resolve_product(product.system, product.sku) == product
+
+    with CaptureQueriesContext(connection) as queries:
+        resolved = resolve_product(product.system, product.sku)
+        assert resolved.system == product.system
+
+    assert resolved == product
+    assert len(queries) == 0
+
+
+def test_resolved_objects_are_copies():
+    """Changing a resolved object shouldn't change the cached one."""
+
+    system = ActiveIntegratedSystemFactory.create()
+
+    resolve_system(system.slug).name = "Changed"
+
+    assert resolve_system(system.slug).name == system.name
+
+
+def test_resolved_related_objects_are_copies():
+    """Changing a resolved product's system shouldn't change the cached one."""
+
+    product = ProductFactory.create()
+
+    resolve_product(product.system, product.sku).system.name = "Changed"
+
+    assert resolve_product(product.system, product.sku).system.name == (
+        product.system.name
+    )
+
+
+def test_resolve_updates_on_change():
+    """Saving a product or system should clear the cache."""
+
+    product = ProductFactory.create()
+    resolve_product(product.system, product.sku)
+
+    product.name = "New name"
+    product.save()
+
+    assert resolve_product(product.system, product.sku).name == "New name"
+
+
+@pytest.mark.parametrize("deleted_model", ["system", "product"])
+def test_resolve_respects_soft_delete(deleted_model):
+    """Soft-deleted objects shouldn't resolve, even if they were cached."""
+
+    product = ProductFactory.create()
+    system = product.system
+    resolve_system(system.slug)
+    resolve_product(system, product.sku)
+
+    if deleted_model == "system":
+        system.delete()
+
+        with pytest.raises(IntegratedSystem.DoesNotExist):
+            resolve_system(system.slug)
+    else:
+        product.delete()
+
+        with pytest.raises(Product.DoesNotExist):
+            resolve_product(system, product.sku)
+
+
+def test_publish_invalidation(settings, mocker):
+    """Invalidations should be published if pub/sub is configured."""
+
+    redis_connection = mocker.Mock()
+    mocker.patch("django_redis.get_redis_connection", return_value=redis_connection)
+    settings.MITOL_UE_RESOLVER_PUBSUB_CACHE_NAME = ""
+
+    publish_invalidation()
+    redis_connection.publish.assert_not_called()
+
+    settings.MITOL_UE_RESOLVER_PUBSUB_CACHE_NAME = "redis"
+
+    publish_invalidation()
+    redis_connection.publish.assert_called_once_with(RESOLVER_INVALIDATION_CHANNEL, "1")
@@ -0,0 +1,77 @@
+"""Signal handlers for the system_meta app."""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from system_meta.caching import (
+    bump_catalog_generation,
+    invalidate_integrated_system_api_key,
+)
+from system_meta.models import IntegratedSystem, IntegratedSystemAPIKey, Product
+from system_meta.resolvers import clear_resolver_cache, publish_invalidation
+
+
+@receiver(post_save, sender=IntegratedSystem)
+@receiver(post_delete, sender=IntegratedSystem)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog(sender, instance, **kwargs):  # noqa: ARG001
+    """
+    Bump the catalog generation when a system or product changes.
+
+    Soft deletes and undeletes go through save(), so post_save covers them.
+
+    This bumps once now and again when the transaction commits. The second bump
+    covers a reader that cached the old data between the first bump and the
+    commit.
+    """
+
+    bump_catalog_generation()
+    transaction.on_commit(bump_catalog_generation)
+
+
+@receiver(post_save, sender=IntegratedSystem)
+@receiver(post_delete, sender=IntegratedSystem)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_resolvers(sender, instance, **kwargs):  # noqa: ARG001
+    """
+    Clear the system/product resolver caches when a system or product changes.
+
+    The local cache is cleared now and again on commit, like the catalog
+    generation. The other processes are told on commit.
+    """
+
+    clear_resolver_cache()
+    transaction.on_commit(clear_resolver_cache)
+    transaction.on_commit(publish_invalidation)
+
+
+@receiver(post_save, sender=IntegratedSystemAPIKey)
+@receiver(post_delete, sender=IntegratedSystemAPIKey)
+def invalidate_api_key(sender, instance, **kwargs):  # noqa: ARG001
+    """Drop the cached verification when an API key is changed or revoked."""
+
+    invalidate_integrated_system_api_key(instance.prefix)
+    transaction.on_commit(lambda: invalidate_integrated_system_api_key(instance.prefix))
+
+
+@receiver(post_save, sender=IntegratedSystem)
+@receiver(post_delete, sender=IntegratedSystem)
+def invalidate_system_api_keys(sender, instance, **kwargs):  # noqa: ARG001
+    """
+    Drop the cached verifications for the system's API keys.
+
+    The cached verification includes the system, so it needs to be refreshed
+    when the system changes.
+    """
+
+    prefixes = list(
+        IntegratedSystemAPIKey.objects.filter(integrated_system=instance).values_list(
+            "prefix", flat=True
+        )
+    )
+
+    for prefix in prefixes:
+        invalidate_integrated_system_api_key(prefix)
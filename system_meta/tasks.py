@@ -8,14 +8,17 @@ from celery import shared_task
 
 
 @shared_task
-def update_products(product_id: Optional[int] = None):
+def update_products(
+    product_id: Optional[int] = None, product_ids: Optional[list[int]] = None
+):
     """
     Update product metadata from the Learn API.
 
-    Updates all products if a product_id is not provided. Pulls the image metadata,
-    name, and description from the Learn API. If the product has a run ID, it also
-    pulls the price from the specific run; otherwise, pulls the price from the
-    resource.
+    Updates all products if neither a product_id nor a list of product_ids is
+    provided. Bulk imports pass product_ids so a whole batch is refreshed by a
+    single task. Pulls the image metadata, name, and description from the Learn
+    API. If the product has a run ID, it also pulls the price from the specific
+    run; otherwise, pulls the price from the resource.
     """
     from system_meta.api import update_product_metadata
     from system_meta.models import Product
@@ -23,6 +26,8 @@ def update_products(product_id: Optional[int] = None):
     log = logging.getLogger(__name__)
     if product_id:
         products = Product.objects.filter(id=product_id)
+    elif product_ids:
+        products = Product.objects.filter(id__in=product_ids)
     else:
         products = Product.objects.all()
 
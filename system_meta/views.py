@@ -2,8 +2,10 @@
 
 import logging
 
+from adrf.decorators import api_view as async_api_view
+from asgiref.sync import sync_to_async
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, extend_schema_view
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.decorators import (
@@ -13,25 +15,34 @@ from rest_framework.decorators import (
     throttle_classes,
 )
 from rest_framework.response import Response
-from rest_framework.throttling import AnonRateThrottle
 
-from system_meta.api import get_product_metadata
+from system_meta.api import aget_product_metadata
+from system_meta.caching import CatalogCacheMixin
 from system_meta.models import IntegratedSystem, Product
+from system_meta.resolvers import resolve_product, resolve_system
 from system_meta.serializers import (
     AdminIntegratedSystemSerializer,
     IntegratedSystemSerializer,
     ProductSerializer,
 )
+from unified_ecommerce.db_routing import ReplicaReadMixin
 from unified_ecommerce.permissions import (
     IsAdminUserOrReadOnly,
 )
+from unified_ecommerce.throttling import AnonTokenBucketThrottle
 from unified_ecommerce.utils import decode_x_header
 from unified_ecommerce.viewsets import AuthVariegatedModelViewSet
 
 log = logging.getLogger(__name__)
 
 
-class IntegratedSystemViewSet(AuthVariegatedModelViewSet):
+@extend_schema_view(
+    list=extend_schema(description="Viewset for IntegratedSystem model."),
+    retrieve=extend_schema(description="Viewset for IntegratedSystem model."),
+)
+class IntegratedSystemViewSet(
+    ReplicaReadMixin, CatalogCacheMixin, AuthVariegatedModelViewSet
+):
     """Viewset for IntegratedSystem model."""
 
     queryset = IntegratedSystem.objects.all()
@@ -42,7 +53,11 @@ class IntegratedSystemViewSet(AuthVariegatedModelViewSet):
     ]
 
 
-class ProductViewSet(AuthVariegatedModelViewSet):
+@extend_schema_view(
+    list=extend_schema(description="Viewset for Product model."),
+    retrieve=extend_schema(description="Viewset for Product model."),
+)
+class ProductViewSet(ReplicaReadMixin, CatalogCacheMixin, AuthVariegatedModelViewSet):
     """Viewset for Product model."""
 
     queryset = Product.objects.all()
@@ -61,6 +76,13 @@ class ProductViewSet(AuthVariegatedModelViewSet):
     ]
 
 
+@sync_to_async
+def _aserialize_product(product: Product) -> dict:
+    """Serialize the product, outside the event loop."""
+
+    return ProductSerializer(product).data
+
+
 @extend_schema(
     description=(
         "Pre-loads the product metadata for a given SKU, even if the "
@@ -70,15 +92,15 @@ class ProductViewSet(AuthVariegatedModelViewSet):
     request=None,
     responses=ProductSerializer,
 )
-@api_view(["GET"])
+@async_api_view(["GET"])
 @permission_classes([])
 @authentication_classes([SessionAuthentication])
 @throttle_classes(
     [
-        AnonRateThrottle,
+        AnonTokenBucketThrottle,
     ]
 )
-def preload_sku(request, system_slug, sku):  # noqa: ARG001
+async def preload_sku(request, system_slug, sku):  # noqa: ARG001
     """
     Preload the SKU for the product.
 
@@ -95,38 +117,43 @@ def preload_sku(request, system_slug, sku):  # noqa: ARG001
     This is throttled for unauthenticated users to prevent abuse - this is
     pretty likely to spawn a request to the Learn API, so we don't want to kill
     it by accident.
+
+    This is an async view, so under ASGI the Learn API call doesn't hold a
+    worker thread while it waits.
     """
 
-    if not IntegratedSystem.objects.filter(slug=system_slug).exists():
+    try:
+        system = await sync_to_async(resolve_system)(system_slug)
+    except IntegratedSystem.DoesNotExist:
         return Response(
             {"error": "System not found"},
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    existing_product = Product.objects.filter(sku=sku, system__slug=system_slug)
-
-    if existing_product.exists():
-        return Response(ProductSerializer(existing_product.first()).data)
+    try:
+        product = await sync_to_async(resolve_product)(system, sku)
+        return Response(await _aserialize_product(product))
+    except Product.DoesNotExist:
+        pass
 
-    product_metadata = get_product_metadata(system_slug, sku)
+    product_metadata = await aget_product_metadata(system_slug, sku)
     if not product_metadata:
         return Response(
             {"error": "Resource not found"},
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    product = Product.objects.create(
+    product = await Product.objects.acreate(
         name=product_metadata.get("title"),
         sku=product_metadata.get("sku"),
         description=product_metadata.get("description"),
         price=product_metadata.get("price"),
-        system=IntegratedSystem.objects.get(slug=system_slug),
+        system=system,
         details_url=product_metadata.get("url"),
     )
-    product.save()
-    product.refresh_from_db()
+    await product.arefresh_from_db()
 
-    return Response(ProductSerializer(product).data)
+    return Response(await _aserialize_product(product))
 
 
 @api_view(["GET"])
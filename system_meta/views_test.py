@@ -15,7 +15,7 @@ from system_meta.serializers import (
     IntegratedSystemSerializer,
     ProductSerializer,
 )
-from system_meta.views import IntegratedSystemViewSet, ProductViewSet
+from system_meta.views import IntegratedSystemViewSet, ProductViewSet, preload_sku
 from unified_ecommerce.test_utils import AuthVariegatedModelViewSetTest
 
 pytestmark = pytest.mark.django_db
@@ -386,3 +386,68 @@ class TestProductViewSet(AuthVariegatedModelViewSetTest):
             assert Product.objects.filter(name="New Name").exists() is not with_bad_data
         else:
             assert response.status_code == 403
+
+
+def test_preload_sku_is_async():
+    """The preload view should be served as a native async view."""
+
+    assert preload_sku.cls.view_is_async
+
+
+def test_preload_sku_existing_product(mocker, client):
+    """Preloading a SKU we have should return it without calling Learn."""
+
+    mocked_metadata = mocker.patch("system_meta.views.aget_product_metadata")
+    product = ActiveProductFactory.create()
+
+    response = client.get(
+        f"/api/v0/meta/product/preload/{product.system.slug}/{product.sku}/"
+    )
+
+    assert response.status_code == 200
+    assert response.json() == ProductSerializer(product).data
+    mocked_metadata.assert_not_called()
+
+
+@pytest.mark.parametrize("found", [True, False])
+def test_preload_sku_new_product(mocker, client, found):
+    """Preloading a new SKU should create the product from the Learn data."""
+
+    system = ActiveIntegratedSystemFactory.create()
+    mocker.patch("system_meta.models.update_products.delay")
+    mocked_metadata = mocker.patch(
+        "system_meta.views.aget_product_metadata",
+        return_value={
+            "sku": "course-v1:MITx+1.234x+1T2099",
+            "title": "Example title",
+            "description": "Example description",
+            "price": 150,
+            "url": "https://example.com/course",
+        }
+        if found
+        else None,
+    )
+
+    response = client.get(
+        f"/api/v0/meta/product/preload/{system.slug}/course-v1:MITx+1.234x+1T2099/"
+    )
+
+    mocked_metadata.assert_awaited_once_with(
+        system.slug, "course-v1:MITx+1.234x+1T2099"
+    )
+    if found:
+        assert response.status_code == 200
+        product = Product.objects.get(system=system)
+        assert response.json() == ProductSerializer(product).data
+        assert product.name == "Example title"
+    else:
+        assert response.status_code == 404
+        assert not Product.objects.filter(system=system).exists()
+
+
+def test_preload_sku_unknown_system(client):
+    """Preloading for a system that doesn't exist should 404."""
+
+    response = client.get("/api/v0/meta/product/preload/nowhere/some-sku/")
+
+    assert response.status_code == 404
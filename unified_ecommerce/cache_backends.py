@@ -0,0 +1,343 @@
+"""
+Two-tier cache backend: an in-process cache in front of a shared one.
+
+Reads are served from the in-process (L1) cache when they can be, so hot keys
+don't cost a network round trip each time. Misses go to the shared (L2) cache
+- normally the "redis" cache - and the result is kept in L1 for a short time.
+Writes go to both.
+
+Each process has its own L1, so when a process changes a key it publishes the
+key on a Redis pub/sub channel, and the other processes drop their L1 copy.
+The L1 timeout bounds how stale a copy can get if a message is missed. If the
+L2 cache isn't a django-redis cache, there's no broadcast, and the L1 timeout
+is the only bound.
+
+get_or_set() only lets one caller recompute a missing value at a time, across
+all the processes: the others wait for it to be stored (up to the lock
+timeout) rather than stampeding whatever the value is computed from.
+
+Configure it like this (LOCATION is the name of the L2 cache):
+
+    "tiered": {
+        "BACKEND": "unified_ecommerce.cache_backends.TieredCache",
+        "LOCATION": "redis",
+        "OPTIONS": {"L1_TIMEOUT": 30, "L1_MAX_ENTRIES": 1000},
+    }
+
+Keys are made as usual, with this backend's KEY_PREFIX and version, so
+incr_version() and friends work. L1 uses those keys as they are; L2 is passed
+them like any other key, so its own KEY_PREFIX and version are added on top.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+log = logging.getLogger(__name__)
+
+DEFAULT_L1_TIMEOUT = 30
+DEFAULT_L1_MAX_ENTRIES = 1000
+DEFAULT_LOCK_TIMEOUT = 10
+LOCK_POLL_SECONDS = 0.05
+LISTENER_RETRY_SECONDS = 5
+INVALIDATE_ALL = "*"
+
+_MISSING = object()
+
+# Django makes a cache instance per thread, but L1 (a LocMemCache, which
+# shares its storage by name) and the listener are per process.
+_listener_lock = threading.Lock()
+_listener_pids = {}
+_process_token = (None, None)
+
+
+def _get_process_token() -> str:
+    """
+    Return the token that identifies this process's messages.
+
+    This is regenerated after a fork, so workers don't ignore each other.
+    """
+
+    global _process_token  # noqa: PLW0603
+
+    pid, token = _process_token
+    if pid != os.getpid():
+        _process_token = (os.getpid(), uuid.uuid4().hex)
+        pid, token = _process_token
+
+    return token
+
+
+def _raw_key(key, key_prefix, version):  # noqa: ARG001
+    """Use the key as is - it's already been made by the tiered cache."""
+
+    return key
+
+
+class TieredCache(BaseCache):
+    """An in-process cache in front of a shared cache."""
+
+    def __init__(self, location, params):
+        """Set up the cache. The location is the name of the L2 cache."""
+
+        super().__init__(params)
+
+        options = params.get("OPTIONS", {})
+        self._l2_name = location
+        self._l1_timeout = options.get("L1_TIMEOUT", DEFAULT_L1_TIMEOUT)
+        self._lock_timeout = options.get("LOCK_TIMEOUT", DEFAULT_LOCK_TIMEOUT)
+        self._channel = options.get("CHANNEL", f"cache:tiered:{location}")
+        self._l1 = LocMemCache(
+            f"tiered:{location}",
+            {
+                "TIMEOUT": self._l1_timeout,
+                "KEY_FUNCTION": _raw_key,
+                "OPTIONS": {
+                    "MAX_ENTRIES": options.get(
+                        "L1_MAX_ENTRIES", DEFAULT_L1_MAX_ENTRIES
+                    ),
+                },
+            },
+        )
+
+    @property
+    def _l2(self):
+        """Return the L2 cache."""
+
+        return caches[self._l2_name]
+
+    def _get_redis_connection(self):
+        """Return a Redis connection for pub/sub, or None if L2 isn't Redis."""
+
+        if not hasattr(self._l2, "client"):
+            # Not a django-redis cache.
+            return None
+
+        from django_redis import get_redis_connection
+
+        return get_redis_connection(self._l2_name)
+
+    def _l2_timeout(self, timeout):
+        """Return the timeout to use in L2."""
+
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _l1_set(self, key, value, timeout):
+        """Keep the value in L1, for no longer than the L1 timeout."""
+
+        timeout = self._l2_timeout(timeout)
+        if timeout is None or timeout > self._l1_timeout:
+            timeout = self._l1_timeout
+
+        if timeout > 0:
+            self._l1.set(key, value, timeout=timeout)
+        else:
+            self._l1.delete(key)
+
+    def _ensure_listener(self):
+        """
+        Start the invalidation listener for this process if it isn't running.
+
+        As with the resolver cache, this is checked against the PID so forked
+        workers start their own listener.
+        """
+
+        if _listener_pids.get(self._channel) == os.getpid():
+            return
+
+        with _listener_lock:
+            if _listener_pids.get(self._channel) == os.getpid():
+                return
+
+            self._l1.clear()
+            _listener_pids[self._channel] = os.getpid()
+
+        if self._get_redis_connection() is None:
+            return
+
+        threading.Thread(
+            target=self._listen_for_invalidations,
+            name=f"tiered-cache-invalidation-{self._l2_name}",
+            daemon=True,
+        ).start()
+
+    def _listen_for_invalidations(self):
+        """Drop L1 entries whenever another process changes them."""
+
+        while True:
+            try:
+                pubsub = self._get_redis_connection().pubsub(
+                    ignore_subscribe_messages=True
+                )
+                pubsub.subscribe(self._channel)
+                # Anything could have changed while we weren't subscribed.
+                self._l1.clear()
+
+                for message in pubsub.listen():
+                    self.handle_invalidation(message["data"])
+            except Exception:
+                log.exception("Tiered cache invalidation listener failed, retrying")
+
+            self._l1.clear()
+            time.sleep(LISTENER_RETRY_SECONDS)
+
+    def handle_invalidation(self, data):
+        """Handle an invalidation message from another process."""
+
+        if isinstance(data, bytes):
+            data = data.decode()
+
+        token, _, key = data.partition(":")
+
+        if token == _get_process_token():
+            return
+
+        if key == INVALIDATE_ALL:
+            self._l1.clear()
+        else:
+            self._l1.delete(key)
+
+    def _publish_invalidation(self, key):
+        """Tell the other processes to drop the key from their L1."""
+
+        try:
+            connection = self._get_redis_connection()
+
+            if connection is not None:
+                connection.publish(self._channel, f"{_get_process_token()}:{key}")
+        except Exception:
+            log.exception("Couldn't publish tiered cache invalidation")
+
+    def get(self, key, default=None, version=None):
+        """Get the value, from L1 if it's there."""
+
+        self._ensure_listener()
+        key = self.make_and_validate_key(key, version=version)
+
+        value = self._l1.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        value = self._l2.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+
+        self._l1_set(key, value, DEFAULT_TIMEOUT)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Set the value in both tiers, and invalidate it elsewhere."""
+
+        self._ensure_listener()
+        key = self.make_and_validate_key(key, version=version)
+
+        self._l2.set(key, value, timeout=self._l2_timeout(timeout))
+        self._l1_set(key, value, timeout)
+        self._publish_invalidation(key)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Set the value if the key isn't in L2 already."""
+
+        self._ensure_listener()
+        key = self.make_and_validate_key(key, version=version)
+
+        added = self._l2.add(key, value, timeout=self._l2_timeout(timeout))
+
+        if added:
+            self._l1_set(key, value, timeout)
+            self._publish_invalidation(key)
+
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        """Update the key's timeout in L2."""
+
+        key = self.make_and_validate_key(key, version=version)
+        return self._l2.touch(key, timeout=self._l2_timeout(timeout))
+
+    def delete(self, key, version=None):
+        """Delete the key from both tiers, and everywhere else."""
+
+        self._ensure_listener()
+        key = self.make_and_validate_key(key, version=version)
+
+        self._l1.delete(key)
+        deleted = self._l2.delete(key)
+        self._publish_invalidation(key)
+
+        return deleted
+
+    def has_key(self, key, version=None):
+        """Return True if the key is in either tier."""
+
+        key = self.make_and_validate_key(key, version=version)
+        return self._l1.has_key(key) or self._l2.has_key(key)
+
+    def incr(self, key, delta=1, version=None):
+        """Increment the value in L2, and invalidate it everywhere else."""
+
+        self._ensure_listener()
+        key = self.make_and_validate_key(key, version=version)
+
+        value = self._l2.incr(key, delta)
+        self._l1_set(key, value, DEFAULT_TIMEOUT)
+        self._publish_invalidation(key)
+
+        return value
+
+    def clear(self):
+        """Clear both tiers, and every other process's L1."""
+
+        self._l1.clear()
+        self._l2.clear()
+        self._publish_invalidation(INVALIDATE_ALL)
+
+    def close(self, **kwargs):
+        """Close the L2 connection."""
+
+        self._l2.close(**kwargs)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Get the value, or compute and set it if it's missing.
+
+        Only one caller computes the value at a time: the others wait for it
+        (polling L2) until the lock times out, and only then compute it too.
+        """
+
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+
+        lock_key = self.make_and_validate_key(f"{key}:single-flight", version=version)
+
+        if self._l2.add(lock_key, _get_process_token(), timeout=self._lock_timeout):
+            try:
+                value = default() if callable(default) else default
+                self.set(key, value, timeout=timeout, version=version)
+                return value
+            finally:
+                self._l2.delete(lock_key)
+
+        deadline = time.monotonic() + self._lock_timeout
+        full_key = self.make_and_validate_key(key, version=version)
+
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            value = self._l2.get(full_key, _MISSING)
+
+            if value is not _MISSING:
+                self._l1_set(full_key, value, timeout)
+                return value
+
+        log.warning("Timed out waiting for %s to be computed", key)
+        value = default() if callable(default) else default
+        self.set(key, value, timeout=timeout, version=version)
+
+        return value
@@ -0,0 +1,169 @@
+"""Tests for the tiered cache backend."""
+
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from django.core.cache import caches
+
+from unified_ecommerce.cache_backends import TieredCache, _get_process_token
+
+
+@pytest.fixture()
+def l2():
+    """Return the L2 cache, cleared."""
+
+    l2 = caches["default"]
+    l2.clear()
+    yield l2
+    l2.clear()
+
+
+@pytest.fixture()
+def tiered(l2):
+    """Return a tiered cache in front of the default cache, with L1 cleared."""
+
+    cache = TieredCache("default", {"OPTIONS": {"L1_TIMEOUT": 30, "LOCK_TIMEOUT": 0.5}})
+    cache._l1.clear()  # noqa: SLF001
+    return cache
+
+
+def test_get_and_set(tiered, l2):
+    """Values should be set in both tiers, and read from L1 first."""
+
+    tiered.set("key", {"value": 1})
+
+    assert tiered.get("key") == {"value": 1}
+    assert l2.get(tiered.make_key("key")) == {"value": 1}
+
+    # Behind the tiered cache's back, so L1 doesn't know.
+    l2.delete(tiered.make_key("key"))
+    assert tiered.get("key") == {"value": 1}
+
+    tiered.delete("key")
+    assert tiered.get("key", "missing") == "missing"
+
+
+def test_l1_populated_from_l2(tiered, l2):
+    """Values found in L2 should be kept in L1."""
+
+    l2.set(tiered.make_key("key"), "value")
+
+    assert tiered.get("key") == "value"
+
+    l2.delete(tiered.make_key("key"))
+    assert tiered.get("key") == "value"
+
+
+def test_l1_timeout(freezer, tiered, l2):
+    """L1 copies should expire after the L1 timeout, even if L2's haven't."""
+
+    tiered.set("key", "value", timeout=None)
+    tiered.set("short", "value", timeout=5)
+
+    freezer.tick(timedelta(seconds=10))
+    l2.set(tiered.make_key("key"), "changed")
+    assert tiered.get("key") == "value"
+    assert tiered.get("short") is None
+
+    freezer.tick(timedelta(seconds=30))
+    assert tiered.get("key") == "changed"
+
+
+def test_versioned_keys(tiered):
+    """Versions should work as they do for the other backends."""
+
+    tiered.set("key", "one")
+    tiered.set("key", "two", version=2)
+
+    assert tiered.get("key") == "one"
+    assert tiered.get("key", version=2) == "two"
+
+    tiered.incr_version("key", delta=2)
+    assert tiered.get("key") is None
+    assert tiered.get("key", version=3) == "one"
+
+
+def test_add_and_incr(tiered):
+    """add() should only set missing keys, and incr() should increment."""
+
+    assert tiered.add("counter", 1)
+    assert not tiered.add("counter", 5)
+    assert tiered.incr("counter", 2) == 3
+    assert tiered.get("counter") == 3
+    assert tiered.has_key("counter")
+
+
+def test_publishes_invalidations(mocker, tiered):
+    """Changes should be published for the other processes."""
+
+    connection = mocker.Mock()
+    mocker.patch.object(tiered, "_get_redis_connection", return_value=connection)
+    mocker.patch.object(tiered, "_ensure_listener")
+
+    tiered.set("key", "value")
+    tiered.delete("key")
+    tiered.clear()
+
+    key = tiered.make_key("key")
+    token = _get_process_token()
+    assert [call.args for call in connection.publish.call_args_list] == [
+        ("cache:tiered:default", f"{token}:{key}"),
+        ("cache:tiered:default", f"{token}:{key}"),
+        ("cache:tiered:default", f"{token}:*"),
+    ]
+
+
+def test_handle_invalidation(tiered, l2):
+    """Messages from other processes should drop the L1 copies."""
+
+    tiered.set("key", "value")
+    tiered.set("other", "value")
+    l2.clear()
+    key = tiered.make_key("key")
+
+    tiered.handle_invalidation(f"{_get_process_token()}:{key}".encode())
+    assert tiered.get("key") == "value"
+
+    tiered.handle_invalidation(f"someone-else:{key}".encode())
+    assert tiered.get("key") is None
+    assert tiered.get("other") == "value"
+
+    tiered.handle_invalidation(b"someone-else:*")
+    assert tiered.get("other") is None
+
+
+def test_get_or_set_single_flight(tiered):
+    """Only one caller should compute a missing value."""
+
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(tiered.get_or_set("k", compute)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert tiered.get_or_set("k", compute) == "value"
+    assert len(calls) == 1
+
+
+def test_get_or_set_lock_timeout(tiered, l2):
+    """If the lock holder never stores the value, waiters compute it."""
+
+    l2.add(tiered.make_key("k:single-flight"), "someone-else")
+
+    assert tiered.get_or_set("k", lambda: "value") == "value"
+    assert tiered.get("k") == "value"
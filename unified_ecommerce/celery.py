@@ -7,6 +7,12 @@ http://celery.readthedocs.org/en/latest/django/first-steps-with-django.html
 import os
 
 from celery import Celery
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_process_shutdown,
+)
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unified_ecommerce.settings")
 
@@ -14,7 +20,58 @@ from django.conf import settings
 
 app = Celery("unified_ecommerce")
 app.config_from_object("django.conf:settings", namespace="CELERY")
-app.conf.task_default_queue = "default"
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)  # pragma: no cover
 
-app.conf.task_routes = {}
+
+@task_prerun.connect
+def _start_task_query_count(**kwargs):
+    """Count the queries made by each task."""
+
+    from unified_ecommerce.query_metrics import start_task_query_count
+
+    start_task_query_count(**kwargs)
+
+
+@before_task_publish.connect
+def _add_published_at_header(**kwargs):
+    """Record when each task was sent, for the queue wait metrics."""
+
+    from unified_ecommerce.celery_queues import add_published_at_header
+
+    add_published_at_header(**kwargs)
+
+
+@task_prerun.connect
+def _record_queue_wait(**kwargs):
+    """Record how long each task waited in its queue."""
+
+    from unified_ecommerce.celery_queues import record_queue_wait
+
+    record_queue_wait(**kwargs)
+
+
+@task_postrun.connect
+def _finish_task_query_count(**kwargs):
+    """Record the queries made by each task."""
+
+    from unified_ecommerce.query_metrics import finish_task_query_count
+
+    finish_task_query_count(**kwargs)
+
+
+@task_postrun.connect
+def _publish_metrics(**kwargs):  # noqa: ARG001
+    """Publish the worker's metrics, when they're due."""
+
+    from unified_ecommerce.metrics import publish_metrics
+
+    publish_metrics()
+
+
+@worker_process_shutdown.connect
+def _publish_final_metrics(**kwargs):  # noqa: ARG001
+    """Publish the rest of the worker's metrics before it exits."""
+
+    from unified_ecommerce.metrics import publish_metrics
+
+    publish_metrics(force=True)
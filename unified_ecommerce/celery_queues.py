@@ -0,0 +1,219 @@
+"""
+Celery queues, routes and priorities, and the queue metrics.
+
+Tasks are routed to a queue by what they're for, so the payment-side effects
+(webhooks to the integrated systems, refunds and emails) are never stuck
+behind the batch jobs (the product metadata sweep, the Google Sheets refund
+sync, the stale basket/order cleanup, the transaction payload archiving and
+the settlement reconciliation), and each queue can get its own workers - see
+scripts/run-celery-worker.sh.
+
+Within a queue, tasks are taken in priority order. With the Redis broker, 0 is
+the highest priority and 9 the lowest; tasks that aren't routed get
+PRIORITY_NORMAL.
+
+Two kinds of queue metrics are recorded:
+- celery_queue_wait_seconds, a histogram of how long each task waited in its
+  queue, recorded by the worker that ran the task
+- celery_queue_depth and celery_queue_oldest_seconds, gauges of the messages
+  waiting in each queue and the age of the oldest one, read from the broker
+  when the metrics are requested
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+
+from unified_ecommerce.metrics import observe, set_gauge
+
+log = logging.getLogger(__name__)
+
+QUEUE_DEFAULT = "default"
+QUEUE_WEBHOOKS = "webhooks"
+QUEUE_REFUNDS = "refunds"
+QUEUE_EMAIL = "email"
+QUEUE_BULK_SYNC = "bulk_sync"
+
+QUEUES = (
+    QUEUE_WEBHOOKS,
+    QUEUE_REFUNDS,
+    QUEUE_EMAIL,
+    QUEUE_DEFAULT,
+    QUEUE_BULK_SYNC,
+)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+# The broker keeps a list per queue and priority step; the list for priority 0
+# is named after the queue, and the others have the step appended.
+PRIORITY_STEPS = list(range(PRIORITY_HIGH, PRIORITY_LOW + 1))
+PRIORITY_SEPARATOR = ":"
+
+TASK_ROUTES = {
+    "payments.tasks.dispatch_webhook": {
+        "queue": QUEUE_WEBHOOKS,
+        "priority": PRIORITY_HIGH,
+    },
+    "payments.tasks.flush_pre_sale_webhooks": {
+        "queue": QUEUE_WEBHOOKS,
+        "priority": PRIORITY_HIGH,
+    },
+    "refunds.tasks.queue_process_approved_refund": {
+        "queue": QUEUE_REFUNDS,
+        "priority": PRIORITY_HIGH,
+    },
+    "payments.tasks.successful_order_payment_email_task": {
+        "queue": QUEUE_EMAIL,
+        "priority": PRIORITY_NORMAL,
+    },
+    "refunds.tasks.queue_refund_access_code_emails": {
+        "queue": QUEUE_EMAIL,
+        "priority": PRIORITY_NORMAL,
+    },
+    "refunds.api.send_request_access_code_email": {
+        "queue": QUEUE_EMAIL,
+        "priority": PRIORITY_NORMAL,
+    },
+    "system_meta.tasks.update_products": {
+        "queue": QUEUE_BULK_SYNC,
+        "priority": PRIORITY_LOW,
+    },
+    "refunds.tasks.process_google_sheets_requests": {
+        "queue": QUEUE_BULK_SYNC,
+        "priority": PRIORITY_LOW,
+    },
+    "payments.tasks.purge_stale_baskets_and_orders": {
+        "queue": QUEUE_BULK_SYNC,
+        "priority": PRIORITY_LOW,
+    },
+    "payments.tasks.archive_transaction_data": {
+        "queue": QUEUE_BULK_SYNC,
+        "priority": PRIORITY_LOW,
+    },
+    "payments.tasks.reconcile_settlement_report": {
+        "queue": QUEUE_BULK_SYNC,
+        "priority": PRIORITY_LOW,
+    },
+}
+
+PUBLISHED_AT_HEADER = "published_at"
+QUEUE_WAIT_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+
+def add_published_at_header(headers=None, **kwargs):  # noqa: ARG001
+    """Record when the task was sent (before_task_publish handler)."""
+
+    if headers is not None:
+        headers[PUBLISHED_AT_HEADER] = time.time()
+
+
+def record_queue_wait(task=None, **kwargs):  # noqa: ARG001
+    """
+    Record how long the task waited in its queue (task_prerun handler).
+
+    Tasks with an ETA or countdown (e.g. webhook retries) are measured from when
+    they were due, not when they were sent. Eager tasks aren't published, so
+    they aren't recorded. The worker publishes the metric to the metrics store
+    after its tasks run, so it's reported by the metrics endpoint.
+    """
+
+    request = task.request
+    published_at = getattr(request, PUBLISHED_AT_HEADER, None)
+
+    if published_at is None:
+        return
+
+    ready_at = published_at
+    if request.eta:
+        ready_at = max(ready_at, datetime.fromisoformat(request.eta).timestamp())
+
+    delivery_info = request.delivery_info or {}
+    queue = delivery_info.get("routing_key") or QUEUE_DEFAULT
+
+    observe(
+        "celery_queue_wait_seconds",
+        max(time.time() - ready_at, 0),
+        buckets=QUEUE_WAIT_BUCKETS,
+        queue=queue,
+        task=task.name,
+    )
+
+
+def _queue_keys(queue: str) -> list[str]:
+    """Return the broker's list keys for each priority step of the queue."""
+
+    return [
+        f"{queue}{PRIORITY_SEPARATOR}{step}" if step else queue
+        for step in PRIORITY_STEPS
+    ]
+
+
+def _published_at(message) -> float | None:
+    """Return when a raw broker message was published, if it says."""
+
+    if message is None:
+        return None
+
+    try:
+        return json.loads(message)["headers"].get(PUBLISHED_AT_HEADER)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def record_queue_depths(client, queues=QUEUES):
+    """
+    Record the depth and oldest message age of each queue.
+
+    Args:
+    - client: a Redis client for the broker
+    - queues (tuple): the queues to check
+    """
+
+    now = time.time()
+    pipeline = client.pipeline(transaction=False)
+
+    for queue in queues:
+        for key in _queue_keys(queue):
+            pipeline.llen(key)
+            # Messages are pushed on the left and taken from the right.
+            pipeline.lindex(key, -1)
+
+    results = iter(pipeline.execute())
+
+    for queue in queues:
+        depth = 0
+        oldest = None
+
+        for _ in PRIORITY_STEPS:
+            depth += next(results)
+            published_at = _published_at(next(results))
+
+            if published_at is not None:
+                oldest = published_at if oldest is None else min(oldest, published_at)
+
+        set_gauge("celery_queue_depth", depth, queue=queue)
+        set_gauge(
+            "celery_queue_oldest_seconds",
+            0 if oldest is None else max(now - oldest, 0),
+            queue=queue,
+        )
+
+
+def record_broker_queue_depths(broker_url: str | None):
+    """Record the queue gauges, if the broker is Redis and can be reached."""
+
+    if not broker_url or not broker_url.startswith(("redis://", "rediss://")):
+        return
+
+    import redis
+
+    try:
+        client = redis.Redis.from_url(
+            broker_url, socket_timeout=2, socket_connect_timeout=2
+        )
+        record_queue_depths(client)
+    except redis.RedisError:
+        log.exception("Couldn't read the Celery queue depths")
@@ -0,0 +1,208 @@
+"""Tests for the Celery queues and queue metrics."""
+
+import json
+import time
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from unified_ecommerce.celery import _publish_metrics, app
+from unified_ecommerce.celery_queues import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    PUBLISHED_AT_HEADER,
+    QUEUE_BULK_SYNC,
+    QUEUE_DEFAULT,
+    QUEUE_EMAIL,
+    QUEUE_REFUNDS,
+    QUEUE_WEBHOOKS,
+    add_published_at_header,
+    record_broker_queue_depths,
+    record_queue_depths,
+    record_queue_wait,
+)
+from unified_ecommerce.metrics import get_metrics, get_shared_metrics, reset_metrics
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    """Clear the recorded metrics."""
+
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def _metrics(name):
+    """Return the metrics with the given name, keyed by queue."""
+
+    return {
+        metric["labels"]["queue"]: metric
+        for metric in get_metrics()["metrics"]
+        if metric["name"] == name
+    }
+
+
+@pytest.mark.parametrize(
+    ("task_name", "queue", "priority"),
+    [
+        ("payments.tasks.dispatch_webhook", QUEUE_WEBHOOKS, PRIORITY_HIGH),
+        ("refunds.tasks.queue_process_approved_refund", QUEUE_REFUNDS, PRIORITY_HIGH),
+        (
+            "payments.tasks.successful_order_payment_email_task",
+            QUEUE_EMAIL,
+            PRIORITY_NORMAL,
+        ),
+        ("system_meta.tasks.update_products", QUEUE_BULK_SYNC, PRIORITY_LOW),
+        (
+            "refunds.tasks.process_google_sheets_requests",
+            QUEUE_BULK_SYNC,
+            PRIORITY_LOW,
+        ),
+        ("some.other.task", QUEUE_DEFAULT, None),
+    ],
+)
+def test_task_routes(task_name, queue, priority):
+    """Tasks should be routed to their queues, with their priorities."""
+
+    route = app.amqp.router.route({}, task_name)
+
+    assert route["queue"].name == queue
+    assert route.get("priority") == priority
+
+
+def test_default_priority():
+    """Tasks without a priority should get the normal one."""
+
+    assert app.conf.task_default_priority == PRIORITY_NORMAL
+
+
+def test_record_queue_wait():
+    """The time between publishing and running the task should be recorded."""
+
+    headers = {}
+    add_published_at_header(headers=headers)
+    headers[PUBLISHED_AT_HEADER] -= 2
+
+    record_queue_wait(
+        task=SimpleNamespace(
+            name="payments.tasks.dispatch_webhook",
+            request=SimpleNamespace(
+                **headers, eta=None, delivery_info={"routing_key": QUEUE_WEBHOOKS}
+            ),
+        )
+    )
+
+    metric = _metrics("celery_queue_wait_seconds")[QUEUE_WEBHOOKS]
+    assert metric["labels"]["task"] == "payments.tasks.dispatch_webhook"
+    assert metric["count"] == 1
+    assert 2 <= metric["sum"] < 5
+
+
+@pytest.mark.usefixtures("metrics_store")
+def test_record_queue_wait_published():
+    """The worker's queue waits should reach the metrics store after the task."""
+
+    task = SimpleNamespace(
+        name="payments.tasks.dispatch_webhook",
+        request=SimpleNamespace(
+            published_at=time.time() - 2,
+            eta=None,
+            delivery_info={"routing_key": QUEUE_WEBHOOKS},
+        ),
+    )
+
+    record_queue_wait(task=task)
+    _publish_metrics(task=task)
+    # The web process serving the metrics endpoint hasn't recorded any.
+    reset_metrics()
+
+    (metric,) = (
+        metric
+        for metric in get_shared_metrics()["metrics"]
+        if metric["name"] == "celery_queue_wait_seconds"
+    )
+    assert metric["labels"]["queue"] == QUEUE_WEBHOOKS
+    assert metric["count"] == 1
+
+
+def test_record_queue_wait_eta():
+    """Tasks with an ETA should be measured from when they were due."""
+
+    eta = datetime.now(tz=UTC) - timedelta(seconds=1)
+
+    record_queue_wait(
+        task=SimpleNamespace(
+            name="payments.tasks.dispatch_webhook",
+            request=SimpleNamespace(
+                published_at=time.time() - 60,
+                eta=eta.isoformat(),
+                delivery_info={"routing_key": QUEUE_WEBHOOKS},
+            ),
+        )
+    )
+
+    assert 1 <= _metrics("celery_queue_wait_seconds")[QUEUE_WEBHOOKS]["sum"] < 5
+
+
+def test_record_queue_wait_eager():
+    """Tasks that weren't published shouldn't be recorded."""
+
+    record_queue_wait(
+        task=SimpleNamespace(
+            name="payments.tasks.dispatch_webhook",
+            request=SimpleNamespace(eta=None, delivery_info=None),
+        )
+    )
+
+    assert not _metrics("celery_queue_wait_seconds")
+
+
+def test_record_queue_depths(mocker):
+    """The depth and oldest message age of each queue should be recorded."""
+
+    def message(age):
+        return json.dumps(
+            {"body": "", "headers": {PUBLISHED_AT_HEADER: time.time() - age}}
+        ).encode()
+
+    lists = {
+        QUEUE_WEBHOOKS: [message(5), message(10)],
+        f"{QUEUE_WEBHOOKS}:5": [message(30)],
+        f"{QUEUE_BULK_SYNC}:9": [b"not json"],
+    }
+    pipeline = mocker.Mock()
+    commands = []
+    pipeline.llen.side_effect = lambda key: commands.append(len(lists.get(key, [])))
+    pipeline.lindex.side_effect = lambda key, index: commands.append(
+        lists[key][index] if key in lists else None
+    )
+    pipeline.execute.side_effect = lambda: commands
+    client = mocker.Mock()
+    client.pipeline.return_value = pipeline
+
+    record_queue_depths(client, queues=(QUEUE_WEBHOOKS, QUEUE_EMAIL, QUEUE_BULK_SYNC))
+
+    depths = _metrics("celery_queue_depth")
+    assert {queue: metric["value"] for queue, metric in depths.items()} == {
+        QUEUE_WEBHOOKS: 3,
+        QUEUE_EMAIL: 0,
+        QUEUE_BULK_SYNC: 1,
+    }
+    oldest = _metrics("celery_queue_oldest_seconds")
+    assert 30 <= oldest[QUEUE_WEBHOOKS]["value"] < 35
+    assert oldest[QUEUE_EMAIL]["value"] == 0
+    assert oldest[QUEUE_BULK_SYNC]["value"] == 0
+
+
+@pytest.mark.parametrize("broker_url", [None, "memory://"])
+def test_record_broker_queue_depths_not_redis(mocker, broker_url):
+    """Only Redis brokers should be checked."""
+
+    mock_record = mocker.patch("unified_ecommerce.celery_queues.record_queue_depths")
+
+    record_broker_queue_depths(broker_url)
+
+    mock_record.assert_not_called()
@@ -0,0 +1,164 @@
+"""
+Read replica routing.
+
+If DATABASE_REPLICA_URL is set, the "replica" database is configured and
+reads can be sent to it. That's opt-in: reads go to the primary unless they
+happen inside use_replica(), which the read-only API views (via
+ReplicaReadMixin) and the reporting commands use.
+
+The replica lags the primary a little, so reads stay on the primary:
+- for the rest of the request (or use_replica() block) once anything has
+  been written, so a request always sees its own writes. The writes made
+  while authenticating a request, before the view runs, don't count.
+- inside a transaction, since it may have uncommitted writes
+- for MITOL_UE_DB_REPLICA_STICKY_SECONDS after a view wrote something for
+  the same user, so the user's next requests (e.g. their basket or order
+  history after checking out) see their writes too
+
+The routing state is kept in an asgiref Local, so it's per thread for sync
+code and follows the request into sync_to_async calls from async views.
+ReplicaRoutingMiddleware resets it for each request.
+"""
+
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_DB_ALIAS = "replica"
+STICKY_CACHE_KEY = "db_routing:sticky_user:{}"
+
+_state = Local()
+
+
+def replica_configured() -> bool:
+    """Return True if there's a replica to read from."""
+
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def reset_routing_state() -> None:
+    """Forget about any writes and stop reading from the replica."""
+
+    _state.use_replica = False
+    _state.wrote = False
+
+
+def replica_reads_enabled() -> bool:
+    """Return True if reads should go to the replica right now."""
+
+    return (
+        getattr(_state, "use_replica", False)
+        and not getattr(_state, "wrote", False)
+        and replica_configured()
+        and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+def has_written() -> bool:
+    """Return True if anything has been written since the state was reset."""
+
+    return getattr(_state, "wrote", False)
+
+
+@contextmanager
+def use_replica():
+    """Send the reads in the block to the replica, if there is one."""
+
+    previous = getattr(_state, "use_replica", False)
+    _state.use_replica = True
+
+    try:
+        yield
+    finally:
+        _state.use_replica = previous
+
+
+@contextmanager
+def use_primary():
+    """Send the reads in the block to the primary, even in use_replica()."""
+
+    previous = getattr(_state, "use_replica", False)
+    _state.use_replica = False
+
+    try:
+        yield
+    finally:
+        _state.use_replica = previous
+
+
+def _get_sticky_cache():
+    """Return the cache that the sticky users are kept in."""
+
+    return caches[settings.MITOL_UE_DB_REPLICA_STICKY_CACHE_NAME]
+
+
+def stick_user_to_primary(user) -> None:
+    """Keep the user's reads on the primary for the sticky window."""
+
+    if not user or not user.is_authenticated:
+        return
+
+    _get_sticky_cache().set(
+        STICKY_CACHE_KEY.format(user.pk),
+        value=True,
+        timeout=settings.MITOL_UE_DB_REPLICA_STICKY_SECONDS,
+    )
+
+
+def is_user_stuck_to_primary(user) -> bool:
+    """Return True if the user wrote something within the sticky window."""
+
+    if not user or not user.is_authenticated:
+        return False
+
+    return bool(_get_sticky_cache().get(STICKY_CACHE_KEY.format(user.pk)))
+
+
+class ReplicaRouter:
+    """Sends reads to the replica when they're allowed to go there."""
+
+    def db_for_read(self, model, **hints):  # noqa: ARG002
+        """Return the replica if replica reads are enabled."""
+
+        if replica_reads_enabled():
+            return REPLICA_DB_ALIAS
+
+        return None
+
+    def db_for_write(self, model, **hints):  # noqa: ARG002
+        """Send writes to the primary, and keep later reads there too."""
+
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):  # noqa: ARG002
+        """Allow any relation, since the replica has the same data."""
+
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):  # noqa: ARG002
+        """Only migrate the primary; the replica gets the changes from it."""
+
+        return db != REPLICA_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    Read from the replica for safe (read-only) requests.
+
+    Requests from a user who wrote something recently stay on the primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        """Turn on replica reads once the user has been authenticated."""
+
+        super().initial(request, *args, **kwargs)
+
+        if request.method in SAFE_METHODS and not is_user_stuck_to_primary(
+            request.user
+        ):
+            _state.use_replica = True
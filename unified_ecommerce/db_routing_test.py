@@ -0,0 +1,268 @@
+"""Tests for the read replica routing."""
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.urls import reverse
+
+from payments.factories import OrderFactory
+from system_meta.caching import CATALOG_BUMPED_AT_KEY
+from system_meta.factories import ActiveProductFactory
+from system_meta.models import Product
+from unified_ecommerce import db_routing
+from unified_ecommerce.db_routing import (
+    REPLICA_DB_ALIAS,
+    ReplicaRouter,
+    is_user_stuck_to_primary,
+    replica_reads_enabled,
+    reset_routing_state,
+    stick_user_to_primary,
+    use_primary,
+    use_replica,
+)
+from unified_ecommerce.loadtest import make_apisix_header
+from unified_ecommerce.middleware import ReplicaRoutingMiddleware
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def _reset_routing_state():
+    """Start and end each test with a clean routing state."""
+
+    reset_routing_state()
+    cache.clear()
+    yield
+    reset_routing_state()
+
+
+@pytest.fixture()
+def _replica(mocker):
+    """
+    Pretend there's a replica, outside of a transaction.
+
+    The tests run in a transaction, which would keep reads on the primary.
+    """
+
+    mocker.patch("unified_ecommerce.db_routing.replica_configured", return_value=True)
+    mocker.patch(
+        "unified_ecommerce.db_routing.connections",
+        {DEFAULT_DB_ALIAS: mocker.Mock(in_atomic_block=False)},
+    )
+
+
+@pytest.fixture()
+def read_routes(mocker):
+    """
+    Record whether each read would have gone to the replica.
+
+    The reads still go to the test database, since there isn't a replica. Clear
+    the list after setting up the test data.
+    """
+
+    routes = []
+
+    def _db_for_read(*args, **kwargs):
+        routes.append(replica_reads_enabled())
+
+    mocker.patch.object(ReplicaRouter, "db_for_read", side_effect=_db_for_read)
+    return routes
+
+
+@pytest.mark.usefixtures("_replica")
+def test_router_reads():
+    """Reads should only go to the replica inside use_replica()."""
+
+    router = ReplicaRouter()
+
+    assert router.db_for_read(Product) is None
+
+    with use_replica():
+        assert router.db_for_read(Product) == REPLICA_DB_ALIAS
+
+        with use_primary():
+            assert router.db_for_read(Product) is None
+
+        assert router.db_for_read(Product) == REPLICA_DB_ALIAS
+
+    assert router.db_for_read(Product) is None
+
+
+@pytest.mark.usefixtures("_replica")
+def test_router_reads_after_write():
+    """Once something's been written, reads should stay on the primary."""
+
+    router = ReplicaRouter()
+
+    with use_replica():
+        assert router.db_for_write(Product) == DEFAULT_DB_ALIAS
+        assert router.db_for_read(Product) is None
+
+    reset_routing_state()
+
+    with use_replica():
+        assert router.db_for_read(Product) == REPLICA_DB_ALIAS
+
+
+def test_router_reads_without_replica():
+    """Without a replica, reads should go to the primary."""
+
+    with use_replica():
+        assert ReplicaRouter().db_for_read(Product) is None
+
+
+def test_router_reads_in_transaction(mocker):
+    """Reads in a transaction should stay on the primary."""
+
+    mocker.patch("unified_ecommerce.db_routing.replica_configured", return_value=True)
+
+    # The test itself runs in a transaction.
+    with use_replica():
+        assert ReplicaRouter().db_for_read(Product) is None
+
+
+def test_router_migrations():
+    """Only the primary should be migrated."""
+
+    router = ReplicaRouter()
+
+    assert router.allow_migrate(DEFAULT_DB_ALIAS, "payments")
+    assert not router.allow_migrate(REPLICA_DB_ALIAS, "payments")
+
+
+def test_sticky_users(user, settings):
+    """Users should be stuck to the primary after writing, for the window."""
+
+    settings.MITOL_UE_DB_REPLICA_STICKY_SECONDS = 60
+
+    assert not is_user_stuck_to_primary(user)
+    stick_user_to_primary(user)
+    assert is_user_stuck_to_primary(user)
+
+    settings.MITOL_UE_DB_REPLICA_STICKY_SECONDS = 0
+    stick_user_to_primary(user)
+    assert not is_user_stuck_to_primary(user)
+
+
+@pytest.mark.usefixtures("_replica")
+def test_views_read_from_replica(user_client, read_routes):
+    """Safe requests to the opted-in views should read from the replica."""
+
+    product = ActiveProductFactory.create()
+    cache.delete(CATALOG_BUMPED_AT_KEY)
+    read_routes.clear()
+
+    response = user_client.get(f"/api/v0/meta/product/{product.id}/")
+
+    assert response.status_code == 200
+    assert read_routes
+    assert all(read_routes)
+
+
+@pytest.mark.usefixtures("_replica")
+def test_catalog_after_change_reads_from_primary(user_client, read_routes):
+    """
+    Right after the catalog changes, catalog responses should be generated from
+    the primary, so stale replica data doesn't get cached.
+    """
+
+    product = ActiveProductFactory.create()
+    read_routes.clear()
+
+    response = user_client.get(f"/api/v0/meta/product/{product.id}/")
+
+    assert response.status_code == 200
+    assert read_routes
+    assert not any(read_routes)
+
+
+@pytest.mark.usefixtures("_replica")
+def test_views_after_write_read_from_primary(user, user_client, read_routes):
+    """A user who just wrote something should read from the primary."""
+
+    OrderFactory.create(purchaser=user)
+    stick_user_to_primary(user)
+    read_routes.clear()
+
+    response = user_client.get("/api/v0/payments/orders/history/")
+
+    assert response.status_code == 200
+    assert read_routes
+    assert not any(read_routes)
+
+
+@pytest.mark.usefixtures("_replica")
+@pytest.mark.usefixtures("read_routes")
+def test_middleware_sticks_users_that_write(mocker, user, user_client):
+    """Requests that write should stick the user to the primary."""
+
+    mocker.patch("payments.api.send_pre_sale_webhook")
+    product = ActiveProductFactory.create()
+
+    user_client.get("/api/v0/payments/orders/history/")
+    assert not is_user_stuck_to_primary(user)
+
+    user_client.post(
+        reverse("v0:create_from_product", args=[product.system.slug, product.sku])
+    )
+    assert is_user_stuck_to_primary(user)
+    assert not db_routing.has_written()
+
+
+def test_middleware_async(mocker, user, rf):
+    """
+    Under ASGI, the writes made before the view (in sync middleware, in a
+    thread) should be forgotten in the view's context, and the view's own
+    writes should still stick the user.
+    """
+
+    stick = mocker.patch("unified_ecommerce.middleware.stick_user_to_primary")
+    written_in_view = []
+
+    async def view(request):
+        # Authentication writes in a thread, then Django calls process_view.
+        await sync_to_async(ReplicaRouter().db_for_write)(User)
+        await middleware.process_view(request, view, (), {})
+        written_in_view.append(db_routing.has_written())
+
+        await sync_to_async(ReplicaRouter().db_for_write)(User)
+        return HttpResponse()
+
+    middleware = ReplicaRoutingMiddleware(view)
+    assert iscoroutinefunction(middleware)
+    assert iscoroutinefunction(middleware.process_view)
+
+    request = rf.get("/")
+    request.user = user
+    async_to_sync(middleware)(request)
+
+    assert written_in_view == [False]
+    stick.assert_called_once_with(user)
+    assert not db_routing.has_written()
+
+
+@pytest.mark.usefixtures("_replica")
+def test_apisix_users_read_from_replica(client, read_routes):
+    """
+    Authenticating with the APISIX headers writes the user on every request,
+    which shouldn't keep the user's reads on the primary.
+    """
+
+    header = make_apisix_header(1, prefix="replica")
+
+    for _ in range(2):
+        read_routes.clear()
+
+        response = client.get(
+            reverse("v0:orderhistory_api-list"), HTTP_X_USERINFO=header
+        )
+
+        assert response.status_code == 200
+        assert read_routes[-1]
+
+    assert not is_user_stuck_to_primary(User.objects.get(username="replica-user-1"))
@@ -0,0 +1,276 @@
+"""
+Idempotency keys for endpoints that clients retry.
+
+If a request to a view wrapped in @idempotent has an Idempotency-Key header,
+its response is stored (for MITOL_UE_IDEMPOTENCY_TTL seconds) keyed by the
+user, the path and the key. A retry with the same key gets the stored response
+back, with an Idempotent-Replayed header, and the view isn't run again.
+
+If the first request is still running when the retry arrives, the retry waits
+for it to finish (up to MITOL_UE_IDEMPOTENCY_LOCK_TIMEOUT seconds) and then
+gets its response; if it takes longer than that, the retry gets a 409. If the
+first request fails without a response being stored, the retry runs the view.
+
+Reusing a key for a request with a different body gets a 422. Server errors
+aren't stored, so the request can be retried with the same key. Requests
+without the header work as usual.
+"""
+
+import hashlib
+import json
+import logging
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework import status
+from rest_framework.response import Response
+
+log = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_CACHE_KEY = "idempotency:{}"
+IDEMPOTENCY_POLL_SECONDS = 0.1
+
+# KEYS[1]: the lock; ARGV[1]: the token of the request that took it. Deletes the
+# lock only if that request still holds it.
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+# Headers that are kept with a stored response, so a replayed redirect still
+# goes to the right place.
+REPLAYED_HEADERS = ("Location",)
+
+# For the views' schemas.
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    IDEMPOTENCY_KEY_HEADER,
+    OpenApiTypes.STR,
+    OpenApiParameter.HEADER,
+    description=(
+        "A unique key for the request. Retries with the same key get the "
+        "original response back instead of repeating the request."
+    ),
+)
+
+
+def _get_cache():
+    """Return the cache that the responses are kept in."""
+
+    return caches[settings.MITOL_UE_IDEMPOTENCY_CACHE_NAME]
+
+
+def _cache_key(request, idempotency_key: str) -> str:
+    """Return the cache key for the user, path and idempotency key."""
+
+    digest = hashlib.sha256(
+        "\n".join(
+            [str(request.user.pk), request.method, request.path, idempotency_key]
+        ).encode()
+    ).hexdigest()
+
+    return IDEMPOTENCY_CACHE_KEY.format(digest)
+
+
+def _fingerprint(request) -> str:
+    """Return a hash of the request's data, to catch reused keys."""
+
+    data = request.data
+    if hasattr(data, "lists"):
+        # A QueryDict, from a form submission.
+        data = sorted(data.lists())
+
+    return hashlib.sha256(
+        json.dumps(
+            [sorted(request.query_params.lists()), data], sort_keys=True, default=str
+        ).encode()
+    ).hexdigest()
+
+
+def _serialize_response(response, fingerprint: str) -> dict:
+    """Return what needs to be stored to replay the response."""
+
+    stored = {
+        "fingerprint": fingerprint,
+        "status": response.status_code,
+        "headers": {
+            header: response[header]
+            for header in REPLAYED_HEADERS
+            if response.has_header(header)
+        },
+    }
+
+    if isinstance(response, Response):
+        stored["data"] = response.data
+    else:
+        stored["content"] = response.content.decode(response.charset)
+        stored["content_type"] = response.get("Content-Type")
+
+    return stored
+
+
+def _replay_response(stored: dict):
+    """Rebuild a stored response."""
+
+    if "data" in stored:
+        response = Response(stored["data"], status=stored["status"])
+    else:
+        response = HttpResponse(
+            stored["content"],
+            status=stored["status"],
+            content_type=stored["content_type"],
+        )
+
+    for header, value in stored["headers"].items():
+        response[header] = value
+
+    response[IDEMPOTENT_REPLAYED_HEADER] = "true"
+    return response
+
+
+def _check_stored(stored: dict, fingerprint: str):
+    """Return the stored response, or a 422 if the request doesn't match."""
+
+    if stored["fingerprint"] != fingerprint:
+        return Response(
+            {
+                "error": (
+                    f"This {IDEMPOTENCY_KEY_HEADER} was already used for a "
+                    "different request."
+                )
+            },
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+
+    return _replay_response(stored)
+
+
+def _wait_for_response(cache, cache_key: str) -> bool:
+    """
+    Wait for the in-flight request with the same key to finish.
+
+    Returns False if it's still running after the lock timeout.
+    """
+
+    deadline = time.monotonic() + settings.MITOL_UE_IDEMPOTENCY_LOCK_TIMEOUT
+
+    while time.monotonic() < deadline:
+        time.sleep(IDEMPOTENCY_POLL_SECONDS)
+
+        # The lock is released once the response is stored, or if the request
+        # raised without one.
+        if cache.get(f"{cache_key}:lock") is None:
+            return True
+
+    return False
+
+
+def _release_lock(cache, cache_key: str, token: str):
+    """
+    Release the request's lock, if it still holds it.
+
+    If the view ran past the lock timeout, a retry may have taken the lock
+    since, and deleting it would let yet another retry run the view too. With
+    django-redis, the check and delete are one atomic script.
+    """
+
+    lock_key = f"{cache_key}:lock"
+    client = getattr(cache, "client", None)
+
+    if hasattr(client, "get_client"):
+        client.get_client(write=True).eval(
+            RELEASE_LOCK_SCRIPT, 1, client.make_key(lock_key), client.encode(token)
+        )
+    elif cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _run_and_store(cache, cache_key: str, token: str, fingerprint: str, view):
+    """Run the view, and store its response unless it's a server error."""
+
+    try:
+        response = view()
+
+        if response.status_code < status.HTTP_500_INTERNAL_SERVER_ERROR:
+            cache.set(
+                cache_key,
+                _serialize_response(response, fingerprint),
+                timeout=settings.MITOL_UE_IDEMPOTENCY_TTL,
+            )
+    finally:
+        _release_lock(cache, cache_key, token)
+
+    return response
+
+
+def idempotent(view_func):
+    """
+    Make the (function-based) DRF view honor the Idempotency-Key header.
+
+    Apply it below @api_view and the permission decorators, so the user has
+    been authenticated by the time it runs.
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        idempotency_key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+
+        if not idempotency_key:
+            return view_func(request, *args, **kwargs)
+
+        if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response(
+                {"error": f"The {IDEMPOTENCY_KEY_HEADER} header is too long."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cache = _get_cache()
+        cache_key = _cache_key(request, idempotency_key)
+        fingerprint = _fingerprint(request)
+
+        while True:
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return _check_stored(stored, fingerprint)
+
+            token = uuid.uuid4().hex
+            if cache.add(
+                f"{cache_key}:lock",
+                token,
+                timeout=settings.MITOL_UE_IDEMPOTENCY_LOCK_TIMEOUT,
+            ):
+                return _run_and_store(
+                    cache,
+                    cache_key,
+                    token,
+                    fingerprint,
+                    lambda: view_func(request, *args, **kwargs),
+                )
+
+            if not _wait_for_response(cache, cache_key):
+                break
+
+            # Either the response was stored, or the request failed and this one
+            # can have a go.
+
+        log.warning("Timed out waiting for the in-flight request for %s", request.path)
+        return Response(
+            {
+                "error": (
+                    f"A request with this {IDEMPOTENCY_KEY_HEADER} is still "
+                    "being processed."
+                )
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    return wrapper
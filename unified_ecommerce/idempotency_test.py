@@ -0,0 +1,229 @@
+"""Tests for the Idempotency-Key handling."""
+
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.shortcuts import redirect
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from unified_ecommerce.factories import UserFactory
+from unified_ecommerce.idempotency import (
+    IDEMPOTENCY_KEY_HEADER,
+    IDEMPOTENT_REPLAYED_HEADER,
+    RELEASE_LOCK_SCRIPT,
+    _cache_key,
+    _release_lock,
+    idempotent,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache(settings):
+    """Use the default cache, and clear it."""
+
+    settings.MITOL_UE_IDEMPOTENCY_CACHE_NAME = "default"
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture()
+def calls():
+    """Return the list of calls made to the view."""
+
+    return []
+
+
+@pytest.fixture()
+def view(calls):
+    """Return an idempotent view that counts its calls."""
+
+    @api_view(["POST"])
+    @idempotent
+    def _view(request):
+        calls.append(request.data)
+        time.sleep(float(request.query_params.get("sleep", 0)))
+
+        if "redirect" in request.query_params:
+            return redirect("/somewhere/")
+
+        return Response(
+            {"call": len(calls)},
+            status=int(request.query_params.get("status", 201)),
+        )
+
+    return _view
+
+
+def post(view, user, key=None, path="/test/", data=None):
+    """Make a POST request to the view, as the user."""
+
+    headers = {IDEMPOTENCY_KEY_HEADER: key} if key else {}
+    request = APIRequestFactory().post(
+        path, data or {"value": 1}, format="json", headers=headers
+    )
+    force_authenticate(request, user)
+    return view(request)
+
+
+def test_no_key(view, calls, user):
+    """Requests without a key should run the view each time."""
+
+    post(view, user)
+    response = post(view, user)
+
+    assert len(calls) == 2
+    assert response.data == {"call": 2}
+    assert not response.has_header(IDEMPOTENT_REPLAYED_HEADER)
+
+
+def test_replay(view, calls, user):
+    """Retries with the same key should get the stored response."""
+
+    first = post(view, user, "key-1")
+    second = post(view, user, "key-1")
+
+    assert len(calls) == 1
+    assert second.status_code == first.status_code == 201
+    assert second.data == first.data == {"call": 1}
+    assert second[IDEMPOTENT_REPLAYED_HEADER] == "true"
+    assert not first.has_header(IDEMPOTENT_REPLAYED_HEADER)
+
+
+def test_keys_are_scoped(view, calls, user):
+    """The same key from another user, or for another path, is a new request."""
+
+    post(view, user, "key-1")
+    post(view, UserFactory.create(), "key-1")
+    post(view, user, "key-1", path="/other/")
+    post(view, user, "key-2")
+
+    assert len(calls) == 4
+
+
+def test_reused_key(view, calls, user):
+    """Reusing a key for a different request should be rejected."""
+
+    post(view, user, "key-1", data={"value": 1})
+    response = post(view, user, "key-1", data={"value": 2})
+
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+def test_key_too_long(view, calls, user):
+    """Overly long keys should be rejected."""
+
+    response = post(view, user, "k" * 256)
+
+    assert response.status_code == 400
+    assert not calls
+
+
+def test_server_errors_not_stored(view, calls, user):
+    """Server errors shouldn't be stored, so the request can be retried."""
+
+    post(view, user, "key-1", path="/test/?status=503")
+    response = post(view, user, "key-1", path="/test/?status=503")
+
+    assert response.status_code == 503
+    assert len(calls) == 2
+
+
+def test_replay_redirect(view, user):
+    """Redirects should be replayed with their location."""
+
+    post(view, user, "key-1", path="/test/?redirect=1")
+    response = post(view, user, "key-1", path="/test/?redirect=1")
+
+    assert response.status_code == 302
+    assert response["Location"] == "/somewhere/"
+    assert response[IDEMPOTENT_REPLAYED_HEADER] == "true"
+
+
+def test_concurrent_duplicates(view, calls, user):
+    """Duplicates that arrive while the first is running should wait for it."""
+
+    responses = []
+
+    def _post():
+        responses.append(post(view, user, "key-1", path="/test/?sleep=0.2"))
+
+    threads = [threading.Thread(target=_post) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert [response.data for response in responses] == [{"call": 1}] * 4
+    assert (
+        len(
+            [
+                response
+                for response in responses
+                if response.has_header(IDEMPOTENT_REPLAYED_HEADER)
+            ]
+        )
+        == 3
+    )
+
+
+def test_in_flight_timeout(settings, view, calls, user):
+    """If the first request takes too long, duplicates should get a 409."""
+
+    settings.MITOL_UE_IDEMPOTENCY_LOCK_TIMEOUT = 0.2
+    request = APIRequestFactory().post("/test/")
+    request.user = user
+    cache.add(f"{_cache_key(request, 'key-1')}:lock", "someone-else")
+
+    response = post(view, user, "key-1")
+
+    assert response.status_code == 409
+    assert not calls
+
+
+def test_expired_lock_not_released(calls, user):
+    """
+    If the view runs past the lock timeout and a retry takes the lock, the
+    first request shouldn't release the retry's lock.
+    """
+
+    request = APIRequestFactory().post("/test/")
+    request.user = user
+    lock_key = f"{_cache_key(request, 'key-1')}:lock"
+
+    @api_view(["POST"])
+    @idempotent
+    def _view(request):
+        calls.append(request.data)
+        # The lock expired, and a retry took it.
+        cache.set(lock_key, "retry")
+        return Response(status=201)
+
+    post(_view, user, "key-1")
+
+    assert cache.get(lock_key) == "retry"
+
+
+def test_release_lock_redis(mocker):
+    """With django-redis, the lock should be released by the atomic script."""
+
+    redis_cache = mocker.Mock()
+    redis_cache.client.make_key.return_value = "prefix:idempotency:abc:lock"
+    redis_cache.client.encode.return_value = b"encoded-token"
+
+    _release_lock(redis_cache, "idempotency:abc", "token")
+
+    redis_cache.client.make_key.assert_called_once_with("idempotency:abc:lock")
+    redis_cache.client.encode.assert_called_once_with("token")
+    redis_cache.client.get_client(write=True).eval.assert_called_once_with(
+        RELEASE_LOCK_SCRIPT, 1, "prefix:idempotency:abc:lock", b"encoded-token"
+    )
+    redis_cache.delete.assert_not_called()
@@ -0,0 +1,383 @@
+"""
+Load-test harness for a running instance.
+
+Virtual users authenticate the way they would behind APISIX, with a base64
+encoded X-Userinfo header, so the harness can drive thousands of synthetic
+users without any login flow. Each worker thread repeatedly picks a virtual
+user and a scenario (weighted), runs it and waits for the think time, until
+the duration is up. The scenarios are:
+- browse: list the system's products, then fetch one of them
+- preload: preload a SKU, as an integrated system page would
+- basket_add: add a product to the basket, with a discount code if any
+- checkout: add a product, start checkout, then send the CyberSource
+  callbacks for it (see payments.simulator)
+- order_history: list the user's orders
+
+Every request is timed and recorded against its endpoint, and the report
+gives the p50/p95/p99 latency, throughput and error rate for each.
+
+The callbacks are signed with the local CyberSource security key, so it has
+to match the key of the instance under test.
+"""
+
+import base64
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urljoin
+
+import requests
+from django.conf import settings
+from django.urls import get_script_prefix, reverse
+
+from payments.simulator import CALLBACK_TARGETS, build_callback_payload_from_checkout
+
+log = logging.getLogger(__name__)
+
+SCENARIO_BROWSE = "browse"
+SCENARIO_PRELOAD = "preload"
+SCENARIO_BASKET_ADD = "basket_add"
+SCENARIO_CHECKOUT = "checkout"
+SCENARIO_ORDER_HISTORY = "order_history"
+
+DEFAULT_SCENARIO_WEIGHTS = {
+    SCENARIO_BROWSE: 40,
+    SCENARIO_PRELOAD: 15,
+    SCENARIO_BASKET_ADD: 20,
+    SCENARIO_CHECKOUT: 15,
+    SCENARIO_ORDER_HISTORY: 10,
+}
+
+
+def _catalog_path(path: str) -> str:
+    """
+    Return the full path for a catalog (system_meta) API route.
+
+    Those routes share the "v0" namespace with the payments ones, which shadow
+    them, so they can't be reversed. This adds the app's path prefix, as
+    reverse() would.
+    """
+
+    prefix = settings.MITOL_APP_PATH_PREFIX.strip("/")
+    if prefix:
+        path = f"{prefix}/{path}"
+
+    return f"{get_script_prefix()}{path}"
+
+
+USER_NAMESPACE = uuid.UUID("5b0e4cfa-7b8a-4b89-9f58-1d6c2d0b6b55")
+HTTP_ERROR_STATUS = 400
+
+
+def make_apisix_header(index: int, *, prefix: str = "loadtest") -> str:
+    """
+    Return the X-Userinfo header value for a synthetic user.
+
+    The same index and prefix always give the same user, so repeated runs
+    reuse the users (and their baskets and orders) rather than creating new
+    ones each time.
+    """
+
+    username = f"{prefix}-user-{index}"
+    userinfo = {
+        "sub": str(uuid.uuid5(USER_NAMESPACE, username)),
+        "preferred_username": username,
+        "email": f"{username}@example.com",
+        "name": f"Load Test User {index}",
+        "given_name": "Load Test",
+        "family_name": f"User {index}",
+    }
+
+    return base64.b64encode(json.dumps(userinfo).encode()).decode()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Return the nearest-rank percentile of the (sorted) values."""
+
+    if not values:
+        return 0.0
+
+    rank = max(math.ceil(pct / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+class LoadTestStats:
+    """Request timings and errors, per endpoint."""
+
+    def __init__(self):
+        """Set up the stats."""
+
+        self._lock = threading.Lock()
+        self._timings = defaultdict(list)
+        self._errors = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, endpoint: str, elapsed: float, *, error: bool = False):
+        """Record a request to the endpoint."""
+
+        with self._lock:
+            self._timings[endpoint].append(elapsed)
+            self._errors[endpoint] += int(error)
+
+    def finish(self):
+        """Mark the end of the run, for the throughput calculation."""
+
+        self.finished = time.perf_counter()
+
+    def summary(self) -> dict:
+        """Return the latency, throughput and error rate for each endpoint."""
+
+        duration = (self.finished or time.perf_counter()) - self.started
+
+        with self._lock:
+            timings = {name: sorted(values) for name, values in self._timings.items()}
+            errors = dict(self._errors)
+
+        return {
+            name: {
+                "requests": len(values),
+                "errors": errors[name],
+                "error_rate": errors[name] / len(values),
+                "throughput": len(values) / duration if duration else 0.0,
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+            }
+            for name, values in sorted(timings.items())
+        }
+
+
+@dataclass
+class LoadTestContext:
+    """What the scenarios need to know about the instance under test."""
+
+    base_url: str
+    system_slug: str
+    skus: list[str]
+    discount_codes: list[str] = field(default_factory=list)
+    timeout: float = 30
+
+
+class VirtualUser:
+    """A synthetic user, making requests with its APISIX header."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        index: int,
+        context: LoadTestContext,
+        session: requests.Session,
+        stats: LoadTestStats,
+        rng: random.Random,
+        *,
+        prefix: str = "loadtest",
+    ):
+        """Set up the user."""
+
+        self.context = context
+        self.session = session
+        self.stats = stats
+        self.rng = rng
+        self.headers = {"X-Userinfo": make_apisix_header(index, prefix=prefix)}
+
+    def request(
+        self,
+        endpoint: str,
+        method: str,
+        path: str,
+        *,
+        authenticated: bool = True,
+        **kwargs,
+    ):
+        """
+        Make a request, and record it against the endpoint.
+
+        Returns the response, or None if the request failed outright.
+        """
+
+        url = urljoin(self.context.base_url, path)
+        headers = self.headers if authenticated else {}
+        start = time.perf_counter()
+
+        try:
+            response = self.session.request(
+                method,
+                url,
+                headers=headers,
+                allow_redirects=False,
+                timeout=self.context.timeout,
+                **kwargs,
+            )
+        except requests.RequestException:
+            log.debug("Request to %s failed", url, exc_info=True)
+            self.stats.record(endpoint, time.perf_counter() - start, error=True)
+            return None
+
+        self.stats.record(
+            endpoint,
+            time.perf_counter() - start,
+            error=response.status_code >= HTTP_ERROR_STATUS,
+        )
+        return response
+
+    def browse(self):
+        """List the system's products, then fetch one of them."""
+
+        response = self.request(
+            "product_list",
+            "GET",
+            _catalog_path("api/v0/meta/product/"),
+            params={"system__slug": self.context.system_slug},
+        )
+
+        if response is not None and response.ok:
+            results = response.json().get("results", [])
+            if results:
+                product = self.rng.choice(results)
+                self.request(
+                    "product_detail",
+                    "GET",
+                    _catalog_path(f"api/v0/meta/product/{product['id']}/"),
+                )
+
+    def preload(self):
+        """Preload a SKU."""
+
+        sku = self.rng.choice(self.context.skus)
+        self.request(
+            "preload_sku",
+            "GET",
+            _catalog_path(
+                f"api/v0/meta/product/preload/{self.context.system_slug}/{sku}/"
+            ),
+        )
+
+    def basket_add(self):
+        """Add a product to the basket, with a discount code if there are any."""
+
+        sku = self.rng.choice(self.context.skus)
+
+        if self.context.discount_codes:
+            self.request(
+                "basket_add_with_discount",
+                "POST",
+                reverse(
+                    "v0:create_from_product_with_discount",
+                    args=[
+                        self.context.system_slug,
+                        sku,
+                        self.rng.choice(self.context.discount_codes),
+                    ],
+                ),
+            )
+        else:
+            self.request(
+                "basket_add",
+                "POST",
+                reverse("v0:create_from_product", args=[self.context.system_slug, sku]),
+            )
+
+    def checkout(self):
+        """Check out a product, then send the payment callbacks for it."""
+
+        self.request(
+            "basket_add",
+            "POST",
+            reverse(
+                "v0:create_from_product",
+                args=[self.context.system_slug, self.rng.choice(self.context.skus)],
+            ),
+        )
+        response = self.request(
+            "checkout",
+            "POST",
+            reverse("v0:start_checkout", args=[self.context.system_slug]),
+        )
+
+        if response is None or not response.ok or "payload" not in response.json():
+            return
+
+        callback = build_callback_payload_from_checkout(response.json()["payload"])
+
+        for target, url_name in CALLBACK_TARGETS.items():
+            self.request(
+                f"callback_{target}",
+                "POST",
+                reverse(url_name),
+                authenticated=False,
+                data=callback,
+            )
+
+    def order_history(self):
+        """List the user's orders."""
+
+        self.request("order_history", "GET", reverse("v0:orderhistory_api-list"))
+
+    def run_scenario(self, scenario: str):
+        """Run the named scenario."""
+
+        getattr(self, scenario)()
+
+
+def run_load_test(  # noqa: PLR0913
+    context: LoadTestContext,
+    *,
+    users: int = 1000,
+    concurrency: int = 10,
+    duration: float = 60,
+    think_time: float = 0,
+    weights: dict | None = None,
+    prefix: str = "loadtest",
+    seed: int | None = None,
+) -> LoadTestStats:
+    """
+    Run the load test, and return the stats.
+
+    Args:
+    - context (LoadTestContext): the instance under test
+    - users (int): the number of synthetic users to spread the load over
+    - concurrency (int): the number of requests in flight at once
+    - duration (float): how long to run for, in seconds
+    - think_time (float): the mean pause between scenarios, in seconds
+    - weights (dict): the relative weights of the scenarios
+    - prefix (str): the prefix for the synthetic usernames
+    - seed (int): seed for the random number generator, for repeatable runs
+    """
+
+    weights = weights or DEFAULT_SCENARIO_WEIGHTS
+    scenarios = list(weights)
+    scenario_weights = [weights[scenario] for scenario in scenarios]
+    stats = LoadTestStats()
+    deadline = time.monotonic() + duration
+
+    def worker(worker_id):
+        rng = random.Random(None if seed is None else seed + worker_id)  # noqa: S311
+        session = requests.Session()
+
+        while time.monotonic() < deadline:
+            user = VirtualUser(
+                rng.randrange(users), context, session, stats, rng, prefix=prefix
+            )
+            scenario = rng.choices(scenarios, scenario_weights)[0]
+
+            try:
+                user.run_scenario(scenario)
+            except Exception:
+                log.exception("Scenario %s failed", scenario)
+                stats.record(f"scenario_{scenario}", 0, error=True)
+
+            if think_time:
+                time.sleep(rng.expovariate(1 / think_time))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+
+    stats.finish()
+    return stats
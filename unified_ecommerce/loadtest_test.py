@@ -0,0 +1,180 @@
+"""Tests for the load-test harness."""
+
+import random
+import uuid
+from urllib.parse import urlsplit
+
+import pytest
+import reversion
+from django.contrib.auth import get_user_model
+from django.test import Client
+
+from payments.models import Order
+from system_meta.factories import ActiveIntegratedSystemFactory, ProductFactory
+from unified_ecommerce.loadtest import (
+    LoadTestContext,
+    LoadTestStats,
+    VirtualUser,
+    make_apisix_header,
+    percentile,
+    run_load_test,
+)
+
+pytestmark = [pytest.mark.django_db]
+
+User = get_user_model()
+
+
+class DjangoTestSession:
+    """Sends the harness's requests through the Django test client."""
+
+    def __init__(self):
+        """Set up the client."""
+
+        self.client = Client()
+
+    def request(self, method, url, *, headers=None, params=None, data=None, **kwargs):  # noqa: ARG002
+        """Make the request with the test client."""
+
+        extra = {
+            f"HTTP_{name.upper().replace('-', '_')}": value
+            for name, value in (headers or {}).items()
+        }
+        path = urlsplit(url).path
+
+        if method == "GET":
+            response = self.client.get(path, params or {}, **extra)
+        else:
+            response = self.client.post(path, data or {}, **extra)
+
+        response.ok = response.status_code < 400
+        return response
+
+
+@pytest.fixture(autouse=True)
+def _payment_gateway_settings(settings, mocker):
+    """Set the payment gateway settings, and skip the webhooks."""
+
+    settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_SECURITY_KEY = "Test Security Key"
+    settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_ACCESS_KEY = "Test Access Key"
+    settings.MITOL_PAYMENT_GATEWAY_CYBERSOURCE_PROFILE_ID = uuid.uuid4()
+    mocker.patch("payments.api.send_pre_sale_webhook")
+    mocker.patch("payments.tasks.dispatch_webhook.delay")
+
+
+@pytest.fixture()
+def context():
+    """Create a system with products, and the context for it."""
+
+    system = ActiveIntegratedSystemFactory.create()
+    with reversion.create_revision():
+        products = ProductFactory.create_batch(3, system=system)
+
+    return LoadTestContext(
+        base_url="http://testserver",
+        system_slug=system.slug,
+        skus=[product.sku for product in products],
+    )
+
+
+def test_apisix_header_authenticates():
+    """The header should authenticate the same synthetic user each time."""
+
+    client = Client()
+
+    for _ in range(2):
+        response = client.get(
+            "/api/v0/payments/orders/history/",
+            HTTP_X_USERINFO=make_apisix_header(7, prefix="test"),
+        )
+        assert response.status_code == 200
+
+    user = User.objects.get(username="test-user-7")
+    assert user.email == "test-user-7@example.com"
+    assert User.objects.filter(username__startswith="test-user-").count() == 1
+
+
+def test_percentile():
+    """Percentiles should use the nearest rank."""
+
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([5], 99) == 5
+    assert percentile([], 50) == 0
+
+
+def test_stats_summary():
+    """The summary should include the error rate and throughput."""
+
+    stats = LoadTestStats()
+    stats.record("checkout", 0.1)
+    stats.record("checkout", 0.3, error=True)
+    stats.finish()
+
+    summary = stats.summary()["checkout"]
+
+    assert summary["requests"] == 2
+    assert summary["errors"] == 1
+    assert summary["error_rate"] == 0.5
+    assert summary["p50"] == 0.1
+    assert summary["p99"] == 0.3
+    assert summary["throughput"] > 0
+
+
+@pytest.mark.parametrize(
+    ("scenario", "endpoints"),
+    [
+        ("browse", {"product_list", "product_detail"}),
+        ("preload", {"preload_sku"}),
+        ("basket_add", {"basket_add"}),
+        (
+            "checkout",
+            {"basket_add", "checkout", "callback_redirect", "callback_backoffice"},
+        ),
+        ("order_history", {"order_history"}),
+    ],
+)
+def test_scenarios(context, scenario, endpoints):
+    """Each scenario should make its requests without errors."""
+
+    stats = LoadTestStats()
+    user = VirtualUser(1, context, DjangoTestSession(), stats, random.Random(1))  # noqa: S311
+
+    user.run_scenario(scenario)
+
+    summary = stats.summary()
+    assert set(summary) == endpoints
+    assert all(result["errors"] == 0 for result in summary.values())
+
+    if scenario == "checkout":
+        order = Order.objects.get(purchaser__username="loadtest-user-1")
+        assert order.state == Order.STATE.FULFILLED
+
+
+def test_run_load_test(mocker, context):
+    """The run should spread the scenarios over the users until the deadline."""
+
+    mocker.patch(
+        "unified_ecommerce.loadtest.requests.Session", side_effect=DjangoTestSession
+    )
+    # The deadline is at 10s, and the clock passes it after three scenarios.
+    mocker.patch(
+        "unified_ecommerce.loadtest.time.monotonic", side_effect=[0, 1, 2, 3, 10]
+    )
+    run_scenario = mocker.patch("unified_ecommerce.loadtest.VirtualUser.run_scenario")
+
+    stats = run_load_test(
+        context,
+        users=5,
+        concurrency=1,
+        duration=10,
+        weights={"preload": 1},
+        seed=1,
+    )
+
+    assert run_scenario.call_count == 3
+    assert {call.args[0] for call in run_scenario.call_args_list} == {"preload"}
+    assert stats.finished is not None
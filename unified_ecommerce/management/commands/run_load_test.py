@@ -0,0 +1,177 @@
+"""Run the load-test harness against a running instance."""
+
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from payments.models import Discount
+from system_meta.models import IntegratedSystem, Product
+from unified_ecommerce.constants import REDEMPTION_TYPE_UNLIMITED
+from unified_ecommerce.loadtest import (
+    DEFAULT_SCENARIO_WEIGHTS,
+    LoadTestContext,
+    run_load_test,
+)
+
+
+def parse_weights(value: str) -> dict:
+    """Parse scenario weights in the form "browse=40,checkout=10"."""
+
+    weights = {}
+
+    for item in value.split(","):
+        scenario, _, weight = item.partition("=")
+        scenario = scenario.strip()
+
+        if scenario not in DEFAULT_SCENARIO_WEIGHTS:
+            msg = f"Unknown scenario {scenario}"
+            raise CommandError(msg)
+
+        weights[scenario] = int(weight)
+
+    return weights
+
+
+class Command(BaseCommand):
+    """
+    Runs a mixed load test against a running instance, using synthetic users
+    authenticated with APISIX headers.
+
+    The system's products (and unlimited discount codes, for the discounted
+    basket adds) are read from the local database, so this should be run
+    against a deployment that shares it. For example:
+    python manage.py run_load_test --system mitxonline --users 5000 \
+        --concurrency 50 --duration 300
+    """
+
+    help = "Run a mixed load test against a running instance."
+
+    def add_arguments(self, parser) -> None:
+        """Add arguments to the command parser."""
+
+        parser.add_argument(
+            "--base-url",
+            type=str,
+            default=settings.SITE_BASE_URL,
+            help="The base URL of the instance under test.",
+        )
+        parser.add_argument(
+            "--system",
+            type=str,
+            help="The slug of the integrated system to test; the first by default.",
+        )
+        parser.add_argument(
+            "--users", type=int, default=1000, help="Number of synthetic users."
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=10,
+            help="Number of requests in flight at once.",
+        )
+        parser.add_argument(
+            "--duration", type=float, default=60, help="Duration, in seconds."
+        )
+        parser.add_argument(
+            "--think-time",
+            type=float,
+            default=0,
+            help="Mean pause between each user's scenarios, in seconds.",
+        )
+        parser.add_argument(
+            "--weights",
+            type=parse_weights,
+            help=(
+                "Scenario weights, like browse=40,checkout=10. Scenarios: "
+                f"{', '.join(DEFAULT_SCENARIO_WEIGHTS)}."
+            ),
+        )
+        parser.add_argument(
+            "--prefix",
+            type=str,
+            default="loadtest",
+            help="Prefix for the synthetic usernames.",
+        )
+        parser.add_argument("--seed", type=int, help="Random seed.")
+        parser.add_argument(
+            "--output", type=Path, help="Also write the results as JSON to this file."
+        )
+
+    def get_context(self, options) -> LoadTestContext:
+        """Find the system, products and discount codes to test with."""
+
+        systems = IntegratedSystem.objects.order_by("id")
+        if options["system"]:
+            systems = systems.filter(slug=options["system"])
+
+        system = systems.first()
+        if system is None:
+            msg = "No integrated system found."
+            raise CommandError(msg)
+
+        skus = list(
+            Product.objects.filter(system=system).values_list("sku", flat=True)[:500]
+        )
+        if not skus:
+            msg = f"No products found for {system.slug}."
+            raise CommandError(msg)
+
+        now = timezone.now()
+        discount_codes = list(
+            Discount.objects.filter(
+                Q(integrated_system=system) | Q(integrated_system__isnull=True),
+                Q(expiration_date__isnull=True) | Q(expiration_date__gt=now),
+                Q(activation_date__isnull=True) | Q(activation_date__lte=now),
+                product__isnull=True,
+                assigned_users__isnull=True,
+                redemption_type=REDEMPTION_TYPE_UNLIMITED,
+            ).values_list("discount_code", flat=True)[:50]
+        )
+
+        return LoadTestContext(
+            base_url=options["base_url"],
+            system_slug=system.slug,
+            skus=skus,
+            discount_codes=discount_codes,
+        )
+
+    def handle(self, **options) -> None:
+        """Run the load test and report the results."""
+
+        context = self.get_context(options)
+        self.stdout.write(
+            f"Load testing {context.base_url} ({context.system_slug}, "
+            f"{len(context.skus)} products, {len(context.discount_codes)} "
+            f"discount codes) for {options['duration']}s..."
+        )
+
+        stats = run_load_test(
+            context,
+            users=options["users"],
+            concurrency=options["concurrency"],
+            duration=options["duration"],
+            think_time=options["think_time"],
+            weights=options["weights"],
+            prefix=options["prefix"],
+            seed=options["seed"],
+        )
+        summary = stats.summary()
+
+        self.stdout.write(
+            f"{'endpoint':<28}{'requests':>10}{'req/s':>9}{'errors':>9}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        )
+        for endpoint, result in summary.items():
+            self.stdout.write(
+                f"{endpoint:<28}{result['requests']:>10}"
+                f"{result['throughput']:>9.1f}{result['error_rate']:>9.1%}"
+                f"{result['p50'] * 1000:>9.1f}{result['p95'] * 1000:>9.1f}"
+                f"{result['p99'] * 1000:>9.1f}"
+            )
+
+        if options["output"]:
+            options["output"].write_text(json.dumps(summary, indent=2))
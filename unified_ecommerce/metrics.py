@@ -0,0 +1,514 @@
+"""
+Lightweight in-process metrics, shared between processes through Redis.
+
+Metrics are aggregated per metric name and set of labels in the memory of the
+process that recorded them. There are four kinds:
+- timings (record_timing/timed): count, total and max duration, and errors
+- counters (increment): a running count
+- histograms (observe): cumulative bucket counts, plus the count and sum
+- gauges (set_gauge): the last value set
+
+Each web and Celery worker process adds what it has recorded since it last did
+so to a hash in the django-redis cache named by MITOL_UE_METRICS_CACHE_NAME
+(publish_metrics), at most every MITOL_UE_METRICS_PUBLISH_INTERVAL seconds,
+after a request or task. The store then holds the totals across every process,
+including ones that have since exited, so the counters only go up.
+
+The metrics endpoint returns the totals from the store as JSON for staff, or in
+the Prometheus text format for scrapers. If the setting is blank (or Redis
+can't be reached), it returns the snapshot of the process that served it
+instead, which includes the PID so results from different workers can be told
+apart.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+METRIC_TYPE_TIMING = "timing"
+METRIC_TYPE_COUNTER = "counter"
+METRIC_TYPE_HISTOGRAM = "histogram"
+METRIC_TYPE_GAUGE = "gauge"
+METRIC_NAME_PREFIX = "unified_ecommerce_"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS_STORE_KEY = "unified_ecommerce:metrics"
+
+# Sets the hash field to the value if that's higher, for the timing maxima.
+MAX_SCRIPT = """
+local current = tonumber(redis.call("HGET", KEYS[1], ARGV[1]))
+if current == nil or tonumber(ARGV[2]) > current then
+    redis.call("HSET", KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+_lock = threading.Lock()
+_metrics = {}
+
+# What was last added to the store, and when.
+_publish_lock = threading.Lock()
+_published = {}
+_last_published = None
+
+
+def _metric_key(name: str, labels: dict) -> tuple:
+    """Return the key for the metric with the given name and labels."""
+
+    return (name, tuple(sorted(labels.items())))
+
+
+def record_timing(name: str, duration: float, *, error: bool = False, **labels):
+    """
+    Record a timing for the metric.
+
+    Args:
+    - name (str): the metric name
+    - duration (float): the duration, in seconds
+    - error (bool): whether the timed operation raised an exception
+    - labels: anything that identifies this instance of the metric (e.g. the
+      hook and plugin names)
+    """
+
+    key = _metric_key(name, labels)
+
+    with _lock:
+        metric = _metrics.setdefault(
+            key,
+            {
+                "type": METRIC_TYPE_TIMING,
+                "count": 0,
+                "errors": 0,
+                "total": 0.0,
+                "max": 0.0,
+            },
+        )
+        metric["count"] += 1
+        metric["errors"] += int(error)
+        metric["total"] += duration
+        metric["max"] = max(metric["max"], duration)
+
+
+def increment(name: str, amount: int = 1, **labels):
+    """Increment a counter metric."""
+
+    key = _metric_key(name, labels)
+
+    with _lock:
+        metric = _metrics.setdefault(key, {"type": METRIC_TYPE_COUNTER, "count": 0})
+        metric["count"] += amount
+
+
+def set_gauge(name: str, value: float, **labels):
+    """Set a gauge metric to the value."""
+
+    key = _metric_key(name, labels)
+
+    with _lock:
+        _metrics[key] = {"type": METRIC_TYPE_GAUGE, "value": value}
+
+
+def observe(name: str, value: float, *, buckets=DEFAULT_BUCKETS, **labels):
+    """
+    Record a value in a histogram metric.
+
+    Args:
+    - name (str): the metric name
+    - value (float): the value to record
+    - buckets (tuple): the bucket upper bounds, in ascending order. This is
+      fixed by the first observation for the metric and labels.
+    - labels: anything that identifies this instance of the metric
+    """
+
+    key = _metric_key(name, labels)
+
+    with _lock:
+        metric = _metrics.setdefault(
+            key,
+            {
+                "type": METRIC_TYPE_HISTOGRAM,
+                "buckets": tuple(buckets),
+                "bucket_counts": [0] * len(buckets),
+                "count": 0,
+                "sum": 0,
+            },
+        )
+        bucket = bisect_left(metric["buckets"], value)
+        if bucket < len(metric["buckets"]):
+            metric["bucket_counts"][bucket] += 1
+        metric["count"] += 1
+        metric["sum"] += value
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """Record the time taken by the wrapped block, and whether it raised."""
+
+    start = time.perf_counter()
+    error = False
+
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        record_timing(name, time.perf_counter() - start, error=error, **labels)
+
+
+def get_metrics() -> dict:
+    """Return a snapshot of the metrics recorded in this process."""
+
+    with _lock:
+        metrics = [
+            {"name": name, "labels": dict(labels), **values}
+            for (name, labels), values in _metrics.items()
+        ]
+
+    for metric in metrics:
+        if metric["type"] == METRIC_TYPE_TIMING:
+            metric["mean"] = metric["total"] / metric["count"]
+        elif metric["type"] == METRIC_TYPE_HISTOGRAM:
+            metric["buckets"] = list(metric["buckets"])
+            metric["bucket_counts"] = list(metric["bucket_counts"])
+
+    return {
+        "pid": os.getpid(),
+        "metrics": sorted(metrics, key=lambda metric: metric["name"]),
+    }
+
+
+def _get_store_connection():
+    """Return the Redis connection for the store, or None if not configured."""
+
+    cache_name = settings.MITOL_UE_METRICS_CACHE_NAME
+
+    if not cache_name:
+        return None
+
+    from django_redis import get_redis_connection
+
+    return get_redis_connection(cache_name)
+
+
+def _store_field(key: tuple, metric_type: str, part: str) -> str:
+    """Return the store's hash field for part of a metric."""
+
+    name, labels = key
+    return json.dumps([name, [list(label) for label in labels], metric_type, part])
+
+
+def _numeric_parts(metric: dict) -> dict:
+    """Return the parts of the metric that are added up across processes."""
+
+    if metric["type"] == METRIC_TYPE_COUNTER:
+        return {"count": metric["count"]}
+
+    if metric["type"] == METRIC_TYPE_TIMING:
+        return {
+            "count": metric["count"],
+            "errors": metric["errors"],
+            "total": metric["total"],
+        }
+
+    if metric["type"] == METRIC_TYPE_HISTOGRAM:
+        return {
+            "count": metric["count"],
+            "sum": metric["sum"],
+            **{
+                f"bucket:{bound}": count
+                for bound, count in zip(metric["buckets"], metric["bucket_counts"])
+            },
+        }
+
+    return {}
+
+
+def _queue_metric(pipeline, key: tuple, metric: dict, published: dict | None):
+    """Queue the changes to the metric since it was published."""
+
+    metric_type = metric["type"]
+
+    if metric_type == METRIC_TYPE_GAUGE:
+        if published is None or published["value"] != metric["value"]:
+            pipeline.hset(
+                METRICS_STORE_KEY,
+                _store_field(key, metric_type, "value"),
+                metric["value"],
+            )
+        return
+
+    if metric_type == METRIC_TYPE_HISTOGRAM and published is None:
+        pipeline.hset(
+            METRICS_STORE_KEY,
+            _store_field(key, metric_type, "buckets"),
+            json.dumps(list(metric["buckets"])),
+        )
+
+    published_parts = _numeric_parts(published) if published else {}
+
+    for part, value in _numeric_parts(metric).items():
+        delta = value - published_parts.get(part, 0)
+
+        if delta:
+            pipeline.hincrbyfloat(
+                METRICS_STORE_KEY, _store_field(key, metric_type, part), delta
+            )
+
+    if metric_type == METRIC_TYPE_TIMING and (
+        published is None or metric["max"] > published["max"]
+    ):
+        pipeline.eval(
+            MAX_SCRIPT,
+            1,
+            METRICS_STORE_KEY,
+            _store_field(key, metric_type, "max"),
+            metric["max"],
+        )
+
+
+def publish_metrics(*, force: bool = False):
+    """
+    Add what this process has recorded since it last published to the store.
+
+    This does nothing if there's no store, or if the process published less
+    than MITOL_UE_METRICS_PUBLISH_INTERVAL seconds ago (unless forced). If Redis
+    can't be reached, the changes are kept for the next try.
+    """
+
+    global _published, _last_published  # noqa: PLW0603
+
+    connection = _get_store_connection()
+
+    if connection is None:
+        return
+
+    now = time.monotonic()
+    if (
+        not force
+        and _last_published is not None
+        and now - _last_published < settings.MITOL_UE_METRICS_PUBLISH_INTERVAL
+    ):
+        return
+
+    # Another thread is already publishing, and would add the same changes.
+    if not _publish_lock.acquire(blocking=False):
+        return
+
+    try:
+        _last_published = now
+
+        with _lock:
+            snapshot = copy.deepcopy(_metrics)
+
+        pipeline = connection.pipeline(transaction=False)
+        for key, metric in snapshot.items():
+            _queue_metric(pipeline, key, metric, _published.get(key))
+
+        try:
+            pipeline.execute()
+        except Exception:
+            log.exception("Couldn't publish the metrics")
+            return
+
+        _published = snapshot
+    finally:
+        _publish_lock.release()
+
+
+def _load_stored_metric(metric_type: str, parts: dict) -> dict:
+    """Build a metric, as in get_metrics, from its parts in the store."""
+
+    if metric_type == METRIC_TYPE_GAUGE:
+        return {"type": metric_type, "value": float(parts["value"])}
+
+    if metric_type == METRIC_TYPE_COUNTER:
+        return {"type": metric_type, "count": int(float(parts.get("count", 0)))}
+
+    if metric_type == METRIC_TYPE_TIMING:
+        count = int(float(parts.get("count", 0)))
+        total = float(parts.get("total", 0))
+        return {
+            "type": metric_type,
+            "count": count,
+            "errors": int(float(parts.get("errors", 0))),
+            "total": total,
+            "max": float(parts.get("max", 0)),
+            "mean": total / count if count else 0.0,
+        }
+
+    buckets = json.loads(parts["buckets"])
+    return {
+        "type": metric_type,
+        "buckets": buckets,
+        "bucket_counts": [
+            int(float(parts.get(f"bucket:{bound}", 0))) for bound in buckets
+        ],
+        "count": int(float(parts.get("count", 0))),
+        "sum": float(parts.get("sum", 0)),
+    }
+
+
+def get_shared_metrics() -> dict:
+    """
+    Return the metrics recorded by every process, from the store.
+
+    This process's latest metrics are published first. Without a store, or if
+    it can't be read, this returns this process's snapshot (get_metrics).
+    """
+
+    connection = _get_store_connection()
+
+    if connection is None:
+        return get_metrics()
+
+    publish_metrics(force=True)
+
+    try:
+        stored = connection.hgetall(METRICS_STORE_KEY)
+    except Exception:
+        log.exception("Couldn't read the metrics, returning this process's")
+        return get_metrics()
+
+    grouped = defaultdict(dict)
+    for field, value in stored.items():
+        name, labels, metric_type, part = json.loads(field)
+        key = (name, tuple(tuple(label) for label in labels), metric_type)
+        grouped[key][part] = value.decode() if isinstance(value, bytes) else value
+
+    metrics = []
+    for (name, labels, metric_type), parts in grouped.items():
+        if metric_type == METRIC_TYPE_HISTOGRAM and "buckets" not in parts:
+            continue
+        if metric_type == METRIC_TYPE_GAUGE and "value" not in parts:
+            continue
+
+        metrics.append(
+            {
+                "name": name,
+                "labels": dict(labels),
+                **_load_stored_metric(metric_type, parts),
+            }
+        )
+
+    return {"metrics": sorted(metrics, key=lambda metric: metric["name"])}
+
+
+def _format_labels(labels: dict, **extra) -> str:
+    """Format the labels for the Prometheus text format."""
+
+    labels = {**labels, **extra}
+    formatted = ",".join(
+        '{}="{}"'.format(
+            key,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for key, value in labels.items()
+    )
+
+    return f"{{{formatted}}}"
+
+
+def render_prometheus(snapshot: dict) -> str:
+    """
+    Render a metrics snapshot in the Prometheus text exposition format.
+
+    Each family's samples are grouped together under its TYPE line, since the
+    format doesn't allow a family's samples to be split up.
+    """
+
+    families = {}
+
+    def add(family, metric_type, sample):
+        families.setdefault(family, (metric_type, []))[1].append(sample)
+
+    # A single process's snapshot is labelled with its PID.
+    process_labels = {"pid": snapshot["pid"]} if "pid" in snapshot else {}
+
+    for metric in snapshot["metrics"]:
+        name = f"{METRIC_NAME_PREFIX}{metric['name']}"
+        labels = {**process_labels, **metric["labels"]}
+
+        if metric["type"] == METRIC_TYPE_COUNTER:
+            add(
+                f"{name}_total",
+                "counter",
+                f"{name}_total{_format_labels(labels)} {metric['count']}",
+            )
+        elif metric["type"] == METRIC_TYPE_GAUGE:
+            add(name, "gauge", f"{name}{_format_labels(labels)} {metric['value']}")
+        elif metric["type"] == METRIC_TYPE_TIMING:
+            add(
+                f"{name}_seconds",
+                "summary",
+                f"{name}_seconds_count{_format_labels(labels)} {metric['count']}",
+            )
+            add(
+                f"{name}_seconds",
+                "summary",
+                f"{name}_seconds_sum{_format_labels(labels)} {metric['total']}",
+            )
+            add(
+                f"{name}_seconds_max",
+                "gauge",
+                f"{name}_seconds_max{_format_labels(labels)} {metric['max']}",
+            )
+            add(
+                f"{name}_errors_total",
+                "counter",
+                f"{name}_errors_total{_format_labels(labels)} {metric['errors']}",
+            )
+        elif metric["type"] == METRIC_TYPE_HISTOGRAM:
+            cumulative = 0
+
+            for bound, count in zip(metric["buckets"], metric["bucket_counts"]):
+                cumulative += count
+                add(
+                    name,
+                    "histogram",
+                    f"{name}_bucket{_format_labels(labels, le=bound)} {cumulative}",
+                )
+
+            add(
+                name,
+                "histogram",
+                f"{name}_bucket{_format_labels(labels, le='+Inf')} {metric['count']}",
+            )
+            add(
+                name,
+                "histogram",
+                f"{name}_count{_format_labels(labels)} {metric['count']}",
+            )
+            add(
+                name,
+                "histogram",
+                f"{name}_sum{_format_labels(labels)} {metric['sum']}",
+            )
+
+    lines = []
+    for family, (metric_type, samples) in families.items():
+        lines.append(f"# TYPE {family} {metric_type}")
+        lines.extend(samples)
+
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    """Clear all the recorded metrics, and what's been published of them."""
+
+    global _last_published  # noqa: PLW0603
+
+    with _lock:
+        _metrics.clear()
+        _published.clear()
+        _last_published = None
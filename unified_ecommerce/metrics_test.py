@@ -0,0 +1,136 @@
+"""Tests for the metrics and the shared metrics store."""
+
+import pytest
+
+from unified_ecommerce.metrics import (
+    METRICS_STORE_KEY,
+    get_metrics,
+    get_shared_metrics,
+    increment,
+    observe,
+    publish_metrics,
+    record_timing,
+    render_prometheus,
+    reset_metrics,
+    set_gauge,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    """Clear the recorded metrics."""
+
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def _record(duration):
+    """Record one of each kind of metric."""
+
+    increment("requests", view="test")
+    record_timing("hook", duration, hook="test")
+    observe("db_queries", 3, buckets=(1, 5), view="test")
+    set_gauge("queue_depth", duration, queue="test")
+
+
+def _by_name(snapshot):
+    """Return the metrics in the snapshot, keyed by name."""
+
+    return {metric["name"]: metric for metric in snapshot["metrics"]}
+
+
+def test_shared_metrics(metrics_store):
+    """The store should add up the metrics from every process."""
+
+    _record(2)
+    publish_metrics(force=True)
+    # Another process, which records its own metrics.
+    reset_metrics()
+    _record(1)
+    _record(1)
+
+    metrics = _by_name(get_shared_metrics())
+
+    assert "pid" not in get_shared_metrics()
+    assert metrics["requests"]["count"] == 3
+    assert metrics["hook"]["count"] == 3
+    assert metrics["hook"]["total"] == 4
+    assert metrics["hook"]["max"] == 2
+    assert metrics["db_queries"]["buckets"] == [1, 5]
+    assert metrics["db_queries"]["bucket_counts"] == [0, 3]
+    assert metrics["db_queries"]["sum"] == 9
+    assert metrics["queue_depth"]["value"] == 1
+    assert metrics["requests"]["labels"] == {"view": "test"}
+
+
+def test_publish_only_changes(metrics_store):
+    """Each publish should only add what changed since the last one."""
+
+    increment("requests")
+    publish_metrics(force=True)
+    publish_metrics(force=True)
+    increment("requests")
+
+    assert _by_name(get_shared_metrics())["requests"]["count"] == 2
+
+
+def test_publish_interval(metrics_store):
+    """Metrics should be published at most once per interval, unless forced."""
+
+    increment("requests")
+    publish_metrics()
+    increment("requests")
+    publish_metrics()
+
+    assert len(metrics_store.hashes[METRICS_STORE_KEY]) == 1
+    assert next(iter(metrics_store.hashes[METRICS_STORE_KEY].values())) == 1
+
+
+def test_publish_failure(metrics_store):
+    """If the store can't be reached, the changes should be kept for later."""
+
+    increment("requests")
+    metrics_store.fail = True
+    publish_metrics(force=True)
+    metrics_store.fail = False
+
+    assert _by_name(get_shared_metrics())["requests"]["count"] == 1
+
+
+def test_no_store(settings):
+    """Without a store, the process's own metrics should be returned."""
+
+    settings.MITOL_UE_METRICS_CACHE_NAME = ""
+    increment("requests")
+
+    assert get_shared_metrics() == get_metrics()
+
+
+def test_metrics_endpoint_includes_workers(metrics_store, staff_client):
+    """The endpoint should return metrics published by the Celery workers."""
+
+    observe("db_queries", 4, task="payments.tasks.test")
+    publish_metrics(force=True)
+    reset_metrics()
+
+    response = staff_client.get("/_/v0/metrics/", {"format": "prometheus"})
+
+    assert response.status_code == 200
+    rendered = response.content.decode()
+    assert 'unified_ecommerce_db_queries_count{task="payments.tasks.test"} 1' in (
+        rendered
+    )
+    assert "pid=" not in rendered
+
+
+def test_render_prometheus_shared():
+    """Metrics from the store shouldn't be labelled with a PID."""
+
+    rendered = render_prometheus(
+        {"metrics": [{"name": "requests", "labels": {}, "type": "counter", "count": 2}]}
+    )
+
+    assert "unified_ecommerce_requests_total{} 2" in rendered
@@ -1,11 +1,24 @@
 """Middleware for Unified Ecommerce."""
 
 import logging
+from contextlib import ExitStack
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.contrib.auth import login, logout
 from django.contrib.auth.middleware import PersistentRemoteUserMiddleware
 from django.core.exceptions import ImproperlyConfigured
 
+from unified_ecommerce.db_routing import (
+    has_written,
+    reset_routing_state,
+    stick_user_to_primary,
+)
+from unified_ecommerce.metrics import publish_metrics
+from unified_ecommerce.query_metrics import (
+    count_queries,
+    get_view_name,
+    record_query_metrics,
+)
 from unified_ecommerce.utils import decode_apisix_headers, get_user_from_apisix_headers
 
 log = logging.getLogger(__name__)
@@ -53,3 +66,133 @@ class ApisixUserMiddleware(PersistentRemoteUserMiddleware):
         request.api_gateway_userdata = decode_apisix_headers(request)
 
         return self.get_response(request)
+
+
+class QueryMetricsMiddleware:
+    """
+    Count and time the database queries made for each request.
+
+    The totals are recorded per resolved view. See query_metrics for details.
+    This also publishes the process's metrics, when they're due.
+
+    This runs natively under ASGI too. Async views make their queries in
+    sync_to_async calls, which run in the request's thread, so the queries
+    are counted in that thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Set up the middleware."""
+
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Process the request, counting its queries."""
+
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with count_queries(lambda: f"View {get_view_name(request)}") as counter:
+            response = self.get_response(request)
+
+        record_query_metrics(counter, view=get_view_name(request))
+        publish_metrics()
+        return response
+
+    async def __acall__(self, request):
+        """Process the request asynchronously, counting its queries."""
+
+        stack = ExitStack()
+        counter = await sync_to_async(stack.enter_context)(
+            count_queries(lambda: f"View {get_view_name(request)}")
+        )
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+
+        record_query_metrics(counter, view=get_view_name(request))
+        await sync_to_async(publish_metrics)()
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Reset the read replica routing for each request.
+
+    If the view wrote anything, the user's reads stay on the primary for a
+    while afterwards. See db_routing for details.
+
+    This runs natively under ASGI too, resetting the routing state in the
+    request's own context so the view sees it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Set up the middleware."""
+
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+            # Otherwise Django would run process_view in a thread.
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        """Process the request, then make the user sticky if it wrote."""
+
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        reset_routing_state()
+
+        try:
+            response = self.get_response(request)
+
+            if has_written():
+                stick_user_to_primary(getattr(request, "user", None))
+        finally:
+            reset_routing_state()
+
+        return response
+
+    async def __acall__(self, request):
+        """Process the request asynchronously, as in __call__."""
+
+        reset_routing_state()
+
+        try:
+            response = await self.get_response(request)
+
+            if has_written():
+                await sync_to_async(stick_user_to_primary)(
+                    getattr(request, "user", None)
+                )
+        finally:
+            reset_routing_state()
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):  # noqa: ARG002
+        """
+        Forget the writes made before the view runs.
+
+        Authentication writes on every request (the APISIX middleware updates
+        the user and their last login), which would otherwise stick every
+        user to the primary.
+        """
+
+        reset_routing_state()
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):  # noqa: ARG002
+        """Forget the writes made before the view runs, as in process_view."""
+
+        reset_routing_state()
@@ -0,0 +1,69 @@
+"""Tests for the estimated count paginator."""
+
+import pytest
+
+from unified_ecommerce.factories import UserFactory
+from unified_ecommerce.paginators import EstimatedCountPaginator
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def postgres(mocker, settings):
+    """Pretend the database is Postgres, and mock its estimates."""
+
+    settings.MITOL_UE_ADMIN_ESTIMATED_COUNT_THRESHOLD = 1000
+    connection = mocker.Mock(vendor="postgresql")
+    mocker.patch("unified_ecommerce.paginators.connections", {"default": connection})
+
+    return {
+        "table": mocker.patch(
+            "unified_ecommerce.paginators.get_table_estimate", return_value=5000
+        ),
+        "query": mocker.patch(
+            "unified_ecommerce.paginators.get_query_estimate", return_value=2000
+        ),
+    }
+
+
+def test_exact_count_on_other_databases(mocker):
+    """Databases other than Postgres should get the exact count."""
+
+    UserFactory.create_batch(3)
+    mock_estimate = mocker.patch("unified_ecommerce.paginators.get_table_estimate")
+
+    assert EstimatedCountPaginator(User.objects.all(), 10).count == 3
+    mock_estimate.assert_not_called()
+
+
+def test_unfiltered_estimate(postgres):
+    """Unfiltered querysets for large tables should use the table estimate."""
+
+    assert EstimatedCountPaginator(User.objects.order_by("id"), 10).count == 5000
+    postgres["query"].assert_not_called()
+
+
+@pytest.mark.parametrize(
+    ("query_estimate", "uses_estimate"), [(2000, True), (5, False)]
+)
+def test_filtered_estimate(postgres, query_estimate, uses_estimate):
+    """Filtered querysets should use the query estimate if it's large."""
+
+    UserFactory.create(is_staff=True)
+    postgres["query"].return_value = query_estimate
+
+    count = EstimatedCountPaginator(User.objects.filter(is_staff=True), 10).count
+
+    assert count == (2000 if uses_estimate else 1)
+
+
+@pytest.mark.parametrize("table_estimate", [None, 50])
+def test_small_tables_are_counted(postgres, table_estimate):
+    """Small (or unanalyzed) tables should get the exact count."""
+
+    UserFactory.create_batch(2)
+    postgres["table"].return_value = table_estimate
+
+    assert EstimatedCountPaginator(User.objects.all(), 10).count == 2
+    postgres["query"].assert_not_called()
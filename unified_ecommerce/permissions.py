@@ -1,5 +1,8 @@
 """Custom DRF permissions."""
 
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 
 
@@ -15,3 +18,17 @@ class IsAdminUserOrReadOnly(permissions.BasePermission):
         return request.method in permissions.SAFE_METHODS or (
             request.user.is_authenticated and request.user.is_staff
         )
+
+
+class HasMetricsToken(permissions.BasePermission):
+    """Allows access if the request has the configured metrics bearer token."""
+
+    def has_permission(self, request, view):  # noqa: ARG002
+        """Return True if the metrics token is set and the request has it."""
+
+        token = settings.MITOL_UE_METRICS_TOKEN
+        if not token:
+            return False
+
+        authorization = request.META.get("HTTP_AUTHORIZATION", "")
+        return hmac.compare_digest(authorization, f"Bearer {token}")
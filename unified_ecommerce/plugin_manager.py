@@ -1,20 +1,111 @@
 """Plugin manager for the Unified Ecommerce app."""
 
+import functools
+import logging
+import threading
+import time
+
 import pluggy
+import sentry_sdk
+from django.conf import settings
 
-from payments import hookspecs as payments_hookspecs
-from payments.hooks import basket_add as payments_basket_add
-from payments.hooks import post_sale as payments_post_sale
-from refunds import hookspecs as refunds_hookspecs
-from refunds.hooks.refund_created import RefundCreatedHooks
-from refunds.hooks.refund_denied import RefundDeniedHooks
-from refunds.hooks.refund_issued import RefundIssuedHooks
+from unified_ecommerce.metrics import record_timing
 
+log = logging.getLogger(__name__)
 
-def get_plugin_manager():
-    """Return the plugin manager for the app."""
+HOOK_METRIC_NAME = "plugin_hook"
+
+_plugin_manager = None
+_plugin_manager_lock = threading.Lock()
+
+
+def _time_hookimpl(hook_name: str, plugin_name: str, function):
+    """
+    Wrap a hook implementation so its latency and failures are recorded.
+
+    Each call is recorded as a plugin_hook metric (labelled with the hook and
+    plugin names) and traced as a Sentry span. Calls slower than
+    MITOL_UE_PLUGIN_SLOW_HOOK_MS are logged as warnings.
+    """
+
+    @functools.wraps(function)
+    def timed_hookimpl(*args, **kwargs):
+        start = time.perf_counter()
+        error = False
+
+        try:
+            with sentry_sdk.start_span(
+                op="plugin.hook", name=f"{hook_name} ({plugin_name})"
+            ):
+                return function(*args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            record_timing(
+                HOOK_METRIC_NAME,
+                duration,
+                error=error,
+                hook=hook_name,
+                plugin=plugin_name,
+            )
+
+            if duration * 1000 >= settings.MITOL_UE_PLUGIN_SLOW_HOOK_MS:
+                log.warning(
+                    "Slow plugin hook: %s (%s) took %.1fms",
+                    hook_name,
+                    plugin_name,
+                    duration * 1000,
+                )
+
+    return timed_hookimpl
+
+
+class TimedPluginManager(pluggy.PluginManager):
+    """
+    Plugin manager that records the latency of each hook implementation.
+
+    Hook wrappers are left alone - they wrap the other implementations, so
+    their time would include everyone else's.
+    """
+
+    def register(self, plugin, name=None):
+        """Register the plugin, then wrap its hook implementations."""
+
+        plugin_name = super().register(plugin, name)
 
-    pm = pluggy.PluginManager("unified_ecommerce")
+        if plugin_name is None:
+            return None
+
+        for hook_caller in self.get_hookcallers(plugin) or []:
+            for hookimpl in hook_caller.get_hookimpls():
+                if (
+                    hookimpl.plugin is not plugin
+                    or hookimpl.wrapper
+                    or hookimpl.hookwrapper
+                ):
+                    continue
+
+                hookimpl.function = _time_hookimpl(
+                    hook_caller.name, plugin_name, hookimpl.function
+                )
+
+        return plugin_name
+
+
+def _build_plugin_manager():
+    """Build the plugin manager and register the app's plugins."""
+
+    from payments import hookspecs as payments_hookspecs
+    from payments.hooks import basket_add as payments_basket_add
+    from payments.hooks import post_sale as payments_post_sale
+    from refunds import hookspecs as refunds_hookspecs
+    from refunds.hooks.refund_created import RefundCreatedHooks
+    from refunds.hooks.refund_denied import RefundDeniedHooks
+    from refunds.hooks.refund_issued import RefundIssuedHooks
+
+    pm = TimedPluginManager("unified_ecommerce")
 
     pm.add_hookspecs(payments_hookspecs)
     pm.register(payments_post_sale.PostSaleSendEmails())
@@ -28,3 +119,21 @@ def get_plugin_manager():
 
     pm.load_setuptools_entrypoints("unified_ecommerce")
     return pm
+
+
+def get_plugin_manager():
+    """
+    Return the plugin manager for the app.
+
+    The manager is built on first use and then shared by the whole process, so
+    the plugins are registered and the entry points scanned only once.
+    """
+
+    global _plugin_manager  # noqa: PLW0603
+
+    if _plugin_manager is None:
+        with _plugin_manager_lock:
+            if _plugin_manager is None:
+                _plugin_manager = _build_plugin_manager()
+
+    return _plugin_manager
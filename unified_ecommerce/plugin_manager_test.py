@@ -0,0 +1,128 @@
+"""Tests for the plugin manager."""
+
+import pluggy
+import pytest
+
+from unified_ecommerce.metrics import get_metrics, reset_metrics
+from unified_ecommerce.plugin_manager import (
+    HOOK_METRIC_NAME,
+    TimedPluginManager,
+    get_plugin_manager,
+)
+
+hookspec = pluggy.HookspecMarker("test")
+hookimpl = pluggy.HookimplMarker("test")
+
+
+class Spec:
+    """Hook specs for testing."""
+
+    @hookspec
+    def do_thing(self, value):
+        """Do a thing."""
+
+
+class GoodPlugin:
+    """Plugin that works."""
+
+    @hookimpl
+    def do_thing(self, value):
+        """Return the value."""
+
+        return value
+
+
+class BadPlugin:
+    """Plugin that fails."""
+
+    @hookimpl
+    def do_thing(self, value):
+        """Fail."""
+
+        raise ValueError(value)
+
+
+class WrapperPlugin:
+    """Plugin with a hook wrapper."""
+
+    @hookimpl(wrapper=True)
+    def do_thing(self, value):  # noqa: ARG002
+        """Pass the results through."""
+
+        return (yield)
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    """Clear the recorded metrics."""
+
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def _hook_metrics():
+    """Return the recorded hook metrics, keyed by plugin name."""
+
+    return {
+        metric["labels"]["plugin"]: metric
+        for metric in get_metrics()["metrics"]
+        if metric["name"] == HOOK_METRIC_NAME
+    }
+
+
+def test_get_plugin_manager_is_shared():
+    """The plugin manager should only be built once."""
+
+    pm = get_plugin_manager()
+
+    assert get_plugin_manager() is pm
+    assert pm.get_plugins()
+
+
+def test_hookimpls_are_timed():
+    """Each hook implementation should be timed separately."""
+
+    pm = TimedPluginManager("test")
+    pm.add_hookspecs(Spec)
+    pm.register(GoodPlugin(), name="good")
+    pm.register(WrapperPlugin(), name="wrapper")
+
+    assert pm.hook.do_thing(value=1) == [1]
+    assert pm.hook.do_thing(value=2) == [2]
+
+    metrics = _hook_metrics()
+    assert list(metrics.keys()) == ["good"]
+    assert metrics["good"]["count"] == 2
+    assert metrics["good"]["errors"] == 0
+    assert metrics["good"]["labels"]["hook"] == "do_thing"
+
+
+def test_hookimpl_errors_are_recorded():
+    """Failing hook implementations should be counted as errors."""
+
+    pm = TimedPluginManager("test")
+    pm.add_hookspecs(Spec)
+    pm.register(GoodPlugin(), name="good")
+    pm.register(BadPlugin(), name="bad")
+
+    with pytest.raises(ValueError):  # noqa: PT011
+        pm.hook.do_thing(value=1)
+
+    metrics = _hook_metrics()
+    assert metrics["bad"]["count"] == 1
+    assert metrics["bad"]["errors"] == 1
+
+
+def test_slow_hookimpls_are_logged(settings, mocker):
+    """Slow hook implementations should be logged."""
+
+    settings.MITOL_UE_PLUGIN_SLOW_HOOK_MS = 0
+    mock_log = mocker.patch("unified_ecommerce.plugin_manager.log")
+
+    pm = TimedPluginManager("test")
+    pm.add_hookspecs(Spec)
+    pm.register(GoodPlugin(), name="good")
+    pm.hook.do_thing(value=1)
+
+    mock_log.warning.assert_called_once()
@@ -0,0 +1,122 @@
+"""
+Database query instrumentation for views and Celery tasks.
+
+Every request and task has its queries counted and timed through
+connection.execute_wrapper. The totals are recorded as histograms (db_queries
+and db_query_seconds) labelled by the resolved view name or the task name.
+
+If a request or task goes over MITOL_UE_QUERY_BUDGET queries, a sample of them
+(MITOL_UE_QUERY_BUDGET_SAMPLE_PERCENT) log a warning with the stack of the
+query that went over, which is usually enough to find the loop responsible.
+"""
+
+import logging
+import random
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from unified_ecommerce.metrics import observe
+
+log = logging.getLogger(__name__)
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+UNRESOLVED_VIEW_NAME = "unresolved"
+
+_task_counters = {}
+
+
+class QueryCounter:
+    """Execute wrapper that counts and times queries."""
+
+    def __init__(self, get_label):
+        """
+        Set up the counter.
+
+        Args:
+        - get_label (callable): returns a description of what's running, for
+          the over-budget log message. This is a callable because a request's
+          view isn't known until the URL has been resolved.
+        """
+
+        self.get_label = get_label
+        self.count = 0
+        self.duration = 0.0
+        self.budget = settings.MITOL_UE_QUERY_BUDGET
+        self.sampled = (
+            random.randrange(100)  # noqa: S311
+            < settings.MITOL_UE_QUERY_BUDGET_SAMPLE_PERCENT
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+        """Run the query, counting it and adding its time to the total."""
+
+        start = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+            if self.sampled and self.count == self.budget + 1:
+                log.warning(
+                    "%s exceeded the query budget of %s queries. Stack:\n%s",
+                    self.get_label(),
+                    self.budget,
+                    "".join(traceback.format_stack()),
+                )
+
+
+@contextmanager
+def count_queries(get_label):
+    """Count and time the queries made in the block, on all databases."""
+
+    counter = QueryCounter(get_label)
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+
+        yield counter
+
+
+def record_query_metrics(counter: QueryCounter, **labels):
+    """Record the counter's totals as histograms with the given labels."""
+
+    observe("db_queries", counter.count, buckets=QUERY_COUNT_BUCKETS, **labels)
+    observe("db_query_seconds", counter.duration, **labels)
+
+
+def get_view_name(request) -> str:
+    """Return the name of the view the request resolved to."""
+
+    resolver_match = getattr(request, "resolver_match", None)
+
+    if resolver_match is None:
+        return UNRESOLVED_VIEW_NAME
+
+    return resolver_match.view_name
+
+
+def start_task_query_count(task_id=None, task=None, **kwargs):  # noqa: ARG001
+    """Start counting queries for a Celery task (task_prerun handler)."""
+
+    stack = ExitStack()
+    counter = stack.enter_context(count_queries(lambda: f"Task {task.name}"))
+    _task_counters[task_id] = (stack, counter)
+
+
+def finish_task_query_count(task_id=None, task=None, **kwargs):  # noqa: ARG001
+    """Record the query metrics for a Celery task (task_postrun handler)."""
+
+    stack, counter = _task_counters.pop(task_id, (None, None))
+
+    if stack is None:
+        return
+
+    stack.close()
+    record_query_metrics(counter, task=task.name)
@@ -0,0 +1,222 @@
+"""Tests for query instrumentation and the metrics endpoint."""
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.urls import resolve
+
+from unified_ecommerce.metrics import (
+    get_metrics,
+    render_prometheus,
+    reset_metrics,
+    set_gauge,
+)
+from unified_ecommerce.middleware import QueryMetricsMiddleware
+from unified_ecommerce.query_metrics import (
+    UNRESOLVED_VIEW_NAME,
+    count_queries,
+    finish_task_query_count,
+    start_task_query_count,
+)
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    """Clear the recorded metrics."""
+
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def _histograms(name, label):
+    """Return the histograms with the given name, keyed by the given label."""
+
+    return {
+        metric["labels"][label]: metric
+        for metric in get_metrics()["metrics"]
+        if metric["name"] == name
+    }
+
+
+def test_count_queries():
+    """Queries in the block should be counted."""
+
+    with count_queries(lambda: "test") as counter:
+        list(User.objects.all())
+        list(User.objects.all())
+
+    assert counter.count == 2
+    assert counter.duration > 0
+
+
+@pytest.mark.parametrize("sampled", [True, False])
+def test_query_budget_logging(settings, mocker, sampled):
+    """Going over the budget should log the stack, if sampled."""
+
+    settings.MITOL_UE_QUERY_BUDGET = 1
+    settings.MITOL_UE_QUERY_BUDGET_SAMPLE_PERCENT = 100 if sampled else 0
+    mock_log = mocker.patch("unified_ecommerce.query_metrics.log")
+
+    with count_queries(lambda: "test"):
+        list(User.objects.all())
+        mock_log.warning.assert_not_called()
+        list(User.objects.all())
+        list(User.objects.all())
+
+    assert mock_log.warning.call_count == (1 if sampled else 0)
+
+
+def test_middleware_records_view_queries(user_client):
+    """Requests should record query metrics for the resolved view."""
+
+    url = "/api/v0/meta/product/"
+    view_name = resolve(url).view_name
+
+    user_client.get(url)
+
+    histograms = _histograms("db_queries", "view")
+    assert histograms[view_name]["count"] == 1
+    assert histograms[view_name]["sum"] > 0
+
+
+def test_middleware_records_async_view_queries(rf):
+    """Under ASGI, the queries an async view makes should be counted."""
+
+    async def view(request):
+        await sync_to_async(lambda: list(User.objects.all()))()
+        await sync_to_async(lambda: list(User.objects.all()))()
+        return HttpResponse()
+
+    middleware = QueryMetricsMiddleware(view)
+    assert iscoroutinefunction(middleware)
+
+    async_to_sync(middleware)(rf.get("/"))
+
+    histograms = _histograms("db_queries", "view")
+    assert histograms[UNRESOLVED_VIEW_NAME]["count"] == 1
+    assert histograms[UNRESOLVED_VIEW_NAME]["sum"] == 2
+
+
+def test_task_query_metrics(mocker):
+    """Task query metrics should be recorded under the task name."""
+
+    task = mocker.Mock()
+    task.name = "test.task"
+
+    start_task_query_count(task_id="abc", task=task)
+    list(User.objects.all())
+    finish_task_query_count(task_id="abc", task=task)
+
+    histograms = _histograms("db_queries", "task")
+    assert histograms["test.task"]["sum"] == 1
+
+
+@pytest.mark.parametrize(
+    ("use_staff", "token", "header", "expected_status"),
+    [
+        (True, "", "", 200),
+        (False, "", "", 403),
+        (False, "secret", "Bearer secret", 200),
+        (False, "secret", "Bearer wrong", 403),
+    ],
+)
+def test_metrics_endpoint(
+    settings, client, staff_client, use_staff, token, header, expected_status
+):
+    """The metrics endpoint should be available to staff or with the token."""
+
+    settings.MITOL_UE_METRICS_TOKEN = token
+    api_client = staff_client if use_staff else client
+
+    response = api_client.get(
+        "/_/v0/metrics/", {"format": "prometheus"}, HTTP_AUTHORIZATION=header
+    )
+
+    assert response.status_code == expected_status
+    if expected_status == 200:
+        assert response["Content-Type"].startswith("text/plain")
+
+
+def test_render_prometheus():
+    """Histograms should be rendered with cumulative buckets."""
+
+    snapshot = {
+        "pid": 1,
+        "metrics": [
+            {
+                "name": "db_queries",
+                "labels": {"view": "test"},
+                "type": "histogram",
+                "buckets": [1, 5],
+                "bucket_counts": [2, 1],
+                "count": 4,
+                "sum": 20,
+            }
+        ],
+    }
+
+    rendered = render_prometheus(snapshot)
+
+    assert "# TYPE unified_ecommerce_db_queries histogram" in rendered
+    assert 'view="test",le="1"} 2' in rendered
+    assert 'view="test",le="5"} 3' in rendered
+    assert 'view="test",le="+Inf"} 4' in rendered
+    assert 'unified_ecommerce_db_queries_sum{pid="' in rendered
+
+
+def test_render_prometheus_gauge():
+    """Gauges should be rendered with their last value."""
+
+    set_gauge("celery_queue_depth", 3, queue="webhooks")
+    set_gauge("celery_queue_depth", 7, queue="webhooks")
+
+    rendered = render_prometheus(get_metrics())
+
+    assert "# TYPE unified_ecommerce_celery_queue_depth gauge" in rendered
+    assert 'queue="webhooks"} 7' in rendered
+
+
+def test_render_prometheus_timing_families():
+    """Each timing family should be one contiguous group, across label sets."""
+
+    snapshot = {
+        "metrics": [
+            {
+                "name": "plugin_hook",
+                "labels": {"hook": hook},
+                "type": "timing",
+                "count": 2,
+                "errors": 0,
+                "total": 0.5,
+                "max": 0.3,
+                "mean": 0.25,
+            }
+            for hook in ("process_transaction", "basket_add")
+        ],
+    }
+
+    lines = render_prometheus(snapshot).splitlines()
+
+    family = None
+    seen = set()
+    for line in lines:
+        if line.startswith("# TYPE "):
+            family = line.split()[2]
+            assert family not in seen
+            seen.add(family)
+        else:
+            sample_name = line.split("{")[0]
+            assert sample_name in (family, f"{family}_count", f"{family}_sum")
+
+    assert seen == {
+        "unified_ecommerce_plugin_hook_seconds",
+        "unified_ecommerce_plugin_hook_seconds_max",
+        "unified_ecommerce_plugin_hook_errors_total",
+    }
+    assert len(lines) == 3 + 2 * 4
@@ -19,6 +19,7 @@ from pathlib import Path
 from urllib.parse import urljoin
 
 import dj_database_url
+from corsheaders.defaults import default_headers
 from django.core.exceptions import ImproperlyConfigured
 from mitol.apigateway.settings import *  # noqa: F403
 from mitol.common.envs import get_bool, get_int, get_string, import_settings_modules
@@ -115,6 +116,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "unified_ecommerce.middleware.QueryMetricsMiddleware",
+    "unified_ecommerce.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -133,6 +136,7 @@ AUTH_USER_MODEL = "users.User"
 CORS_ALLOWED_ORIGINS = get_list_of_str("CORS_ALLOWED_ORIGINS", [])
 CORS_ALLOWED_ORIGIN_REGEXES = get_list_of_str("CORS_ALLOWED_ORIGIN_REGEXES", [])
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 
 CSRF_TRUSTED_ORIGINS = get_list_of_str("CSRF_TRUSTED_ORIGINS", [])
 
@@ -197,6 +201,32 @@ else:
 
 DATABASES = {"default": DEFAULT_DATABASE_CONFIG}
 
+# Optional read replica. Only the reads that opt in go to it - see
+# unified_ecommerce.db_routing.
+DATABASE_REPLICA_URL = get_string("DATABASE_REPLICA_URL", "")
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = {
+        **dj_database_url.parse(DATABASE_REPLICA_URL),
+        "DISABLE_SERVER_SIDE_CURSORS": DEFAULT_DATABASE_CONFIG[
+            "DISABLE_SERVER_SIDE_CURSORS"
+        ],
+        "CONN_MAX_AGE": DEFAULT_DATABASE_CONFIG["CONN_MAX_AGE"],
+        "OPTIONS": DEFAULT_DATABASE_CONFIG["OPTIONS"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["unified_ecommerce.db_routing.ReplicaRouter"]
+
+# How long a user's reads stay on the primary after they write something, so
+# they see their own writes despite replication lag. The cache has to be shared
+# between processes, or requests that reach another process read the replica.
+MITOL_UE_DB_REPLICA_STICKY_SECONDS = get_int(
+    name="MITOL_UE_DB_REPLICA_STICKY_SECONDS", default=10
+)
+MITOL_UE_DB_REPLICA_STICKY_CACHE_NAME = get_string(
+    name="MITOL_UE_DB_REPLICA_STICKY_CACHE_NAME", default="redis"
+)
+
 # Safe delete fields
 # Note field name is changed from default for consistency with the other timestamp
 # fields.
@@ -397,8 +427,23 @@ CACHES = {
         "BACKEND": "django.core.cache.backends.db.DatabaseCache",
         "LOCATION": "durable_cache",
     },
+    # In-process cache in front of Redis, invalidated across processes over
+    # Redis pub/sub. See unified_ecommerce.cache_backends.
+    "tiered": {
+        "BACKEND": "unified_ecommerce.cache_backends.TieredCache",
+        "LOCATION": "redis",
+        "OPTIONS": {
+            "L1_TIMEOUT": get_int("MITOL_UE_TIERED_CACHE_L1_TIMEOUT", 30),
+            "L1_MAX_ENTRIES": get_int("MITOL_UE_TIERED_CACHE_L1_MAX_ENTRIES", 1000),
+        },
+    },
 }
 
+# The durable cache (used for feature flags) is a database table by default;
+# this moves it to the tiered cache so it doesn't add load to Postgres.
+if get_bool("MITOL_UE_DURABLE_CACHE_TIERED", False):  # noqa: FBT003
+    CACHES["durable"] = {**CACHES["tiered"], "KEY_PREFIX": "durable"}
+
 # JWT authentication settings
 MITOL_UE_JWT_SECRET = get_string(
     "MITOL_UE_JWT_SECRET", "terribly_unsafe_default_jwt_secret_key"
@@ -465,7 +510,24 @@ REST_FRAMEWORK = {
     "ALLOWED_VERSIONS": [
         "v0",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "100/hour", "user": "1000/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "100/hour",
+        "user": "1000/day",
+        # Token bucket throttles (see unified_ecommerce.throttling and
+        # payments.throttling): the burst allowed, refilled over the period.
+        "basket_user": get_string("MITOL_UE_THROTTLE_RATE_BASKET_USER", "60/min"),
+        "basket_ip": get_string("MITOL_UE_THROTTLE_RATE_BASKET_IP", "300/min"),
+        "discount_user": get_string("MITOL_UE_THROTTLE_RATE_DISCOUNT_USER", "10/min"),
+        "discount_ip": get_string("MITOL_UE_THROTTLE_RATE_DISCOUNT_IP", "30/min"),
+        "checkout_user": get_string("MITOL_UE_THROTTLE_RATE_CHECKOUT_USER", "20/min"),
+        "checkout_ip": get_string("MITOL_UE_THROTTLE_RATE_CHECKOUT_IP", "100/min"),
+        "checkout_callback_ip": get_string(
+            "MITOL_UE_THROTTLE_RATE_CHECKOUT_CALLBACK_IP", "100/min"
+        ),
+        "integrated_system": get_string(
+            "MITOL_UE_THROTTLE_RATE_INTEGRATED_SYSTEM", "600/min"
+        ),
+    },
 }
 
 USE_X_FORWARDED_PORT = get_bool("USE_X_FORWARDED_PORT", False)  # noqa: FBT003
@@ -499,6 +561,20 @@ MITOL_UE_PAYMENT_INTERSTITIAL_DEBUG = get_bool(
 MITOL_UE_WEBHOOK_RETRY_COOLDOWN = get_int("MITOL_UE_WEBHOOK_RETRY_COOLDOWN", 60)
 MITOL_UE_WEBHOOK_RETRY_MAX = get_int("MITOL_UE_WEBHOOK_RETRY_MAX", 4)
 
+# Pre-sale webhooks sent within this many seconds of each other, for the same
+# user and system, are coalesced into one (see payments.api.
+# queue_pre_sale_webhook); 0 sends each one straight away. Systems listed in
+# IMMEDIATE_SYSTEMS (by slug) always get theirs straight away. The cache has to
+# be shared between processes, or changes made in different ones each get a
+# webhook.
+MITOL_UE_PRE_SALE_WEBHOOK_WINDOW = get_int("MITOL_UE_PRE_SALE_WEBHOOK_WINDOW", 0)
+MITOL_UE_PRE_SALE_WEBHOOK_IMMEDIATE_SYSTEMS = get_list_of_str(
+    "MITOL_UE_PRE_SALE_WEBHOOK_IMMEDIATE_SYSTEMS", []
+)
+MITOL_UE_PRE_SALE_WEBHOOK_CACHE_NAME = get_string(
+    "MITOL_UE_PRE_SALE_WEBHOOK_CACHE_NAME", "redis"
+)
+
 MITOL_UE_FORCE_PROFILE_COUNTRY = get_bool(
     name="MITOL_UE_FORCE_PROFILE_COUNTRY", default=False
 )
@@ -512,6 +588,149 @@ MITOL_UE_PAYMENT_BASKET_CHOOSER = get_string(
 
 MITOL_LEARN_API_URL = get_string(name="MITOL_LEARN_API_URL", default="")
 
+# Catalog response caching. The cache has to be shared between processes so
+# the generation counter is too, or a product change only reaches the process
+# that made it.
+MITOL_UE_CATALOG_CACHE_NAME = get_string(
+    name="MITOL_UE_CATALOG_CACHE_NAME", default="tiered"
+)
+MITOL_UE_CATALOG_CACHE_TIMEOUT = get_int(
+    name="MITOL_UE_CATALOG_CACHE_TIMEOUT", default=60 * 15
+)
+
+# Cleanup of abandoned pending orders and baskets (payments.tasks.
+# purge_stale_baskets_and_orders). Each run looks at up to MAX_ROWS of each, in
+# chunks, pausing between them so it doesn't compete with checkout. Set MAX_ROWS
+# to 0 for no limit.
+MITOL_UE_STALE_PENDING_ORDER_DAYS = get_int(
+    name="MITOL_UE_STALE_PENDING_ORDER_DAYS", default=14
+)
+MITOL_UE_STALE_BASKET_DAYS = get_int(name="MITOL_UE_STALE_BASKET_DAYS", default=90)
+MITOL_UE_CLEANUP_CHUNK_SIZE = get_int(name="MITOL_UE_CLEANUP_CHUNK_SIZE", default=500)
+MITOL_UE_CLEANUP_PAUSE_MS = get_int(name="MITOL_UE_CLEANUP_PAUSE_MS", default=250)
+MITOL_UE_CLEANUP_MAX_ROWS = get_int(name="MITOL_UE_CLEANUP_MAX_ROWS", default=50000)
+
+# Transaction payloads older than this are compressed into the archive table
+# (payments.tasks.archive_transaction_data), using the cleanup settings above.
+MITOL_UE_TRANSACTION_ARCHIVE_DAYS = get_int(
+    name="MITOL_UE_TRANSACTION_ARCHIVE_DAYS", default=180
+)
+
+# The sales report (payments.reports) is read this many rows at a time.
+MITOL_UE_REPORT_CHUNK_SIZE = get_int(name="MITOL_UE_REPORT_CHUNK_SIZE", default=2000)
+
+# Settlement reconciliation (payments.reconciliation). The daily task downloads
+# the named CyberSource report for the previous day; leave the name blank to
+# turn it off.
+MITOL_UE_SETTLEMENT_REPORT_NAME = get_string(
+    name="MITOL_UE_SETTLEMENT_REPORT_NAME", default=""
+)
+MITOL_UE_RECONCILIATION_BATCH_SIZE = get_int(
+    name="MITOL_UE_RECONCILIATION_BATCH_SIZE", default=5000
+)
+MITOL_UE_RECONCILIATION_TIME_LIMIT = get_int(
+    name="MITOL_UE_RECONCILIATION_TIME_LIMIT", default=60 * 30
+)
+
+# Admin changelists use Postgres's row estimates instead of counting the rows
+# once a table is past this size.
+MITOL_UE_ADMIN_ESTIMATED_COUNT_THRESHOLD = get_int(
+    name="MITOL_UE_ADMIN_ESTIMATED_COUNT_THRESHOLD", default=100000
+)
+
+# Serialized baskets, keyed by the basket's version. Entries are never stale,
+# so the timeout only bounds how long unused ones are kept.
+MITOL_UE_BASKET_CACHE_NAME = get_string(
+    name="MITOL_UE_BASKET_CACHE_NAME", default="default"
+)
+MITOL_UE_BASKET_CACHE_TIMEOUT = get_int(
+    name="MITOL_UE_BASKET_CACHE_TIMEOUT", default=60 * 60
+)
+
+# Verified integrated system API keys. Revoking a key clears its entry, but
+# the timeout bounds how long any other change to a key can go unnoticed. The
+# cache has to be shared between processes so revocations reach all of them.
+MITOL_UE_API_KEY_CACHE_NAME = get_string(
+    name="MITOL_UE_API_KEY_CACHE_NAME", default="tiered"
+)
+MITOL_UE_API_KEY_CACHE_TIMEOUT = get_int(
+    name="MITOL_UE_API_KEY_CACHE_TIMEOUT", default=60
+)
+
+# Stored responses for requests with an Idempotency-Key header. The cache has
+# to be shared between processes, or retries that reach another process run
+# the view again.
+MITOL_UE_IDEMPOTENCY_CACHE_NAME = get_string(
+    name="MITOL_UE_IDEMPOTENCY_CACHE_NAME", default="redis"
+)
+MITOL_UE_IDEMPOTENCY_TTL = get_int(
+    name="MITOL_UE_IDEMPOTENCY_TTL", default=60 * 60 * 24
+)
+# How long a retry waits for the original request to finish.
+MITOL_UE_IDEMPOTENCY_LOCK_TIMEOUT = get_int(
+    name="MITOL_UE_IDEMPOTENCY_LOCK_TIMEOUT", default=30
+)
+
+# The django-redis cache that the throttles' token buckets are kept in. If
+# blank, DRF's per-process throttling is used instead, so each process has its
+# own limits.
+MITOL_UE_THROTTLE_CACHE_NAME = get_string(
+    name="MITOL_UE_THROTTLE_CACHE_NAME", default="redis"
+)
+
+# Query instrumentation - requests and tasks that make more queries than the
+# budget log their stack (for the given percentage of them).
+MITOL_UE_QUERY_BUDGET = get_int(name="MITOL_UE_QUERY_BUDGET", default=50)
+MITOL_UE_QUERY_BUDGET_SAMPLE_PERCENT = get_int(
+    name="MITOL_UE_QUERY_BUDGET_SAMPLE_PERCENT", default=10
+)
+
+# The django-redis cache (i.e. "redis") that every process adds its metrics to,
+# at most every PUBLISH_INTERVAL seconds, for the metrics endpoint. If blank,
+# the endpoint only returns the metrics of the process that serves it.
+MITOL_UE_METRICS_CACHE_NAME = get_string(
+    name="MITOL_UE_METRICS_CACHE_NAME", default="redis"
+)
+MITOL_UE_METRICS_PUBLISH_INTERVAL = get_int(
+    name="MITOL_UE_METRICS_PUBLISH_INTERVAL", default=10
+)
+
+# If set, the metrics endpoint also accepts this as a bearer token, so the
+# metrics can be scraped without a staff session.
+MITOL_UE_METRICS_TOKEN = get_string(name="MITOL_UE_METRICS_TOKEN", default="")
+
+# Process-local system/product lookup cache. Changes are broadcast to the other
+# processes over the pub/sub cache, a django-redis cache; if it's blank, they
+# only see them once their entries expire.
+MITOL_UE_RESOLVER_CACHE_TTL = get_int(name="MITOL_UE_RESOLVER_CACHE_TTL", default=300)
+MITOL_UE_RESOLVER_PUBSUB_CACHE_NAME = get_string(
+    name="MITOL_UE_RESOLVER_PUBSUB_CACHE_NAME", default="redis"
+)
+
+# Precomputed API schemas (openapi.schema), keyed by a hash of the code. The
+# cache has to be shared between processes, or the schema that
+# generate_openapi_spec --precompute stores at deploy time isn't seen by the
+# web processes.
+MITOL_UE_OPENAPI_SCHEMA_CACHE_NAME = get_string(
+    name="MITOL_UE_OPENAPI_SCHEMA_CACHE_NAME", default="redis"
+)
+MITOL_UE_OPENAPI_SCHEMA_CACHE_TIMEOUT = get_int(
+    name="MITOL_UE_OPENAPI_SCHEMA_CACHE_TIMEOUT", default=60 * 60 * 24 * 30
+)
+
+# Local CyberSource simulator, for offline load testing. When enabled, refunds
+# go to a stand-in for the CyberSource REST API with the given latency and
+# failure rate instead. Never enable this in production.
+MITOL_UE_CYBERSOURCE_SIMULATOR = get_bool(
+    name="MITOL_UE_CYBERSOURCE_SIMULATOR", default=False
+)
+MITOL_UE_CYBERSOURCE_SIMULATOR_REFUND_LATENCY_MS = get_int(
+    name="MITOL_UE_CYBERSOURCE_SIMULATOR_REFUND_LATENCY_MS", default=200
+)
+MITOL_UE_CYBERSOURCE_SIMULATOR_REFUND_FAILURE_PERCENT = get_int(
+    name="MITOL_UE_CYBERSOURCE_SIMULATOR_REFUND_FAILURE_PERCENT", default=0
+)
+
 import_settings_modules("mitol.payment_gateway.settings.cybersource")
 
 SPECTACULAR_SETTINGS = open_spectacular_settings
@@ -4,6 +4,13 @@ Django settings for celery.
 
 from celery.schedules import crontab
 
+from unified_ecommerce.celery_queues import (
+    PRIORITY_NORMAL,
+    PRIORITY_SEPARATOR,
+    PRIORITY_STEPS,
+    QUEUE_DEFAULT,
+    TASK_ROUTES,
+)
 from unified_ecommerce.envs import get_bool, get_int, get_string
 
 USE_CELERY = True
@@ -20,6 +27,19 @@ CELERY_WORKER_MAX_MEMORY_PER_CHILD = get_int(
     "CELERY_WORKER_MAX_MEMORY_PER_CHILD", 250_000
 )
 
+# Queues and priorities - see unified_ecommerce.celery_queues.
+CELERY_TASK_DEFAULT_QUEUE = QUEUE_DEFAULT
+CELERY_TASK_ROUTES = TASK_ROUTES
+CELERY_TASK_DEFAULT_PRIORITY = PRIORITY_NORMAL
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "queue_order_strategy": "priority",
+    "priority_steps": PRIORITY_STEPS,
+    "sep": PRIORITY_SEPARATOR,
+}
+# Only reserve one task at a time, so a long task doesn't hold up the tasks
+# behind it in the worker's prefetch buffer while other workers are idle.
+CELERY_WORKER_PREFETCH_MULTIPLIER = get_int("CELERY_WORKER_PREFETCH_MULTIPLIER", 1)
+
 CELERY_BEAT_SCHEDULE = {
     "update-products-daily": {
         "task": "system_meta.tasks.update_products",
@@ -29,6 +49,18 @@ CELERY_BEAT_SCHEDULE = {
         "task": "refunds.tasks.process_google_sheets_requests",
         "schedule": crontab(minute="0", hour="*/6"),
     },
+    "purge-stale-baskets-and-orders": {
+        "task": "payments.tasks.purge_stale_baskets_and_orders",
+        "schedule": crontab(minute="30"),  # Runs every hour
+    },
+    "archive-transaction-data": {
+        "task": "payments.tasks.archive_transaction_data",
+        "schedule": crontab(minute="45", hour="3"),  # Runs daily
+    },
+    "reconcile-settlement-report": {
+        "task": "payments.tasks.reconcile_settlement_report",
+        "schedule": crontab(minute="15", hour="6"),  # Runs daily
+    },
 }
 
 CELERY_TASK_SERIALIZER = "json"
@@ -1 +1,6 @@
 """Settings for Pluggy."""
+
+from unified_ecommerce.envs import get_int
+
+# Hook implementations that take at least this long are logged as warnings.
+MITOL_UE_PLUGIN_SLOW_HOOK_MS = get_int("MITOL_UE_PLUGIN_SLOW_HOOK_MS", 500)
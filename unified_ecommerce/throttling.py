@@ -0,0 +1,229 @@
+"""
+Token bucket throttles, shared between processes through Redis.
+
+Each throttle has a scope, with a DRF-style rate in DEFAULT_THROTTLE_RATES
+(e.g. "10/min"). The rate sets both the size of the bucket (the burst a client
+can make) and how fast it refills, so "10/min" allows 10 requests at once and
+then one every 6 seconds.
+
+The buckets are kept in the django-redis cache named by
+MITOL_UE_THROTTLE_CACHE_NAME, and updated by a Lua script so that checking and
+taking a token is atomic across processes. Time is Redis's, so the workers'
+clocks don't matter. If the setting is blank, the throttles fall back to DRF's
+per-process throttling, which is fine for development but doesn't hold across
+workers. If Redis can't be reached, requests are let through rather than
+failing checkout.
+
+Throttled requests get a 429 with a Retry-After header (from DRF). Each
+decision is counted in the throttle_requests metric.
+"""
+
+import logging
+import math
+
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from unified_ecommerce.metrics import increment
+
+log = logging.getLogger(__name__)
+
+THROTTLE_RESULT_ALLOWED = "allowed"
+THROTTLE_RESULT_THROTTLED = "throttled"
+THROTTLE_RESULT_ERROR = "error"
+
+# KEYS[1]: the bucket; ARGV[1]: its capacity; ARGV[2]: tokens added per ms.
+# Returns whether a token was taken, and if not, the ms until there is one.
+BUCKET_SCRIPT = """
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill)
+
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = math.ceil((1 - tokens) / refill)
+end
+
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil((capacity - tokens) / refill) + 1000)
+
+return {allowed, wait}
+"""
+
+_script = None
+
+
+def _get_redis_connection():
+    """Return the Redis connection for the buckets, or None if not configured."""
+
+    cache_name = settings.MITOL_UE_THROTTLE_CACHE_NAME
+
+    if not cache_name:
+        return None
+
+    from django_redis import get_redis_connection
+
+    return get_redis_connection(cache_name)
+
+
+def _get_script(connection):
+    """Return the token bucket script (which is run by its SHA once loaded)."""
+
+    global _script  # noqa: PLW0603
+
+    if _script is None:
+        _script = connection.register_script(BUCKET_SCRIPT)
+
+    return _script
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Base class for the token bucket throttles.
+
+    Subclasses set the scope, and get_cache_key returns the bucket for the
+    request (or None not to throttle it).
+    """
+
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def __init__(self):
+        """Set up the throttle, and clear the wait."""
+
+        super().__init__()
+        self._wait = None
+
+    def _format_key(self, ident: str) -> str:
+        """Return the bucket for the identity, in this throttle's scope."""
+
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def _take_token(self, connection, key: str) -> bool:
+        """Take a token from the bucket, and set the wait if there isn't one."""
+
+        refill = self.num_requests / (self.duration * 1000)
+        allowed, wait = _get_script(connection)(
+            keys=[key], args=[self.num_requests, refill], client=connection
+        )
+
+        if not allowed:
+            self._wait = wait / 1000
+
+        return bool(allowed)
+
+    def allow_request(self, request, view):
+        """Return whether the request should be let through."""
+
+        if self.rate is None:
+            return True
+
+        connection = _get_redis_connection()
+
+        if connection is None:
+            return super().allow_request(request, view)
+
+        key = self.get_cache_key(request, view)
+
+        if key is None:
+            return True
+
+        try:
+            allowed = self._take_token(connection, key)
+        except Exception:
+            log.exception("Couldn't check the %s throttle, allowing", self.scope)
+            increment(
+                "throttle_requests", scope=self.scope, result=THROTTLE_RESULT_ERROR
+            )
+            return True
+
+        increment(
+            "throttle_requests",
+            scope=self.scope,
+            result=THROTTLE_RESULT_ALLOWED if allowed else THROTTLE_RESULT_THROTTLED,
+        )
+
+        return allowed
+
+    def throttle_failure(self):
+        """Count the request as throttled, for the per-process fallback."""
+
+        increment(
+            "throttle_requests", scope=self.scope, result=THROTTLE_RESULT_THROTTLED
+        )
+        return super().throttle_failure()
+
+    def wait(self):
+        """Return how many seconds until the request would be let through."""
+
+        if self._wait is not None:
+            return math.ceil(self._wait)
+
+        return super().wait()
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Throttle each authenticated user; anonymous requests aren't throttled."""
+
+    def get_cache_key(self, request, view):  # noqa: ARG002
+        """Return the user's bucket."""
+
+        if not request.user or not request.user.is_authenticated:
+            return None
+
+        return self._format_key(f"user:{request.user.pk}")
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Throttle each client IP address (see DRF's NUM_PROXIES setting)."""
+
+    def get_cache_key(self, request, view):  # noqa: ARG002
+        """Return the IP address's bucket."""
+
+        return self._format_key(f"ip:{self.get_ident(request)}")
+
+
+class AnonTokenBucketThrottle(IPTokenBucketThrottle):
+    """
+    Throttle each IP address's unauthenticated requests, like DRF's
+    AnonRateThrottle (and with its "anon" rate).
+    """
+
+    scope = "anon"
+
+    def get_cache_key(self, request, view):
+        """Return the IP address's bucket, if the user isn't authenticated."""
+
+        if request.user and request.user.is_authenticated:
+            return None
+
+        return super().get_cache_key(request, view)
+
+
+class IntegratedSystemTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Throttle each integrated system, for the API key endpoints.
+
+    This relies on HasIntegratedSystemAPIKey having attached the system to the
+    request; DRF checks permissions before throttles.
+    """
+
+    def get_cache_key(self, request, view):  # noqa: ARG002
+        """Return the integrated system's bucket."""
+
+        system = getattr(request, "integrated_system", None)
+
+        return self._format_key(f"system:{system.pk}") if system else None
@@ -0,0 +1,158 @@
+"""Tests for the token bucket throttles."""
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.decorators import api_view, throttle_classes
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from unified_ecommerce import throttling
+from unified_ecommerce.factories import UserFactory
+from unified_ecommerce.metrics import get_metrics, reset_metrics
+from unified_ecommerce.throttling import (
+    AnonTokenBucketThrottle,
+    IntegratedSystemTokenBucketThrottle,
+    IPTokenBucketThrottle,
+    UserTokenBucketThrottle,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+class UserThrottle(UserTokenBucketThrottle):
+    """A user throttle with a test rate."""
+
+    scope = "test_user"
+    THROTTLE_RATES = {"test_user": "2/min"}
+
+
+class IPThrottle(IPTokenBucketThrottle):
+    """An IP throttle with a test rate."""
+
+    scope = "test_ip"
+    THROTTLE_RATES = {"test_ip": "2/min"}
+
+
+class SystemThrottle(IntegratedSystemTokenBucketThrottle):
+    """An integrated system throttle with a test rate."""
+
+    scope = "test_system"
+    THROTTLE_RATES = {"test_system": "2/min"}
+
+
+@api_view(["POST"])
+@throttle_classes([UserThrottle])
+def view(request):
+    """Return a 201."""
+
+    return Response({}, status=201)
+
+
+@pytest.fixture(autouse=True)
+def _reset(mocker):
+    """Clear the metrics and the registered script."""
+
+    mocker.patch.object(throttling, "_script", None)
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+@pytest.fixture()
+def connection(mocker, settings):
+    """Return a mocked Redis connection for the buckets."""
+
+    settings.MITOL_UE_THROTTLE_CACHE_NAME = "redis"
+    connection = mocker.Mock()
+    mocker.patch("django_redis.get_redis_connection", return_value=connection)
+    return connection
+
+
+def _post(user):
+    """Post to the view as the user."""
+
+    request = APIRequestFactory().post("/", {}, format="json")
+    force_authenticate(request, user=user)
+    return view(request)
+
+
+def _throttle_counts():
+    """Return the throttle_requests counts, keyed by result."""
+
+    return {
+        metric["labels"]["result"]: metric["count"]
+        for metric in get_metrics()["metrics"]
+        if metric["name"] == "throttle_requests"
+    }
+
+
+def test_redis_bucket(connection):
+    """The request should take a token from the user's bucket in Redis."""
+
+    user = UserFactory.create()
+    script = connection.register_script.return_value
+    script.side_effect = [[1, 0], [0, 4500]]
+
+    assert _post(user).status_code == 201
+
+    response = _post(user)
+    assert response.status_code == 429
+    assert response["Retry-After"] == "5"
+
+    script.assert_called_with(
+        keys=[f"throttle:test_user:user:{user.pk}"],
+        args=[2, 2 / 60000],
+        client=connection,
+    )
+    connection.register_script.assert_called_once()
+    assert _throttle_counts() == {"allowed": 1, "throttled": 1}
+
+
+def test_redis_error(connection):
+    """If Redis can't be reached, the request should be let through."""
+
+    connection.register_script.return_value.side_effect = RedisConnectionError
+
+    assert _post(UserFactory.create()).status_code == 201
+    assert _throttle_counts() == {"error": 1}
+
+
+def test_fallback(settings):
+    """Without Redis, DRF's per-process throttling should be used."""
+
+    settings.MITOL_UE_THROTTLE_CACHE_NAME = ""
+    user = UserFactory.create()
+
+    assert [_post(user).status_code for _ in range(3)] == [201, 201, 429]
+    assert _post(UserFactory.create()).status_code == 201
+    assert _throttle_counts() == {"throttled": 1}
+
+
+def test_cache_keys(mocker):
+    """Each throttle should have a bucket per user, IP address or system."""
+
+    request = APIRequestFactory().post("/", REMOTE_ADDR="10.0.0.1")
+    request.user = AnonymousUser()
+
+    assert UserThrottle().get_cache_key(request, None) is None
+    assert IPThrottle().get_cache_key(request, None) == "throttle:test_ip:ip:10.0.0.1"
+    assert (
+        AnonTokenBucketThrottle().get_cache_key(request, None)
+        == "throttle:anon:ip:10.0.0.1"
+    )
+    assert SystemThrottle().get_cache_key(request, None) is None
+
+    request.integrated_system = mocker.Mock(pk=3)
+    assert (
+        SystemThrottle().get_cache_key(request, None) == "throttle:test_system:system:3"
+    )
+
+
+def test_anon_throttle_skips_users(user):
+    """The anonymous throttle shouldn't throttle authenticated users."""
+
+    request = APIRequestFactory().get("/")
+    request.user = user
+
+    assert AnonTokenBucketThrottle().get_cache_key(request, None) is None
@@ -24,6 +24,7 @@ from django.urls import include, path, re_path
 from mitol.apigateway.views import ApiGatewayLogoutView
 
 from unified_ecommerce.utils import prefix_url_patterns
+from unified_ecommerce.views import metrics
 
 base_urlpatterns = [
     path("", include("cart.urls")),
@@ -40,6 +41,8 @@ base_urlpatterns = [
         lambda request: HttpResponse("ok", content_type="text/plain"),  # noqa: ARG005
     ),
     re_path(r"^_/v0/meta/", include("system_meta.private_urls")),
+    re_path(r"^_/v0/payments/", include("payments.private_urls")),
+    re_path(r"^_/v0/metrics/$", metrics, name="metrics"),
     # API Paths
     re_path(r"", include("payments.urls")),
     re_path(r"", include("system_meta.urls")),
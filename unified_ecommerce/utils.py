@@ -12,7 +12,7 @@ import markdown2
 from bs4 import BeautifulSoup
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connections, models
 from django.http import HttpResponseRedirect
 from django.urls.conf import URLPattern, URLResolver
 from mitol.common.utils.datetime import now_in_utc
@@ -171,6 +171,43 @@ def prefetched_iterator(query, chunk_size=2000):
         batch = _next(item.id) if item is not None else None
 
 
+def chunked_iterator(query, chunk_size=2000):
+    """
+    Yield the rows of a queryset in lists of up to chunk_size, in primary key
+    order, holding only one chunk in memory at a time.
+
+    The rows are read with a server-side cursor, unless the database has
+    DISABLE_SERVER_SIDE_CURSORS set (e.g. because it's behind a transaction
+    pooler). Then they're read a chunk at a time, starting after the last
+    primary key of the previous chunk. values() querysets must include "id".
+
+    Args:
+        query (QuerySet): the django queryset to iterate
+        chunk_size (int): the most rows in each chunk
+
+    """
+    base_query = query.order_by("id")
+
+    if not connections[base_query.db].settings_dict.get("DISABLE_SERVER_SIDE_CURSORS"):
+        chunk = []
+        for row in base_query.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+        return
+
+    last_id = 0
+    while chunk := list(base_query.filter(id__gt=last_id)[:chunk_size]):
+        yield chunk
+        last_id = chunk[-1]["id"] if isinstance(chunk[-1], dict) else chunk[-1].id
+
+
 def generate_filepath(filename, directory_name, suffix, prefix):
     """
     Generate and return the filepath for an uploaded image
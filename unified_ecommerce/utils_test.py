@@ -5,9 +5,11 @@ from tempfile import NamedTemporaryFile
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import connections
 
 from unified_ecommerce.factories import UserFactory
 from unified_ecommerce.utils import (
+    chunked_iterator,
     extract_values,
     filter_dict_keys,
     filter_dict_with_renamed_keys,
@@ -115,6 +117,31 @@ def test_prefetched_iterator(chunk_size):
         assert user in fetched_users
 
 
+@pytest.mark.django_db()
+@pytest.mark.parametrize("server_side_cursors", [True, False])
+@pytest.mark.parametrize("values", [True, False])
+@pytest.mark.parametrize("chunk_size", [3, 5, 20])
+def test_chunked_iterator(mocker, server_side_cursors, values, chunk_size):
+    """
+    chunked_iterator should yield all the rows in chunks, in ID order, with or
+    without server-side cursors
+    """
+    users = UserFactory.create_batch(10)
+    mocker.patch.dict(
+        connections["default"].settings_dict,
+        {"DISABLE_SERVER_SIDE_CURSORS": not server_side_cursors},
+    )
+    query = User.objects.values("id") if values else User.objects.all()
+
+    chunks = list(chunked_iterator(query, chunk_size=chunk_size))
+
+    assert [len(chunk) for chunk in chunks[:-1]] == [chunk_size] * (len(chunks) - 1)
+    assert 0 < len(chunks[-1]) <= chunk_size
+    assert [row["id"] if values else row.id for chunk in chunks for row in chunk] == [
+        user.id for user in sorted(users, key=lambda user: user.id)
+    ]
+
+
 def test_extract_values():
     """
     extract_values should return the correct match from a dict
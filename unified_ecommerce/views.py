@@ -0,0 +1,53 @@
+"""Project-level views for Unified Ecommerce."""
+
+from django.conf import settings
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+    renderer_classes,
+)
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+
+from unified_ecommerce.celery_queues import record_broker_queue_depths
+from unified_ecommerce.metrics import get_shared_metrics, render_prometheus
+from unified_ecommerce.permissions import HasMetricsToken
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Renders a metrics snapshot in the Prometheus text format."""
+
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):  # noqa: ARG002
+        """Render the snapshot, or the error detail if it isn't one."""
+
+        if "metrics" not in data:
+            return str(data)
+
+        return render_prometheus(data)
+
+
+@api_view(["GET"])
+# The metrics token is a bearer token, which the JWT authentication would try
+# (and fail) to decode, so only use session authentication here.
+@authentication_classes([SessionAuthentication])
+@permission_classes([IsAdminUser | HasMetricsToken])
+@renderer_classes([JSONRenderer, PrometheusRenderer])
+def metrics(request):  # noqa: ARG001
+    """
+    Return the metrics recorded by every web and Celery worker process.
+
+    Use ?format=prometheus (or Accept: text/plain) for the Prometheus format.
+    The Celery queue depths are read from the broker for each request. Without
+    a metrics store, only this process's metrics are returned.
+    """
+
+    record_broker_queue_depths(settings.CELERY_BROKER_URL)
+
+    return Response(get_shared_metrics())
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.27 on 2026-10-19 10:15
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # The indexes are built concurrently, so users can still be written.
+    atomic = False
+
+    dependencies = [
+        ("users", "0003_add_email_optin_field"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("email"),
+                    name="gin_trgm_ops",
+                ),
+                name="users_user_email_trgm_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("username"),
+                    name="gin_trgm_ops",
+                ),
+                name="users_user_username_trgm_idx",
+            ),
+        ),
+    ]
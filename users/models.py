@@ -7,7 +7,9 @@ from uuid import uuid4
 from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models, transaction
+from django.db.models.functions import Upper
 from django_countries.fields import CountryField
 from mitol.common.models import TimestampedModel
 
@@ -96,6 +98,21 @@ class User(AbstractBaseUser, TimestampedModel, PermissionsMixin):
 
     objects = UserManager()
 
+    class Meta:
+        """Model meta options."""
+
+        indexes = [
+            # For the admin's case-insensitive substring searches.
+            GinIndex(
+                OpClass(Upper("email"), name="gin_trgm_ops"),
+                name="users_user_email_trgm_idx",
+            ),
+            GinIndex(
+                OpClass(Upper("username"), name="gin_trgm_ops"),
+                name="users_user_username_trgm_idx",
+            ),
+        ]
+
     @property
     def is_global(self) -> bool:
         """Return True if the user is a global user (was created via SSO)"""